@@ -34,12 +34,27 @@ if config.config_file_name is not None:
 # add your model's MetaData object here for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Objetos creados con SQL en las migraciones que no están en los modelos
+# (empresa.ubicacion se mantiene por triggers); autogenerate no debe borrarlos
+OBJETOS_SOLO_EN_MIGRACIONES = {
+    ("column", "ubicacion"),
+    ("index", "sp_empresa_ubicacion"),
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None and (type_, name) in OBJETOS_SOLO_EN_MIGRACIONES:
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -59,7 +74,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection, 
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,35 @@
+"""add fulltext indexes for busqueda
+
+Revision ID: 3f8a2c1d9b47
+Revises: ddc02c990b10
+Create Date: 2026-10-19 10:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a2c1d9b47'
+down_revision: Union[str, None] = 'ddc02c990b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Índices FULLTEXT para búsqueda de texto (MATCH ... AGAINST)
+    op.create_index(
+        'ft_empresa_texto', 'empresa', ['razon_social', 'descripcion'],
+        mysql_prefix='FULLTEXT'
+    )
+    op.create_index(
+        'ft_servicio_nombre', 'servicio', ['nombre'],
+        mysql_prefix='FULLTEXT'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ft_servicio_nombre', table_name='servicio')
+    op.drop_index('ft_empresa_texto', table_name='empresa')
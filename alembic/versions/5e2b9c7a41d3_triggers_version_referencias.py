@@ -0,0 +1,48 @@
+"""bump cache_version on rol, permiso and rol_permiso writes
+
+Revision ID: 5e2b9c7a41d3
+Revises: a3f6d8e2c917
+Create Date: 2026-10-19 18:05:42.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b9c7a41d3'
+down_revision: Union[str, None] = 'a3f6d8e2c917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Roles y permisos se editan por SQL o en migraciones, no desde la API:
+# sin estos triggers los workers no ven el cambio (cache_referencias y los
+# bits del evaluador RBAC) hasta la próxima edición de una categoría
+TABLAS = ('rol', 'permiso', 'rol_permiso')
+EVENTOS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _nombre(tabla: str, evento: str) -> str:
+    return f"trg_{tabla}_{evento.lower()}_cache_version"
+
+
+def upgrade() -> None:
+    for tabla in TABLAS:
+        for evento in EVENTOS:
+            op.execute(f"""
+                CREATE TRIGGER {_nombre(tabla, evento)}
+                AFTER {evento} ON {tabla}
+                FOR EACH ROW
+                BEGIN
+                    UPDATE cache_version SET version = version + 1 WHERE nombre = 'referencias';
+                END
+            """)
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        for evento in EVENTOS:
+            op.execute(f"DROP TRIGGER IF EXISTS {_nombre(tabla, evento)}")
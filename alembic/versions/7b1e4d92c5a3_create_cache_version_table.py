@@ -0,0 +1,36 @@
+"""create cache_version table
+
+Revision ID: 7b1e4d92c5a3
+Revises: 3f8a2c1d9b47
+Create Date: 2026-10-19 11:02:17.334910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4d92c5a3'
+down_revision: Union[str, None] = '3f8a2c1d9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versión de los datos de referencia (categorías, roles, permisos)
+    # cacheados en memoria por cada worker
+    cache_version = op.create_table(
+        'cache_version',
+        sa.Column('nombre', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('fecha_actualizacion', sa.DateTime(), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('nombre')
+    )
+    op.bulk_insert(cache_version, [{'nombre': 'referencias', 'version': 1}])
+
+
+def downgrade() -> None:
+    op.drop_table('cache_version')
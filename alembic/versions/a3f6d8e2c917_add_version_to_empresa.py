@@ -0,0 +1,28 @@
+"""add version counter to empresa
+
+Revision ID: a3f6d8e2c917
+Revises: e5a7c3b19d40
+Create Date: 2026-10-19 16:42:11.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6d8e2c917'
+down_revision: Union[str, None] = 'e5a7c3b19d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versión del perfil para los ETags: fecha_actualizacion tiene resolución
+    # de segundos y dos escrituras en el mismo segundo no la cambian
+    op.add_column('empresa', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('empresa', 'version')
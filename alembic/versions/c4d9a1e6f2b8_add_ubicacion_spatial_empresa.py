@@ -0,0 +1,64 @@
+"""add ubicacion POINT column with spatial index to empresa
+
+Revision ID: c4d9a1e6f2b8
+Revises: 7b1e4d92c5a3
+Create Date: 2026-10-19 12:20:05.917342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9a1e6f2b8'
+down_revision: Union[str, None] = '7b1e4d92c5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Punto (longitud latitud) en SRID 4326. Las empresas sin coordenadas
+# quedan en POINT(0 0): el SPATIAL INDEX exige NOT NULL y las búsquedas
+# filtran igual por latitud/longitud IS NOT NULL.
+PUNTO_EMPRESA = (
+    "ST_GeomFromText(CONCAT('POINT(', COALESCE({fila}.longitud, 0), ' ', "
+    "COALESCE({fila}.latitud, 0), ')'), 4326, 'axis-order=long-lat')"
+)
+
+
+def upgrade() -> None:
+    # 1. Columna nullable para poder hacer el backfill
+    op.execute("ALTER TABLE empresa ADD COLUMN ubicacion POINT SRID 4326 NULL")
+
+    # 2. Backfill desde las coordenadas existentes
+    op.execute(f"UPDATE empresa SET ubicacion = {PUNTO_EMPRESA.format(fila='empresa')}")
+
+    # 3. NOT NULL + SPATIAL INDEX
+    op.execute("ALTER TABLE empresa MODIFY COLUMN ubicacion POINT SRID 4326 NOT NULL")
+    op.execute("CREATE SPATIAL INDEX sp_empresa_ubicacion ON empresa (ubicacion)")
+
+    # 4. Triggers: mantienen ubicacion sincronizada con latitud/longitud en
+    #    cualquier escritura (ORM, SQL crudo o scripts de carga)
+    op.execute("DROP TRIGGER IF EXISTS empresa_ubicacion_insert")
+    op.execute(f"""
+        CREATE TRIGGER empresa_ubicacion_insert
+        BEFORE INSERT ON empresa
+        FOR EACH ROW
+        SET NEW.ubicacion = {PUNTO_EMPRESA.format(fila='NEW')}
+    """)
+
+    op.execute("DROP TRIGGER IF EXISTS empresa_ubicacion_update")
+    op.execute(f"""
+        CREATE TRIGGER empresa_ubicacion_update
+        BEFORE UPDATE ON empresa
+        FOR EACH ROW
+        SET NEW.ubicacion = {PUNTO_EMPRESA.format(fila='NEW')}
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS empresa_ubicacion_update")
+    op.execute("DROP TRIGGER IF EXISTS empresa_ubicacion_insert")
+    op.drop_index('sp_empresa_ubicacion', table_name='empresa')
+    op.drop_column('empresa', 'ubicacion')
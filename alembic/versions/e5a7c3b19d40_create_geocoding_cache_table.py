@@ -0,0 +1,39 @@
+"""create geocoding_cache table
+
+Revision ID: e5a7c3b19d40
+Revises: c4d9a1e6f2b8
+Create Date: 2026-10-19 13:05:48.120376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c3b19d40'
+down_revision: Union[str, None] = 'c4d9a1e6f2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'geocoding_cache',
+        sa.Column('clave_hash', sa.String(length=64), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('clave', sa.String(length=500), nullable=False),
+        sa.Column('encontrado', sa.Boolean(), nullable=False),
+        sa.Column('resultado', sa.JSON(), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('expira_en', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('clave_hash')
+    )
+    op.create_index('ix_geocoding_cache_expira_en', 'geocoding_cache', ['expira_en'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_geocoding_cache_expira_en', table_name='geocoding_cache')
+    op.drop_table('geocoding_cache')
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app.database import get_db
 from app.core.security import verify_token
+from app.core.principal_cache import cache_principales, Principal
 from app.models.user import Usuario, TipoUsuario
 from app.schemas.auth import TokenData
 
@@ -17,11 +18,13 @@ security = HTTPBearer()
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> Usuario:
+) -> Principal:
     """
     Dependency para obtener usuario actual autenticado.
     
-    Verifica el token JWT y retorna el usuario desde la BD.
+    Verifica el token JWT y retorna el Principal del usuario (caché de
+    principales). La fila ORM completa se carga solo si el endpoint usa
+    otro atributo (current_user.nombre) o current_user.usuario.
     
     Raises:
         HTTPException 401: Token inválido o usuario no encontrado
@@ -29,8 +32,8 @@ def get_current_user(
     # Verificar token
     token_data: TokenData = verify_token(credentials.credentials)
     
-    # Buscar usuario en BD
-    user = db.query(Usuario).filter(Usuario.usuario_id == token_data.usuario_id).first()
+    # Buscar usuario (caché de principales; la BD solo si no está cacheado)
+    user = cache_principales.obtener(db, token_data.usuario_id, token_data)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -304,9 +307,6 @@ def get_optional_current_user(
     
     try:
         token_data: TokenData = verify_token(credentials.credentials)
-        user = db.query(Usuario).filter(
-            Usuario.usuario_id == token_data.usuario_id
-        ).first()
-        return user
+        return cache_principales.obtener(db, token_data.usuario_id, token_data)
     except:
         return None
\ No newline at end of file
@@ -18,8 +18,9 @@ from app.schemas.auth import (
     ResetPasswordRequest, ResetPasswordResponse     
 )
 from app.auth.permissions import get_user_roles, assign_role
+from app.auth.permisos_token import agregar_claims_permisos
 from app.core.security import (
-    verify_password, get_password_hash, create_access_token,
+    verify_and_update_password_async, get_password_hash_async, create_access_token,
     create_refresh_token, verify_refresh_token_expiry, REFRESH_TOKEN_EXPIRE_DAYS,
     get_current_user
 )
@@ -76,11 +77,17 @@ async def login(
             detail="This account uses Google login. Please sign in with Google."
         )
 
-    if not verify_password(login_data.password, user.password):
+    password_valida, nuevo_hash = await verify_and_update_password_async(login_data.password, user.password)
+    if not password_valida:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    if nuevo_hash:
+        # Hash con un perfil/costo anterior: se migra ahora que tenemos la
+        # contraseña en claro (se guarda con el commit del refresh token)
+        user.password = nuevo_hash
+        logger.info(f"Hash de contraseña actualizado al perfil vigente para usuario {user.usuario_id}")
     # 1. Obtener el rol de sistema más alto del usuario desde la tabla usuario_rol
     roles = get_user_roles(user.usuario_id, db)
     
@@ -98,12 +105,12 @@ async def login(
     # 3. Crear access token y añadir el campo tipo_usuario con el rol principal
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={
+        data=agregar_claims_permisos(user.usuario_id, db, {
             "sub": str(user.usuario_id),
             "email": user.email,
             # 💡 ESTO AHORA ES CORRECTO: Envía el rol de sistema ('SUPERADMIN')
             "tipo_usuario": rol_principal 
-        },
+        }),
         expires_delta=access_token_expires
     )
     
@@ -181,7 +188,7 @@ async def register(
                 )
         
         # 3. Crear nuevo usuario
-        hashed_password = get_password_hash(registro_data.password)
+        hashed_password = await get_password_hash_async(registro_data.password)
         
         new_user = Usuario(
             email=registro_data.email,
@@ -292,12 +299,12 @@ async def refresh_access_token(
         # Crear nuevo access token
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = create_access_token(
-            data={
+            data=agregar_claims_permisos(user.usuario_id, db, {
                 "sub": str(user.usuario_id),
                 "email": user.email,
                 # 💡 Aquí también se usa el rol principal
                 "tipo_usuario": rol_principal 
-            },
+            }),
             expires_delta=access_token_expires
         )
         
@@ -433,11 +440,11 @@ async def google_callback(
         
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = create_access_token(
-            data={
+            data=agregar_claims_permisos(user.usuario_id, db, {
                 "sub": str(user.usuario_id),
                 "email": user.email,
                 "tipo_usuario": rol_principal
-            },
+            }),
             expires_delta=access_token_expires
         )
         
@@ -696,11 +703,11 @@ async def google_token_login(
         # Crear access token
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = create_access_token(
-            data={
+            data=agregar_claims_permisos(user.usuario_id, db, {
                 "sub": str(user.usuario_id),
                 "email": user.email,
                 "tipo_usuario": rol_principal
-            },
+            }),
             expires_delta=access_token_expires
         )
         
@@ -914,7 +921,7 @@ async def reset_password(
             )
         
         # Actualizar contraseña
-        usuario.password = get_password_hash(request.new_password)
+        usuario.password = await get_password_hash_async(request.new_password)
         
         # Marcar token como usado
         reset_token.usado = True
@@ -0,0 +1,133 @@
+# app/api/v1/busqueda.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.database import get_db
+from app.models.user import Usuario
+from app.core.security import get_current_user
+from app.schemas.busqueda import EmpresaBusqueda, ResultadoBusqueda, SugerenciasResponse
+from app.services.busqueda_service import BusquedaService
+from app.services.autocompletado_service import indice_autocompletado, TIPOS_SUGERENCIA
+from fastapi_limiter.depends import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get(
+    "/busqueda/empresas",
+    dependencies=[Depends(RateLimiter(times=120, seconds=60))],
+    response_model=ResultadoBusqueda,
+    status_code=status.HTTP_200_OK,
+    summary="Buscar empresas por texto",
+    description="""
+    Búsqueda de texto sobre razón social, descripción y nombre de servicios
+    de empresas activas, ordenada por relevancia.
+    
+    - Los términos se buscan por prefijo ("pelu" encuentra "peluquería")
+    - No distingue mayúsculas ni acentos
+    - Filtro opcional por categoría y paginación
+    """
+)
+def buscar_empresas(
+    q: str = Query(..., min_length=2, max_length=100, description="Texto a buscar"),
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoría"),
+    pagina: int = Query(1, ge=1, description="Número de página"),
+    por_pagina: int = Query(20, ge=1, le=50, description="Resultados por página"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        resultados, total = BusquedaService.buscar_empresas(
+            db, q, categoria_id=categoria_id, pagina=pagina, por_pagina=por_pagina
+        )
+        
+        total_paginas = (total + por_pagina - 1) // por_pagina
+        
+        return ResultadoBusqueda(
+            consulta=q,
+            resultados=[
+                EmpresaBusqueda(
+                    empresa_id=empresa.empresa_id,
+                    razon_social=empresa.razon_social,
+                    descripcion=empresa.descripcion,
+                    categoria_id=empresa.categoria_id,
+                    logo_url=empresa.logo_url,
+                    rating_promedio=empresa.rating_promedio,
+                    total_calificaciones=empresa.total_calificaciones or 0,
+                    relevancia=relevancia
+                )
+                for empresa, relevancia in resultados
+            ],
+            total=total,
+            pagina=pagina,
+            por_pagina=por_pagina,
+            total_paginas=total_paginas,
+            tiene_siguiente=pagina < total_paginas,
+            tiene_anterior=pagina > 1
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en búsqueda de empresas '{q}': {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al buscar empresas"
+        )
+
+
+@router.get(
+    "/busqueda/autocompletar",
+    dependencies=[Depends(RateLimiter(times=600, seconds=60))],
+    response_model=SugerenciasResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Autocompletar nombres de empresas, categorías y ciudades",
+    description="""
+    Sugerencias para el cuadro de búsqueda mientras el usuario escribe.
+    
+    - Coincide por prefijo de cualquiera de las primeras palabras del nombre
+    - No distingue mayúsculas ni acentos
+    - Empresas ordenadas por rating; categorías y ciudades por cantidad de empresas
+    - Se resuelve en memoria, sin consultar la base de datos
+    """
+)
+def autocompletar(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto escrito hasta ahora"),
+    limite: int = Query(5, ge=1, le=20, description="Máximo de sugerencias por tipo"),
+    tipos: Optional[str] = Query(None, description="Tipos separados por coma: empresa,categoria,ciudad"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    tipos_pedidos = None
+    if tipos:
+        tipos_pedidos = {t.strip().lower() for t in tipos.split(",") if t.strip()}
+        invalidos = tipos_pedidos - set(TIPOS_SUGERENCIA)
+        if invalidos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tipos inválidos: {', '.join(sorted(invalidos))}. Válidos: {', '.join(TIPOS_SUGERENCIA)}"
+            )
+    
+    try:
+        indice_autocompletado.asegurar_construido(db)
+        sugerencias = indice_autocompletado.sugerir(q, limite=limite, tipos=tipos_pedidos)
+        
+        return SugerenciasResponse(
+            consulta=q,
+            empresas=sugerencias["empresa"],
+            categorias=sugerencias["categoria"],
+            ciudades=sugerencias["ciudad"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en autocompletado '{q}': {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor en autocompletado"
+        )
@@ -19,6 +19,7 @@ from app.schemas.calificacion import (
 )
 from app.enums import EstadoTurno, TipoUsuario
 from app.api.deps import get_current_user
+from app.services.indices_empresa import registro_indices
 
 router = APIRouter()
 
@@ -39,6 +40,7 @@ def actualizar_rating_empresa(db: Session, empresa_id: int):
         empresa.rating_promedio = round(float(stats.promedio), 2) if stats.promedio else None
         empresa.total_calificaciones = stats.total or 0
         db.commit()
+        registro_indices.notificar_cambio(db, empresa_id)
         return empresa.rating_promedio
     return None
 
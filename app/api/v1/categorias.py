@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from typing import List
 from sqlalchemy.orm import Session
@@ -9,24 +9,33 @@ from app.schemas.categoria import CategoriaSchema, CategoriaCreate, CategoriaUpd
 from app.crud import get_categorias
 from app.models.categoria import Categoria
 from app.models.user import Usuario
+from app.utils.conditional import ConditionalGet
+from app.services.indices_empresa import registro_indices
+from app.services.referencias_cache import cache_referencias
 
 router = APIRouter()
 
+categorias_etags = ConditionalGet("categorias")
+
 @router.get("/categorias", response_model=List[CategoriaSchema])
 def leer_categorias(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,  
     db: Session = Depends(get_db)
 ):
-    """Listar todas las categorías"""
+    """Listar todas las categorías (soporta ETag / If-None-Match)"""
+    # La versión del caché de referencia sirve de sonda: si el cliente ya
+    # tiene el ETag de esta versión se responde 304 sin serializar nada
+    version = cache_referencias.obtener(db).version
+    respuesta = categorias_etags.verificar(request, (skip, limit), version)
+    if respuesta:
+        return respuesta
+
     categorias = get_categorias(db, skip=skip, limit=limit)
-    return JSONResponse(
-        content=[CategoriaSchema.from_orm(cat).dict() for cat in categorias],
-        status_code=200,
-        # Opcional pero explícito, asegura que se envía el header charset=utf-8
-        media_type="application/json", 
-        headers={"Content-Type": "application/json; charset=utf-8"} 
-    )
+    contenido = [categoria._asdict() for categoria in categorias]
+    # La respuesta ya declara charset=utf-8.
+    return categorias_etags.responder(request, (skip, limit), version, contenido)
 
 
 @router.post("/categorias", response_model=CategoriaSchema, status_code=201)
@@ -51,8 +60,10 @@ def crear_categoria(
     )
     
     db.add(nueva_categoria)
+    cache_referencias.invalidar(db)
     db.commit()
     db.refresh(nueva_categoria)
+    registro_indices.notificar_referencias(db)
     
     return nueva_categoria
     
@@ -89,8 +100,10 @@ def actualizar_categoria(
 
     # 4. Guardar en la base de datos
     db.add(categoria_db)
+    cache_referencias.invalidar(db)
     db.commit()
     db.refresh(categoria_db)
+    registro_indices.notificar_referencias(db)
     
     # 5. Devolver la respuesta a través de JSONResponse para mantener UTF-8
     return JSONResponse(
@@ -1,5 +1,5 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from typing import Optional
 import logging
@@ -12,10 +12,13 @@ from app.models.auditoria import AuditoriaSistema
 from app.models.empresa import Empresa
 from app.models.direccion import Direccion
 from app.auth.permissions import PermissionService  
-from app.schemas.empresa import EmpresasListResponse, EmpresaCreate, EmpresaResponse, EmpresaUpdate
+from app.schemas.empresa import EmpresasListResponse, EmpresaCreate, EmpresaResponse, EmpresaUpdate, PerfilEmpresaResponse
 from app.schemas.equipo import EquipoListResponse, EquipoMiembro, InvitacionCreate, InvitacionResponse, CambiarRolRequest, CambioRolResponse, DesactivarMiembroRequest, DesactivacionResponse
 from app.services.empresa_service import EmpresaService
+from app.services.perfil_empresa_service import PerfilEmpresaService
+from app.services.indices_empresa import registro_indices
 from app.core.security import get_current_user
+from app.utils.conditional import ConditionalGet
 from fastapi_limiter.depends import RateLimiter
 
 # Configurar logging
@@ -23,6 +26,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# ETags emitidos por este worker para perfiles de empresa
+empresa_etags = ConditionalGet("empresa")
+
 @router.get(
     "/empresas", 
     dependencies=[Depends(RateLimiter(times=100, seconds=60))],
@@ -66,24 +72,54 @@ def get_empresas(
     response_model=EmpresaResponse,
     status_code=status.HTTP_200_OK,
     summary="Obtener empresa por ID",
-    description="Obtiene una empresa con direccion incluida"
+    description="""
+    Obtiene una empresa con direccion incluida.
+    
+    **GET condicional:** la respuesta incluye `ETag` y `Last-Modified`.
+    Si el cliente envía `If-None-Match` (o `If-Modified-Since`) y la empresa
+    no cambió, responde 304 sin cargar la empresa ni sus relaciones.
+    """,
+    responses={304: {"description": "La empresa no cambió desde el ETag enviado"}}
 )
 def get_empresa(
     empresa_id: int,
+    request: Request,
     current_user: Usuario = Depends(get_current_user),  
     db: Session = Depends(get_db)
 ):
     try:
+        # 1. Sonda de versión barata (version y fecha_actualizacion por PK)
+        version = EmpresaService.get_empresa_version(db, empresa_id)
+        
+        if not version:
+            logger.warning(f"Empresa {empresa_id} no encontrada")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Empresa con ID {empresa_id} no encontrada"
+            )
+        
+        fecha_actualizacion = version.fecha_actualizacion
+        
+        # 2. Si el ETag del cliente sigue vigente, 304 sin cargar relaciones
+        no_modificada = empresa_etags.verificar(
+            request, empresa_id, version.version, fecha_actualizacion
+        )
+        if no_modificada:
+            return no_modificada
+        
+        # 3. Cargar y serializar el perfil completo
         empresa = EmpresaService.get_empresa_by_id(db, empresa_id)
         
         if not empresa:
-            logger.warning(f"Empresa {empresa_id} no encontrada")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Empresa con ID {empresa_id} no encontrada"
             )
         
-        return empresa
+        contenido = EmpresaResponse.model_validate(empresa).model_dump(mode="json")
+        return empresa_etags.responder(
+            request, empresa_id, version.version, contenido, fecha_actualizacion
+        )
         
     except HTTPException:
         raise
@@ -94,6 +130,63 @@ def get_empresa(
             detail="Error interno del servidor al obtener la empresa"
         )
 
+@router.get(
+    "/empresas/{empresa_id}/perfil",
+    dependencies=[Depends(RateLimiter(times=100, seconds=60))],
+    response_model=PerfilEmpresaResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Perfil completo de empresa",
+    description="""
+    Devuelve en una sola llamada todo lo que muestra la página de una empresa:
+    empresa, dirección, categoría, servicios activos, horarios semanales,
+    resumen de calificaciones y próximos turnos disponibles.
+    
+    **include:** secciones opcionales separadas por coma
+    (`servicios,horarios,calificaciones,disponibilidad`). Sin el parámetro
+    se incluyen todas; las no pedidas se devuelven como null.
+    """
+)
+def get_perfil_empresa(
+    empresa_id: int,
+    include: Optional[str] = Query(
+        None,
+        description="Secciones a incluir: servicios,horarios,calificaciones,disponibilidad"
+    ),
+    slots: int = Query(10, ge=1, le=50, description="Cantidad de próximos turnos disponibles"),
+    dias: int = Query(7, ge=1, le=30, description="Días hacia adelante para buscar disponibilidad"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        secciones = PerfilEmpresaService.parsear_include(include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        perfil = PerfilEmpresaService.obtener_perfil(
+            db, empresa_id, secciones, max_slots=slots, dias_disponibilidad=dias
+        )
+        
+        if not perfil:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Empresa con ID {empresa_id} no encontrada"
+            )
+        
+        return perfil
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener perfil de empresa {empresa_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al obtener el perfil de la empresa"
+        )
+
 @router.post(
     "/empresas", 
     dependencies=[Depends(RateLimiter(times=30, seconds=60))],
@@ -137,6 +230,7 @@ def create_empresa(
         # Vincular empresa_id en UsuarioRol
         usuario_rol.empresa_id = db_empresa.empresa_id
         db.commit()
+        registro_indices.notificar_cambio(db, db_empresa.empresa_id)
         
         logger.info(f"Empresa '{db_empresa.razon_social}' creada exitosamente para usuario {empresa.usuario_id}")
         return db_empresa
@@ -348,6 +442,7 @@ def update_empresa_completa(
         )
         db.add(auditoria)
         db.commit()
+        registro_indices.notificar_cambio(db, empresa_id)
         
         logger.info(f"Empresa {empresa_id} actualizada completamente por usuario {current_user.usuario_id}")
         return empresa_actualizada
@@ -496,6 +591,7 @@ def update_empresa_parcial(
         )
         db.add(auditoria)
         db.commit()
+        registro_indices.notificar_cambio(db, empresa_id)
         
         logger.info(f"Empresa {empresa_id} actualizada parcialmente por usuario {current_user.usuario_id}")
         return empresa_actualizada
@@ -605,6 +701,7 @@ def desactivar_empresa(
         )
         db.add(auditoria)
         db.commit()
+        registro_indices.notificar_cambio(db, empresa_id)
         
         logger.info(f"Empresa {empresa_id} desactivada por usuario {current_user.usuario_id}")
         
@@ -719,6 +816,7 @@ def reactivar_empresa(
         )
         db.add(auditoria)
         db.commit()
+        registro_indices.notificar_cambio(db, empresa_id)
         
         logger.info(f"Empresa {empresa_id} reactivada por usuario {current_user.usuario_id}")
         
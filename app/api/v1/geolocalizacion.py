@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Literal
+from datetime import date, time
 import logging
 import asyncio
 
@@ -11,17 +12,24 @@ from app.schemas.geo import (
     GeoLocation,
     ActualizarCoordenadasRequest,
     ActualizarCoordenadasResponse,
-    BusquedaPorDireccion
+    BusquedaPorDireccion,
+    ResultadoMapa,
+    EmpresaConDisponibilidad,
+    ResultadoDisponibilidadCercana
 )
 from app.services.geolocation_service import geolocation_service
+from app.services.disponibilidad_cercana_service import disponibilidad_cercana_service
 from app.services.geocoding_service_new import geocoding_service
+from app.services.geocoding_cache import cache_direcciones, cache_inversa
+from app.services.geocodificacion_lote import GeocodificadorLote
 from app.models.empresa import Empresa
 from app.models.direccion import Direccion
 from app.models.categoria import Categoria
 from app.core.security import get_current_user
 from app.models.user import Usuario 
 from app.models.rol import UsuarioRol
-from app.auth.permissions import PermissionService
+from app.auth.permissions import PermissionService, require_permission
+from app.services.indices_empresa import registro_indices
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -29,12 +37,54 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/geolocalizacion")
 
 
+def _buscar_cercanas(
+    db: Session,
+    latitud: float,
+    longitud: float,
+    radio_km: float,
+    categoria_id: Optional[int],
+    ordenar_por: str,
+    limit: int,
+    cursor: Optional[str]
+):
+    """
+    Página de empresas cercanas: por distancia se pagina con cursor
+    (distancia_km, empresa_id); por relevancia se devuelven las `limit` mejores.
+    
+    Returns:
+        (empresas, siguiente_cursor)
+    """
+    if ordenar_por == "distancia":
+        return geolocation_service.find_nearby_empresas_pagina(
+            db, latitud, longitud, radio_km, categoria_id, limit, cursor
+        )
+    
+    if cursor:
+        raise HTTPException(
+            status_code=400,
+            detail="La paginación con cursor solo está disponible con ordenar_por=distancia"
+        )
+    empresas = geolocation_service.find_nearby_empresas(
+        db=db,
+        latitud=latitud,
+        longitud=longitud,
+        radio_km=radio_km,
+        categoria_id=categoria_id,
+        limit=limit,
+        ordenar_por=ordenar_por
+    )
+    return empresas, None
+
+
 @router.get("/empresas-cercanas", response_model=ResultadoBusquedaGeografica)
 async def buscar_empresas_cercanas(
     latitud: float = Query(..., ge=-90, le=90, description="Latitud del punto de búsqueda"),
     longitud: float = Query(..., ge=-180, le=180, description="Longitud del punto de búsqueda"),
     radio_km: float = Query(10.0, gt=0, le=100, description="Radio de búsqueda en km (máx 100)"),
     categoria_id: Optional[int] = Query(None, description="Filtrar por categoría específica"),
+    ordenar_por: Literal["distancia", "relevancia"] = Query("distancia", description="distancia o relevancia (distancia + rating)"),
+    limit: int = Query(50, ge=1, le=100, description="Empresas por página"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior (solo orden por distancia)"),
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -50,6 +100,9 @@ async def buscar_empresas_cercanas(
     - 400: Parámetros inválidos, categoría no existe
     - 500: Error de base de datos o servicio
     
+    **Paginación** (orden por distancia): cada respuesta trae `siguiente_cursor`;
+    se pasa como `cursor` para pedir la página siguiente (None = no hay más).
+    
     Ejemplo: /geolocalizacion/empresas-cercanas?latitud=-34.6537&longitud=-58.6199&radio_km=10
     """
     try:
@@ -77,13 +130,9 @@ async def buscar_empresas_cercanas(
         # 3. Buscar empresas cercanas
         logger.info(f"Buscando empresas en radio {radio_km}km desde ({latitud}, {longitud})")
         
-        empresas_encontradas = geolocation_service.find_nearby_empresas(
-            db=db,
-            latitud=latitud,
-            longitud=longitud,
-            radio_km=radio_km,
-            categoria_id=categoria_id,
-            limit=50
+        empresas_encontradas, siguiente_cursor = _buscar_cercanas(
+            db, latitud, longitud, radio_km, categoria_id,
+            ordenar_por, limit, cursor
         )
         
         # 4. Validar que hay resultados o devolver lista vacía (no es error)
@@ -119,6 +168,7 @@ async def buscar_empresas_cercanas(
                             longitud=emp["longitud"]
                         ),
                         distancia_km=emp["distancia_km"],
+                        rating_promedio=emp.get("rating_promedio"),
                         activa=True
                     )
                 )
@@ -135,7 +185,8 @@ async def buscar_empresas_cercanas(
             ),
             radio_km=radio_km,
             total_encontradas=len(empresas_response),
-            empresas=empresas_response
+            empresas=empresas_response,
+            siguiente_cursor=siguiente_cursor
         )
     
     except HTTPException:
@@ -154,6 +205,110 @@ async def buscar_empresas_cercanas(
         )
 
 
+@router.get("/disponibilidad-cercana", response_model=ResultadoDisponibilidadCercana)
+def buscar_disponibilidad_cercana(
+    latitud: float = Query(..., ge=-90, le=90, description="Latitud del punto de búsqueda"),
+    longitud: float = Query(..., ge=-180, le=180, description="Longitud del punto de búsqueda"),
+    fecha: date = Query(..., description="Fecha del turno"),
+    hora_desde: time = Query(time(0, 0), description="Inicio de la franja horaria"),
+    hora_hasta: time = Query(time(23, 59), description="Fin de la franja horaria (exclusivo)"),
+    radio_km: float = Query(10.0, gt=0, le=100, description="Radio de búsqueda en km (máx 100)"),
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoría específica"),
+    servicio: Optional[str] = Query(None, min_length=2, max_length=100, description="Nombre del servicio (contiene)"),
+    ordenar_por: Literal["distancia", "horario"] = Query("distancia", description="distancia o horario (primer slot libre)"),
+    limit: int = Query(20, ge=1, le=50, description="Máximo de empresas"),
+    slots: int = Query(3, ge=1, le=20, description="Slots por empresa"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Empresas cercanas con turnos libres en una fecha y franja horaria.
+    
+    Reemplaza /empresas-cercanas + una llamada a /disponibilidad por empresa:
+    las candidatas salen del índice geográfico y la disponibilidad de todas
+    se calcula con una sola carga de horarios, servicios y turnos.
+    
+    Se devuelven solo las empresas con al menos un slot que empiece dentro de
+    [hora_desde, hora_hasta), ordenadas por distancia y primer slot libre
+    (o al revés con ordenar_por=horario).
+    
+    Ejemplo: /geolocalizacion/disponibilidad-cercana?latitud=-34.6537&longitud=-58.6199&fecha=2025-06-10&hora_desde=17:00&hora_hasta=18:00&servicio=corte
+    """
+    if hora_desde >= hora_hasta:
+        raise HTTPException(
+            status_code=400,
+            detail="Franja inválida: hora_desde debe ser menor que hora_hasta"
+        )
+    
+    empresas, candidatas, truncadas = disponibilidad_cercana_service.buscar(
+        db, latitud, longitud, radio_km, fecha, hora_desde, hora_hasta,
+        categoria_id=categoria_id,
+        servicio=servicio,
+        ordenar_por=ordenar_por,
+        limit=limit,
+        max_slots=slots
+    )
+    
+    return ResultadoDisponibilidadCercana(
+        punto_busqueda=GeoLocation(latitud=latitud, longitud=longitud),
+        radio_km=radio_km,
+        fecha=fecha,
+        hora_desde=hora_desde,
+        hora_hasta=hora_hasta,
+        candidatas_evaluadas=candidatas,
+        candidatas_truncadas=truncadas,
+        total_encontradas=len(empresas),
+        empresas=[
+            EmpresaConDisponibilidad(
+                empresa_id=emp["empresa_id"],
+                razon_social=emp["nombre"],
+                descripcion=emp.get("descripcion"),
+                categoria_id=emp["categoria_id"],
+                coordenadas=GeoLocation(latitud=emp["latitud"], longitud=emp["longitud"]),
+                distancia_km=emp["distancia_km"],
+                rating_promedio=emp.get("rating_promedio"),
+                primer_slot=emp["primer_slot"],
+                slots=emp["slots"]
+            )
+            for emp in empresas
+        ]
+    )
+
+
+@router.get("/mapa", response_model=ResultadoMapa)
+def empresas_en_mapa(
+    min_lat: float = Query(..., ge=-90, le=90, description="Latitud sur del viewport"),
+    max_lat: float = Query(..., ge=-90, le=90, description="Latitud norte del viewport"),
+    min_lng: float = Query(..., ge=-180, le=180, description="Longitud oeste del viewport"),
+    max_lng: float = Query(..., ge=-180, le=180, description="Longitud este del viewport"),
+    zoom: int = Query(..., ge=0, le=22, description="Nivel de zoom del mapa"),
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoría específica"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Empresas visibles en un viewport del mapa.
+    
+    - **Zoom bajo**: clusters por celda de grilla (~64 px) con cantidad y centroide
+    - **Zoom alto** (o pocas empresas en el viewport): puntos individuales,
+      hasta MAPA_MAX_MARCADORES; con más se devuelven clusters igual
+    
+    Se resuelve con el índice geográfico en memoria, sin traer empresas
+    completas de la base.
+    
+    Ejemplo: /geolocalizacion/mapa?min_lat=-34.8&max_lat=-34.5&min_lng=-58.6&max_lng=-58.3&zoom=11
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(
+            status_code=400,
+            detail="Viewport inválido: min_lat/min_lng deben ser menores que max_lat/max_lng"
+        )
+    
+    return geolocation_service.agrupar_en_viewport(
+        db, min_lat, max_lat, min_lng, max_lng, zoom, categoria_id
+    )
+
+
 @router.get("/buscar-por-direccion", response_model=ResultadoBusquedaGeografica)
 async def buscar_por_direccion(
     calle: str = Query(..., min_length=1, description="Nombre de la calle"),
@@ -163,6 +318,9 @@ async def buscar_por_direccion(
     codigo_postal: Optional[str] = Query(None, description="Código postal"),
     radio_km: float = Query(10.0, gt=0, le=100, description="Radio de búsqueda en km"),
     categoria_id: Optional[int] = Query(None, description="Filtrar por categoría"),
+    ordenar_por: Literal["distancia", "relevancia"] = Query("distancia", description="distancia o relevancia (distancia + rating)"),
+    limit: int = Query(50, ge=1, le=100, description="Empresas por página"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior (solo orden por distancia)"),
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -253,13 +411,9 @@ async def buscar_por_direccion(
             )
         
         # 6. Buscar empresas cercanas
-        empresas_encontradas = geolocation_service.find_nearby_empresas(
-            db=db,
-            latitud=lat,
-            longitud=lng,
-            radio_km=radio_km,
-            categoria_id=categoria_id,
-            limit=50
+        empresas_encontradas, siguiente_cursor = _buscar_cercanas(
+            db, lat, lng, radio_km, categoria_id,
+            ordenar_por, limit, cursor
         )
         
         # 7. Construir respuesta
@@ -290,6 +444,7 @@ async def buscar_por_direccion(
                             longitud=emp["longitud"]
                         ),
                         distancia_km=emp["distancia_km"],
+                        rating_promedio=emp.get("rating_promedio"),
                         activa=True
                     )
                 )
@@ -303,7 +458,8 @@ async def buscar_por_direccion(
             punto_busqueda=GeoLocation(latitud=lat, longitud=lng),
             radio_km=radio_km,
             total_encontradas=len(empresas_response),
-            empresas=empresas_response
+            empresas=empresas_response,
+            siguiente_cursor=siguiente_cursor
         )
     
     except HTTPException:
@@ -562,6 +718,7 @@ async def actualizar_coordenadas_empresa(
         
         db.commit()
         db.refresh(empresa)
+        registro_indices.notificar_cambio(db, empresa_id)
         
         logger.info(
             f"Coordenadas actualizadas exitosamente para empresa {empresa_id}: "
@@ -720,13 +877,9 @@ async def buscar_empresas_por_ubicacion(
         # 6. Buscar empresas cercanas
         logger.info(f"Buscando empresas en radio {busqueda.radio_km}km")
         
-        empresas_encontradas = geolocation_service.find_nearby_empresas(
-            db=db,
-            latitud=lat,
-            longitud=lng,
-            radio_km=busqueda.radio_km,
-            categoria_id=busqueda.categoria_id,
-            limit=50
+        empresas_encontradas, siguiente_cursor = _buscar_cercanas(
+            db, lat, lng, busqueda.radio_km, busqueda.categoria_id,
+            busqueda.ordenar_por, busqueda.limit, busqueda.cursor
         )
         
         # 7. Construir respuesta
@@ -758,6 +911,7 @@ async def buscar_empresas_por_ubicacion(
                             longitud=emp["longitud"]
                         ),
                         distancia_km=emp["distancia_km"],
+                        rating_promedio=emp.get("rating_promedio"),
                         activa=True
                     )
                 )
@@ -771,7 +925,8 @@ async def buscar_empresas_por_ubicacion(
             punto_busqueda=GeoLocation(latitud=lat, longitud=lng),
             radio_km=busqueda.radio_km,
             total_encontradas=len(empresas_response),
-            empresas=empresas_response
+            empresas=empresas_response,
+            siguiente_cursor=siguiente_cursor
         )
     
     except HTTPException:
@@ -787,4 +942,63 @@ async def buscar_empresas_por_ubicacion(
         raise HTTPException(
             status_code=500,
             detail="Error interno del servidor. Por favor, intente nuevamente."
-        )
\ No newline at end of file
+        )
+
+@router.get("/cache/estadisticas")
+async def estadisticas_cache_geocodificacion(
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Estadísticas de los cachés de geocodificación (directa e inversa) y del
+    circuit breaker de Georef de este worker.
+    
+    - hits_memoria / hits_base: aciertos en el LRU y en la tabla geocoding_cache
+    - hits_negativos: aciertos sobre consultas que Georef no resolvió
+    - hit_ratio: (hits_memoria + hits_base) / consultas
+    """
+    return {
+        "direcciones": cache_direcciones.estadisticas(),
+        "inversa": cache_inversa.estadisticas(),
+        "circuito_georef": geocoding_service.circuito.estadisticas(),
+    }
+
+
+# Corrida de geocodificación en lote de este worker (una a la vez)
+_geocodificacion_lote: Optional[GeocodificadorLote] = None
+
+
+@router.post("/geocodificacion-lote", status_code=202)
+async def iniciar_geocodificacion_lote(
+    background_tasks: BackgroundTasks,
+    desde_id: Optional[int] = Query(None, description="Empezar después de este empresa_id"),
+    concurrencia: int = Query(4, ge=1, le=16, description="Consultas bulk simultáneas a Georef"),
+    current_user: Usuario = Depends(require_permission("sistema:gestionar_empresas"))
+):
+    """
+    Inicia en segundo plano la geocodificación en lote de empresas sin
+    coordenadas o con requires_verification (ver app/services/geocodificacion_lote).
+    
+    Para reanudar una corrida interrumpida, pasar como desde_id el
+    ultimo_empresa_id informado por GET /geolocalizacion/geocodificacion-lote.
+    """
+    global _geocodificacion_lote
+    
+    if _geocodificacion_lote and _geocodificacion_lote.progreso["en_curso"]:
+        raise HTTPException(status_code=409, detail="Ya hay una geocodificación en lote en curso")
+    
+    _geocodificacion_lote = GeocodificadorLote(concurrencia=concurrencia)
+    _geocodificacion_lote.progreso["en_curso"] = True
+    background_tasks.add_task(_geocodificacion_lote.ejecutar, desde_id)
+    
+    logger.info(f"Usuario {current_user.usuario_id} inició geocodificación en lote (desde_id={desde_id})")
+    return _geocodificacion_lote.progreso
+
+
+@router.get("/geocodificacion-lote")
+async def progreso_geocodificacion_lote(
+    current_user: Usuario = Depends(require_permission("sistema:gestionar_empresas"))
+):
+    """Progreso de la última geocodificación en lote de este worker"""
+    if _geocodificacion_lote is None:
+        raise HTTPException(status_code=404, detail="No se ejecutó ninguna geocodificación en lote")
+    return _geocodificacion_lote.progreso
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -9,9 +9,15 @@ from app.models.user import Usuario
 from app.schemas.servicio import ServicioCreate, ServicioUpdate, ServicioResponse
 from app.api.deps import get_current_user
 from app.auth.permissions import PermissionService
+from app.services.empresa_service import EmpresaService
+from app.services.indices_empresa import registro_indices
+from app.utils.conditional import ConditionalGet
 
 router = APIRouter()
 
+# Los servicios forman parte del perfil: se versionan con empresa.version
+servicios_etags = ConditionalGet("servicios")
+
 
 # ==================== ENDPOINTS ====================
 
@@ -62,8 +68,10 @@ def crear_servicio(
     )
     
     db.add(nuevo_servicio)
+    EmpresaService.marcar_actualizada(db, empresa_id)
     db.commit()
     db.refresh(nuevo_servicio)
+    registro_indices.notificar_cambio(db, empresa_id)
     
     return nuevo_servicio
 
@@ -71,6 +79,7 @@ def crear_servicio(
 @router.get("/empresa/{empresa_id}", response_model=List[ServicioResponse])
 def listar_servicios_empresa(
     empresa_id: int,
+    request: Request,
     solo_activos: bool = True,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -80,15 +89,26 @@ def listar_servicios_empresa(
     
     **Parámetros:**
     - solo_activos: si True, solo retorna servicios activos
+    
+    Soporta GET condicional (ETag / If-None-Match).
     """
-    # Verificar que la empresa existe
-    empresa = db.query(Empresa).filter(Empresa.empresa_id == empresa_id).first()
-    if not empresa:
+    # Verificar que la empresa existe (sonda de versión, sin cargar la fila)
+    version = EmpresaService.get_empresa_version(db, empresa_id)
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Empresa no encontrada"
         )
     
+    fecha_actualizacion = version.fecha_actualizacion
+    clave = (empresa_id, solo_activos)
+    
+    no_modificados = servicios_etags.verificar(
+        request, clave, version.version, fecha_actualizacion
+    )
+    if no_modificados:
+        return no_modificados
+    
     # Query base
     query = db.query(Servicio).filter(Servicio.empresa_id == empresa_id)
     
@@ -97,7 +117,13 @@ def listar_servicios_empresa(
         query = query.filter(Servicio.activo == True)
     
     servicios = query.all()
-    return servicios
+    contenido = [
+        ServicioResponse.model_validate(servicio).model_dump(mode="json")
+        for servicio in servicios
+    ]
+    return servicios_etags.responder(
+        request, clave, version.version, contenido, fecha_actualizacion
+    )
 
 
 @router.get("/{servicio_id}", response_model=ServicioResponse)
@@ -163,8 +189,10 @@ def actualizar_servicio(
     for field, value in update_data.items():
         setattr(servicio, field, value)
     
+    EmpresaService.marcar_actualizada(db, servicio.empresa_id)
     db.commit()
     db.refresh(servicio)
+    registro_indices.notificar_cambio(db, servicio.empresa_id)
     
     return servicio
 
@@ -209,8 +237,10 @@ def desactivar_servicio(
     
     # Soft delete
     servicio.activo = False
+    EmpresaService.marcar_actualizada(db, servicio.empresa_id)
     db.commit()
     db.refresh(servicio)
+    registro_indices.notificar_cambio(db, servicio.empresa_id)
     
     return {
         "message": "Servicio desactivado exitosamente",
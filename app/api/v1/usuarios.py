@@ -55,7 +55,7 @@ def update_my_profile(
     current_user.fecha_actualizacion = datetime.utcnow()
     
     db.commit()
-    db.refresh(current_user)
+    db.refresh(current_user.usuario)
     
     return current_user
 
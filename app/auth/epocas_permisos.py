@@ -0,0 +1,91 @@
+# app/auth/epocas_permisos.py
+"""
+Épocas de permisos: un contador por usuario en Redis que sube con cada
+cambio de sus roles.
+
+Es la única definición de la revocación de permisos entre workers. La usan:
+- el evaluador RBAC (app/auth/evaluador_rbac.py): recarga las asignaciones
+  cacheadas de un usuario cuando cambió su época
+- los permisos en el access token (app/auth/permisos_token.py): el claim
+  "perm" guarda la época con la que se emitió y deja de valer si cambió
+
+La incrementa notificar_cambio_roles (evaluador_rbac), que llaman
+assign_role / remove_role y el evento after_commit de los cambios ORM de
+UsuarioRol. Sin PERMISOS_EPOCA_REDIS_URL actual() devuelve None.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.core.redis_opcional import RedisOpcional
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_REDIS_EPOCA = "permisos:epoca:"
+# Épocas recordadas por worker como máximo (se vacía al superarlo)
+MAX_EPOCAS_LOCALES = 50000
+
+
+class EpocasPermisos:
+    """
+    Contador por usuario en Redis que sube con cada cambio de roles. Cada
+    worker recuerda la época leída durante cache_seconds para que el chequeo
+    no vaya a Redis en cada request.
+    """
+
+    def __init__(self, redis_url: Optional[str], cache_seconds: float):
+        self.cache_seconds = cache_seconds
+        self._redis = RedisOpcional(redis_url, "Épocas de permisos")
+        # usuario_id -> (vence_en, época)
+        self._locales: Dict[int, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def actual(self, usuario_id: int) -> Optional[int]:
+        """Época vigente del usuario; None si no se puede saber (sin Redis o con error)"""
+        with self._lock:
+            local = self._locales.get(usuario_id)
+        if local is not None and local[0] > time.monotonic():
+            return local[1]
+
+        cliente = self._redis.cliente()
+        if cliente is None:
+            return None
+        try:
+            epoca = int(cliente.get(f"{PREFIJO_REDIS_EPOCA}{usuario_id}") or 0)
+        except Exception as e:
+            self._redis.error("lectura", e)
+            return None
+
+        with self._lock:
+            if len(self._locales) >= MAX_EPOCAS_LOCALES:
+                self._locales.clear()
+            self._locales[usuario_id] = (time.monotonic() + self.cache_seconds, epoca)
+        return epoca
+
+    def incrementar(self, *usuario_ids: int) -> None:
+        """Marca como desactualizado todo lo derivado de los roles de esos usuarios"""
+        if not usuario_ids:
+            return
+        with self._lock:
+            for usuario_id in usuario_ids:
+                self._locales.pop(usuario_id, None)
+
+        # Se intenta aunque Redis esté suspendido por un error anterior
+        cliente = self._redis.cliente(ignorar_suspension=True)
+        if cliente is None:
+            return
+        try:
+            pipeline = cliente.pipeline(transaction=False)
+            for usuario_id in usuario_ids:
+                pipeline.incr(f"{PREFIJO_REDIS_EPOCA}{usuario_id}")
+            pipeline.execute()
+        except Exception as e:
+            # Los tokens ya emitidos siguen valiendo hasta que venzan
+            self._redis.error("incremento", e)
+            logger.error(f"No se pudo incrementar la época de permisos de los usuarios {list(usuario_ids)}")
+
+
+epocas_permisos = EpocasPermisos(settings.PERMISOS_EPOCA_REDIS_URL, settings.PERMISOS_EPOCA_CACHE_SECONDS)
@@ -0,0 +1,252 @@
+# app/auth/evaluador_rbac.py
+"""
+Evaluador RBAC en memoria.
+
+PermissionService.usuario_tiene_permiso llamaba a la función MySQL
+usuario_tiene_permiso (join de usuario_rol, rol, rol_permiso y permiso) en
+cada chequeo, y las rutas con require_any_permission / require_all_permissions
+hacen varios por request. El evaluador responde lo mismo sin ir a la base:
+
+- Bits por rol: rol_permiso cargado una vez como un entero por rol, con el
+  bit n encendido si el rol tiene el permiso con permiso_id n. Se recarga
+  cuando cambia la versión de los datos de referencia (cache_referencias),
+  que los triggers de rol, permiso y rol_permiso suben en cada escritura,
+  también las hechas a mano por SQL
+- Asignaciones por usuario: los roles activos del usuario (UsuarioRol),
+  separados en globales y por empresa, con TTL corto
+  (RBAC_ASIGNACIONES_TTL_SECONDS) y LRU acotado
+
+Con todo en memoria un chequeo es un OR de los bits de unos pocos roles.
+
+Misma semántica que la función SQL (test de paridad en test_auth.py):
+- rol y permiso activos; la asignación activa (usuario_rol.activo);
+  rol_permiso.activo no se considera, igual que en la función
+- sin empresa: cualquier rol del usuario; con empresa: roles de esa
+  empresa + roles sin empresa
+
+Cambios de roles: notificar_cambio_roles(usuario_id) descarta las
+asignaciones cacheadas e incrementa la época de permisos del usuario
+(app/auth/epocas_permisos.py). La llaman assign_role / remove_role y, para
+los cambios ORM de UsuarioRol, un evento after_commit de la sesión. Los
+demás workers ven el cambio en PERMISOS_EPOCA_CACHE_SECONDS si hay Redis,
+o al vencer el TTL de asignaciones si no; por eso sin Redis los chequeos
+siguen yendo a la base salvo RBAC_EVALUADOR_EN_MEMORIA=True.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.auth.epocas_permisos import epocas_permisos
+from app.config import settings
+from app.models.rol import UsuarioRol
+from app.services.referencias_cache import SnapshotReferencias, cache_referencias
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------
+# Evaluador
+# ----------------------------------------------------------------------
+
+class BitsRoles(NamedTuple):
+    """Bits de permisos por rol, derivados de una foto de referencias"""
+    snapshot: SnapshotReferencias
+    # rol_id -> bits (solo roles activos)
+    bits_por_rol: Mapping[int, int]
+    # código -> permiso_id (solo permisos activos)
+    permiso_por_codigo: Mapping[str, int]
+
+
+class AsignacionesUsuario(NamedTuple):
+    """Roles activos de un usuario"""
+    globales: Tuple[int, ...]
+    por_empresa: Mapping[int, Tuple[int, ...]]
+
+    def roles(self, empresa_id: Optional[int] = None) -> Tuple[int, ...]:
+        """Roles que cuentan en la empresa (sin empresa: todos)"""
+        if empresa_id is None:
+            return self.globales + tuple(r for roles in self.por_empresa.values() for r in roles)
+        return self.globales + self.por_empresa.get(empresa_id, ())
+
+
+class EvaluadorRBAC:
+
+    def __init__(self, ttl_seconds: float, max_usuarios: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_usuarios = max_usuarios
+        self._bits: Optional[BitsRoles] = None
+        # usuario_id -> (vence_en, época, asignaciones)
+        self._asignaciones: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Bits por rol
+    # ------------------------------------------------------------------
+
+    def bits_roles(self, db: Session) -> BitsRoles:
+        """Bits por rol de la foto de referencias vigente (se recalculan si cambió)"""
+        snapshot = cache_referencias.obtener(db)
+        bits = self._bits
+        if bits is not None and bits.snapshot is snapshot:
+            return bits
+
+        with self._lock:
+            bits = self._bits
+            if bits is None or bits.snapshot is not snapshot:
+                bits = self._cargar_bits(db, snapshot)
+                self._bits = bits
+                logger.debug(f"Bits de roles recalculados (versión {snapshot.version})")
+            return bits
+
+    @staticmethod
+    def _cargar_bits(db: Session, snapshot: SnapshotReferencias) -> BitsRoles:
+        # Mismas condiciones que la función usuario_tiene_permiso
+        filas = db.execute(text("""
+            SELECT rp.rol_id, p.permiso_id, p.codigo
+            FROM rol_permiso rp
+            INNER JOIN rol r ON rp.rol_id = r.rol_id
+            INNER JOIN permiso p ON rp.permiso_id = p.permiso_id
+            WHERE r.activo = 1
+            AND p.activo = 1
+        """)).fetchall()
+
+        bits_por_rol: Dict[int, int] = {}
+        for fila in filas:
+            bits_por_rol[fila.rol_id] = bits_por_rol.get(fila.rol_id, 0) | (1 << fila.permiso_id)
+
+        permiso_por_codigo = {
+            codigo: permiso.permiso_id for codigo, permiso in snapshot.permisos_por_codigo.items()
+        }
+        return BitsRoles(snapshot, MappingProxyType(bits_por_rol), MappingProxyType(permiso_por_codigo))
+
+    # ------------------------------------------------------------------
+    # Asignaciones por usuario
+    # ------------------------------------------------------------------
+
+    def asignaciones(self, db: Session, usuario_id: int) -> AsignacionesUsuario:
+        """Roles activos del usuario (caché con TTL, recargado si cambió su época de permisos)"""
+        epoca = epocas_permisos.actual(usuario_id)
+        with self._lock:
+            entrada = self._asignaciones.get(usuario_id)
+            if entrada is not None:
+                vence_en, epoca_cargada, asignaciones = entrada
+                if vence_en > time.monotonic() and (epoca is None or epoca == epoca_cargada):
+                    self._asignaciones.move_to_end(usuario_id)
+                    return asignaciones
+
+        asignaciones = self._cargar_asignaciones(db, usuario_id)
+        with self._lock:
+            self._asignaciones[usuario_id] = (time.monotonic() + self.ttl_seconds, epoca, asignaciones)
+            self._asignaciones.move_to_end(usuario_id)
+            while len(self._asignaciones) > self.max_usuarios:
+                self._asignaciones.popitem(last=False)
+        return asignaciones
+
+    @staticmethod
+    def _cargar_asignaciones(db: Session, usuario_id: int) -> AsignacionesUsuario:
+        filas = db.execute(text("""
+            SELECT rol_id, empresa_id
+            FROM usuario_rol
+            WHERE usuario_id = :usuario_id
+            AND activo = 1
+        """), {"usuario_id": usuario_id}).fetchall()
+
+        globales = []
+        por_empresa: Dict[int, list] = {}
+        for fila in filas:
+            if fila.empresa_id is None:
+                globales.append(fila.rol_id)
+            else:
+                por_empresa.setdefault(fila.empresa_id, []).append(fila.rol_id)
+
+        return AsignacionesUsuario(
+            tuple(globales),
+            MappingProxyType({empresa_id: tuple(roles) for empresa_id, roles in por_empresa.items()}),
+        )
+
+    def invalidar(self, *usuario_ids: int) -> None:
+        with self._lock:
+            for usuario_id in usuario_ids:
+                self._asignaciones.pop(usuario_id, None)
+
+    def limpiar(self) -> None:
+        """Descarta bits y asignaciones (tests)"""
+        with self._lock:
+            self._bits = None
+            self._asignaciones.clear()
+
+    # ------------------------------------------------------------------
+    # Chequeos
+    # ------------------------------------------------------------------
+
+    def bits_usuario(self, db: Session, usuario_id: int, empresa_id: Optional[int] = None) -> int:
+        """Bits de todos los permisos del usuario en la empresa (sin empresa: en cualquiera)"""
+        bits_por_rol = self.bits_roles(db).bits_por_rol
+        bits = 0
+        for rol_id in self.asignaciones(db, usuario_id).roles(empresa_id):
+            bits |= bits_por_rol.get(rol_id, 0)
+        return bits
+
+    def tiene_permiso(
+        self,
+        db: Session,
+        usuario_id: int,
+        permiso_codigo: str,
+        empresa_id: Optional[int] = None
+    ) -> bool:
+        """Equivalente a usuario_tiene_permiso(usuario_id, permiso_codigo, empresa_id) de MySQL"""
+        bits = self.bits_roles(db)
+        permiso_id = bits.permiso_por_codigo.get(permiso_codigo)
+        if permiso_id is None:
+            return False
+
+        for rol_id in self.asignaciones(db, usuario_id).roles(empresa_id):
+            if (bits.bits_por_rol.get(rol_id, 0) >> permiso_id) & 1:
+                return True
+        return False
+
+
+evaluador_rbac = EvaluadorRBAC(settings.RBAC_ASIGNACIONES_TTL_SECONDS, settings.RBAC_ASIGNACIONES_MAX_USUARIOS)
+
+
+def notificar_cambio_roles(*usuario_ids: int) -> None:
+    """Llamar después del commit que cambia roles de usuarios"""
+    evaluador_rbac.invalidar(*usuario_ids)
+    epocas_permisos.incrementar(*usuario_ids)
+
+
+# ----------------------------------------------------------------------
+# Cambios ORM de UsuarioRol (empresas, Google OAuth)
+# ----------------------------------------------------------------------
+
+CLAVE_SESION = "roles_modificados"
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_roles_modificados(session: Session, flush_context) -> None:
+    modificados = [
+        objeto.usuario_id
+        for objeto in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(objeto, UsuarioRol) and objeto.usuario_id is not None
+    ]
+    if modificados:
+        session.info.setdefault(CLAVE_SESION, set()).update(modificados)
+
+
+@event.listens_for(Session, "after_commit")
+def _notificar_roles_modificados(session: Session) -> None:
+    modificados = session.info.pop(CLAVE_SESION, None)
+    if modificados:
+        notificar_cambio_roles(*modificados)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_roles_modificados(session: Session) -> None:
+    session.info.pop(CLAVE_SESION, None)
@@ -0,0 +1,153 @@
+# app/auth/permisos_token.py
+"""
+Permisos del usuario dentro del access token (claim "perm").
+
+require_permission consultaba la función usuario_tiene_permiso de MySQL en
+cada request. Con JWT_PERMISOS_EN_TOKEN, el login y el refresh agregan al
+token los permisos del usuario y los chequeos pasan a ser solo CPU:
+
+    "perm": {
+        "g": bits de los roles sin empresa,
+        "e": {"<empresa_id>": bits de los roles de esa empresa},
+        "ep": época de permisos del usuario al emitir el token,
+        "rv": versión de los datos de referencia (roles/permisos)
+    }
+
+Los bits son un entero con el bit n encendido si el usuario tiene el
+permiso con permiso_id n, codificado en base64url (little-endian). La
+evaluación replica la función SQL:
+- sin empresa: cualquier rol activo del usuario (global o de cualquier empresa)
+- con empresa: roles de esa empresa + roles sin empresa
+
+El claim se usa solo mientras siga vigente:
+- "ep" igual a la época del usuario en Redis (app/auth/epocas_permisos.py):
+  assign_role / remove_role y los cambios ORM de UsuarioRol la incrementan
+- "rv" igual a la versión de cache_referencias: cambiar los permisos de un
+  rol invalida los bits de todos los tokens emitidos
+Si no está vigente, o Redis no responde, el chequeo va a la base como antes
+hasta que el cliente renueve el token (/refresh emite bits nuevos). Sin
+PERMISOS_EPOCA_REDIS_URL no se emiten claims: sin épocas compartidas un
+worker no se enteraría de los roles quitados en otro.
+"""
+
+import base64
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.auth.epocas_permisos import epocas_permisos
+from app.auth.evaluador_rbac import evaluador_rbac
+from app.config import settings
+from app.services.referencias_cache import cache_referencias
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------
+# Bitsets
+# ----------------------------------------------------------------------
+
+def codificar_bits(bits: int) -> str:
+    """Entero de bits -> base64url sin relleno"""
+    crudo = bits.to_bytes(max(1, (bits.bit_length() + 7) // 8), "little")
+    return base64.urlsafe_b64encode(crudo).rstrip(b"=").decode("ascii")
+
+
+def decodificar_bits(texto: str) -> int:
+    crudo = base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+    return int.from_bytes(crudo, "little")
+
+
+def evaluar_claims(claims: Dict[str, Any], permiso_id: int, empresa_id: Optional[int] = None) -> bool:
+    """Si los bits del claim incluyen el permiso (misma semántica que usuario_tiene_permiso)"""
+    bits = decodificar_bits(claims["g"])
+    por_empresa = claims.get("e") or {}
+    if empresa_id is None:
+        for bits_empresa in por_empresa.values():
+            bits |= decodificar_bits(bits_empresa)
+    elif str(empresa_id) in por_empresa:
+        bits |= decodificar_bits(por_empresa[str(empresa_id)])
+    return bool((bits >> permiso_id) & 1)
+
+
+# ----------------------------------------------------------------------
+# Emisión y evaluación
+# ----------------------------------------------------------------------
+
+def claims_permisos(usuario_id: int, db: Session) -> Optional[Dict[str, Any]]:
+    """
+    Claim "perm" para el access token del usuario, o None si no corresponde
+    incluirlo (desactivado, sin Redis, demasiadas empresas).
+    """
+    if not settings.JWT_PERMISOS_EN_TOKEN:
+        return None
+
+    # La época se lee antes que los roles: si cambian en el medio, el token
+    # sale con la época vieja y se descarta en el primer chequeo
+    epoca = epocas_permisos.actual(usuario_id)
+    if epoca is None:
+        return None
+
+    # Bits calculados por el evaluador RBAC: el token decide igual que la base
+    bits = evaluador_rbac.bits_roles(db)
+    if bits.snapshot.version is None:
+        return None
+
+    asignaciones = evaluador_rbac.asignaciones(db, usuario_id)
+    if len(asignaciones.por_empresa) > settings.JWT_PERMISOS_MAX_EMPRESAS:
+        return None
+
+    def bits_de(rol_ids) -> str:
+        valor = 0
+        for rol_id in rol_ids:
+            valor |= bits.bits_por_rol.get(rol_id, 0)
+        return codificar_bits(valor)
+
+    return {
+        "g": bits_de(asignaciones.globales),
+        "e": {str(empresa_id): bits_de(rol_ids) for empresa_id, rol_ids in asignaciones.por_empresa.items()},
+        "ep": epoca,
+        "rv": bits.snapshot.version,
+    }
+
+
+def agregar_claims_permisos(usuario_id: int, db: Session, datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos del access token con el claim "perm" cuando corresponde"""
+    claims = claims_permisos(usuario_id, db)
+    return {**datos, "perm": claims} if claims else datos
+
+
+def permiso_desde_token(
+    principal,
+    permiso_codigo: str,
+    db: Session,
+    empresa_id: Optional[int] = None
+) -> Optional[bool]:
+    """
+    Decide el permiso con el claim del token del principal.
+
+    Returns:
+        True/False si el claim está vigente; None si hay que consultar la base
+    """
+    token = getattr(principal, "token", None)
+    claims = token.permisos if token is not None else None
+    if not claims:
+        return None
+
+    referencias = cache_referencias.obtener(db)
+    if referencias.version is None or claims.get("rv") != referencias.version:
+        return None
+    if claims.get("ep") != epocas_permisos.actual(principal.usuario_id):
+        return None
+
+    permiso = referencias.permisos_por_codigo.get(permiso_codigo)
+    if permiso is None:
+        # Código inexistente o permiso inactivo
+        return False
+
+    try:
+        return evaluar_claims(claims, permiso.permiso_id, empresa_id)
+    except (KeyError, ValueError, TypeError):
+        logger.warning(f"Claim de permisos inválido en el token del usuario {principal.usuario_id}")
+        return None
@@ -10,6 +10,11 @@ from sqlalchemy import text
 from fastapi import Depends, HTTPException, status
 from app.database import get_db
 from app.api.deps import get_current_user
+from app.services.referencias_cache import cache_referencias
+from app.core.principal_cache import cache_principales
+from app.auth.evaluador_rbac import evaluador_rbac, notificar_cambio_roles
+from app.auth.permisos_token import permiso_desde_token
+from app.config import settings
 
 
 # ============================================================================
@@ -30,6 +35,9 @@ class PermissionService:
     ) -> bool:
         """Verificar si un usuario tiene un permiso específico"""
         try:
+            if settings.rbac_evaluador_en_memoria:
+                return evaluador_rbac.tiene_permiso(self.db, usuario_id, permiso_codigo, empresa_id)
+            
             query = text("""
                 SELECT usuario_tiene_permiso(:usuario_id, :permiso_codigo, :empresa_id) as tiene_permiso
             """)
@@ -49,26 +57,28 @@ class PermissionService:
     def obtener_permisos_usuario(self, usuario_id: int) -> List[Dict[str, Any]]:
         """Obtener permisos básicos de un usuario"""
         try:
-            # Query corregido: usar tablas reales y extraer acción del código
-            query = text("""
-                SELECT DISTINCT
-                    p.codigo as permiso_codigo,
-                    p.nombre as permiso_nombre,
-                    p.categoria as recurso,
-                    SUBSTRING_INDEX(SUBSTRING_INDEX(p.codigo, ':', 2), ':', -1) as accion
-                FROM usuario_rol ur
-                JOIN rol r ON ur.rol_id = r.rol_id
-                JOIN rol_permiso rp ON r.rol_id = rp.rol_id
-                JOIN permiso p ON rp.permiso_id = p.permiso_id
-                WHERE ur.usuario_id = :usuario_id 
-                AND ur.activo = 1
-                AND r.activo = 1
-                AND p.activo = 1
-                ORDER BY p.categoria, p.codigo
-            """)
+            # Mismos bits por rol que usuario_tiene_permiso (semántica de la
+            # función SQL: rol_permiso.activo no se considera)
+            bits_roles = evaluador_rbac.bits_roles(self.db)
+            bits = 0
+            for rol_id in _roles_activos_usuario(usuario_id, self.db):
+                bits |= bits_roles.bits_por_rol.get(rol_id, 0)
+            
+            permisos_por_codigo = bits_roles.snapshot.permisos_por_codigo
+            permisos = []
+            for codigo, permiso_id in bits_roles.permiso_por_codigo.items():
+                if not (bits >> permiso_id) & 1:
+                    continue
+                permiso = permisos_por_codigo[codigo]
+                partes = codigo.split(":")
+                permisos.append({
+                    "permiso_codigo": codigo,
+                    "permiso_nombre": permiso.nombre,
+                    "recurso": permiso.categoria,
+                    "accion": partes[1] if len(partes) > 1 else partes[0]
+                })
             
-            result = self.db.execute(query, {"usuario_id": usuario_id}).fetchall()
-            return [dict(row._mapping) for row in result]
+            return sorted(permisos, key=lambda p: (p["recurso"], p["permiso_codigo"]))
             
         except Exception as e:
             print(f"Error obteniendo permisos: {e}")
@@ -121,6 +131,23 @@ def get_user_permissions(usuario_id: int, db: Session) -> List[Dict[str, Any]]:
     return service.obtener_permisos_usuario(usuario_id)
 
 
+def principal_has_permission(
+    current_user,
+    permission_code: str,
+    db: Session,
+    empresa_id: Optional[int] = None
+) -> bool:
+    """
+    Como user_has_permission, pero primero intenta decidir con los permisos
+    del access token (claim "perm", ver app/auth/permisos_token.py). Si el
+    token no los trae o quedaron desactualizados, consulta la base.
+    """
+    decision = permiso_desde_token(current_user, permission_code, db, empresa_id)
+    if decision is not None:
+        return decision
+    return user_has_permission(current_user.usuario_id, permission_code, db, empresa_id)
+
+
 # ============================================================================
 # DECORADORES DE FASTAPI (NUEVOS)
 # ============================================================================
@@ -178,7 +205,7 @@ def require_permission(permission_code: str, empresa_id_param: Optional[str] = N
         # TODO: Extraer empresa_id del path si empresa_id_param está definido
         # Esto requiere access a los path params, se implementará en siguiente iteración
         
-        if not user_has_permission(current_user.usuario_id, permission_code, db, empresa_id):
+        if not principal_has_permission(current_user, permission_code, db, empresa_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permiso denegado. Se requiere: {permission_code}"
@@ -225,7 +252,7 @@ def require_any_permission(permission_codes: List[str]):
         
         # Verificar si tiene al menos uno de los permisos
         has_permission = any(
-            user_has_permission(current_user.usuario_id, code, db)
+            principal_has_permission(current_user, code, db)
             for code in permission_codes
         )
         
@@ -277,7 +304,7 @@ def require_all_permissions(permission_codes: List[str]):
         # Verificar todos los permisos
         missing_permissions = [
             code for code in permission_codes
-            if not user_has_permission(current_user.usuario_id, code, db)
+            if not principal_has_permission(current_user, code, db)
         ]
         
         if missing_permissions:
@@ -295,6 +322,21 @@ def require_all_permissions(permission_codes: List[str]):
 # HELPERS DE ROLES (NUEVO - TRANSICIÓN DE tipo_usuario)
 # ============================================================================
 
+def _roles_activos_usuario(usuario_id: int, db: Session) -> List[int]:
+    """IDs de los roles con asignación activa del usuario (la validez del rol la da el caché)"""
+    if settings.rbac_evaluador_en_memoria:
+        return list(evaluador_rbac.asignaciones(db, usuario_id).roles())
+    
+    query = text("""
+        SELECT rol_id
+        FROM usuario_rol
+        WHERE usuario_id = :usuario_id
+        AND activo = 1
+    """)
+    
+    return [row.rol_id for row in db.execute(query, {"usuario_id": usuario_id}).fetchall()]
+
+
 def user_has_role(usuario_id: int, rol_nombre: str, db: Session) -> bool:
     """
     Verifica si un usuario tiene un rol específico.
@@ -308,22 +350,11 @@ def user_has_role(usuario_id: int, rol_nombre: str, db: Session) -> bool:
         True si tiene el rol activo
     """
     try:
-        query = text("""
-            SELECT COUNT(*) as count
-            FROM usuario_rol ur
-            JOIN rol r ON ur.rol_id = r.rol_id
-            WHERE ur.usuario_id = :usuario_id
-            AND r.nombre = :rol_nombre
-            AND ur.activo = 1
-            AND r.activo = 1
-        """)
-        
-        result = db.execute(query, {
-            "usuario_id": usuario_id,
-            "rol_nombre": rol_nombre
-        }).fetchone()
+        rol = cache_referencias.obtener(db).rol(rol_nombre)
+        if rol is None:
+            return False
         
-        return result.count > 0
+        return rol.rol_id in _roles_activos_usuario(usuario_id, db)
         
     except Exception as e:
         print(f"Error verificando rol: {e}")
@@ -342,18 +373,13 @@ def get_user_roles(usuario_id: int, db: Session) -> List[str]:
         Lista de nombres de roles
     """
     try:
-        query = text("""
-            SELECT r.nombre
-            FROM usuario_rol ur
-            JOIN rol r ON ur.rol_id = r.rol_id
-            WHERE ur.usuario_id = :usuario_id
-            AND ur.activo = 1
-            AND r.activo = 1
-            ORDER BY r.nivel DESC
-        """)
-        
-        result = db.execute(query, {"usuario_id": usuario_id}).fetchall()
-        return [row.nombre for row in result]
+        roles_por_id = cache_referencias.obtener(db).roles_por_id
+        roles = [
+            roles_por_id[rol_id]
+            for rol_id in _roles_activos_usuario(usuario_id, db)
+            if rol_id in roles_por_id
+        ]
+        return [rol.nombre for rol in sorted(roles, key=lambda r: r.nivel, reverse=True)]
         
     except Exception as e:
         print(f"Error obteniendo roles: {e}")
@@ -396,14 +422,8 @@ def assign_role(
     from fastapi import HTTPException, status
     
     try:
-        # 1. Verificar que el rol existe
-        query_rol = text("""
-            SELECT rol_id, tipo 
-            FROM rol 
-            WHERE nombre = :rol_nombre AND activo = 1
-        """)
-        
-        rol = db.execute(query_rol, {"rol_nombre": rol_nombre}).fetchone()
+        # 1. Verificar que el rol existe (caché de referencia)
+        rol = cache_referencias.obtener(db).rol(rol_nombre)
         
         if not rol:
             raise HTTPException(
@@ -453,6 +473,8 @@ def assign_role(
                 """)
                 db.execute(query_activar, {"usuario_rol_id": existe.usuario_rol_id})
                 db.commit()
+                cache_principales.invalidar(usuario_id)
+                notificar_cambio_roles(usuario_id)
                 return True
             else:
                 raise HTTPException(
@@ -473,6 +495,8 @@ def assign_role(
         })
         
         db.commit()
+        cache_principales.invalidar(usuario_id)
+        notificar_cambio_roles(usuario_id)
         return True
         
     except HTTPException:
@@ -510,13 +534,8 @@ def remove_role(
     from fastapi import HTTPException, status
     
     try:
-        # Obtener rol_id
-        query_rol = text("""
-            SELECT rol_id FROM rol 
-            WHERE nombre = :rol_nombre AND activo = 1
-        """)
-        
-        rol = db.execute(query_rol, {"rol_nombre": rol_nombre}).fetchone()
+        # Obtener rol_id (caché de referencia)
+        rol = cache_referencias.obtener(db).rol(rol_nombre)
         
         if not rol:
             raise HTTPException(
@@ -541,6 +560,8 @@ def remove_role(
         })
         
         db.commit()
+        cache_principales.invalidar(usuario_id)
+        notificar_cambio_roles(usuario_id)
         
         if result.rowcount == 0:
             raise HTTPException(
@@ -54,6 +54,137 @@ class Settings(BaseSettings):
     # ✅ NUEVO: Frontend URL dinámica según entorno
     FRONTEND_URL: Optional[str] = None  # Se lee del .env
     
+    # ========================================
+    # ÍNDICES EN MEMORIA (búsqueda, autocompletado, geo)
+    # ========================================
+    
+    # Cada cuántos segundos cada worker toma los cambios de empresas hechos por otros workers
+    INDICES_SYNC_INTERVAL_SECONDS: int = 30
+    
+    # False: las búsquedas geográficas van a la base (SPATIAL INDEX en MySQL) en lugar del índice en memoria
+    GEO_INDICE_EN_MEMORIA: bool = True
+    
+    # Mapa por viewport: desde este zoom (o con hasta MAPA_MAX_PUNTOS empresas) se
+    # devuelven puntos individuales en lugar de clusters
+    MAPA_ZOOM_PUNTOS: int = 15
+    MAPA_MAX_PUNTOS: int = 200
+    # Tope de puntos o clusters por respuesta: con zoom alto y más empresas que
+    # esto en el viewport también se agrupa
+    MAPA_MAX_MARCADORES: int = 1000
+    
+    # Búsqueda "cercanas con disponibilidad": empresas más cercanas a evaluar como máximo
+    DISPONIBILIDAD_CERCANA_MAX_CANDIDATAS: int = 200
+    
+    # Cada cuántos segundos cada worker verifica la versión de categorías/roles/permisos cacheados
+    REFERENCIAS_CHECK_INTERVAL_SECONDS: float = 5
+    
+    # ========================================
+    # CACHÉ DE GEOCODIFICACIÓN
+    # ========================================
+    
+    # Vigencia de direcciones geocodificadas y de resultados vacíos (caché negativo)
+    GEOCODING_CACHE_TTL_DIAS: int = 30
+    GEOCODING_CACHE_TTL_NEGATIVO_HORAS: int = 24
+    # Entradas en el LRU en memoria de cada worker
+    GEOCODING_CACHE_MAX_ENTRADAS: int = 10000
+    # Geocodificación inversa: lado de la celda de la grilla, entradas en memoria y
+    # si se guarda también en la tabla geocoding_cache
+    GEOCODING_INVERSA_GRILLA_METROS: float = 50.0
+    GEOCODING_INVERSA_MAX_ENTRADAS: int = 20000
+    GEOCODING_INVERSA_PERSISTIR: bool = True
+    
+    # Circuit breaker de Georef: fallos consecutivos para abrirlo y segundos hasta
+    # probar de nuevo. Con el circuito abierto se responde con el gazetteer local
+    GEOREF_CIRCUITO_UMBRAL_FALLOS: int = 5
+    GEOREF_CIRCUITO_SEGUNDOS_ABIERTO: float = 30.0
+    # Archivo de localidades adicional para el gazetteer local (CSV o JSON de datos.gob.ar).
+    # Las localidades que no estén en el incluido ni acá no tienen respaldo sin red ni
+    # validación por ciudad (para regenerar el incluido ver app/services/gazetteer.py)
+    GEOCODING_LOCALIDADES_ARCHIVO: Optional[str] = None
+    
+    # ========================================
+    # CLIENTES HTTP SALIENTES (Georef, integraciones)
+    # ========================================
+    # HTTP/2 si está instalado h2 (extra httpx[http2] de requirements.txt);
+    # si no, HTTP/1.1. El protocolo en uso se informa en el log de startup
+    
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    # Conexiones simultáneas y keep-alive contra cada host externo. Con menos
+    # keep-alive que conexiones, bajo carga httpcore cierra y reabre conexiones
+    # en cada request (ver benchmarks/bench_geocoding.py)
+    HTTP_MAX_CONEXIONES_POR_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_POR_HOST: int = 20
+    HTTP_KEEPALIVE_SECONDS: float = 30.0
+    
+    # ========================================
+    # HASHING DE CONTRASEÑAS (bcrypt fuera del event loop)
+    # ========================================
+    
+    # Hashes/verificaciones simultáneos por worker y cuántos pueden esperar
+    # en cola antes de responder 503 (ver app/core/password_hashing.py)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_EN_COLA: int = 64
+    
+    # Perfil de hashing: "bcrypt" o "argon2id" (requiere argon2-cffi).
+    # Los hashes con otro perfil/costo se rehashean en el próximo login.
+    # Medir con benchmarks/bench_password_hashing.py antes de cambiarlos
+    PASSWORD_HASH_PERFIL: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_MEMORIA_KIB: int = 19456
+    PASSWORD_ARGON2_ITERACIONES: int = 2
+    PASSWORD_ARGON2_PARALELISMO: int = 1
+    
+    # ========================================
+    # CACHÉ DE USUARIOS AUTENTICADOS (get_current_user)
+    # ========================================
+    
+    # Nivel local de cada worker: también es el desfase máximo que ve otro
+    # worker después de desactivar un usuario o cambiarle los roles
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 10
+    PRINCIPAL_CACHE_MAX_ENTRADAS: int = 10000
+    # Nivel compartido en Redis (ej: el mismo REDIS_URL del rate limiting).
+    # None = solo el nivel local
+    PRINCIPAL_CACHE_REDIS_URL: Optional[str] = None
+    # Corto a propósito: si falla el borrado al invalidar (Redis caído) es lo
+    # que un usuario desactivado puede seguir autenticándose
+    PRINCIPAL_CACHE_REDIS_TTL_SECONDS: int = 60
+    
+    # ========================================
+    # VERIFICACIÓN DE ACCESS TOKENS (JWT)
+    # ========================================
+    
+    # Librería JWT: "jose" o "pyjwt" (requiere PyJWT). Ver app/core/jwt_verificacion.py
+    JWT_BACKEND: str = "jose"
+    # Tokens ya verificados que cada worker recuerda hasta su "exp" (0 = sin caché)
+    JWT_VERIFICACION_CACHE_MAX: int = 10000
+    
+    # ========================================
+    # PERMISOS (RBAC en memoria y en el access token)
+    # ========================================
+    
+    # Evaluador en memoria (app/auth/evaluador_rbac.py) en lugar de la función
+    # usuario_tiene_permiso de MySQL. None = solo si hay PERMISOS_EPOCA_REDIS_URL:
+    # sin Redis, un rol quitado en un worker sigue valiendo en los demás hasta
+    # RBAC_ASIGNACIONES_TTL_SECONDS. Con True y sin Redis se acepta esa ventana
+    RBAC_EVALUADOR_EN_MEMORIA: Optional[bool] = None
+    # Vigencia y cantidad de usuarios con roles cacheados en cada worker
+    RBAC_ASIGNACIONES_TTL_SECONDS: float = 10
+    RBAC_ASIGNACIONES_MAX_USUARIOS: int = 50000
+    
+    # Ver app/auth/permisos_token.py
+    # Incluir en el JWT los permisos del usuario (bitset por permiso_id, global y
+    # por empresa): require_permission los evalúa sin ir a la base mientras la
+    # época de permisos del usuario no cambie
+    JWT_PERMISOS_EN_TOKEN: bool = False
+    # Con roles en más empresas que esto no se incluyen (el token crecería demasiado)
+    JWT_PERMISOS_MAX_EMPRESAS: int = 20
+    # Redis con las épocas de permisos, compartido entre workers. Sin él no se
+    # emiten permisos en el token
+    PERMISOS_EPOCA_REDIS_URL: Optional[str] = None
+    # Segundos que cada worker reutiliza la época leída de Redis (desfase máximo
+    # entre quitar un rol y que los tokens emitidos dejen de valer)
+    PERMISOS_EPOCA_CACHE_SECONDS: float = 2
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -67,6 +198,17 @@ class Settings(BaseSettings):
             return self.database_url.replace("mysql://", "mysql+pymysql://", 1)
         return self.database_url
     
+    @property
+    def rbac_evaluador_en_memoria(self) -> bool:
+        """
+        Si los chequeos de permiso usan el evaluador en memoria. Por defecto
+        solo con Redis de épocas: así un rol quitado deja de valer en todos
+        los workers en PERMISOS_EPOCA_CACHE_SECONDS
+        """
+        if self.RBAC_EVALUADOR_EN_MEMORIA is None:
+            return bool(self.PERMISOS_EPOCA_REDIS_URL)
+        return self.RBAC_EVALUADOR_EN_MEMORIA
+    
     @property
     def brevo_enabled(self) -> bool:
         """
@@ -0,0 +1,127 @@
+# app/core/http_client.py
+"""
+Clientes HTTP salientes compartidos (Georef y otras integraciones).
+
+Un httpx.AsyncClient por host, creado una vez y reutilizado durante toda
+la vida de la aplicación: mantiene conexiones keep-alive (sin handshake
+TCP+TLS por request), usa HTTP/2 y limita las conexiones simultáneas
+contra cada host.
+
+HTTP/2 necesita el paquete h2, que instala el extra httpx[http2] de
+requirements.txt. Si falta, los clientes usan HTTP/1.1 y el startup lo
+avisa en el log (ver protocolo).
+
+Uso:
+    from app.core.http_client import clientes_http
+
+    cliente = clientes_http.cliente(url)
+    response = await cliente.get(url, params=params)
+
+main.py llama a cerrar() en el shutdown.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroClientesHTTP:
+    """
+    Registro de clientes httpx por origen (esquema + host + puerto).
+
+    Un cliente queda atado al event loop donde abrió sus conexiones. Los
+    scripts y tests con varios asyncio.run (o threads con su propio loop)
+    obtienen un cliente nuevo, y el anterior no queda abierto:
+    - cada cliente se cierra solo cuando termina su loop (asyncio.run
+      cancela las tareas pendientes y espera que terminen)
+    - si se reemplaza mientras su loop sigue corriendo en otro thread, se
+      cierra en ese loop
+    """
+
+    def __init__(self):
+        # origen -> (cliente, event loop donde se creó, tarea que lo cierra al terminar el loop)
+        self._clientes: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop, asyncio.Task]] = {}
+        self.http2 = importlib.util.find_spec("h2") is not None
+
+    @property
+    def protocolo(self) -> str:
+        return "HTTP/2" if self.http2 else "HTTP/1.1"
+
+    @staticmethod
+    def _origen(url: str) -> str:
+        partes = urlsplit(url)
+        return f"{partes.scheme}://{partes.netloc}"
+
+    def cliente(self, url: str) -> httpx.AsyncClient:
+        """Cliente compartido para el host de la URL (se crea en el primer uso)"""
+        origen = self._origen(url)
+        loop = asyncio.get_running_loop()
+
+        entrada = self._clientes.get(origen)
+        if entrada is not None and not entrada[0].is_closed and entrada[1] is loop:
+            return entrada[0]
+
+        if entrada is not None:
+            self._descartar(*entrada)
+
+        cliente = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONEXIONES_POR_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_POR_HOST,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_SECONDS
+            )
+        )
+        tarea = loop.create_task(self._cerrar_al_terminar_el_loop(cliente))
+        self._clientes[origen] = (cliente, loop, tarea)
+        logger.info(f"Cliente HTTP creado para {origen} ({self.protocolo})")
+        return cliente
+
+    @staticmethod
+    async def _cerrar_al_terminar_el_loop(cliente: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # Cancelada al terminar el loop (o en cerrar()): las conexiones se
+            # cierran en el loop donde se abrieron
+            await cliente.aclose()
+
+    @staticmethod
+    def _descartar(cliente: httpx.AsyncClient, loop: asyncio.AbstractEventLoop, tarea: asyncio.Task) -> None:
+        """Cierra un cliente reemplazado en su propio loop"""
+        if cliente.is_closed or loop.is_closed():
+            # Ya lo cerró su tarea al terminar el loop
+            return
+        if loop.is_running():
+            loop.call_soon_threadsafe(tarea.cancel)
+        else:
+            # Loop detenido pero no cerrado: su tarea lo cierra cuando el loop
+            # se finalice (asyncio.run / Runner cancelan las tareas pendientes)
+            logger.debug("Cliente HTTP reemplazado; se cierra al finalizar su event loop")
+
+    async def cerrar(self) -> None:
+        """Cierra todos los clientes (shutdown de la aplicación)"""
+        clientes = list(self._clientes.values())
+        self._clientes.clear()
+        loop = asyncio.get_running_loop()
+        for cliente, loop_cliente, tarea in clientes:
+            try:
+                if loop_cliente is loop:
+                    tarea.cancel()
+                    await cliente.aclose()
+                else:
+                    self._descartar(cliente, loop_cliente, tarea)
+            except Exception as e:
+                logger.warning(f"Error cerrando cliente HTTP: {str(e)}")
+
+
+clientes_http = RegistroClientesHTTP()
@@ -0,0 +1,202 @@
+# app/core/jwt_verificacion.py
+"""
+Verificación de access tokens con caché de tokens ya verificados.
+
+verify_token decodificaba el JWT en cada request: HMAC de la firma, base64
+y parseo JSON del payload, más la validación de claims de python-jose. Un
+cliente manda el mismo bearer token en todos sus requests hasta que vence,
+así que el resultado se puede reutilizar:
+
+- LRU acotado (JWT_VERIFICACION_CACHE_MAX) de token -> (exp, TokenData)
+- La clave es el token completo, no solo la firma: un token con el payload
+  modificado nunca coincide con una entrada verificada
+- Se respeta "exp": una entrada vencida se descarta y el token se rechaza
+  igual que lo haría la librería. Los tokens sin "exp" no se cachean
+- Solo se cachean tokens válidos: uno inválido siempre paga la verificación
+  completa (no se puede llenar el caché mandando basura)
+
+La librería JWT es intercambiable (JWT_BACKEND):
+- jose: python-jose, la de siempre
+- pyjwt: PyJWT, más rápida al decodificar; dependencia opcional
+
+Medir con benchmarks/bench_auth.py.
+
+Uso:
+    from app.core.jwt_verificacion import verificador_tokens, TokenInvalidoError
+
+    token_data = verificador_tokens.verificar(token)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.schemas.auth import TokenData
+
+logger = logging.getLogger(__name__)
+
+
+BACKENDS_JWT = ("jose", "pyjwt")
+
+
+class TokenInvalidoError(Exception):
+    """Token con firma inválida, vencido o con un payload inesperado"""
+    pass
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+class BackendJose:
+    nombre = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def codificar(self, payload: Dict[str, Any], clave: str, algoritmo: str) -> str:
+        return self._jwt.encode(payload, clave, algorithm=algoritmo)
+
+    def decodificar(self, token: str, clave: str, algoritmo: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(token, clave, algorithms=[algoritmo])
+        except self._error as e:
+            raise TokenInvalidoError(str(e))
+
+
+class BackendPyJWT:
+    nombre = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt
+        except ImportError:
+            raise RuntimeError("El backend JWT pyjwt requiere el paquete PyJWT")
+
+        self._jwt = jwt
+        self._error = jwt.InvalidTokenError
+
+    def codificar(self, payload: Dict[str, Any], clave: str, algoritmo: str) -> str:
+        return self._jwt.encode(payload, clave, algorithm=algoritmo)
+
+    def decodificar(self, token: str, clave: str, algoritmo: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(token, clave, algorithms=[algoritmo])
+        except self._error as e:
+            raise TokenInvalidoError(str(e))
+
+
+def crear_backend_jwt(nombre: Optional[str] = None):
+    """Backend JWT por nombre (por defecto settings.JWT_BACKEND)"""
+    nombre = nombre or settings.JWT_BACKEND
+    if nombre == "jose":
+        return BackendJose()
+    if nombre == "pyjwt":
+        return BackendPyJWT()
+    raise ValueError(f"Backend JWT desconocido: {nombre} (opciones: {', '.join(BACKENDS_JWT)})")
+
+
+# ----------------------------------------------------------------------
+# Verificación con caché
+# ----------------------------------------------------------------------
+
+class VerificadorTokens:
+
+    def __init__(self, backend, clave: str, algoritmo: str, max_entradas: int):
+        self.backend = backend
+        self.clave = clave
+        self.algoritmo = algoritmo
+        # 0 desactiva el caché
+        self.max_entradas = max_entradas
+
+        # token -> (exp en segundos epoch, TokenData)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._estadisticas = {"aciertos": 0, "decodificados": 0, "vencidos": 0}
+
+    def codificar(self, payload: Dict[str, Any]) -> str:
+        return self.backend.codificar(payload, self.clave, self.algoritmo)
+
+    def verificar(self, token: str) -> TokenData:
+        """
+        TokenData del token. El TokenData devuelto puede estar compartido
+        entre requests: no modificarlo.
+
+        Raises:
+            TokenInvalidoError: firma inválida, vencido o sin usuario_id
+        """
+        if self.max_entradas > 0:
+            token_data = self._obtener_cache(token)
+            if token_data is not None:
+                return token_data
+
+        payload = self.backend.decodificar(token, self.clave, self.algoritmo)
+        self._contar("decodificados")
+        token_data = self._token_data(payload)
+
+        exp = payload.get("exp")
+        if self.max_entradas > 0 and isinstance(exp, (int, float)):
+            self._guardar_cache(token, float(exp), token_data)
+        return token_data
+
+    @staticmethod
+    def _token_data(payload: Dict[str, Any]) -> TokenData:
+        try:
+            usuario_id = int(payload["sub"])
+        except (KeyError, TypeError, ValueError):
+            raise TokenInvalidoError("Token sin usuario_id (sub) válido")
+        return TokenData(
+            usuario_id=usuario_id,
+            email=payload.get("email"),
+            tipo_usuario=payload.get("tipo_usuario"),
+            permisos=payload.get("perm"),
+        )
+
+    def _obtener_cache(self, token: str) -> Optional[TokenData]:
+        with self._lock:
+            entrada = self._cache.get(token)
+            if entrada is None:
+                return None
+            exp, token_data = entrada
+            if exp <= time.time():
+                del self._cache[token]
+                self._estadisticas["vencidos"] += 1
+                raise TokenInvalidoError("Signature has expired.")
+            self._cache.move_to_end(token)
+            self._estadisticas["aciertos"] += 1
+            return token_data
+
+    def _guardar_cache(self, token: str, exp: float, token_data: TokenData) -> None:
+        with self._lock:
+            self._cache[token] = (exp, token_data)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+
+    def limpiar(self) -> None:
+        """Vacía el caché (tests)"""
+        with self._lock:
+            self._cache.clear()
+
+    def _contar(self, clave: str) -> None:
+        with self._lock:
+            self._estadisticas[clave] += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._estadisticas, "entradas": len(self._cache), "backend": self.backend.nombre}
+
+
+verificador_tokens = VerificadorTokens(
+    backend=crear_backend_jwt(),
+    clave=settings.secret_key,
+    algoritmo=settings.algorithm,
+    max_entradas=settings.JWT_VERIFICACION_CACHE_MAX,
+)
@@ -0,0 +1,178 @@
+# app/core/password_hashing.py
+"""
+Pool acotado para hashear y verificar contraseñas fuera del event loop.
+
+bcrypt tarda ~250ms de CPU por operación a propósito. Llamado directamente
+desde un endpoint async bloquea el event loop del worker: durante un pico
+de logins todos los demás requests quedan esperando.
+
+El pool corre esas operaciones en un ThreadPoolExecutor propio (bcrypt
+libera el GIL mientras calcula, así que los threads usan núcleos reales
+sin el costo de serializar hacia procesos):
+- PASSWORD_HASH_WORKERS: operaciones simultáneas como máximo (acota la CPU
+  que el hashing le puede quitar al resto de la API)
+- PASSWORD_HASH_MAX_EN_COLA: operaciones esperando un worker; por encima
+  se rechaza enseguida (PoolHashingSaturadoError -> 503) en lugar de
+  acumular requests que van a terminar en timeout
+
+Perfiles de hashing (PASSWORD_HASH_PERFIL):
+- bcrypt: costo PASSWORD_BCRYPT_ROUNDS (cada +1 duplica el tiempo)
+- argon2id: memoria / iteraciones / paralelismo configurables; requiere
+  argon2-cffi (dependencia opcional)
+Los hashes de otro esquema o con otros parámetros se siguen verificando y
+quedan marcados para actualizar: el login los rehashea con el perfil actual
+(verify_and_update). benchmarks/bench_password_hashing.py mide logins/s por
+núcleo de cada perfil para elegir los parámetros de cada despliegue.
+
+Uso:
+    from app.core.password_hashing import pool_hashing
+
+    valida = await pool_hashing.ejecutar(verify_password, plain, hashed)
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from passlib.context import CryptContext
+from passlib.hash import argon2
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+PERFILES_HASHING = ("bcrypt", "argon2id")
+
+
+def crear_contexto_hashing(
+    perfil: Optional[str] = None,
+    bcrypt_rounds: Optional[int] = None,
+    argon2_memoria_kib: Optional[int] = None,
+    argon2_iteraciones: Optional[int] = None,
+    argon2_paralelismo: Optional[int] = None
+) -> CryptContext:
+    """
+    CryptContext con el perfil pedido como esquema por defecto.
+
+    Los parámetros que no se pasan salen de settings. El resto de los
+    esquemas quedan deprecados: verifican, pero needs_update() da True.
+    """
+    perfil = perfil or settings.PASSWORD_HASH_PERFIL
+    if perfil not in PERFILES_HASHING:
+        raise ValueError(f"Perfil de hashing desconocido: {perfil} (opciones: {', '.join(PERFILES_HASHING)})")
+
+    esquemas = ["bcrypt"]
+    if argon2.has_backend():
+        esquemas.insert(0, "argon2")
+    elif perfil == "argon2id":
+        raise RuntimeError("El perfil de hashing argon2id requiere el paquete argon2-cffi")
+
+    return CryptContext(
+        schemes=esquemas,
+        default="argon2" if perfil == "argon2id" else "bcrypt",
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds or settings.PASSWORD_BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memoria_kib or settings.PASSWORD_ARGON2_MEMORIA_KIB,
+        argon2__rounds=argon2_iteraciones or settings.PASSWORD_ARGON2_ITERACIONES,
+        argon2__parallelism=argon2_paralelismo or settings.PASSWORD_ARGON2_PARALELISMO,
+    )
+
+
+class PoolHashingSaturadoError(Exception):
+    """Hay demasiadas operaciones de hashing esperando"""
+    pass
+
+
+class PoolHashing:
+
+    def __init__(self, workers: int, max_en_cola: int):
+        self.workers = workers
+        self.max_en_cola = max_en_cola
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self._en_cola = 0
+        self._en_curso = 0
+        self._estadisticas = {
+            "completadas": 0,
+            "rechazadas": 0,
+            "espera_total_ms": 0.0,
+            "espera_max_ms": 0.0,
+        }
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hashing"
+                    )
+        return self._executor
+
+    async def ejecutar(self, funcion: Callable[..., Any], *args) -> Any:
+        """Corre funcion(*args) en el pool y espera el resultado sin bloquear el loop"""
+        with self._lock:
+            if self._en_cola >= self.max_en_cola:
+                self._estadisticas["rechazadas"] += 1
+                raise PoolHashingSaturadoError(
+                    f"{self._en_cola} operaciones de hashing en cola (máximo {self.max_en_cola})"
+                )
+            self._en_cola += 1
+
+        encolada = time.perf_counter()
+
+        def tarea():
+            espera_ms = (time.perf_counter() - encolada) * 1000
+            with self._lock:
+                self._en_cola -= 1
+                self._en_curso += 1
+                self._estadisticas["espera_total_ms"] += espera_ms
+                self._estadisticas["espera_max_ms"] = max(self._estadisticas["espera_max_ms"], espera_ms)
+            try:
+                return funcion(*args)
+            finally:
+                with self._lock:
+                    self._en_curso -= 1
+                    self._estadisticas["completadas"] += 1
+
+        loop = asyncio.get_running_loop()
+        future = self._obtener_executor().submit(tarea)
+        try:
+            return await asyncio.wrap_future(future, loop=loop)
+        except asyncio.CancelledError:
+            # Request cancelado: si todavía no empezó, se saca de la cola
+            if future.cancel():
+                with self._lock:
+                    self._en_cola -= 1
+            raise
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            en_cola, en_curso = self._en_cola, self._en_curso
+            datos = dict(self._estadisticas)
+
+        completadas = datos["completadas"]
+        return {
+            "workers": self.workers,
+            "max_en_cola": self.max_en_cola,
+            "en_cola": en_cola,
+            "en_curso": en_curso,
+            "completadas": completadas,
+            "rechazadas": datos["rechazadas"],
+            "espera_media_ms": round(datos["espera_total_ms"] / completadas, 2) if completadas else 0.0,
+            "espera_max_ms": round(datos["espera_max_ms"], 2),
+        }
+
+    def cerrar(self) -> None:
+        """Espera las operaciones en curso y libera los threads (shutdown)"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+pool_hashing = PoolHashing(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_EN_COLA)
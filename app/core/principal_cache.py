@@ -0,0 +1,320 @@
+# app/core/principal_cache.py
+"""
+Caché de usuarios autenticados (principal) para get_current_user.
+
+Cada request autenticado buscaba la fila completa del usuario después de
+decodificar el JWT: era la query más frecuente de la base. La autorización
+solo necesita usuario_id, email, tipo_usuario y activo, así que eso es lo
+que se cachea, en dos niveles:
+
+1. Memoria del worker: TTL corto (PRINCIPAL_CACHE_TTL_SECONDS)
+2. Redis, compartido entre workers (PRINCIPAL_CACHE_REDIS_URL, opcional)
+
+y si no está en ninguno, una query de solo esas cuatro columnas.
+
+Invalidación:
+- Automática al commitear cambios ORM de un Usuario (desactivar, editar
+  perfil, cambiar contraseña) o de sus UsuarioRol: evento after_commit
+  de la sesión
+- Explícita con invalidar(usuario_id) para cambios por SQL directo
+  (asignar/quitar roles)
+Se borra el nivel local del worker y la clave en Redis; los demás workers
+pueden ver el dato anterior como mucho PRINCIPAL_CACHE_TTL_SECONDS.
+
+Un request que leyó la base antes de una invalidación no puede dejar el
+dato viejo en Redis después del delete: cada usuario tiene una versión en
+Redis (principal:v:<id>) que invalidar() incrementa; la entrada se guarda
+con la versión leída antes de ir a la base y al leerla se descarta si no
+coincide con la vigente. Lo mismo en el nivel local: si hubo una
+invalidación mientras se consultaba la base, el dato no se guarda.
+
+get_current_user devuelve un Principal: los cuatro campos cacheados se leen
+sin tocar la base y cualquier otro atributo (nombre, password, relaciones)
+carga la fila ORM la primera vez que se usa, con la sesión del request.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session, load_only
+
+from app.config import settings
+from app.core.redis_opcional import RedisOpcional
+from app.enums import TipoUsuario
+from app.models.rol import UsuarioRol
+from app.models.user import Usuario
+from app.schemas.auth import TokenData
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_REDIS = "principal:"
+PREFIJO_REDIS_VERSION = "principal:v:"
+
+
+class DatosPrincipal(NamedTuple):
+    usuario_id: int
+    email: str
+    tipo_usuario: TipoUsuario
+    activo: bool
+
+
+class Principal:
+    """
+    Usuario autenticado. usuario_id, email, tipo_usuario y activo vienen del
+    caché; el resto de los atributos se delegan a la fila ORM (cargada bajo
+    demanda), así los endpoints que reciben current_user no cambian.
+    """
+
+    __slots__ = ("usuario_id", "email", "tipo_usuario", "activo", "token", "_db", "_usuario")
+
+    CAMPOS = DatosPrincipal._fields
+
+    def __init__(
+        self,
+        datos: DatosPrincipal,
+        db: Session,
+        usuario: Optional[Usuario] = None,
+        token: Optional[TokenData] = None
+    ):
+        for campo, valor in zip(self.CAMPOS, datos):
+            object.__setattr__(self, campo, valor)
+        # Datos del access token con el que se autenticó (claims de permisos)
+        object.__setattr__(self, "token", token)
+        object.__setattr__(self, "_db", db)
+        object.__setattr__(self, "_usuario", usuario)
+
+    @property
+    def usuario(self) -> Usuario:
+        """Fila ORM del usuario (una query la primera vez)"""
+        if self._usuario is None:
+            usuario = self._db.get(Usuario, self.usuario_id)
+            if usuario is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Could not validate credentials",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            object.__setattr__(self, "_usuario", usuario)
+        return self._usuario
+
+    def __getattr__(self, nombre: str) -> Any:
+        # Solo se llama para atributos que no son los cacheados
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        return getattr(self.usuario, nombre)
+
+    def __setattr__(self, nombre: str, valor: Any) -> None:
+        # Las escrituras van a la fila ORM (para el commit del endpoint)
+        setattr(self.usuario, nombre, valor)
+        if nombre in self.CAMPOS:
+            object.__setattr__(self, nombre, valor)
+
+    def __repr__(self) -> str:
+        return f"<Principal usuario_id={self.usuario_id} email={self.email}>"
+
+
+class CachePrincipales:
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entradas: int,
+        redis_url: Optional[str] = None,
+        redis_ttl_seconds: int = 60
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entradas = max_entradas
+        self.redis_ttl_seconds = redis_ttl_seconds
+
+        # usuario_id -> (vence_en, datos)
+        self._local: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = RedisOpcional(redis_url, "Caché de principales")
+
+        self._estadisticas = {"local": 0, "redis": 0, "base": 0, "invalidaciones": 0}
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def obtener(self, db: Session, usuario_id: int, token: Optional[TokenData] = None) -> Optional[Principal]:
+        """Principal del usuario, o None si no existe"""
+        datos = self._obtener_local(usuario_id)
+        if datos is not None:
+            self._contar("local")
+            return Principal(datos, db, token=token)
+
+        # Antes de leer: si se invalida mientras tanto, lo leído no se guarda
+        invalidaciones = self._invalidaciones()
+        datos, version = self._obtener_redis(usuario_id)
+        if datos is not None:
+            self._contar("redis")
+            self._guardar_local(datos, invalidaciones)
+            return Principal(datos, db, token=token)
+
+        usuario = db.query(Usuario).options(
+            load_only(Usuario.usuario_id, Usuario.email, Usuario.tipo_usuario, Usuario.activo)
+        ).filter(Usuario.usuario_id == usuario_id).first()
+        self._contar("base")
+        if usuario is None:
+            return None
+
+        datos = DatosPrincipal(usuario.usuario_id, usuario.email, usuario.tipo_usuario, usuario.activo)
+        self._guardar_local(datos, invalidaciones)
+        self._guardar_redis(datos, version)
+        # La fila parcial ya está en la sesión: si el endpoint la pide, el
+        # resto de las columnas se carga en una sola query
+        return Principal(datos, db, usuario, token)
+
+    def _obtener_local(self, usuario_id: int) -> Optional[DatosPrincipal]:
+        with self._lock:
+            entrada = self._local.get(usuario_id)
+            if entrada is None:
+                return None
+            vence_en, datos = entrada
+            if vence_en <= time.monotonic():
+                del self._local[usuario_id]
+                return None
+            self._local.move_to_end(usuario_id)
+            return datos
+
+    def _invalidaciones(self) -> int:
+        with self._lock:
+            return self._estadisticas["invalidaciones"]
+
+    def _guardar_local(self, datos: DatosPrincipal, invalidaciones: int) -> None:
+        with self._lock:
+            if self._estadisticas["invalidaciones"] != invalidaciones:
+                # Leído antes de una invalidación de este worker: puede estar viejo
+                return
+            self._local[datos.usuario_id] = (time.monotonic() + self.ttl_seconds, datos)
+            self._local.move_to_end(datos.usuario_id)
+            while len(self._local) > self.max_entradas:
+                self._local.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Redis (nivel compartido, opcional)
+    # ------------------------------------------------------------------
+
+    def _obtener_redis(self, usuario_id: int) -> Tuple[Optional[DatosPrincipal], Optional[int]]:
+        """(datos, versión vigente del usuario); versión None si no se pudo leer Redis"""
+        cliente = self._redis.cliente()
+        if cliente is None:
+            return None, None
+        try:
+            valor, version = cliente.mget(f"{PREFIJO_REDIS}{usuario_id}", f"{PREFIJO_REDIS_VERSION}{usuario_id}")
+        except Exception as e:
+            self._redis.error("lectura", e)
+            return None, None
+        version = int(version or 0)
+        if valor is None:
+            return None, version
+
+        try:
+            datos = json.loads(valor)
+            if datos.get("v", 0) != version:
+                # Guardada por un request que leyó la base antes de una invalidación
+                return None, version
+            return DatosPrincipal(
+                int(datos["usuario_id"]), datos["email"], TipoUsuario(datos["tipo_usuario"]), bool(datos["activo"])
+            ), version
+        except (ValueError, KeyError, TypeError, AttributeError):
+            logger.warning(f"Caché de principales: entrada inválida en Redis para usuario {usuario_id}")
+            return None, version
+
+    def _guardar_redis(self, datos: DatosPrincipal, version: Optional[int]) -> None:
+        """Guarda con la versión leída antes de consultar la base (sin versión no se guarda)"""
+        cliente = self._redis.cliente()
+        if cliente is None or version is None:
+            return
+        valor = json.dumps({**datos._asdict(), "tipo_usuario": datos.tipo_usuario.value, "v": version})
+        try:
+            cliente.set(f"{PREFIJO_REDIS}{datos.usuario_id}", valor, ex=self.redis_ttl_seconds)
+        except Exception as e:
+            self._redis.error("escritura", e)
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+
+    def invalidar(self, *usuario_ids: int) -> None:
+        """Descarta los usuarios del caché local y de Redis (llamar después del commit)"""
+        if not usuario_ids:
+            return
+        with self._lock:
+            for usuario_id in usuario_ids:
+                self._local.pop(usuario_id, None)
+        self._contar("invalidaciones", len(usuario_ids))
+
+        # Se intenta aunque Redis esté suspendido: una entrada vieja ahí la
+        # seguirían leyendo los demás workers
+        cliente = self._redis.cliente(ignorar_suspension=True)
+        if cliente is not None:
+            try:
+                pipeline = cliente.pipeline(transaction=False)
+                for usuario_id in usuario_ids:
+                    # La versión vive más que cualquier entrada guardada con la anterior
+                    pipeline.incr(f"{PREFIJO_REDIS_VERSION}{usuario_id}")
+                    pipeline.expire(f"{PREFIJO_REDIS_VERSION}{usuario_id}", 2 * self.redis_ttl_seconds)
+                pipeline.delete(*[f"{PREFIJO_REDIS}{usuario_id}" for usuario_id in usuario_ids])
+                pipeline.execute()
+            except Exception as e:
+                # La clave vence sola en redis_ttl_seconds
+                self._redis.error("invalidación", e)
+
+    def limpiar(self) -> None:
+        """Vacía el nivel local (tests)"""
+        with self._lock:
+            self._local.clear()
+
+    def _contar(self, clave: str, cantidad: int = 1) -> None:
+        with self._lock:
+            self._estadisticas[clave] += cantidad
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._estadisticas, "entradas_locales": len(self._local)}
+
+
+cache_principales = CachePrincipales(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entradas=settings.PRINCIPAL_CACHE_MAX_ENTRADAS,
+    redis_url=settings.PRINCIPAL_CACHE_REDIS_URL,
+    redis_ttl_seconds=settings.PRINCIPAL_CACHE_REDIS_TTL_SECONDS,
+)
+
+
+# ----------------------------------------------------------------------
+# Invalidación automática por cambios ORM en Usuario / UsuarioRol
+# ----------------------------------------------------------------------
+
+CLAVE_SESION = "principales_modificados"
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_usuarios_modificados(session: Session, flush_context) -> None:
+    modificados = [
+        objeto.usuario_id
+        for objeto in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(objeto, (Usuario, UsuarioRol)) and objeto.usuario_id is not None
+    ]
+    if modificados:
+        session.info.setdefault(CLAVE_SESION, set()).update(modificados)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_usuarios_modificados(session: Session) -> None:
+    modificados = session.info.pop(CLAVE_SESION, None)
+    if modificados:
+        cache_principales.invalidar(*modificados)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_usuarios_modificados(session: Session) -> None:
+    session.info.pop(CLAVE_SESION, None)
@@ -0,0 +1,55 @@
+# app/core/redis_opcional.py
+"""
+Cliente Redis síncrono para cachés opcionales del camino de autenticación.
+
+Lo comparten el caché de principales y las épocas de permisos. Redis es una
+optimización: si no está configurado o falla, quien lo usa sigue con la base.
+- Timeouts cortos (REDIS_TIMEOUT_SECONDS): nunca demora más que la query
+- Después de un error se deja de usar por REDIS_REINTENTO_SECONDS, así un
+  Redis caído no agrega el timeout a cada request
+"""
+
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin intentar Redis después de un error
+REDIS_REINTENTO_SECONDS = 30.0
+# Timeout de conexión y de cada operación
+REDIS_TIMEOUT_SECONDS = 0.1
+
+
+class RedisOpcional:
+
+    def __init__(self, url: Optional[str], nombre: str):
+        self.url = url
+        self.nombre = nombre
+        self._cliente = None
+        self._suspendido_hasta = 0.0
+
+    def cliente(self, ignorar_suspension: bool = False):
+        """Cliente redis.Redis, o None si no está configurado o está suspendido por un error reciente"""
+        if not self.url:
+            return None
+        if not ignorar_suspension and time.monotonic() < self._suspendido_hasta:
+            return None
+        if self._cliente is None:
+            import redis
+
+            self._cliente = redis.Redis.from_url(
+                self.url,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                decode_responses=True,
+            )
+        return self._cliente
+
+    def error(self, operacion: str, error: Exception) -> None:
+        """Registra un error y suspende el uso de Redis por REDIS_REINTENTO_SECONDS"""
+        self._suspendido_hasta = time.monotonic() + REDIS_REINTENTO_SECONDS
+        logger.warning(
+            f"{self.nombre}: error de Redis en {operacion} ({str(error)}), "
+            f"se omite por {REDIS_REINTENTO_SECONDS:.0f}s"
+        )
@@ -1,8 +1,6 @@
 # app/core/security.py
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Optional, Tuple
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -13,14 +11,17 @@ from app.schemas.auth import TokenData
 from app.database import get_db
 from app.models.user import Usuario
 from app.core.logger import get_logger
+from app.core.password_hashing import pool_hashing, PoolHashingSaturadoError, crear_contexto_hashing
+from app.core.principal_cache import cache_principales, Principal
+from app.core.jwt_verificacion import verificador_tokens, TokenInvalidoError
 
 import secrets
 
 # Logger específico para autenticación
 auth_logger = get_logger("miturno.auth")
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (perfil configurable, ver app/core/password_hashing.py)
+pwd_context = crear_contexto_hashing()
 
 # OAuth2 scheme - auto_error=False para manejar manualmente el error 401
 oauth2_scheme = HTTPBearer(auto_error=False)
@@ -33,6 +34,33 @@ def get_password_hash(password: str) -> str:
     """Crear hash de password"""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verificar password; si el hash usa un perfil viejo devuelve también el hash nuevo"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool de hashing, sin bloquear el event loop (503 si está saturado)"""
+    return await _en_pool_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash en el pool de hashing, sin bloquear el event loop (503 si está saturado)"""
+    return await _en_pool_hashing(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password en el pool de hashing (503 si está saturado)"""
+    return await _en_pool_hashing(verify_and_update_password, plain_password, hashed_password)
+
+async def _en_pool_hashing(funcion, *args):
+    try:
+        return await pool_hashing.ejecutar(funcion, *args)
+    except PoolHashingSaturadoError as e:
+        auth_logger.warning(f"Pool de hashing saturado: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intente nuevamente en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crear JWT token"""
     auth_logger.debug(f"Creando token para: {data.get('email', 'unknown')}")
@@ -46,7 +74,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     
     try:
-        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+        encoded_jwt = verificador_tokens.codificar(to_encode)
         auth_logger.info(f"Token creado exitosamente para usuario: {data.get('email')}")
         return encoded_jwt
     except Exception as e:
@@ -54,9 +82,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         raise
 
 def verify_token(token: str) -> TokenData:
-    """Verificar y decodificar JWT token"""
-    auth_logger.debug("Iniciando verificación de token")
-    
+    """
+    Verificar y decodificar JWT token
+
+    Los tokens ya verificados se reutilizan hasta su "exp" sin volver a
+    chequear la firma (ver app/core/jwt_verificacion.py)
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -64,31 +95,8 @@ def verify_token(token: str) -> TokenData:
     )
     
     try:
-        auth_logger.debug(f"Decodificando token con SECRET_KEY: {settings.secret_key[:10]}... y algoritmo: {settings.algorithm}")
-        
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        auth_logger.debug("Token decodificado exitosamente")
-        
-        usuario_id: int = int(payload.get("sub"))
-        email: str = payload.get("email")
-        tipo_usuario: str = payload.get("tipo_usuario")
-        
-        auth_logger.debug(f"Datos extraídos - usuario_id: {usuario_id}, email: {email}")
-        
-        if usuario_id is None:
-            auth_logger.warning("Token válido pero sin usuario_id en payload")
-            raise credentials_exception
-            
-        token_data = TokenData(
-            usuario_id=usuario_id,
-            email=email,
-            tipo_usuario=tipo_usuario
-        )
-        
-        auth_logger.info(f"Token verificado exitosamente para usuario: {email}")
-        return token_data
-        
-    except JWTError as e:
+        return verificador_tokens.verificar(token)
+    except TokenInvalidoError as e:
         auth_logger.error(f"Error JWT al verificar token: {str(e)}")
         raise credentials_exception
     except Exception as e:
@@ -98,20 +106,19 @@ def verify_token(token: str) -> TokenData:
 def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> Usuario:
+) -> Principal:
     """
     Obtener usuario actual desde JWT token
     Para usar como dependencia en endpoints protegidos
     
     Retorna:
-    - Usuario si el token es válido
+    - Principal del usuario si el token es válido (caché de principales;
+      los atributos que no son id/email/tipo/activo cargan la fila ORM)
     
     Errores:
     - 401: Sin token o token inválido (no autenticado)
     - 500: Error de base de datos
     """
-    auth_logger.debug("Iniciando get_current_user")
-    
     # Excepción estándar para problemas de autenticación
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -131,10 +138,9 @@ def get_current_user(
         
         # Verificar token
         token_data = verify_token(credentials.credentials)
-        auth_logger.debug(f"Token verificado, buscando usuario ID: {token_data.usuario_id}")
         
-        # Buscar usuario en BD
-        user = db.query(Usuario).filter(Usuario.usuario_id == token_data.usuario_id).first()
+        # Buscar usuario (caché de principales; la BD solo si no está cacheado)
+        user = cache_principales.obtener(db, token_data.usuario_id, token_data)
         
         if user is None:
             auth_logger.warning(f"Usuario {token_data.usuario_id} no encontrado en BD")
@@ -149,7 +155,6 @@ def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
         )
             
-        auth_logger.info(f"Usuario autenticado exitosamente: {user.email}")
         return user
         
     except HTTPException as e:
@@ -4,9 +4,11 @@ from app.models.turno import Turno
 from app.schemas.turno import TurnoCreate
 from typing import List, Optional
 from datetime import datetime
+from app.services.referencias_cache import cache_referencias
 
 def get_categorias(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Categoria).filter(Categoria.activa == True).offset(skip).limit(limit).all()
+    """Categorías activas desde el caché de referencia (sin query salvo recarga)"""
+    return list(cache_referencias.obtener(db).categorias[skip:skip + limit])
 
 def crear_turno(db: Session, turno: TurnoCreate) -> Turno:
     db_turno = Turno(
@@ -1,5 +1,6 @@
 # app/main.py
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
@@ -8,9 +9,13 @@ from fastapi_limiter import FastAPILimiter
 
 from app.config import settings
 from app.core.logger import setup_logging, get_logger
-from app.api.v1 import auth, empresas, categorias, turnos, test_roles, geolocalizacion, conversaciones, calificaciones, servicios, horarios, usuarios
+from app.api.v1 import auth, empresas, categorias, turnos, test_roles, geolocalizacion, conversaciones, calificaciones, servicios, horarios, usuarios, busqueda
 from app.routers import auditoria, geo_test
 from app.database import engine
+from app.services.indices_empresa import precargar_indices, sincronizar_periodicamente
+from app.core.http_client import clientes_http
+from app.core.password_hashing import pool_hashing
+from app.services.geocoding_service_new import GeocodingService
 from app.models import user  
 
 # ============================================
@@ -163,12 +168,44 @@ async def startup_event():
     except Exception as e:
         app_logger.error(f"❌ Error inicializando FastAPILimiter: {str(e)}")
         app_logger.warning("⚠️ Rate limiting no estará disponible")
+    
+    # Cliente HTTP compartido para Georef (pool keep-alive para toda la vida de la app)
+    clientes_http.cliente(GeocodingService.GEOREF_BASE_URL)
+    if clientes_http.http2:
+        app_logger.info(f"✅ Cliente HTTP saliente listo ({clientes_http.protocolo})")
+    else:
+        app_logger.warning(
+            f"⚠️ Cliente HTTP saliente en {clientes_http.protocolo}: falta el paquete h2 (httpx[http2])"
+        )
+    
+    # Índices en memoria (búsqueda, autocompletado, geo) y su sincronización
+    try:
+        await asyncio.to_thread(precargar_indices)
+        app_logger.info("✅ Índices en memoria construidos")
+    except Exception as e:
+        app_logger.error(f"❌ Error construyendo índices en memoria: {str(e)}")
+        app_logger.warning("⚠️ Los índices se construirán en el primer uso")
+    
+    app.state.tarea_indices = asyncio.create_task(
+        sincronizar_periodicamente(settings.INDICES_SYNC_INTERVAL_SECONDS)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento de cierre de la aplicación"""
     app_logger.info("Cerrando aplicación MiTurno API")
     
+    # Detener la sincronización de índices
+    tarea_indices = getattr(app.state, "tarea_indices", None)
+    if tarea_indices:
+        tarea_indices.cancel()
+    
+    # Cerrar clientes HTTP salientes (conexiones keep-alive)
+    await clientes_http.cerrar()
+    
+    # Liberar los threads del pool de hashing de contraseñas
+    pool_hashing.cerrar()
+    
     # Cerrar conexión de FastAPILimiter
     try:
         await FastAPILimiter.close()
@@ -192,6 +229,7 @@ app.include_router(geo_test.router, prefix="/api/v1/geo-test", tags=["🧪 Geo T
 app.include_router(geolocalizacion.router, prefix="/api/v1", tags=["🗺️ Geolocalización"])
 app.include_router(conversaciones.router, prefix="/api/v1", tags=["💬 Conversaciones"])
 app.include_router(calificaciones.router, prefix="/api/v1", tags=["⭐ Calificaciones"])
+app.include_router(busqueda.router, prefix="/api/v1", tags=["🔎 Búsqueda"])
 
 app_logger.info("Todos los routers registrados correctamente")
 
@@ -210,5 +248,7 @@ async def health_check():
     return {
         "status": "healthy", 
         "version": settings.app_version,
-        "app_name": settings.app_name
+        "app_name": settings.app_name,
+        # Profundidad de cola del hashing de contraseñas (picos de login)
+        "password_hashing": pool_hashing.estadisticas()
     }
\ No newline at end of file
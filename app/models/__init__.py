@@ -12,6 +12,8 @@ from .direccion import Direccion
 from .auditoria_detalle import AuditoriaDetalle
 from .refresh_token import RefreshToken
 from .password_reset_token import PasswordResetToken
+from .cache_version import CacheVersion
+from .geocoding_cache import GeocodingCache
 
 __all__ = [
     "Usuario", "TipoUsuario",
@@ -31,5 +33,7 @@ __all__ = [
     "Direccion",
     "AuditoriaDetalle",
     "RefreshToken",
-    "PasswordResetToken"
+    "PasswordResetToken",
+    "CacheVersion",
+    "GeocodingCache"
 ]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class CacheVersion(Base):
+    """
+    Versión de datos de referencia cacheados en memoria por cada worker.
+    Se incrementa en cada escritura; los workers recargan al ver un cambio.
+    """
+    __tablename__ = "cache_version"
+    
+    nombre = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    fecha_actualizacion = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DECIMAL, Text, Boolean, DateTime, Numeric
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, ForeignKey, DECIMAL, Text, Boolean, DateTime, Numeric, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
 class Empresa(Base):
     __tablename__ = "empresa"
+    __table_args__ = (
+        # Búsqueda de texto (solo MySQL); ver BusquedaService
+        Index('ft_empresa_texto', 'razon_social', 'descripcion', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
     
     empresa_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     usuario_id = Column(Integer, ForeignKey("usuario.usuario_id"), unique=True, nullable=False)
@@ -14,6 +18,9 @@ class Empresa(Base):
     cuit = Column(String(13), unique=True)
     
     # Campos de geolocalización
+    # En MySQL además existe empresa.ubicacion (POINT SRID 4326 con SPATIAL
+    # INDEX), mantenida por triggers a partir de estas dos columnas; no se
+    # mapea acá para que los modelos sigan funcionando en SQLite.
     latitud = Column(DECIMAL(10, 8))
     longitud = Column(DECIMAL(11, 8))
     
@@ -28,6 +35,11 @@ class Empresa(Base):
     activa = Column(Boolean, default=True, nullable=False)
     fecha_creacion = Column(DateTime, server_default=func.now())
     fecha_actualizacion = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Contador de cambios del perfil (ETag de GET /empresas/{id}). A diferencia
+    # de fecha_actualizacion no tiene resolución de segundos: dos escrituras en
+    # el mismo segundo dan versiones distintas. Se incrementa en SQL en cada
+    # UPDATE del ORM (flush, query.update y bulk por PK)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
     
     # NUEVO CAMPO agregado durante normalización
     direccion_id = Column(Integer, ForeignKey("direccion.direccion_id"))
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, Boolean, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class GeocodingCache(Base):
+    """
+    Resultados de geocodificación persistidos (segundo nivel del caché).
+    La clave es la dirección normalizada; encontrado=False es caché negativo.
+    """
+    __tablename__ = "geocoding_cache"
+    __table_args__ = (
+        Index('ix_geocoding_cache_expira_en', 'expira_en'),
+    )
+    
+    # sha256 de "tipo:clave" (las direcciones pueden superar el largo de una PK)
+    clave_hash = Column(String(64), primary_key=True)
+    tipo = Column(String(20), nullable=False)  # 'direccion'
+    clave = Column(String(500), nullable=False)
+    encontrado = Column(Boolean, nullable=False, default=True)
+    resultado = Column(JSON, nullable=True)
+    fecha_creacion = Column(DateTime, server_default=func.now(), nullable=False)
+    expira_en = Column(DateTime, nullable=False)
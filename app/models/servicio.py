@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DECIMAL, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DECIMAL, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,6 +6,10 @@ from app.database import Base
 
 class Servicio(Base):
     __tablename__ = "servicio"
+    __table_args__ = (
+        # Búsqueda de texto (solo MySQL); ver BusquedaService
+        Index('ft_servicio_nombre', 'nombre', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
     
     servicio_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     empresa_id = Column(Integer, ForeignKey("empresa.empresa_id"), nullable=False)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.models.user import TipoUsuario
 
 
@@ -90,6 +90,8 @@ class TokenData(BaseModel):
     usuario_id: Optional[int] = None
     email: Optional[str] = None
     tipo_usuario: Optional[str] = None  # Acepta cualquier rol del sistema RBAC
+    # Claim "perm" opcional: permisos del usuario (ver app/auth/permisos_token.py)
+    permisos: Optional[Dict[str, Any]] = None
     
 # ============================================
 # GOOGLE OAUTH SCHEMAS (Flujo de autorización)
@@ -0,0 +1,49 @@
+# app/schemas/busqueda.py
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from decimal import Decimal
+
+
+class EmpresaBusqueda(BaseModel):
+    """Empresa encontrada por búsqueda de texto"""
+    empresa_id: int
+    razon_social: str
+    descripcion: Optional[str] = None
+    categoria_id: int
+    logo_url: Optional[str] = None
+    rating_promedio: Optional[Decimal] = None
+    total_calificaciones: int = 0
+    relevancia: float = Field(..., description="Puntaje de relevancia (mayor es mejor)")
+
+    class Config:
+        from_attributes = True
+
+
+class ResultadoBusqueda(BaseModel):
+    """Página de resultados de búsqueda"""
+    consulta: str
+    resultados: List[EmpresaBusqueda]
+    total: int
+    pagina: int
+    por_pagina: int
+    total_paginas: int
+    tiene_siguiente: bool
+    tiene_anterior: bool
+
+
+class Sugerencia(BaseModel):
+    """Sugerencia de autocompletado"""
+    tipo: str = Field(..., description="empresa, categoria o ciudad")
+    id: Optional[int] = Field(None, description="ID de empresa o categoría (null para ciudades)")
+    texto: str
+    rating_promedio: Optional[float] = None
+    cantidad: int = Field(0, description="Calificaciones (empresa) o empresas activas (categoría/ciudad)")
+    detalle: Optional[str] = Field(None, description="Información adicional (ej: ciudad de la empresa)")
+
+
+class SugerenciasResponse(BaseModel):
+    """Sugerencias de autocompletado agrupadas por tipo"""
+    consulta: str
+    empresas: List[Sugerencia] = []
+    categorias: List[Sugerencia] = []
+    ciudades: List[Sugerencia] = []
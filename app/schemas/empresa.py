@@ -3,6 +3,11 @@ from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from .direccion import DireccionResponse, DireccionCreate, DireccionUpdate  # ← AGREGADO DireccionUpdate
+from .categoria import CategoriaSchema
+from .servicio import ServicioResponse
+from .horario import HorarioResponse
+from .calificacion import EstadisticasCalificaciones
+from .turno import SlotDisponible
 
 class EmpresaCreate(BaseModel):
     usuario_id: int
@@ -76,4 +81,22 @@ class EmpresaUpdate(BaseModel):
         return v
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Secciones opcionales del perfil agregado (parámetro include=)
+SECCIONES_PERFIL = ("servicios", "horarios", "calificaciones", "disponibilidad")
+
+class PerfilEmpresaResponse(BaseModel):
+    """
+    Perfil completo de una empresa en una sola respuesta.
+    Las secciones no incluidas vía include= se devuelven como null.
+    """
+    empresa: EmpresaResponse
+    categoria: Optional[CategoriaSchema] = None
+    servicios: Optional[List[ServicioResponse]] = None
+    horarios: Optional[List[HorarioResponse]] = None
+    calificaciones: Optional[EstadisticasCalificaciones] = None
+    proximos_turnos: Optional[List[SlotDisponible]] = Field(
+        None, description="Próximos slots disponibles, ordenados por fecha y hora"
+    )
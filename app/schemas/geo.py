@@ -1,9 +1,12 @@
 # app/schemas/geo.py
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict 
+from typing import Optional, List, Dict, Literal
+from datetime import date, time
 from decimal import Decimal
 
+from app.schemas.turno import SlotDisponible
+
 class GeoLocation(BaseModel):
     """Coordenadas geográficas"""
     latitud: float = Field(..., ge=-90, le=90, description="Latitud en grados decimales")
@@ -63,6 +66,11 @@ class BusquedaPorDireccion(BaseModel):
     direccion: DireccionGeocode
     radio_km: float = Field(10, ge=0.1, le=100, description="Radio de búsqueda en kilómetros")
     categoria_id: Optional[int] = Field(None, description="ID de categoría para filtrar")
+    ordenar_por: Literal["distancia", "relevancia"] = Field(
+        "distancia", description="distancia: más cercanas primero; relevancia: combina distancia y rating"
+    )
+    limit: int = Field(50, ge=1, le=100, description="Empresas por página")
+    cursor: Optional[str] = Field(None, description="siguiente_cursor de la página anterior (solo orden por distancia)")
 
 class EmpresaConDistancia(BaseModel):
     """Empresa con información de distancia"""
@@ -74,6 +82,7 @@ class EmpresaConDistancia(BaseModel):
     direccion: Optional[Dict[str, str]] = None
     coordenadas: Optional[GeoLocation] = None
     distancia_km: Optional[float] = Field(None, description="Distancia en kilómetros")
+    rating_promedio: Optional[float] = None
     duracion_turno_minutos: Optional[int] = None
     logo_url: Optional[str] = None
     activa: bool = True
@@ -84,7 +93,53 @@ class ResultadoBusquedaGeografica(BaseModel):
     radio_km: float
     total_encontradas: int
     empresas: List[EmpresaConDistancia]
+    siguiente_cursor: Optional[str] = Field(
+        None, description="Cursor para pedir la página siguiente; None si no hay más resultados"
+    )
     
+class EmpresaConDisponibilidad(EmpresaConDistancia):
+    """Empresa cercana con sus primeros slots libres en la franja pedida"""
+    primer_slot: time = Field(..., description="Hora de inicio del primer slot libre")
+    slots: List[SlotDisponible]
+
+class ResultadoDisponibilidadCercana(BaseModel):
+    """Resultado de búsqueda de empresas cercanas con disponibilidad"""
+    punto_busqueda: GeoLocation
+    radio_km: float
+    fecha: date
+    hora_desde: time
+    hora_hasta: time
+    candidatas_evaluadas: int = Field(..., description="Empresas del radio cuya disponibilidad se calculó")
+    candidatas_truncadas: bool = Field(
+        False, description="El radio tiene más empresas que las evaluadas (las más lejanas quedaron afuera)"
+    )
+    total_encontradas: int
+    empresas: List[EmpresaConDisponibilidad]
+
+class ClusterMapa(BaseModel):
+    """Grupo de empresas cercanas en una celda del mapa"""
+    latitud: float = Field(..., description="Centroide de las empresas del grupo")
+    longitud: float
+    cantidad: int
+    empresa_id: Optional[int] = Field(None, description="Solo si el grupo tiene una única empresa")
+
+class PuntoMapa(BaseModel):
+    """Empresa individual en el mapa"""
+    empresa_id: int
+    nombre: str
+    latitud: float
+    longitud: float
+    categoria_id: int
+    rating_promedio: Optional[float] = None
+
+class ResultadoMapa(BaseModel):
+    """Empresas de un viewport: clusters (zoom bajo) o puntos (zoom alto)"""
+    zoom: int
+    modo: Literal["clusters", "puntos"]
+    total: int = Field(..., description="Empresas dentro del viewport")
+    clusters: List[ClusterMapa] = []
+    puntos: List[PuntoMapa] = []
+
 class ReverseGeocodeRequest(BaseModel):
     """Request para geocodificación inversa"""
     latitud: float = Field(..., ge=-90, le=90)
@@ -0,0 +1,383 @@
+# app/services/autocompletado_service.py
+"""
+Autocompletado (type-ahead) de nombres de empresas, categorías y ciudades.
+
+Índice en memoria sobre un arreglo ordenado de claves normalizadas: un
+prefijo se resuelve con dos búsquedas binarias (bisect) y se recorre solo
+el rango que coincide. Cada nombre se indexa desde cada una de sus
+primeras palabras, así "sol" encuentra "Peluquería Sol".
+
+Ranking:
+- empresas: rating bayesiano (rating ajustado por cantidad de calificaciones)
+- categorías y ciudades: cantidad de empresas activas
+
+Los prefijos muy cortos ("a", "pe") abarcan gran parte del arreglo. Si el
+rango supera MAX_CLAVES_RECORRIDAS claves, en lugar de recorrerlo se
+recorren las empresas en orden de ranking (lista precalculada) hasta
+juntar `limite` que coincidan: con tantas coincidencias aparecen enseguida
+y el resultado es el mismo que rankeando el rango completo.
+"""
+
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.direccion import Direccion
+from app.models.empresa import Empresa
+from app.services.indices_empresa import IndiceEmpresas, registro_indices
+from app.services.referencias_cache import cache_referencias
+from app.utils.rating import rating_bayesiano
+from app.utils.texto import tokenizar
+
+logger = logging.getLogger(__name__)
+
+
+TIPOS_SUGERENCIA = ("empresa", "categoria", "ciudad")
+
+# Cantidad de palabras iniciales desde las que se indexa cada nombre
+MAX_PALABRAS_CLAVE = 4
+
+# Rangos de más claves que esto (prefijos muy cortos) se resuelven recorriendo
+# las empresas en orden de ranking en lugar del rango
+MAX_CLAVES_RECORRIDAS = 20000
+
+
+def normalizar_consulta(texto: str) -> str:
+    """Normaliza igual que las claves: minúsculas, sin acentos, palabras separadas por un espacio"""
+    return " ".join(tokenizar(texto, min_longitud=1, quitar_stopwords=False))
+
+
+def claves_de(texto: str) -> Tuple[str, ...]:
+    """
+    Claves de un nombre: el nombre completo normalizado y sus sufijos
+    desde cada una de las primeras MAX_PALABRAS_CLAVE palabras.
+
+    Ejemplo: "Peluquería Sol Norte" -> ("peluqueria sol norte", "sol norte", "norte")
+    """
+    palabras = tokenizar(texto, min_longitud=1, quitar_stopwords=False)
+    claves = []
+    for i in range(min(len(palabras), MAX_PALABRAS_CLAVE)):
+        # Las palabras vacías sueltas ("de", "la") no son buen punto de entrada
+        if i > 0 and len(palabras[i]) < 3:
+            continue
+        claves.append(" ".join(palabras[i:]))
+    return tuple(dict.fromkeys(claves))
+
+
+class IndiceAutocompletado(IndiceEmpresas):
+    """
+    Arreglo ordenado de (clave, tipo, id) con actualización incremental.
+
+    Las inserciones y bajas usan bisect sobre la lista (O(n) por el
+    desplazamiento de memoria, pero en C y poco frecuentes). Las consultas
+    se cachean; cualquier cambio vacía el caché.
+    """
+
+    nombre = "autocompletado"
+
+    MAX_CACHE = 2048
+
+    def __init__(self):
+        super().__init__()
+        self._claves: List[Tuple[str, str, object]] = []
+        # empresa_id -> (texto, rating, total_calificaciones, claves, categoria_id, ciudad)
+        self._empresas: Dict[int, tuple] = {}
+        # empresa_id -> clave de ranking precalculada (ver _orden)
+        self._rango_empresas: Dict[int, tuple] = {}
+        # (clave de ranking, empresa_id) de todas las empresas, ordenado
+        self._empresas_por_ranking: List[Tuple[tuple, int]] = []
+        # categoria_id -> (texto, claves)
+        self._categorias: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        # ciudad normalizada -> texto a mostrar
+        self._ciudades: Dict[str, str] = {}
+        self._empresas_por_categoria: Dict[int, int] = {}
+        self._empresas_por_ciudad: Dict[str, int] = {}
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _query_empresas(db: Session):
+        return db.query(
+            Empresa.empresa_id,
+            Empresa.razon_social,
+            Empresa.rating_promedio,
+            Empresa.total_calificaciones,
+            Empresa.categoria_id,
+            Empresa.activa,
+            Direccion.ciudad
+        ).outerjoin(Direccion, Empresa.direccion_id == Direccion.direccion_id)
+
+    def construir(self, db: Session) -> None:
+        empresas = self._query_empresas(db).filter(Empresa.activa == True).all()
+        self.cargar(empresas, cache_referencias.obtener(db).categorias)
+
+    def cargar(self, empresas: Iterable, categorias: Iterable) -> None:
+        """
+        Reemplaza el contenido del índice.
+
+        Args:
+            empresas: filas con empresa_id, razon_social, rating_promedio,
+                total_calificaciones, categoria_id y ciudad
+            categorias: filas con categoria_id y nombre
+        """
+        claves: List[Tuple[str, str, object]] = []
+        self._empresas = {}
+        self._rango_empresas = {}
+        self._categorias = {}
+        self._ciudades = {}
+        self._empresas_por_categoria = {}
+        self._empresas_por_ciudad = {}
+
+        for empresa in empresas:
+            for clave in self._registrar_empresa(empresa):
+                claves.append((clave, "empresa", empresa.empresa_id))
+
+        for ciudad in self._ciudades:
+            claves.append((ciudad, "ciudad", ciudad))
+
+        for categoria in categorias:
+            claves_categoria = claves_de(categoria.nombre)
+            self._categorias[categoria.categoria_id] = (categoria.nombre, claves_categoria)
+            for clave in claves_categoria:
+                claves.append((clave, "categoria", categoria.categoria_id))
+
+        claves.sort()
+        self._claves = claves
+        self._empresas_por_ranking = sorted(
+            (rango, empresa_id) for empresa_id, rango in self._rango_empresas.items()
+        )
+        self._invalidar_cache()
+        self._construido = True
+
+    def actualizar(self, db: Session, empresa_ids: List[int]) -> None:
+        filas = {
+            fila.empresa_id: fila
+            for fila in self._query_empresas(db).filter(Empresa.empresa_id.in_(empresa_ids)).all()
+        }
+
+        with self._lock:
+            for empresa_id in empresa_ids:
+                self._quitar_empresa(empresa_id)
+                fila = filas.get(empresa_id)
+                if fila is not None and fila.activa:
+                    nueva_ciudad = self._ciudad_nueva(fila.ciudad)
+                    for clave in self._registrar_empresa(fila):
+                        insort(self._claves, (clave, "empresa", empresa_id))
+                    insort(self._empresas_por_ranking, (self._rango_empresas[empresa_id], empresa_id))
+                    if nueva_ciudad:
+                        insort(self._claves, (nueva_ciudad, "ciudad", nueva_ciudad))
+            self._invalidar_cache()
+
+    def refrescar(self, db: Session) -> None:
+        """Toma las categorías del caché de referencia por si cambiaron nombres o altas"""
+        categorias = cache_referencias.obtener(db).categorias
+
+        with self._lock:
+            actuales = {c.categoria_id: c.nombre for c in categorias}
+            previas = {cid: texto for cid, (texto, _) in self._categorias.items()}
+            if actuales == previas:
+                return
+
+            for categoria_id, (_, claves) in list(self._categorias.items()):
+                for clave in claves:
+                    self._quitar_clave((clave, "categoria", categoria_id))
+            self._categorias = {}
+            for categoria_id, nombre in actuales.items():
+                claves = claves_de(nombre)
+                self._categorias[categoria_id] = (nombre, claves)
+                for clave in claves:
+                    insort(self._claves, (clave, "categoria", categoria_id))
+            self._invalidar_cache()
+
+    def _ciudad_nueva(self, ciudad: Optional[str]) -> Optional[str]:
+        """Ciudad normalizada si todavía no tiene empresas (hay que agregar su clave)"""
+        normalizada = normalizar_consulta(ciudad or "")
+        if normalizada and self._empresas_por_ciudad.get(normalizada, 0) == 0:
+            return normalizada
+        return None
+
+    def _registrar_empresa(self, empresa) -> Tuple[str, ...]:
+        """Registra los datos de la empresa y devuelve sus claves"""
+        claves = claves_de(empresa.razon_social or "")
+        ciudad = normalizar_consulta(empresa.ciudad or "")
+
+        self._empresas[empresa.empresa_id] = (
+            empresa.razon_social,
+            float(empresa.rating_promedio) if empresa.rating_promedio is not None else None,
+            empresa.total_calificaciones or 0,
+            claves,
+            empresa.categoria_id,
+            ciudad,
+        )
+        total = empresa.total_calificaciones or 0
+        self._rango_empresas[empresa.empresa_id] = (
+            -round(rating_bayesiano(empresa.rating_promedio, total), 4),
+            -total,
+            (empresa.razon_social or "").lower(),
+        )
+        self._empresas_por_categoria[empresa.categoria_id] = (
+            self._empresas_por_categoria.get(empresa.categoria_id, 0) + 1
+        )
+        if ciudad:
+            self._empresas_por_ciudad[ciudad] = self._empresas_por_ciudad.get(ciudad, 0) + 1
+            self._ciudades.setdefault(ciudad, empresa.ciudad.strip())
+        return claves
+
+    def _quitar_empresa(self, empresa_id: int) -> None:
+        datos = self._empresas.pop(empresa_id, None)
+        if datos is None:
+            return
+        rango = self._rango_empresas.pop(empresa_id, None)
+        i = bisect_left(self._empresas_por_ranking, (rango, empresa_id))
+        if i < len(self._empresas_por_ranking) and self._empresas_por_ranking[i] == (rango, empresa_id):
+            del self._empresas_por_ranking[i]
+
+        _, _, _, claves, categoria_id, ciudad = datos
+        for clave in claves:
+            self._quitar_clave((clave, "empresa", empresa_id))
+
+        self._empresas_por_categoria[categoria_id] = self._empresas_por_categoria.get(categoria_id, 1) - 1
+        if ciudad:
+            restantes = self._empresas_por_ciudad.get(ciudad, 1) - 1
+            if restantes > 0:
+                self._empresas_por_ciudad[ciudad] = restantes
+            else:
+                self._empresas_por_ciudad.pop(ciudad, None)
+                self._ciudades.pop(ciudad, None)
+                self._quitar_clave((ciudad, "ciudad", ciudad))
+
+    def _quitar_clave(self, entrada: Tuple[str, str, object]) -> None:
+        i = bisect_left(self._claves, entrada)
+        if i < len(self._claves) and self._claves[i] == entrada:
+            del self._claves[i]
+
+    def _invalidar_cache(self) -> None:
+        self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def sugerir(
+        self,
+        consulta: str,
+        limite: int = 5,
+        tipos: Optional[Set[str]] = None
+    ) -> Dict[str, List[dict]]:
+        """
+        Sugerencias para un prefijo, agrupadas por tipo.
+
+        Returns:
+            {"empresa": [...], "categoria": [...], "ciudad": [...]}, cada
+            lista con hasta `limite` elementos ordenados por ranking
+        """
+        tipos = set(tipos or TIPOS_SUGERENCIA)
+        prefijo = normalizar_consulta(consulta)
+        resultado: Dict[str, List[dict]] = {tipo: [] for tipo in TIPOS_SUGERENCIA}
+        if not prefijo:
+            return resultado
+
+        clave_cache = (prefijo, limite, frozenset(tipos))
+        with self._lock:
+            guardado = self._cache.get(clave_cache)
+            if guardado is not None:
+                self._cache.move_to_end(clave_cache)
+                return guardado
+
+            inicio = bisect_left(self._claves, (prefijo,))
+            fin = bisect_left(self._claves, (prefijo + "\uffff",))
+
+            if fin - inicio <= MAX_CLAVES_RECORRIDAS:
+                mejores_por_tipo = self._mejores_en_rango(inicio, fin, limite, tipos)
+            else:
+                mejores_por_tipo = self._mejores_por_ranking(prefijo, limite, tipos)
+
+            for tipo, mejores in mejores_por_tipo.items():
+                resultado[tipo] = [self._sugerencia(tipo, ref) for ref in mejores]
+
+            self._cache[clave_cache] = resultado
+            if len(self._cache) > self.MAX_CACHE:
+                self._cache.popitem(last=False)
+
+        return resultado
+
+    def _mejores_en_rango(self, inicio: int, fin: int, limite: int, tipos: Set[str]) -> Dict[str, list]:
+        """Mejores `limite` de cada tipo entre las claves [inicio, fin) del arreglo"""
+        # Deduplicar primero (una empresa puede aparecer por varias claves)
+        # y rankear después, así el costo por clave es solo un dict lookup
+        candidatos: Dict[str, dict] = {tipo: {} for tipo in tipos}
+        for _, tipo, ref in self._claves[inicio:fin]:
+            encontrados = candidatos.get(tipo)
+            if encontrados is not None:
+                encontrados[ref] = None
+
+        return {
+            tipo: heapq.nsmallest(limite, encontrados, key=lambda ref, tipo=tipo: self._orden(tipo, ref))
+            for tipo, encontrados in candidatos.items()
+        }
+
+    def _mejores_por_ranking(self, prefijo: str, limite: int, tipos: Set[str]) -> Dict[str, list]:
+        """
+        Mejores `limite` de cada tipo para un prefijo con demasiadas claves.
+
+        Las empresas se recorren en orden de ranking cortando en la
+        `limite`-ésima coincidencia. Categorías y ciudades son pocas: se
+        filtran todas.
+        """
+        def coincide(claves) -> bool:
+            return any(clave.startswith(prefijo) for clave in claves)
+
+        mejores: Dict[str, list] = {}
+        if "empresa" in tipos:
+            empresas = []
+            for _, empresa_id in self._empresas_por_ranking:
+                if len(empresas) >= limite:
+                    break
+                if coincide(self._empresas[empresa_id][3]):
+                    empresas.append(empresa_id)
+            mejores["empresa"] = empresas
+        if "categoria" in tipos:
+            categorias = [cid for cid, (_, claves) in self._categorias.items() if coincide(claves)]
+            mejores["categoria"] = heapq.nsmallest(limite, categorias, key=lambda ref: self._orden("categoria", ref))
+        if "ciudad" in tipos:
+            ciudades = [ciudad for ciudad in self._ciudades if ciudad.startswith(prefijo)]
+            mejores["ciudad"] = heapq.nsmallest(limite, ciudades, key=lambda ref: self._orden("ciudad", ref))
+        return mejores
+
+    def _orden(self, tipo: str, ref) -> tuple:
+        """Clave de ranking ascendente: mejor puntaje primero, desempate alfabético"""
+        if tipo == "empresa":
+            return self._rango_empresas[ref]
+        if tipo == "categoria":
+            return (-self._empresas_por_categoria.get(ref, 0), self._categorias[ref][0].lower())
+        return (-self._empresas_por_ciudad.get(ref, 0), self._ciudades[ref].lower())
+
+    def _sugerencia(self, tipo: str, ref) -> dict:
+        if tipo == "empresa":
+            texto, rating, total, _, _, ciudad = self._empresas[ref]
+            return {
+                "tipo": tipo, "id": ref, "texto": texto,
+                "rating_promedio": rating, "cantidad": total,
+                "detalle": self._ciudades.get(ciudad),
+            }
+        if tipo == "categoria":
+            return {
+                "tipo": tipo, "id": ref, "texto": self._categorias[ref][0],
+                "rating_promedio": None, "cantidad": self._empresas_por_categoria.get(ref, 0),
+                "detalle": None,
+            }
+        return {
+            "tipo": tipo, "id": None, "texto": self._ciudades[ref],
+            "rating_promedio": None, "cantidad": self._empresas_por_ciudad.get(ref, 0),
+            "detalle": None,
+        }
+
+
+indice_autocompletado = registro_indices.registrar(IndiceAutocompletado())
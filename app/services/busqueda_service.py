@@ -0,0 +1,456 @@
+# app/services/busqueda_service.py
+"""
+Búsqueda de texto sobre empresas y servicios.
+
+- MySQL: índices FULLTEXT (empresa.razon_social + descripcion, servicio.nombre)
+  con MATCH ... AGAINST en modo booleano y ranking por relevancia.
+- Otros motores (SQLite en tests/desarrollo): índice invertido en memoria
+  con ranking BM25, registrado en registro_indices para mantenerse al día.
+
+En ambos casos los términos se buscan por prefijo ("pelu" encuentra
+"peluquería") y con semántica OR ordenada por relevancia.
+"""
+
+import heapq
+import logging
+import math
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.empresa import Empresa
+from app.models.servicio import Servicio
+from app.services.indices_empresa import IndiceEmpresas, registro_indices
+from app.utils.texto import tokenizar
+
+logger = logging.getLogger(__name__)
+
+
+# Peso de cada campo en la frecuencia de término
+PESO_RAZON_SOCIAL = 3.0
+PESO_SERVICIO = 2.0
+PESO_DESCRIPCION = 1.0
+
+# Longitud mínima para expandir un término por prefijo
+MIN_LONGITUD_PREFIJO = 3
+# Máximo de términos del vocabulario en que se expande un prefijo
+MAX_EXPANSIONES_PREFIJO = 64
+
+
+class IndiceBusquedaTexto(IndiceEmpresas):
+    """
+    Índice invertido en memoria con ranking BM25.
+
+    postings: token -> {empresa_id: impacto}, donde el impacto es la parte
+    de BM25 que depende del documento (frecuencia ponderada normalizada por
+    longitud), precalculada al indexar. En la consulta solo se multiplica
+    por el idf del término.
+
+    Para el top-k se recorren las listas ordenadas por impacto con el
+    algoritmo de umbral (Fagin): se corta cuando ningún documento no visto
+    puede superar al peor del top-k. El total de coincidencias se obtiene
+    con operaciones de conjuntos. Solo se indexan empresas activas; los
+    servicios activos aportan su nombre.
+    """
+
+    nombre = "busqueda_texto"
+
+    K1 = 1.2
+    B = 0.75
+
+    # Con menos candidatos que esto se puntúan todos directamente
+    UMBRAL_EXHAUSTIVO = 2000
+
+    def __init__(self):
+        super().__init__()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._ordenados: Dict[str, List[Tuple[float, int]]] = {}
+        self._documentos: Dict[int, Tuple[int, float, Tuple[str, ...]]] = {}
+        self._por_categoria: Dict[int, Set[int]] = {}
+        self._longitud_total = 0.0
+        self._vocabulario: List[str] = []
+        self._vocabulario_sucio = False
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    def construir(self, db: Session) -> None:
+        servicios_por_empresa = self._cargar_servicios(db)
+        empresas = db.query(
+            Empresa.empresa_id, Empresa.razon_social, Empresa.descripcion, Empresa.categoria_id
+        ).filter(Empresa.activa == True).all()
+
+        self.cargar(
+            (empresa, servicios_por_empresa.get(empresa.empresa_id, []))
+            for empresa in empresas
+        )
+
+    def cargar(self, documentos: Iterable[Tuple[object, List[str]]]) -> None:
+        """
+        Reemplaza el contenido del índice.
+
+        Args:
+            documentos: pares (fila con empresa_id/razon_social/descripcion/
+                categoria_id, nombres de servicios activos)
+        """
+        # Primera pasada: frecuencias y longitud media, para que los
+        # impactos de la carga inicial usen la media definitiva
+        tokenizados = [
+            (empresa, self._frecuencias(empresa, servicios))
+            for empresa, servicios in documentos
+        ]
+
+        self._postings = {}
+        self._ordenados = {}
+        self._documentos = {}
+        self._por_categoria = {}
+        self._longitud_total = sum(sum(f.values()) or 1.0 for _, f in tokenizados)
+        longitud_media = self._longitud_total / len(tokenizados) if tokenizados else 1.0
+
+        for empresa, frecuencias in tokenizados:
+            self._agregar(empresa, frecuencias, longitud_media)
+
+        self._vocabulario = sorted(self._postings)
+        self._vocabulario_sucio = False
+        self._construido = True
+
+    def actualizar(self, db: Session, empresa_ids: List[int]) -> None:
+        servicios_por_empresa = self._cargar_servicios(db, empresa_ids)
+        empresas = db.query(
+            Empresa.empresa_id, Empresa.razon_social, Empresa.descripcion, Empresa.categoria_id
+        ).filter(
+            Empresa.empresa_id.in_(empresa_ids),
+            Empresa.activa == True
+        ).all()
+
+        with self._lock:
+            for empresa_id in empresa_ids:
+                self._quitar(empresa_id)
+            for empresa in empresas:
+                frecuencias = self._frecuencias(empresa, servicios_por_empresa.get(empresa.empresa_id, []))
+                self._longitud_total += sum(frecuencias.values()) or 1.0
+                longitud_media = self._longitud_total / (len(self._documentos) + 1)
+                self._agregar(empresa, frecuencias, longitud_media)
+
+    @staticmethod
+    def _cargar_servicios(db: Session, empresa_ids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+        query = db.query(Servicio.empresa_id, Servicio.nombre).filter(Servicio.activo == True)
+        if empresa_ids is not None:
+            query = query.filter(Servicio.empresa_id.in_(empresa_ids))
+
+        servicios: Dict[int, List[str]] = {}
+        for empresa_id, nombre in query.all():
+            servicios.setdefault(empresa_id, []).append(nombre)
+        return servicios
+
+    @staticmethod
+    def _frecuencias(empresa, nombres_servicios: List[str]) -> Dict[str, float]:
+        """Frecuencia ponderada por campo de cada token del documento"""
+        frecuencias: Dict[str, float] = {}
+        campos = [(empresa.razon_social, PESO_RAZON_SOCIAL), (empresa.descripcion, PESO_DESCRIPCION)]
+        campos += [(nombre, PESO_SERVICIO) for nombre in nombres_servicios]
+
+        for texto_campo, peso in campos:
+            for token in tokenizar(texto_campo or ""):
+                frecuencias[token] = frecuencias.get(token, 0.0) + peso
+        return frecuencias
+
+    def _agregar(self, empresa, frecuencias: Dict[str, float], longitud_media: float) -> None:
+        """Agrega un documento (el llamador ya sumó su longitud al total)"""
+        longitud = sum(frecuencias.values()) or 1.0
+        norma_longitud = self.K1 * (1 - self.B + self.B * longitud / longitud_media)
+
+        for token, tf in frecuencias.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                self._vocabulario_sucio = True
+            posting[empresa.empresa_id] = tf * (self.K1 + 1) / (tf + norma_longitud)
+            self._ordenados.pop(token, None)
+
+        self._documentos[empresa.empresa_id] = (empresa.categoria_id, longitud, tuple(frecuencias))
+        self._por_categoria.setdefault(empresa.categoria_id, set()).add(empresa.empresa_id)
+
+    def _quitar(self, empresa_id: int) -> None:
+        documento = self._documentos.pop(empresa_id, None)
+        if documento is None:
+            return
+
+        categoria_id, longitud, tokens = documento
+        self._longitud_total -= longitud
+        self._por_categoria.get(categoria_id, set()).discard(empresa_id)
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(empresa_id, None)
+            self._ordenados.pop(token, None)
+            if not posting:
+                del self._postings[token]
+                self._vocabulario_sucio = True
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _expandir(self, termino: str) -> List[str]:
+        """Término exacto más los del vocabulario que empiezan con él"""
+        if len(termino) < MIN_LONGITUD_PREFIJO:
+            return [termino] if termino in self._postings else []
+
+        if self._vocabulario_sucio:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_sucio = False
+
+        expansiones = []
+        i = bisect_left(self._vocabulario, termino)
+        while i < len(self._vocabulario) and len(expansiones) < MAX_EXPANSIONES_PREFIJO:
+            candidato = self._vocabulario[i]
+            if not candidato.startswith(termino):
+                break
+            expansiones.append(candidato)
+            i += 1
+        return expansiones
+
+    def _lista_ordenada(self, token: str) -> List[Tuple[float, int]]:
+        """Posting ordenado por impacto descendente (se recalcula si cambió)"""
+        lista = self._ordenados.get(token)
+        if lista is None:
+            lista = sorted(
+                ((impacto, empresa_id) for empresa_id, impacto in self._postings[token].items()),
+                key=lambda item: (-item[0], item[1])
+            )
+            self._ordenados[token] = lista
+        return lista
+
+    def buscar(
+        self,
+        consulta: str,
+        categoria_id: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Busca empresas por relevancia BM25.
+
+        Cada término suma el puntaje de su mejor expansión (exacta o por
+        prefijo) en el documento.
+
+        Returns:
+            ([(empresa_id, relevancia), ...] de la página, total de coincidencias)
+        """
+        terminos = list(dict.fromkeys(tokenizar(consulta)))
+        if not terminos:
+            return [], 0
+
+        with self._lock:
+            total_documentos = len(self._documentos)
+            if total_documentos == 0:
+                return [], 0
+
+            # Una "corriente" por cada expansión de cada término: (idf, posting, término)
+            corrientes: List[Tuple[float, str, int]] = []
+            for i, termino in enumerate(terminos):
+                for token in self._expandir(termino):
+                    df = len(self._postings[token])
+                    idf = math.log(1 + (total_documentos - df + 0.5) / (df + 0.5))
+                    # Coincidencia exacta pesa más que una por prefijo
+                    if token != termino:
+                        idf *= 0.8
+                    corrientes.append((idf, token, i))
+
+            if not corrientes:
+                return [], 0
+
+            postings = [self._postings[token] for _, token, _ in corrientes]
+            candidatos = set().union(*postings)
+            if categoria_id is not None:
+                candidatos &= self._por_categoria.get(categoria_id, set())
+
+            total = len(candidatos)
+            k = offset + limit
+            if total == 0 or offset >= total:
+                return [], total
+
+            pesos = [(idf, posting, i) for (idf, _, i), posting in zip(corrientes, postings)]
+            cantidad_terminos = len(terminos)
+
+            def puntaje(empresa_id: int) -> float:
+                mejores = [0.0] * cantidad_terminos
+                for idf, posting, i in pesos:
+                    impacto = posting.get(empresa_id)
+                    if impacto is not None and idf * impacto > mejores[i]:
+                        mejores[i] = idf * impacto
+                return sum(mejores)
+
+            if total <= max(self.UMBRAL_EXHAUSTIVO, k):
+                mejores = heapq.nlargest(
+                    k,
+                    ((puntaje(empresa_id), -empresa_id) for empresa_id in candidatos)
+                )
+            else:
+                listas = [self._lista_ordenada(token) for _, token, _ in corrientes]
+                mejores = self._top_k_umbral(corrientes, listas, candidatos, puntaje, k, cantidad_terminos)
+
+        return [(-menos_id, round(valor, 4)) for valor, menos_id in mejores[offset:]], total
+
+    @staticmethod
+    def _top_k_umbral(corrientes, listas, candidatos, puntaje, k, cantidad_terminos):
+        """
+        Algoritmo de umbral sobre listas ordenadas por impacto.
+
+        En cada profundidad se puntúan los documentos nuevos; el umbral es la
+        suma, por término, del mayor impacto aún no recorrido. Cuando el peor
+        del top-k supera estrictamente el umbral, ningún documento no visto
+        puede entrar (el corte estricto mantiene el orden de desempate por id
+        igual al de la evaluación exhaustiva).
+        """
+        top: List[Tuple[float, int]] = []
+        vistos: Set[int] = set()
+        profundidad_maxima = max(len(lista) for lista in listas)
+
+        for profundidad in range(profundidad_maxima):
+            umbral_por_termino = [0.0] * cantidad_terminos
+            for (idf, _, i), lista in zip(corrientes, listas):
+                if profundidad >= len(lista):
+                    continue
+                impacto, empresa_id = lista[profundidad]
+                if idf * impacto > umbral_por_termino[i]:
+                    umbral_por_termino[i] = idf * impacto
+                if empresa_id in vistos:
+                    continue
+                vistos.add(empresa_id)
+                if empresa_id not in candidatos:
+                    continue
+
+                item = (puntaje(empresa_id), -empresa_id)
+                if len(top) < k:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+
+            if len(top) >= k and top[0][0] > sum(umbral_por_termino):
+                break
+
+        return sorted(top, reverse=True)
+
+
+indice_busqueda = registro_indices.registrar(
+    IndiceBusquedaTexto(),
+    # Con MySQL se usa FULLTEXT y el índice en memoria no hace falta
+    precargar=engine.dialect.name != "mysql"
+)
+
+
+class BusquedaService:
+    """Service de búsqueda de empresas por texto"""
+
+    @staticmethod
+    def usa_fulltext(db: Session) -> bool:
+        return db.get_bind().dialect.name == "mysql"
+
+    @staticmethod
+    def buscar_empresas(
+        db: Session,
+        consulta: str,
+        categoria_id: Optional[int] = None,
+        pagina: int = 1,
+        por_pagina: int = 20
+    ) -> Tuple[List[Tuple[Empresa, float]], int]:
+        """
+        Busca empresas activas por razón social, descripción y nombre de servicios.
+
+        Returns:
+            ([(empresa, relevancia), ...] ordenadas por relevancia, total)
+        """
+        offset = (pagina - 1) * por_pagina
+
+        if BusquedaService.usa_fulltext(db):
+            ranking, total = BusquedaService._buscar_fulltext(
+                db, consulta, categoria_id, offset, por_pagina
+            )
+        else:
+            indice_busqueda.asegurar_construido(db)
+            ranking, total = indice_busqueda.buscar(consulta, categoria_id, offset, por_pagina)
+
+        if not ranking:
+            return [], total
+
+        ids = [empresa_id for empresa_id, _ in ranking]
+        empresas = {
+            e.empresa_id: e
+            for e in db.query(Empresa).filter(Empresa.empresa_id.in_(ids)).all()
+        }
+
+        resultados = [
+            (empresas[empresa_id], relevancia)
+            for empresa_id, relevancia in ranking
+            if empresa_id in empresas
+        ]
+        return resultados, total
+
+    @staticmethod
+    def _expresion_booleana(consulta: str) -> str:
+        """
+        Arma la expresión para MATCH ... AGAINST IN BOOLEAN MODE.
+
+        Los tokens solo contienen [a-z0-9], así que no pueden inyectar
+        operadores del modo booleano.
+        """
+        terminos = dict.fromkeys(tokenizar(consulta))
+        return " ".join(
+            f"{t}*" if len(t) >= MIN_LONGITUD_PREFIJO else t
+            for t in terminos
+        )
+
+    @staticmethod
+    def _buscar_fulltext(
+        db: Session,
+        consulta: str,
+        categoria_id: Optional[int],
+        offset: int,
+        limit: int
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        expresion = BusquedaService._expresion_booleana(consulta)
+        if not expresion:
+            return [], 0
+
+        filtro_categoria = "AND e.categoria_id = :categoria_id" if categoria_id is not None else ""
+        desde = f"""
+            FROM empresa e
+            LEFT JOIN (
+                SELECT s.empresa_id,
+                       MAX(MATCH(s.nombre) AGAINST(:q IN BOOLEAN MODE)) AS puntaje
+                FROM servicio s
+                WHERE s.activo = 1
+                  AND MATCH(s.nombre) AGAINST(:q IN BOOLEAN MODE)
+                GROUP BY s.empresa_id
+            ) sv ON sv.empresa_id = e.empresa_id
+            WHERE e.activa = 1
+              AND (MATCH(e.razon_social, e.descripcion) AGAINST(:q IN BOOLEAN MODE)
+                   OR sv.empresa_id IS NOT NULL)
+              {filtro_categoria}
+        """
+        parametros = {"q": expresion, "categoria_id": categoria_id}
+
+        total = db.execute(text(f"SELECT COUNT(*) {desde}"), parametros).scalar() or 0
+        if total == 0 or offset >= total:
+            return [], total
+
+        filas = db.execute(
+            text(f"""
+                SELECT e.empresa_id,
+                       MATCH(e.razon_social, e.descripcion) AGAINST(:q IN BOOLEAN MODE)
+                       + COALESCE(sv.puntaje, 0) AS relevancia
+                {desde}
+                ORDER BY relevancia DESC, e.empresa_id
+                LIMIT :limit OFFSET :offset
+            """),
+            {**parametros, "limit": limit, "offset": offset}
+        ).fetchall()
+
+        return [(fila.empresa_id, round(float(fila.relevancia), 4)) for fila in filas], total
@@ -0,0 +1,202 @@
+# app/services/disponibilidad_cercana_service.py
+"""
+Búsqueda combinada "empresas cercanas con disponibilidad".
+
+Responde en un solo request lo que antes eran /empresas-cercanas + una
+llamada a /disponibilidad por empresa ("¿quién cerca mío puede hacer un
+corte de pelo mañana a las 17?").
+
+Cantidad de queries fija, independiente de la cantidad de candidatas:
+    0. candidatas por radio/categoría  (índice geográfico en memoria; la base
+                                        solo si el índice está desactivado)
+    1. horarios activos del día de la semana de esas empresas
+    2. servicios activos de las empresas con horario ese día
+    3. turnos ocupados de esa fecha en esas empresas
+
+Los slots se generan en memoria con generar_slots_servicio, la misma
+función que usan la disponibilidad por empresa y el perfil.
+"""
+
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy.orm import Session, load_only
+
+from app.config import settings
+from app.enums import EstadoTurno
+from app.models.horario_empresa import HorarioEmpresa
+from app.models.servicio import Servicio
+from app.models.turno import Turno
+from app.schemas.turno import SlotDisponible
+from app.services.geolocation_service import geolocation_service
+from app.services.turno_service import DIAS_SEMANA, generar_slots_servicio
+
+logger = logging.getLogger(__name__)
+
+
+def patron_contiene(texto: str) -> str:
+    """Patrón LIKE "contiene" con %, _ y \\ escapados (usar con escape="\\")"""
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+
+class DisponibilidadCercanaService:
+    """Service para buscar empresas cercanas con turnos libres en una franja"""
+
+    @staticmethod
+    def buscar(
+        db: Session,
+        latitud: float,
+        longitud: float,
+        radio_km: float,
+        fecha: date,
+        hora_desde: time,
+        hora_hasta: time,
+        categoria_id: Optional[int] = None,
+        servicio: Optional[str] = None,
+        ordenar_por: str = "distancia",
+        limit: int = 20,
+        max_slots: int = 3,
+        ahora: Optional[datetime] = None
+    ) -> Tuple[List[dict], int, bool]:
+        """
+        Empresas del radio con al menos un slot libre que empiece dentro de
+        [hora_desde, hora_hasta) en la fecha.
+
+        Args:
+            servicio: filtra servicios por nombre (contiene, sin distinguir mayúsculas)
+            ordenar_por: "distancia" (distancia, primer slot) o "horario" (primer slot, distancia)
+            max_slots: slots por empresa en la respuesta
+
+        Returns:
+            (empresas, candidatas_evaluadas, candidatas_truncadas). Cada
+            empresa es el dict de find_nearby_empresas más "slots" y
+            "primer_slot". candidatas_truncadas indica que el radio tenía más
+            de DISPONIBILIDAD_CERCANA_MAX_CANDIDATAS empresas y las más lejanas
+            no se evaluaron.
+        """
+        ahora = ahora or datetime.now()
+        if fecha < ahora.date():
+            return [], 0, False
+
+        # Una de más para saber si quedaron empresas del radio sin evaluar
+        maximo = settings.DISPONIBILIDAD_CERCANA_MAX_CANDIDATAS
+        candidatas = geolocation_service.find_nearby_empresas(
+            db, latitud, longitud, radio_km,
+            categoria_id=categoria_id,
+            limit=maximo + 1,
+            ordenar_por="distancia"
+        )
+        truncadas = len(candidatas) > maximo
+        candidatas = candidatas[:maximo]
+        if not candidatas:
+            return [], 0, False
+
+        slots_por_empresa = DisponibilidadCercanaService._slots_por_empresa(
+            db, [c["empresa_id"] for c in candidatas], fecha, hora_desde, hora_hasta, servicio, ahora
+        )
+
+        empresas = []
+        for candidata in candidatas:
+            slots = slots_por_empresa.get(candidata["empresa_id"])
+            if slots:
+                empresas.append({
+                    **candidata,
+                    "primer_slot": slots[0].hora_inicio,
+                    "slots": slots[:max_slots],
+                })
+
+        if ordenar_por == "horario":
+            clave = lambda e: (e["primer_slot"], e["distancia_km"], e["empresa_id"])
+        else:
+            clave = lambda e: (e["distancia_km"], e["primer_slot"], e["empresa_id"])
+        empresas.sort(key=clave)
+
+        logger.info(
+            f"Disponibilidad cercana {fecha} {hora_desde}-{hora_hasta}: "
+            f"{len(empresas)} de {len(candidatas)} candidatas con turnos libres"
+            + (" (candidatas truncadas)" if truncadas else "")
+        )
+        return empresas[:limit], len(candidatas), truncadas
+
+    @staticmethod
+    def _slots_por_empresa(
+        db: Session,
+        empresa_ids: List[int],
+        fecha: date,
+        hora_desde: time,
+        hora_hasta: time,
+        servicio: Optional[str],
+        ahora: datetime
+    ) -> Dict[int, List[SlotDisponible]]:
+        """Slots libres en la franja, por empresa y ordenados por hora (3 queries en total)"""
+        horarios = db.query(HorarioEmpresa).filter(
+            HorarioEmpresa.empresa_id.in_(empresa_ids),
+            HorarioEmpresa.dia_semana == DIAS_SEMANA[fecha.weekday()],
+            HorarioEmpresa.activo == True
+        ).all()
+
+        horarios_por_empresa: Dict[int, List[HorarioEmpresa]] = {}
+        for horario in horarios:
+            # Solo interesan los horarios que se superponen con la franja pedida
+            if horario.hora_apertura < hora_hasta and horario.hora_cierre > hora_desde:
+                horarios_por_empresa.setdefault(horario.empresa_id, []).append(horario)
+        if not horarios_por_empresa:
+            return {}
+
+        ids_con_horario = list(horarios_por_empresa)
+
+        servicios_query = db.query(Servicio).filter(
+            Servicio.empresa_id.in_(ids_con_horario),
+            Servicio.activo == True
+        )
+        if servicio:
+            servicios_query = servicios_query.filter(
+                Servicio.nombre.ilike(patron_contiene(servicio.strip()), escape="\\")
+            )
+
+        servicios_por_empresa: Dict[int, List[Servicio]] = {}
+        for s in servicios_query.all():
+            servicios_por_empresa.setdefault(s.empresa_id, []).append(s)
+        if not servicios_por_empresa:
+            return {}
+
+        turnos = db.query(Turno).options(
+            load_only(Turno.empresa_id, Turno.servicio_id, Turno.fecha, Turno.hora)
+        ).filter(
+            Turno.empresa_id.in_(list(servicios_por_empresa)),
+            Turno.fecha == fecha,
+            Turno.estado.in_([EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO])
+        ).all()
+
+        turnos_por_empresa: Dict[int, List[Turno]] = {}
+        for turno in turnos:
+            turnos_por_empresa.setdefault(turno.empresa_id, []).append(turno)
+
+        # Hoy no se ofrecen slots que ya empezaron
+        desde = max(hora_desde, ahora.time()) if fecha == ahora.date() else hora_desde
+
+        resultado: Dict[int, List[SlotDisponible]] = {}
+        for empresa_id, servicios in servicios_por_empresa.items():
+            turnos_empresa = turnos_por_empresa.get(empresa_id, [])
+            slots: List[SlotDisponible] = []
+            for horario in horarios_por_empresa[empresa_id]:
+                for s in servicios:
+                    # Se generan con el horario completo para respetar la grilla
+                    # de la empresa; la franja filtra por hora de inicio
+                    slots.extend(
+                        slot for slot in generar_slots_servicio(
+                            fecha, horario.hora_apertura, horario.hora_cierre, s, turnos_empresa
+                        )
+                        if desde <= slot.hora_inicio < hora_hasta
+                    )
+            if slots:
+                slots.sort(key=lambda slot: (slot.hora_inicio, slot.servicio_id))
+                resultado[empresa_id] = slots
+
+        return resultado
+
+
+# Instancia singleton
+disponibilidad_cercana_service = DisponibilidadCercanaService()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from typing import Optional, List, Tuple
+from datetime import datetime
 from fastapi import HTTPException, status
 
 from app.models.empresa import Empresa
@@ -61,6 +62,33 @@ class EmpresaService:
             joinedload(Empresa.categoria)
         ).filter(Empresa.empresa_id == empresa_id).first()
     
+    @staticmethod
+    def get_empresa_version(db: Session, empresa_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+        """
+        Sonda de versión para GET condicional: lee solo version y
+        fecha_actualizacion por PK.
+        
+        Returns:
+            Tupla (version, fecha_actualizacion) o None si la empresa no existe
+        """
+        return db.query(Empresa.version, Empresa.fecha_actualizacion).filter(
+            Empresa.empresa_id == empresa_id
+        ).first()
+    
+    @staticmethod
+    def marcar_actualizada(db: Session, empresa_id: int) -> None:
+        """
+        Actualiza fecha_actualizacion de la empresa sin modificar otros campos
+        (el UPDATE también incrementa empresa.version).
+        
+        Se usa cuando cambian datos relacionados (dirección, servicios) para que
+        la sonda de versión invalide los ETags emitidos. No hace commit.
+        """
+        db.query(Empresa).filter(Empresa.empresa_id == empresa_id).update(
+            {Empresa.fecha_actualizacion: func.now()},
+            synchronize_session=False
+        )
+    
     @staticmethod
     def get_empresa_by_usuario_id(db: Session, usuario_id: int) -> Optional[Empresa]:
         """Obtener empresa por usuario_id con relaciones"""
@@ -190,6 +218,9 @@ class EmpresaService:
                     db.add(direccion)
                     db.flush()
                     empresa.direccion_id = direccion.direccion_id
+                
+                # La dirección forma parte del perfil: invalidar su versión
+                EmpresaService.marcar_actualizada(db, empresa_id)
             
             db.commit()
             db.refresh(empresa)
@@ -261,6 +292,9 @@ class EmpresaService:
                     db.add(direccion)
                     db.flush()
                     empresa.direccion_id = direccion.direccion_id
+                
+                # La dirección forma parte del perfil: invalidar su versión
+                EmpresaService.marcar_actualizada(db, empresa_id)
             
             db.commit()
             db.refresh(empresa)
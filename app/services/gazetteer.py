@@ -0,0 +1,354 @@
+# app/services/gazetteer.py
+"""
+Nomenclador local de localidades argentinas (sin red).
+
+Lo usan GeoValidationService (validar coordenadas contra la ciudad, ciudad
+más cercana) y el geocodificador de respaldo cuando Georef no está disponible:
+- buscar(nombre, provincia): centro de una localidad por nombre
+- mas_cercana(lat, lng): localidad más cercana a un punto (KD-tree, O(log n))
+
+Fuentes, en orden (la primera que trae una localidad gana):
+1. app/data/localidades.csv.gz, incluido en el repo. Se genera desde la
+   API de localidades de datos.gob.ar (abajo); mientras no se regenere
+   trae ~160 localidades (centros del Gran Buenos Aires, capitales
+   provinciales y ciudades principales de cada provincia) y una localidad
+   que no está no se valida (requires_manual_review) ni tiene respaldo sin
+   red (geocode_address devuelve None con Georef caído)
+2. GeoValidationService.CITY_CENTERS, para los alias que no estén en el archivo
+3. Archivo de localidades opcional (settings.GEOCODING_LOCALIDADES_ARCHIVO)
+
+Los archivos pueden ser CSV (nombre,provincia,latitud,longitud) o el JSON de
+la API de localidades de datos.gob.ar ({"localidades": [{"nombre",
+"provincia": {"nombre"}, "centroide": {"lat", "lon"}}]}), opcionalmente
+comprimidos con gzip (.gz).
+
+Regenerar el archivo incluido con el listado completo de datos.gob.ar
+(descarga paginada; las entradas actuales quedan como respaldo de las que
+la API no traiga) y commitearlo:
+
+    python -m app.services.gazetteer app/data/localidades.csv.gz --descargar app/data/localidades.csv.gz
+
+Si la descarga trae menos de MINIMO_LOCALIDADES_DESCARGA localidades no se
+escribe nada.
+
+Nada se lee hasta el primer uso (obtener_gazetteer) y el KD-tree se arma en
+la primera consulta por cercanía, así el arranque de la API no paga la carga.
+
+Los nombres se comparan normalizados (normalizar_direccion): sin acentos,
+mayúsculas ni puntuación, con abreviaturas expandidas ("CABA", "Cap. Fed.").
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.utils.geo_vectorial import haversine_km
+from app.utils.kdtree import KDTree
+from app.utils.texto import normalizar_direccion
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_LOCALIDADES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "localidades.csv.gz"
+)
+
+COLUMNAS_CSV = ["nombre", "provincia", "latitud", "longitud"]
+
+URL_LOCALIDADES_GEOREF = "https://apis.datos.gob.ar/georef/api/localidades"
+LOCALIDADES_POR_PAGINA = 5000
+# Una descarga con menos localidades está incompleta (el listado tiene ~4000)
+MINIMO_LOCALIDADES_DESCARGA = 3000
+
+
+class Localidad(NamedTuple):
+    nombre: str
+    provincia: Optional[str]
+    latitud: float
+    longitud: float
+
+
+def _abrir(ruta: str, modo: str = "r"):
+    """Abre un archivo de texto UTF-8, descomprimiendo si termina en .gz"""
+    if ruta.lower().endswith(".gz"):
+        return gzip.open(ruta, modo + "t", encoding="utf-8", newline="")
+    return open(ruta, modo, encoding="utf-8", newline="")
+
+
+def _localidades_json(datos: dict) -> List[Localidad]:
+    """Localidades de una respuesta de la API de localidades de datos.gob.ar"""
+    return [
+        Localidad(
+            l["nombre"],
+            (l.get("provincia") or {}).get("nombre"),
+            float(l["centroide"]["lat"]),
+            float(l["centroide"]["lon"]),
+        )
+        for l in datos.get("localidades", [])
+    ]
+
+
+def descargar_localidades(
+    url: str = URL_LOCALIDADES_GEOREF,
+    por_pagina: int = LOCALIDADES_POR_PAGINA,
+    cliente: Optional[httpx.Client] = None
+) -> List[Localidad]:
+    """Listado completo de la API de localidades, página por página (parámetros max/inicio)"""
+    propio = cliente is None
+    cliente = cliente or httpx.Client(timeout=settings.HTTP_TIMEOUT_SECONDS * 6)
+    localidades: List[Localidad] = []
+    try:
+        while True:
+            response = cliente.get(url, params={
+                "max": por_pagina,
+                "inicio": len(localidades),
+                "campos": "nombre,provincia.nombre,centroide",
+                "orden": "id",
+            })
+            response.raise_for_status()
+            datos = response.json()
+            pagina = _localidades_json(datos)
+            localidades.extend(pagina)
+            if not pagina or len(localidades) >= datos.get("total", 0):
+                return localidades
+    finally:
+        if propio:
+            cliente.close()
+
+
+class Gazetteer:
+    """
+    Localidades en arreglos compactos (array de floats / códigos de provincia)
+    + diccionario por nombre normalizado + KD-tree sobre las coordenadas.
+    """
+
+    def __init__(self):
+        self._nombres: List[str] = []
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        # Código de provincia por localidad (-1 = sin provincia)
+        self._codigos_provincia = array("h")
+        self._provincias: List[str] = []
+        self._codigo_por_provincia: Dict[str, int] = {}
+
+        self._por_nombre: Dict[str, List[int]] = {}
+        self._arbol: Optional[KDTree] = None
+
+    def __len__(self) -> int:
+        return len(self._nombres)
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def cargar(self, localidades: Iterable[Localidad]) -> int:
+        """Agrega localidades; omite las repetidas (mismo nombre y provincia). Devuelve cuántas agregó"""
+        agregadas = 0
+        for localidad in localidades:
+            clave = normalizar_direccion(localidad.nombre)
+            codigo = self._codigo_provincia(localidad.provincia)
+            posiciones = self._por_nombre.setdefault(clave, [])
+            if any(self._codigos_provincia[i] == codigo for i in posiciones):
+                continue
+
+            posiciones.append(len(self._nombres))
+            self._nombres.append(localidad.nombre)
+            self._latitudes.append(localidad.latitud)
+            self._longitudes.append(localidad.longitud)
+            self._codigos_provincia.append(codigo)
+            agregadas += 1
+
+        if agregadas:
+            self._arbol = None
+        return agregadas
+
+    def _codigo_provincia(self, provincia: Optional[str]) -> int:
+        if not provincia:
+            return -1
+        clave = _clave_provincia(provincia)
+        codigo = self._codigo_por_provincia.get(clave)
+        if codigo is None:
+            codigo = len(self._provincias)
+            self._provincias.append(provincia)
+            self._codigo_por_provincia[clave] = codigo
+        return codigo
+
+    def cargar_archivo(self, ruta: str) -> int:
+        """Carga un archivo CSV o JSON de localidades (o .gz); devuelve cuántas agregó"""
+        with _abrir(ruta) as archivo:
+            if ruta.lower().removesuffix(".gz").endswith(".json"):
+                localidades = _localidades_json(json.load(archivo))
+            else:
+                localidades = [
+                    Localidad(f["nombre"], f.get("provincia") or None, float(f["latitud"]), float(f["longitud"]))
+                    for f in csv.DictReader(archivo)
+                ]
+
+        return self.cargar(localidades)
+
+    def guardar_archivo(self, ruta: str) -> None:
+        """Escribe todas las localidades en CSV (comprimido si la ruta termina en .gz)"""
+        with _abrir(ruta, "w") as archivo:
+            escritor = csv.writer(archivo, lineterminator="\n")
+            escritor.writerow(COLUMNAS_CSV)
+            for i in range(len(self)):
+                localidad = self._localidad(i)
+                escritor.writerow([
+                    localidad.nombre, localidad.provincia or "", localidad.latitud, localidad.longitud
+                ])
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _localidad(self, i: int) -> Localidad:
+        codigo = self._codigos_provincia[i]
+        return Localidad(
+            self._nombres[i],
+            self._provincias[codigo] if codigo >= 0 else None,
+            self._latitudes[i],
+            self._longitudes[i],
+        )
+
+    def buscar(self, nombre: str, provincia: Optional[str] = None) -> Optional[Localidad]:
+        """
+        Localidad por nombre. Con provincia, solo la de esa provincia (o una
+        sin provincia, como los alias de CITY_CENTERS): si el nombre existe
+        únicamente en otras provincias devuelve None, no el homónimo de otra.
+        """
+        posiciones = self._por_nombre.get(normalizar_direccion(nombre or ""))
+        if not posiciones:
+            return None
+        if not provincia:
+            return self._localidad(posiciones[0])
+
+        codigo = self._codigo_por_provincia.get(_clave_provincia(provincia))
+        sin_provincia = None
+        for i in posiciones:
+            if codigo is not None and self._codigos_provincia[i] == codigo:
+                return self._localidad(i)
+            if self._codigos_provincia[i] == -1 and sin_provincia is None:
+                sin_provincia = i
+        return self._localidad(sin_provincia) if sin_provincia is not None else None
+
+    def mas_cercana(self, lat: float, lng: float) -> Optional[Tuple[Localidad, float]]:
+        """(localidad, distancia_km) más cercana al punto"""
+        if not self._nombres:
+            return None
+
+        i, _ = self._obtener_arbol().mas_cercano(_vector_unitario(lat, lng))
+        localidad = self._localidad(i)
+        distancia = haversine_km(
+            lat, lng, np.array([localidad.latitud]), np.array([localidad.longitud])
+        )
+        return localidad, float(distancia[0])
+
+    def _obtener_arbol(self) -> KDTree:
+        arbol = self._arbol
+        if arbol is None:
+            # Sobre la esfera unitaria la distancia euclídea (cuerda) crece con
+            # la distancia geodésica: el más cercano es el mismo que con Haversine
+            arbol = KDTree(_vector_unitario(
+                np.frombuffer(self._latitudes, dtype=np.float64),
+                np.frombuffer(self._longitudes, dtype=np.float64),
+            ))
+            self._arbol = arbol
+        return arbol
+
+
+def _clave_provincia(provincia: str) -> str:
+    """
+    Nombre de provincia normalizado para comparar: sin "Provincia de" y sin lo
+    que sigue a una coma ("Tierra del Fuego, Antártida e Islas del Atlántico Sur")
+    """
+    clave = normalizar_direccion(provincia.split(",")[0])
+    for prefijo in ("provincia de ", "provincia del "):
+        if clave.startswith(prefijo):
+            return clave[len(prefijo):]
+    return clave
+
+
+def _vector_unitario(lat, lng) -> np.ndarray:
+    """Coordenadas geográficas en grados -> puntos (x, y, z) sobre la esfera unitaria"""
+    lat_rad = np.radians(lat)
+    lng_rad = np.radians(lng)
+    return np.stack([
+        np.cos(lat_rad) * np.cos(lng_rad),
+        np.cos(lat_rad) * np.sin(lng_rad),
+        np.sin(lat_rad),
+    ], axis=-1)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_lock = threading.Lock()
+
+
+def obtener_gazetteer() -> Gazetteer:
+    """Gazetteer del proceso, construido en el primer uso"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                from app.services.geo_validation_service import GeoValidationService
+
+                gazetteer = Gazetteer()
+                for ruta in (ARCHIVO_LOCALIDADES, settings.GEOCODING_LOCALIDADES_ARCHIVO):
+                    if not ruta:
+                        continue
+                    try:
+                        cantidad = gazetteer.cargar_archivo(ruta)
+                        logger.info(f"Gazetteer: {cantidad} localidades desde {ruta}")
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error(f"No se pudo cargar el archivo de localidades {ruta}: {str(e)}")
+
+                    if ruta == ARCHIVO_LOCALIDADES:
+                        # Alias de CITY_CENTERS ("capital federal") que el archivo no trae
+                        gazetteer.cargar(
+                            Localidad(nombre, None, lat, lng)
+                            for nombre, (lat, lng) in GeoValidationService.CITY_CENTERS.items()
+                            if gazetteer.buscar(nombre) is None
+                        )
+                _gazetteer = gazetteer
+    return _gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Combina archivos de localidades (CSV/JSON de datos.gob.ar, .gz) en un CSV comprimido"
+    )
+    parser.add_argument("salida", help="Archivo a escribir (ej: app/data/localidades.csv.gz)")
+    parser.add_argument("fuentes", nargs="*", help="Archivos a combinar; ante repetidas gana el primero")
+    parser.add_argument(
+        "--descargar", action="store_true",
+        help=f"Descargar primero el listado completo de {URL_LOCALIDADES_GEOREF}"
+    )
+    args = parser.parse_args()
+    if not args.fuentes and not args.descargar:
+        parser.error("indicar archivos fuente o --descargar")
+
+    gazetteer = Gazetteer()
+    if args.descargar:
+        descargadas = descargar_localidades()
+        if len(descargadas) < MINIMO_LOCALIDADES_DESCARGA:
+            raise SystemExit(
+                f"La descarga trajo {len(descargadas)} localidades (mínimo {MINIMO_LOCALIDADES_DESCARGA}); "
+                f"no se escribe {args.salida}"
+            )
+        print(f"{URL_LOCALIDADES_GEOREF}: {gazetteer.cargar(descargadas)} localidades")
+    for ruta in args.fuentes:
+        print(f"{ruta}: {gazetteer.cargar_archivo(ruta)} localidades")
+    gazetteer.guardar_archivo(args.salida)
+    print(f"{args.salida}: {len(gazetteer)} localidades")
+
+
+if __name__ == "__main__":
+    main()
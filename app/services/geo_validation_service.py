@@ -4,6 +4,8 @@ import logging
 from typing import Tuple, Optional, Dict, Any
 from math import radians, cos, sin, asin, sqrt
 
+from app.services.gazetteer import obtener_gazetteer
+
 logger = logging.getLogger(__name__)
 
 class GeoValidationService:
@@ -12,7 +14,9 @@ class GeoValidationService:
     Detecta inconsistencias y errores en coordenadas devueltas.
     """
     
-    # Centros aproximados de ciudades principales del Gran Buenos Aires
+    # Centros aproximados de ciudades principales del Gran Buenos Aires.
+    # El resto del país (y estos mismos, con su provincia) está en el
+    # gazetteer local (app/data/localidades.csv.gz); acá quedan los alias.
     CITY_CENTERS = {
         # CABA
         "ciudad autonoma de buenos aires": (-34.6037, -58.3816),
@@ -55,9 +59,6 @@ class GeoValidationService:
     # Radio maximo aceptable desde centro de ciudad (en km)
     MAX_DISTANCE_FROM_CENTER = 15  # 15km
     
-    def __init__(self):
-        pass
-    
     def calculate_distance(self, lat1: float, lon1: float, 
                           lat2: float, lon2: float) -> float:
         """
@@ -118,13 +119,11 @@ class GeoValidationService:
         Returns:
             Dict con resultado de validacion
         """
-        # Normalizar nombre de ciudad
-        ciudad_normalized = self.normalize_city_name(ciudad)
+        # Buscar centro de la ciudad (nombre normalizado; con la provincia
+        # se desambiguan homónimos como Merlo o San Martín)
+        localidad = obtener_gazetteer().buscar(ciudad, provincia) if ciudad else None
         
-        # Buscar centro de la ciudad
-        city_center = self.CITY_CENTERS.get(ciudad_normalized)
-        
-        if not city_center:
+        if not localidad:
             # Ciudad no en base de datos - no podemos validar
             return {
                 "valid": None,
@@ -133,6 +132,8 @@ class GeoValidationService:
                 "requires_manual_review": True
             }
         
+        city_center = (localidad.latitud, localidad.longitud)
+        
         # Calcular distancia desde centro de ciudad
         distance_km = self.calculate_distance(
             lat, lng, 
@@ -178,19 +179,18 @@ class GeoValidationService:
         Returns:
             Dict con info de ciudad mas cercana o None
         """
-        closest_city = None
-        min_distance = float('inf')
-        
-        for city_name, (city_lat, city_lng) in self.CITY_CENTERS.items():
-            distance = self.calculate_distance(lat, lng, city_lat, city_lng)
-            
-            if distance < min_distance:
-                min_distance = distance
-                closest_city = {
-                    "name": city_name,
-                    "distance_km": round(distance, 2),
-                    "coordinates": (city_lat, city_lng)
-                }
+        # KD-tree del gazetteer: O(log n) sobre todas las localidades cargadas
+        cercana = obtener_gazetteer().mas_cercana(lat, lng)
+        if cercana is None:
+            return None
+        
+        localidad, distancia_km = cercana
+        closest_city = {
+            "name": localidad.nombre,
+            "province": localidad.provincia,
+            "distance_km": distancia_km,
+            "coordinates": (localidad.latitud, localidad.longitud)
+        }
         
         return closest_city
     
@@ -0,0 +1,265 @@
+# app/services/geocodificacion_lote.py
+"""
+Geocodificación en lote (backfill) de empresas.
+
+Recorre las empresas activas con dirección que no tienen coordenadas o
+están marcadas con requires_verification, en orden de empresa_id:
+
+1. Lee lotes de hasta 1000 empresas (keyset por empresa_id, sin OFFSET)
+2. Geocodifica cada lote con un solo POST bulk a Georef, con varios lotes
+   en vuelo como máximo (concurrencia acotada)
+3. Valida cada resultado contra la ciudad (validate_geocoding_result)
+4. Escribe con UPDATEs bulk por clave primaria y notifica a los índices
+
+Reanudable: después de cada lote confirmado se guarda en el checkpoint el
+último empresa_id procesado sin errores en orden; una nueva corrida sigue
+desde ahí. Si un lote falla, el checkpoint deja de avanzar y la próxima
+corrida lo reintenta (reprocesar un lote ya escrito es inocuo).
+
+Uso como CLI:
+    python -m app.services.geocodificacion_lote
+    python -m app.services.geocodificacion_lote --lote 500 --concurrencia 2 --checkpoint geocodificacion.json
+
+Como tarea de fondo: POST /api/v1/geolocalizacion/geocodificacion-lote
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_, update
+
+from app.core.http_client import clientes_http
+from app.database import SessionLocal
+from app.models.direccion import Direccion
+from app.models.empresa import Empresa
+from app.services.geocoding_service_new import GeocodingService, geocoding_service
+from app.services.indices_empresa import registro_indices
+
+logger = logging.getLogger(__name__)
+
+CONFIANZA_SIN_RESULTADO = "not_found"
+
+
+class GeocodificadorLote:
+    """Una corrida del backfill de coordenadas"""
+
+    def __init__(
+        self,
+        tamano_lote: int = GeocodingService.MAX_DIRECCIONES_BULK,
+        concurrencia: int = 4,
+        checkpoint: Optional[str] = None,
+        servicio: GeocodingService = geocoding_service,
+        session_factory=SessionLocal
+    ):
+        self.tamano_lote = min(tamano_lote, GeocodingService.MAX_DIRECCIONES_BULK)
+        self.concurrencia = concurrencia
+        self.checkpoint = checkpoint
+        self.servicio = servicio
+        self.session_factory = session_factory
+
+        self.progreso: Dict[str, Any] = {
+            "en_curso": False,
+            "lotes": 0,
+            "procesadas": 0,
+            "actualizadas": 0,
+            "baja_confianza": 0,
+            "sin_resultado": 0,
+            "lotes_fallidos": 0,
+            "ultimo_empresa_id": None,
+            "segundos": 0.0,
+        }
+        # Lotes en orden de lectura, para avanzar el checkpoint sin huecos
+        self._lotes_en_orden: List[Dict[str, Any]] = []
+        self._checkpoint_bloqueado = False
+
+    # ------------------------------------------------------------------
+    # Corrida
+    # ------------------------------------------------------------------
+
+    async def ejecutar(self, desde_id: Optional[int] = None) -> Dict[str, Any]:
+        desde = desde_id if desde_id is not None else self._leer_checkpoint()
+        self.progreso["ultimo_empresa_id"] = desde
+        self.progreso["en_curso"] = True
+        inicio = time.perf_counter()
+
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        tareas = []
+        try:
+            while True:
+                # Se espera un lugar antes de leer: acota también la memoria
+                await semaforo.acquire()
+                filas = await asyncio.to_thread(self._leer_pendientes, desde)
+                if not filas:
+                    semaforo.release()
+                    break
+
+                desde = filas[-1].empresa_id
+                lote = {"ultimo_id": desde, "terminado": False, "ok": False}
+                self._lotes_en_orden.append(lote)
+
+                tarea = asyncio.create_task(self._procesar_lote(filas, lote))
+                tarea.add_done_callback(lambda _: semaforo.release())
+                tareas.append(tarea)
+
+            await asyncio.gather(*tareas)
+        finally:
+            self.progreso["en_curso"] = False
+            self.progreso["segundos"] = round(time.perf_counter() - inicio, 2)
+
+        logger.info(f"Geocodificación en lote terminada: {self.progreso}")
+        return self.progreso
+
+    async def _procesar_lote(self, filas: list, lote: Dict[str, Any]) -> None:
+        try:
+            resultados = await self.servicio.geocode_addresses_bulk([
+                {"calle": f.calle, "numero": f.numero, "ciudad": f.ciudad, "provincia": f.provincia}
+                for f in filas
+            ])
+            valores = [self._valores_actualizacion(f.empresa_id, r) for f, r in zip(filas, resultados)]
+            await asyncio.to_thread(self._aplicar, valores)
+            lote["ok"] = True
+
+            self.progreso["procesadas"] += len(filas)
+            for v in valores:
+                if "latitud" in v:
+                    self.progreso["actualizadas"] += 1
+                if v["geocoding_confidence"] == CONFIANZA_SIN_RESULTADO:
+                    self.progreso["sin_resultado"] += 1
+                elif v["requires_verification"]:
+                    self.progreso["baja_confianza"] += 1
+        except Exception as e:
+            self.progreso["lotes_fallidos"] += 1
+            logger.error(
+                f"Lote de geocodificación hasta empresa {lote['ultimo_id']} falló: {str(e)}"
+            )
+        finally:
+            lote["terminado"] = True
+            self.progreso["lotes"] += 1
+            self._avanzar_checkpoint()
+            logger.info(
+                f"Geocodificación en lote: {self.progreso['procesadas']} procesadas, "
+                f"{self.progreso['actualizadas']} con coordenadas, "
+                f"{self.progreso['lotes_fallidos']} lotes fallidos"
+            )
+
+    # ------------------------------------------------------------------
+    # Base de datos (en threads, con sesión propia)
+    # ------------------------------------------------------------------
+
+    def _leer_pendientes(self, desde_id: Optional[int]) -> list:
+        db = self.session_factory()
+        try:
+            query = db.query(
+                Empresa.empresa_id, Direccion.calle, Direccion.numero,
+                Direccion.ciudad, Direccion.provincia
+            ).join(
+                Direccion, Empresa.direccion_id == Direccion.direccion_id
+            ).filter(
+                Empresa.activa == True,
+                or_(
+                    Empresa.latitud.is_(None),
+                    Empresa.longitud.is_(None),
+                    Empresa.requires_verification == True
+                )
+            )
+            if desde_id is not None:
+                query = query.filter(Empresa.empresa_id > desde_id)
+            return query.order_by(Empresa.empresa_id).limit(self.tamano_lote).all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _valores_actualizacion(empresa_id: int, resultado: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Columnas a escribir para una empresa según el resultado de Georef"""
+        if resultado is None:
+            return {
+                "empresa_id": empresa_id,
+                "geocoding_confidence": CONFIANZA_SIN_RESULTADO,
+                "geocoding_warning": "Georef no encontró la dirección",
+                "requires_verification": True,
+            }
+
+        lat, lng = resultado["coordinates"]
+        validacion = resultado.get("validation") or {}
+        return {
+            "empresa_id": empresa_id,
+            "latitud": lat,
+            "longitud": lng,
+            "geocoding_confidence": validacion.get("confidence", "unknown"),
+            "geocoding_warning": validacion.get("validation", {}).get("warning"),
+            "requires_verification": not validacion.get("safe_to_use", True),
+        }
+
+    def _aplicar(self, valores: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            # UPDATE bulk por clave primaria; un executemany por juego de columnas
+            con_coordenadas = [v for v in valores if "latitud" in v]
+            sin_coordenadas = [v for v in valores if "latitud" not in v]
+            for grupo in (con_coordenadas, sin_coordenadas):
+                if grupo:
+                    db.execute(update(Empresa), grupo)
+            db.commit()
+            registro_indices.notificar_cambio(db, [v["empresa_id"] for v in valores])
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _leer_checkpoint(self) -> Optional[int]:
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint, encoding="utf-8") as archivo:
+            return json.load(archivo).get("ultimo_empresa_id")
+
+    def _avanzar_checkpoint(self) -> None:
+        avanzo = False
+        while self._lotes_en_orden and self._lotes_en_orden[0]["terminado"]:
+            lote = self._lotes_en_orden.pop(0)
+            if not lote["ok"]:
+                self._checkpoint_bloqueado = True
+            if not self._checkpoint_bloqueado:
+                self.progreso["ultimo_empresa_id"] = lote["ultimo_id"]
+                avanzo = True
+
+        if avanzo and self.checkpoint:
+            temporal = f"{self.checkpoint}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump({"ultimo_empresa_id": self.progreso["ultimo_empresa_id"]}, archivo)
+            os.replace(temporal, self.checkpoint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lote", type=int, default=GeocodingService.MAX_DIRECCIONES_BULK,
+                        help="Direcciones por consulta bulk (máximo 1000)")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Consultas bulk simultáneas")
+    parser.add_argument("--checkpoint", default=None, help="Archivo JSON para reanudar la corrida")
+    parser.add_argument("--desde-id", type=int, default=None, help="Empezar después de este empresa_id")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    geocodificador = GeocodificadorLote(args.lote, args.concurrencia, args.checkpoint)
+
+    async def corrida():
+        try:
+            return await geocodificador.ejecutar(args.desde_id)
+        finally:
+            await clientes_http.cerrar()
+
+    progreso = asyncio.run(corrida())
+    print(json.dumps(progreso, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# app/services/geocoding_cache.py
+"""
+Caché de geocodificación en dos niveles.
+
+1. LRU en memoria del worker (rápido, se pierde al reiniciar)
+2. Tabla geocoding_cache (compartida entre workers y reinicios)
+
+Las claves son direcciones normalizadas (normalizar_direccion): "Av. Gral
+Paz 1200" y "Avenida General Paz 1200" comparten entrada. Los resultados
+vacíos también se guardan (caché negativo) con un TTL más corto, para no
+repetir consultas que Georef ya contestó sin resultados. Los errores de
+red nunca se cachean.
+
+Los resultados son dicts mutables: el nivel en memoria guarda una copia y
+devuelve una copia en cada lectura, así un caller que modifica su
+resultado no altera lo que reciben los demás.
+
+La geocodificación inversa usa la misma tabla (tipo 'inversa') con las
+coordenadas cuantizadas a una grilla (celda_coordenadas): puntos a pocos
+metros entre sí comparten entrada.
+"""
+
+import asyncio
+import copy
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.geocoding_cache import GeocodingCache
+
+logger = logging.getLogger(__name__)
+
+# Metros por grado de latitud (y de longitud en el ecuador)
+METROS_POR_GRADO = 111320.0
+
+
+class CacheGeocodificacion:
+    """
+    Caché de resultados de un tipo de consulta (ej: 'direccion').
+
+    obtener() devuelve (encontrado_en_cache, valor); valor None con
+    encontrado_en_cache=True es un resultado negativo cacheado.
+    """
+
+    def __init__(
+        self,
+        tipo: str,
+        max_entradas: int,
+        ttl: timedelta,
+        ttl_negativo: timedelta,
+        persistir: bool = True,
+        desde_json: Optional[Callable[[Any], Any]] = None
+    ):
+        self.tipo = tipo
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.persistir = persistir
+        self._desde_json = desde_json
+        # clave -> (valor, vence_en epoch)
+        self._memoria: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._estadisticas = {
+            "consultas": 0,
+            "hits_memoria": 0,
+            "hits_base": 0,
+            "hits_negativos": 0,
+            "misses": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    async def obtener(self, clave: str) -> Tuple[bool, Any]:
+        self._estadisticas["consultas"] += 1
+
+        encontrado, valor = self._leer_memoria(clave)
+        if encontrado:
+            self._contar_hit("hits_memoria", valor)
+            return True, valor
+
+        if self.persistir:
+            encontrado, valor, vence_en = await asyncio.to_thread(self._leer_base, clave)
+            if encontrado:
+                self._guardar_memoria(clave, valor, vence_en)
+                self._contar_hit("hits_base", valor)
+                return True, valor
+
+        self._estadisticas["misses"] += 1
+        return False, None
+
+    async def guardar(self, clave: str, valor: Any) -> None:
+        """Guarda un resultado (None = negativo) en ambos niveles"""
+        vence_en = datetime.now() + (self.ttl if valor is not None else self.ttl_negativo)
+        self._guardar_memoria(clave, valor, vence_en.timestamp())
+        if self.persistir:
+            await asyncio.to_thread(self._escribir_base, clave, valor, vence_en)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        datos = dict(self._estadisticas)
+        hits = datos["hits_memoria"] + datos["hits_base"]
+        datos["hit_ratio"] = round(hits / datos["consultas"], 4) if datos["consultas"] else 0.0
+        datos["entradas_memoria"] = len(self._memoria)
+        return datos
+
+    def limpiar_memoria(self) -> None:
+        self._memoria.clear()
+
+    # ------------------------------------------------------------------
+    # Memoria (LRU)
+    # ------------------------------------------------------------------
+
+    def _leer_memoria(self, clave: str) -> Tuple[bool, Any]:
+        entrada = self._memoria.get(clave)
+        if entrada is None:
+            return False, None
+        valor, vence_en = entrada
+        if vence_en <= time.time():
+            self._memoria.pop(clave, None)
+            return False, None
+        self._memoria.move_to_end(clave)
+        return True, copy.deepcopy(valor)
+
+    def _guardar_memoria(self, clave: str, valor: Any, vence_en: float) -> None:
+        self._memoria[clave] = (copy.deepcopy(valor), vence_en)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _contar_hit(self, nivel: str, valor: Any) -> None:
+        self._estadisticas[nivel] += 1
+        if valor is None:
+            self._estadisticas["hits_negativos"] += 1
+
+    # ------------------------------------------------------------------
+    # Base de datos (se ejecuta en un thread, con sesión propia)
+    # ------------------------------------------------------------------
+
+    def _hash(self, clave: str) -> str:
+        return hashlib.sha256(f"{self.tipo}:{clave}".encode("utf-8")).hexdigest()
+
+    def _leer_base(self, clave: str) -> Tuple[bool, Any, float]:
+        db = SessionLocal()
+        try:
+            entrada = db.query(GeocodingCache).filter(
+                GeocodingCache.clave_hash == self._hash(clave),
+                GeocodingCache.expira_en > datetime.now()
+            ).first()
+            if entrada is None:
+                return False, None, 0.0
+
+            valor = entrada.resultado if entrada.encontrado else None
+            if valor is not None and self._desde_json:
+                valor = self._desde_json(valor)
+            return True, valor, entrada.expira_en.timestamp()
+        except Exception as e:
+            logger.warning(f"Caché de geocodificación no disponible (lectura): {str(e)}")
+            return False, None, 0.0
+        finally:
+            db.close()
+
+    def _escribir_base(self, clave: str, valor: Any, vence_en: datetime) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(GeocodingCache(
+                clave_hash=self._hash(clave),
+                tipo=self.tipo,
+                clave=clave[:500],
+                encontrado=valor is not None,
+                resultado=valor,
+                expira_en=vence_en
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Caché de geocodificación no disponible (escritura): {str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def purgar_vencidas(db) -> int:
+        """Borra las entradas vencidas de la tabla (mantenimiento)"""
+        borradas = db.query(GeocodingCache).filter(
+            GeocodingCache.expira_en <= datetime.now()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return borradas
+
+
+def _resultado_direccion_desde_json(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON guarda las tuplas como listas; geocode_address devuelve coordinates como tupla"""
+    if resultado.get("coordinates") is not None:
+        resultado["coordinates"] = tuple(resultado["coordinates"])
+    return resultado
+
+
+def celda_coordenadas(lat: float, lng: float, metros: float) -> Tuple[str, float, float]:
+    """
+    Cuantiza un punto a una grilla de celdas de ~metros de lado.
+    
+    Devuelve (clave, lat_centro, lng_centro). El ancho en grados de
+    longitud se ajusta por la latitud de la fila, para que las celdas sean
+    aproximadamente cuadradas. El tamaño de la grilla forma parte de la
+    clave: cambiarlo no reutiliza entradas de otra grilla.
+    """
+    paso_lat = metros / METROS_POR_GRADO
+    fila = math.floor(lat / paso_lat)
+    lat_centro = (fila + 0.5) * paso_lat
+
+    paso_lng = metros / (METROS_POR_GRADO * max(math.cos(math.radians(lat_centro)), 0.01))
+    columna = math.floor(lng / paso_lng)
+    lng_centro = (columna + 0.5) * paso_lng
+
+    return f"{metros:g}m:{fila}:{columna}", round(lat_centro, 6), round(lng_centro, 6)
+
+
+cache_direcciones = CacheGeocodificacion(
+    tipo="direccion",
+    max_entradas=settings.GEOCODING_CACHE_MAX_ENTRADAS,
+    ttl=timedelta(days=settings.GEOCODING_CACHE_TTL_DIAS),
+    ttl_negativo=timedelta(hours=settings.GEOCODING_CACHE_TTL_NEGATIVO_HORAS),
+    desde_json=_resultado_direccion_desde_json
+)
+
+cache_inversa = CacheGeocodificacion(
+    tipo="inversa",
+    max_entradas=settings.GEOCODING_INVERSA_MAX_ENTRADAS,
+    ttl=timedelta(days=settings.GEOCODING_CACHE_TTL_DIAS),
+    ttl_negativo=timedelta(hours=settings.GEOCODING_CACHE_TTL_NEGATIVO_HORAS),
+    persistir=settings.GEOCODING_INVERSA_PERSISTIR
+)
@@ -4,6 +4,7 @@ import httpx
 import logging
 from typing import Optional, Dict, Any, Tuple
 from app.config import settings
+from app.core.http_client import clientes_http
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
@@ -58,10 +59,10 @@ class GeocodingService:
             GeocodingServiceError: Si la petición falla después de los reintentos
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
+            client = clientes_http.cliente(url)
+            response = await client.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
                 
         except httpx.RequestError as e:
             logger.error(f"Error de conexión con Georef API: {e}")
@@ -2,10 +2,16 @@
 
 import httpx
 import logging
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple
 from app.config import settings
+from app.core.http_client import clientes_http
 import asyncio
 from app.services.geo_validation_service import geo_validation_service
+from app.services.geocoding_cache import cache_direcciones, cache_inversa, celda_coordenadas
+from app.services.gazetteer import obtener_gazetteer
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.singleflight import SingleFlight
+from app.utils.texto import normalizar_direccion
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 logger = logging.getLogger(__name__)
@@ -14,6 +20,10 @@ class GeocodingServiceError(Exception):
     """Excepción personalizada para errores de geocodificación"""
     pass
 
+class GeorefNoDisponibleError(GeocodingServiceError):
+    """El circuito hacia Georef está abierto: no se intentó la consulta"""
+    pass
+
 class GeocodingService:
     """
     Servicio para geocodificación usando la API oficial Georef de Argentina.
@@ -28,6 +38,9 @@ class GeocodingService:
     # API oficial del Estado Argentino - INDEC
     GEOREF_BASE_URL = "https://apis.datos.gob.ar/georef/api"
     
+    # Máximo de direcciones por consulta bulk (POST /direcciones)
+    MAX_DIRECCIONES_BULK = 1000
+    
     # Límites geográficos aproximados de Argentina
     ARGENTINA_BOUNDS = {
         'lat_min': -55.1,    # Tierra del Fuego
@@ -38,41 +51,74 @@ class GeocodingService:
     
     def __init__(self):
         self.timeout = httpx.Timeout(10.0)  # 10 segundos timeout
+        self.timeout_bulk = httpx.Timeout(60.0)  # Hasta 1000 direcciones por request
+        self._vuelos = SingleFlight()
+        self.circuito = CircuitBreaker(
+            "georef",
+            umbral_fallos=settings.GEOREF_CIRCUITO_UMBRAL_FALLOS,
+            segundos_abierto=settings.GEOREF_CIRCUITO_SEGUNDOS_ABIERTO
+        )
         
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError))
     )
-    async def _make_request(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None,
+                            json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Realiza petición HTTP con reintentos automáticos.
         
         Args:
             url: URL del endpoint
             params: Parámetros de la consulta
+            json: Cuerpo JSON; si se indica la petición es un POST (consultas bulk)
             
         Returns:
             Dict con la respuesta JSON
             
         Raises:
+            GeorefNoDisponibleError: Si el circuito está abierto (no se consulta)
             GeocodingServiceError: Si la petición falla después de los reintentos
         """
+        if not self.circuito.permitir():
+            raise GeorefNoDisponibleError("Georef no disponible (circuito abierto)")
+        
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
+            client = clientes_http.cliente(url)
+            if json is not None:
+                response = await client.post(url, json=json, timeout=self.timeout_bulk)
+            else:
+                response = await client.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            self.circuito.registrar_exito()
+            return data
                 
         except httpx.RequestError as e:
+            # Conexión fallida o timeout: cuenta para abrir el circuito
+            self.circuito.registrar_fallo()
             logger.error(f"Error de conexión con Georef API: {e}")
             raise GeocodingServiceError(f"Error de conexión: {str(e)}")
             
         except httpx.HTTPStatusError as e:
+            # Solo los 5xx indican que el proveedor está caído
+            if e.response.status_code >= 500:
+                self.circuito.registrar_fallo()
+            else:
+                self.circuito.registrar_exito()
             logger.error(f"Error HTTP {e.response.status_code} con Georef API: {e}")
             raise GeocodingServiceError(f"Error HTTP {e.response.status_code}")
+        
+        except asyncio.CancelledError:
+            # Cancelada por un timeout externo (wait_for): el proveedor está lento
+            self.circuito.registrar_fallo()
+            raise
             
         except Exception as e:
+            # Ej: 200 con un cuerpo que no es JSON. Cuenta como fallo: si era la
+            # prueba del circuito semi-abierto, la libera en lugar de dejarla en curso
+            self.circuito.registrar_fallo()
             logger.error(f"Error inesperado en geocodificación: {e}")
             raise GeocodingServiceError(f"Error inesperado: {str(e)}")
     
@@ -130,6 +176,43 @@ class GeocodingService:
         """
         Geocodifica una direccion argentina a coordenadas lat/lng con validacion.
         
+        Consulta primero el cache de geocodificacion (memoria + base), con la
+        direccion normalizada como clave. Los resultados vacios (None) tambien
+        se cachean; los errores (GeocodingServiceError) no.
+        
+        Args / Returns / Raises: ver _geocode_address_remoto
+        """
+        clave = normalizar_direccion(self._build_address_string(calle, numero, ciudad, provincia))
+        
+        # Requests concurrentes por la misma direccion comparten una sola consulta
+        return await self._vuelos.ejecutar(
+            ("direccion", clave),
+            lambda: self._geocode_address_cacheado(clave, calle, numero, ciudad, provincia, codigo_postal)
+        )
+    
+    async def _geocode_address_cacheado(self, clave: str, calle: str, numero: Optional[str],
+                                        ciudad: Optional[str], provincia: Optional[str],
+                                        codigo_postal: Optional[str]) -> Optional[Dict[str, Any]]:
+        encontrado, resultado = await cache_direcciones.obtener(clave)
+        if encontrado:
+            logger.debug(f"Geocodificacion desde cache: {clave}")
+            return resultado
+        
+        try:
+            resultado = await self._geocode_address_remoto(calle, numero, ciudad, provincia, codigo_postal)
+        except GeorefNoDisponibleError:
+            # Respaldo local; no se cachea para volver a Georef cuando se recupere
+            return self._geocode_address_local(ciudad, provincia)
+        
+        await cache_direcciones.guardar(clave, resultado)
+        return resultado
+    
+    async def _geocode_address_remoto(self, calle: str, numero: Optional[str] = None,
+                                      ciudad: Optional[str] = None, provincia: Optional[str] = None,
+                                      codigo_postal: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Geocodifica una direccion argentina consultando Georef (sin cache).
+        
         Args:
             calle: Nombre de la calle
             numero: Numero de la direccion
@@ -189,61 +272,7 @@ class GeocodingService:
             
             logger.info(f"Primera direccion encontrada: {direccion_resultado}")
             
-            # Extraer coordenadas
-            ubicacion = direccion_resultado.get('ubicacion', {})
-            lat = ubicacion.get('lat')
-            lng = ubicacion.get('lon')
-            
-            logger.info(f"Coordenadas extraidas - lat: {lat}, lng: {lng}")
-            
-            if lat is None or lng is None:
-                logger.warning(f"Coordenadas no disponibles para: {params['direccion']}")
-                return None
-                
-            # Convertir a float y validar limites de Argentina
-            lat_float = float(lat)
-            lng_float = float(lng)
-            
-            if not self._validate_coordinates(lat_float, lng_float):
-                logger.warning(f"Coordenadas fuera de Argentina: {lat_float}, {lng_float}")
-                return None
-            
-            # NUEVA VALIDACION: Verificar que coordenadas coincidan con ciudad
-            validation_result = None
-            if ciudad:
-                validation_result = geo_validation_service.validate_geocoding_result(
-                    coordenadas=(lat_float, lng_float),
-                    direccion_input={
-                        'calle': calle,
-                        'numero': numero,
-                        'ciudad': ciudad,
-                        'provincia': provincia
-                    }
-                )
-                
-                # Log de resultado de validacion
-                confidence = validation_result.get('confidence', 'unknown')
-                safe = validation_result.get('safe_to_use', True)
-                
-                logger.info(f"Validacion completada - Confianza: {confidence}, Seguro: {safe}")
-                
-                # Si hay warning, loggearlo
-                if validation_result.get('validation', {}).get('warning'):
-                    logger.warning(f"VALIDACION: {validation_result['validation']['warning']}")
-                
-                # Si hay sugerencia de ciudad alternativa, loggearlo
-                if validation_result.get('validation', {}).get('suggestion'):
-                    logger.warning(f"SUGERENCIA: {validation_result['validation']['suggestion']}")
-            
-            # Construir resultado completo
-            result = {
-                'coordinates': (lat_float, lng_float),
-                'validation': validation_result,
-                'raw_result': direccion_resultado
-            }
-            
-            logger.info(f"Geocodificacion exitosa: ({lat_float}, {lng_float})")
-            return result
+            return self._procesar_resultado(direccion_resultado, calle, numero, ciudad, provincia)
             
         except GeocodingServiceError:
             # Re-raise errores especificos del servicio
@@ -253,6 +282,118 @@ class GeocodingService:
             logger.error(f"Error inesperado en geocode_address: {e}")
             raise GeocodingServiceError(f"Error en geocodificacion: {str(e)}")
             
+    def _procesar_resultado(self, direccion_resultado: Dict[str, Any], calle: str,
+                            numero: Optional[str], ciudad: Optional[str],
+                            provincia: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Convierte una direccion devuelta por Georef en el resultado de
+        geocode_address: coordenadas dentro de Argentina + validacion contra
+        la ciudad ingresada. Devuelve None si no hay coordenadas utilizables.
+        """
+        # Extraer coordenadas
+        ubicacion = direccion_resultado.get('ubicacion', {})
+        lat = ubicacion.get('lat')
+        lng = ubicacion.get('lon')
+        
+        logger.info(f"Coordenadas extraidas - lat: {lat}, lng: {lng}")
+        
+        if lat is None or lng is None:
+            logger.warning(f"Coordenadas no disponibles para: {direccion_resultado.get('nomenclatura', calle)}")
+            return None
+        
+        # Convertir a float y validar limites de Argentina
+        lat_float = float(lat)
+        lng_float = float(lng)
+        
+        if not self._validate_coordinates(lat_float, lng_float):
+            logger.warning(f"Coordenadas fuera de Argentina: {lat_float}, {lng_float}")
+            return None
+        
+        # NUEVA VALIDACION: Verificar que coordenadas coincidan con ciudad
+        validation_result = None
+        if ciudad:
+            validation_result = geo_validation_service.validate_geocoding_result(
+                coordenadas=(lat_float, lng_float),
+                direccion_input={
+                    'calle': calle,
+                    'numero': numero,
+                    'ciudad': ciudad,
+                    'provincia': provincia
+                }
+            )
+        
+            # Log de resultado de validacion
+            confidence = validation_result.get('confidence', 'unknown')
+            safe = validation_result.get('safe_to_use', True)
+        
+            logger.info(f"Validacion completada - Confianza: {confidence}, Seguro: {safe}")
+        
+            # Si hay warning, loggearlo
+            if validation_result.get('validation', {}).get('warning'):
+                logger.warning(f"VALIDACION: {validation_result['validation']['warning']}")
+        
+            # Si hay sugerencia de ciudad alternativa, loggearlo
+            if validation_result.get('validation', {}).get('suggestion'):
+                logger.warning(f"SUGERENCIA: {validation_result['validation']['suggestion']}")
+        
+        # Construir resultado completo
+        result = {
+            'coordinates': (lat_float, lng_float),
+            'validation': validation_result,
+            'raw_result': direccion_resultado
+        }
+        
+        logger.info(f"Geocodificacion exitosa: ({lat_float}, {lng_float})")
+        return result
+    
+    async def geocode_addresses_bulk(self, direcciones: List[Dict[str, Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Geocodifica varias direcciones en un solo POST a Georef (sin cache).
+        
+        Args:
+            direcciones: Hasta MAX_DIRECCIONES_BULK dicts con calle, numero,
+                ciudad y provincia
+            
+        Returns:
+            Lista alineada con la entrada: el mismo resultado que devolveria
+            geocode_address para cada direccion, o None si no se encontro
+            
+        Raises:
+            GeocodingServiceError: Si falla la consulta
+        """
+        if len(direcciones) > self.MAX_DIRECCIONES_BULK:
+            raise ValueError(f"Maximo {self.MAX_DIRECCIONES_BULK} direcciones por consulta bulk")
+        if not direcciones:
+            return []
+        
+        consultas = []
+        for d in direcciones:
+            consulta = {
+                'direccion': self._build_address_string(d.get('calle'), d.get('numero'), d.get('ciudad'), d.get('provincia')),
+                'max': 1,
+                'campos': 'completo'
+            }
+            if d.get('provincia'):
+                consulta['provincia'] = d['provincia']
+            consultas.append(consulta)
+        
+        data = await self._make_request(f"{self.GEOREF_BASE_URL}/direcciones", json={'direcciones': consultas})
+        resultados = data.get('resultados', [])
+        
+        if len(resultados) != len(direcciones):
+            raise GeocodingServiceError(
+                f"Respuesta bulk inconsistente: {len(resultados)} resultados para {len(direcciones)} direcciones"
+            )
+        
+        salida = []
+        for d, resultado in zip(direcciones, resultados):
+            encontradas = resultado.get('direcciones') or []
+            salida.append(
+                self._procesar_resultado(encontradas[0], d.get('calle'), d.get('numero'), d.get('ciudad'), d.get('provincia'))
+                if encontradas else None
+            )
+        return salida
+    
     async def reverse_geocode(self, lat: float, lng: float) -> Optional[Dict[str, str]]:
         """
         Geocodificación inversa: coordenadas a dirección.
@@ -264,6 +405,79 @@ class GeocodingService:
         Returns:
             Dict con información de la dirección o None
         """
+        if not self._validate_coordinates(lat, lng):
+            logger.warning(f"Coordenadas fuera de Argentina: {lat}, {lng}")
+            return None
+        
+        # Puntos de la misma celda (~GEOCODING_INVERSA_GRILLA_METROS) comparten
+        # resultado: se consulta el centro de la celda y se cachea por celda
+        clave, lat_celda, lng_celda = celda_coordenadas(lat, lng, settings.GEOCODING_INVERSA_GRILLA_METROS)
+        
+        # Requests concurrentes por la misma celda comparten una sola consulta
+        return await self._vuelos.ejecutar(
+            ("inversa", clave),
+            lambda: self._reverse_geocode_cacheado(clave, lat_celda, lng_celda)
+        )
+    
+    async def _reverse_geocode_cacheado(self, clave: str, lat: float, lng: float) -> Optional[Dict[str, str]]:
+        encontrado, resultado = await cache_inversa.obtener(clave)
+        if encontrado:
+            logger.debug(f"Geocodificacion inversa desde cache: {clave}")
+            return resultado
+        
+        try:
+            resultado = await self._reverse_geocode_remoto(lat, lng)
+        except GeorefNoDisponibleError:
+            return self._reverse_geocode_local(lat, lng)
+        
+        await cache_inversa.guardar(clave, resultado)
+        return resultado
+    
+    def _geocode_address_local(self, ciudad: Optional[str], provincia: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Respaldo sin red: centro de la localidad según el gazetteer local.
+        
+        Mismo formato que geocode_address, con confianza baja: la ubicación
+        es aproximada (no tiene en cuenta calle ni número).
+        """
+        localidad = obtener_gazetteer().buscar(ciudad, provincia) if ciudad else None
+        if localidad is None:
+            logger.warning(f"Georef no disponible y '{ciudad}' no esta en el gazetteer local")
+            return None
+        
+        logger.warning(f"Georef no disponible: usando centro de {localidad.nombre} (respaldo local)")
+        return {
+            'coordinates': (localidad.latitud, localidad.longitud),
+            'validation': {
+                'confidence': 'low',
+                'safe_to_use': False,
+                'validation': {
+                    'warning': f"Georef no disponible: ubicación aproximada al centro de {localidad.nombre}"
+                }
+            },
+            'raw_result': None,
+            'fuente': 'local'
+        }
+    
+    def _reverse_geocode_local(self, lat: float, lng: float) -> Optional[Dict[str, str]]:
+        """Respaldo sin red: localidad más cercana según el gazetteer local"""
+        cercana = obtener_gazetteer().mas_cercana(lat, lng)
+        if cercana is None:
+            return None
+        
+        localidad, _ = cercana
+        return {
+            'calle': '',
+            'numero': '',
+            'ciudad': localidad.nombre,
+            'provincia': localidad.provincia or '',
+            'codigo_postal': '',
+            'confianza': 'low',
+            'fuente': 'local'
+        }
+    
+    async def _reverse_geocode_remoto(self, lat: float, lng: float) -> Optional[Dict[str, str]]:
+        """Geocodificación inversa consultando Georef (ver reverse_geocode)"""
         try:
             if not self._validate_coordinates(lat, lng):
                 logger.warning(f"Coordenadas fuera de Argentina: {lat}, {lng}")
@@ -291,6 +505,9 @@ class GeocodingService:
                 'codigo_postal': ubicacion.get('codigo_postal', '')
             }
             
+        except GeocodingServiceError:
+            raise
+            
         except Exception as e:
             logger.error(f"Error en reverse_geocode: {e}")
             raise GeocodingServiceError(f"Error en geocodificación inversa: {str(e)}")
@@ -1,9 +1,23 @@
+from collections import namedtuple
 from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, text
 import math
+import numpy as np
+from app.config import settings
 from app.models.empresa import Empresa
 from app.models.categoria import Categoria
+from app.services.indice_geografico import IndiceGeografico, indice_geografico
+from app.utils.geo_vectorial import k_menores, puntaje_relevancia
+from app.utils.rating import rating_bayesiano
+
+# Fila de candidato en las búsquedas resueltas en la base
+FilaCercana = namedtuple(
+    "FilaCercana",
+    "empresa_id razon_social descripcion categoria_id latitud longitud "
+    "rating_promedio total_calificaciones distancia_km"
+)
+
 
 class GeolocationService:
     """
@@ -88,7 +102,8 @@ class GeolocationService:
         longitud: float,
         radio_km: float = 10.0,
         categoria_id: Optional[int] = None,
-        limit: int = 50
+        limit: int = 50,
+        ordenar_por: str = "distancia"
     ) -> List[dict]:
         """
         Busca empresas cercanas a una ubicación.
@@ -99,17 +114,218 @@ class GeolocationService:
             radio_km: Radio de búsqueda en kilómetros (default: 10)
             categoria_id: ID de categoría para filtrar (opcional)
             limit: Máximo número de resultados (default: 50)
+            ordenar_por: "distancia" (default) o "relevancia" (distancia + rating)
             
         Returns:
             List[dict]: Lista de empresas con distancia calculada
         """
-        # Calcular bounding box para optimizar query
+        if not settings.GEO_INDICE_EN_MEMORIA:
+            return GeolocationService.find_nearby_empresas_db(
+                db, latitud, longitud, radio_km, categoria_id, limit, ordenar_por
+            )
+        
+        # Se resuelve con el índice en memoria del worker (grilla); la base
+        # solo se consulta para construirlo la primera vez
+        indice_geografico.asegurar_construido(db)
+        return indice_geografico.buscar_radio(
+            latitud, longitud, radio_km,
+            categoria_id=categoria_id, limit=limit, ordenar_por=ordenar_por
+        )
+    
+    @staticmethod
+    def find_nearby_empresas_pagina(
+        db: Session,
+        latitud: float,
+        longitud: float,
+        radio_km: float = 10.0,
+        categoria_id: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Página de empresas cercanas ordenadas por distancia.
+        
+        Args:
+            cursor: siguiente_cursor devuelto por la página anterior (None = primera)
+            
+        Returns:
+            (empresas, siguiente_cursor); siguiente_cursor es None en la última página
+            
+        Raises:
+            ValueError: Si el cursor es inválido
+        """
+        despues_de = GeolocationService.decodificar_cursor(cursor) if cursor else None
+        
+        # Se pide una de más para saber si hay otra página
+        if settings.GEO_INDICE_EN_MEMORIA:
+            indice_geografico.asegurar_construido(db)
+            empresas = indice_geografico.pagina_por_distancia(
+                latitud, longitud, radio_km, categoria_id, limit + 1, despues_de
+            )
+        else:
+            empresas = GeolocationService.find_nearby_empresas_db(
+                db, latitud, longitud, radio_km, categoria_id, limit + 1, despues_de=despues_de
+            )
+        
+        if len(empresas) <= limit:
+            return empresas, None
+        empresas = empresas[:limit]
+        return empresas, GeolocationService.codificar_cursor(empresas[-1])
+    
+    @staticmethod
+    def codificar_cursor(empresa: dict) -> str:
+        """Cursor (distancia_km, empresa_id) de la última empresa de una página"""
+        return f"{empresa['distancia_km']:.2f}_{empresa['empresa_id']}"
+    
+    @staticmethod
+    def decodificar_cursor(cursor: str) -> Tuple[float, int]:
+        try:
+            distancia, empresa_id = cursor.split("_")
+            return round(float(distancia), 2), int(empresa_id)
+        except ValueError:
+            raise ValueError(f"Cursor inválido: {cursor}")
+    
+    @staticmethod
+    def find_nearby_empresas_db(
+        db: Session,
+        latitud: float,
+        longitud: float,
+        radio_km: float = 10.0,
+        categoria_id: Optional[int] = None,
+        limit: int = 50,
+        ordenar_por: str = "distancia",
+        despues_de: Optional[Tuple[float, int]] = None
+    ) -> List[dict]:
+        """
+        Misma búsqueda que find_nearby_empresas, resuelta en la base.
+        
+        En MySQL usa la columna espacial empresa.ubicacion (SPATIAL INDEX
+        con MBRContains + ST_Distance_Sphere); en otros motores (SQLite en
+        desarrollo y tests) usa bounding box sobre latitud/longitud y
+        Haversine en Python.
+        
+        Args:
+            despues_de: cursor (distancia_km, empresa_id); solo con orden por distancia
+        """
+        if db.get_bind().dialect.name == "mysql":
+            filas = GeolocationService._buscar_espacial_mysql(
+                db, latitud, longitud, radio_km, categoria_id,
+                # Con orden por relevancia hay que puntuar todo el radio
+                limit if ordenar_por == "distancia" else None,
+                despues_de
+            )
+        else:
+            filas = GeolocationService._buscar_bounding_box(db, latitud, longitud, radio_km, categoria_id)
+            if despues_de:
+                filas = [f for f in filas if (f.distancia_km, f.empresa_id) > despues_de]
+        
+        if not filas:
+            return []
+        
+        distancias = np.array([f.distancia_km for f in filas], dtype=np.float64)
+        if ordenar_por == "relevancia":
+            # Mismo rating ajustado que el índice en memoria
+            ratings = np.array(
+                [rating_bayesiano(f.rating_promedio, f.total_calificaciones) for f in filas],
+                dtype=np.float64
+            )
+            clave = puntaje_relevancia(distancias, ratings, radio_km)
+        else:
+            clave = distancias
+        
+        ids = np.array([f.empresa_id for f in filas], dtype=np.int64)
+        return [
+            GeolocationService._fila_resultado(filas[i])
+            for i in k_menores(clave, limit, desempate=ids)
+        ]
+    
+    @staticmethod
+    def _buscar_espacial_mysql(
+        db: Session,
+        latitud: float,
+        longitud: float,
+        radio_km: float,
+        categoria_id: Optional[int],
+        limit: Optional[int],
+        despues_de: Optional[Tuple[float, int]] = None
+    ) -> list:
+        """
+        MBRContains filtra por el SPATIAL INDEX y ST_Distance_Sphere da la
+        distancia exacta. Se repiten las condiciones de bounding box sobre
+        latitud/longitud para respetar el mismo criterio que el resto de
+        los caminos de búsqueda.
+        """
         min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(
             latitud, longitud, radio_km
         )
+        poligono = (
+            f"POLYGON(({min_lng} {min_lat}, {max_lng} {min_lat}, {max_lng} {max_lat}, "
+            f"{min_lng} {max_lat}, {min_lng} {min_lat}))"
+        )
         
-        # Query base: empresas activas con coordenadas dentro del bounding box
-        query = db.query(Empresa).filter(
+        sql = """
+            SELECT * FROM (
+                SELECT
+                    e.empresa_id, e.razon_social, e.descripcion, e.categoria_id,
+                    e.latitud, e.longitud, e.rating_promedio, e.total_calificaciones,
+                    ROUND(ST_Distance_Sphere(
+                        e.ubicacion,
+                        ST_GeomFromText(:punto, 4326, 'axis-order=long-lat'),
+                        :radio_tierra_m
+                    ) / 1000, 2) AS distancia_km
+                FROM empresa e
+                WHERE MBRContains(ST_GeomFromText(:poligono, 4326, 'axis-order=long-lat'), e.ubicacion)
+                AND e.activa = 1
+                AND e.latitud IS NOT NULL
+                AND e.longitud IS NOT NULL
+                AND e.latitud BETWEEN :min_lat AND :max_lat
+                AND e.longitud BETWEEN :min_lng AND :max_lng
+                {filtro_categoria}
+            ) cercanas
+            WHERE distancia_km <= :radio_km
+            {filtro_cursor}
+            ORDER BY distancia_km, empresa_id
+            {limite}
+        """.format(
+            filtro_categoria="AND e.categoria_id = :categoria_id" if categoria_id else "",
+            filtro_cursor=(
+                "AND (distancia_km > :cursor_distancia "
+                "OR (distancia_km = :cursor_distancia AND empresa_id > :cursor_id))"
+            ) if despues_de else "",
+            limite="LIMIT :limit" if limit is not None else ""
+        )
+        
+        return db.execute(text(sql), {
+            "punto": f"POINT({longitud} {latitud})",
+            "poligono": poligono,
+            "radio_tierra_m": GeolocationService.EARTH_RADIUS_KM * 1000,
+            "min_lat": min_lat, "max_lat": max_lat,
+            "min_lng": min_lng, "max_lng": max_lng,
+            "radio_km": radio_km,
+            "categoria_id": categoria_id,
+            "limit": limit,
+            "cursor_distancia": despues_de[0] if despues_de else None,
+            "cursor_id": despues_de[1] if despues_de else None,
+        }).fetchall()
+    
+    @staticmethod
+    def _buscar_bounding_box(
+        db: Session,
+        latitud: float,
+        longitud: float,
+        radio_km: float,
+        categoria_id: Optional[int]
+    ) -> list:
+        """Bounding box sobre latitud/longitud + Haversine (motores sin soporte espacial)"""
+        min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(
+            latitud, longitud, radio_km
+        )
+        
+        query = db.query(
+            Empresa.empresa_id, Empresa.razon_social, Empresa.descripcion, Empresa.categoria_id,
+            Empresa.latitud, Empresa.longitud, Empresa.rating_promedio,
+            Empresa.total_calificaciones
+        ).filter(
             and_(
                 Empresa.activa == True,
                 Empresa.latitud.isnot(None),
@@ -118,39 +334,77 @@ class GeolocationService:
                 Empresa.longitud.between(min_lng, max_lng)
             )
         )
-        
-        # Filtrar por categoría si se especifica
         if categoria_id:
             query = query.filter(Empresa.categoria_id == categoria_id)
         
-        # Ejecutar query
-        empresas = query.all()
-        
-        # Calcular distancia exacta y filtrar por radio
         resultados = []
-        for empresa in empresas:
+        for fila in query.all():
             distancia = GeolocationService.calculate_distance(
-                latitud, longitud,
-                float(empresa.latitud), float(empresa.longitud)
+                latitud, longitud, float(fila.latitud), float(fila.longitud)
             )
-            
-            # Solo incluir si está dentro del radio
             if distancia <= radio_km:
-                resultados.append({
-                    "empresa_id": empresa.empresa_id,
-                    "nombre": empresa.razon_social,
-                    "descripcion": empresa.descripcion,
-                    "latitud": float(empresa.latitud),
-                    "longitud": float(empresa.longitud),
-                    "distancia_km": distancia,
-                    "categoria_id": empresa.categoria_id,
-                })
-        
-        # Ordenar por distancia (más cercano primero)
-        resultados.sort(key=lambda x: x["distancia_km"])
-        
-        # Limitar resultados
-        return resultados[:limit]
+                resultados.append(FilaCercana(*fila, distancia_km=distancia))
+        return resultados
+    
+    @staticmethod
+    def _fila_resultado(fila) -> dict:
+        return {
+            "empresa_id": fila.empresa_id,
+            "nombre": fila.razon_social,
+            "descripcion": fila.descripcion,
+            "latitud": float(fila.latitud),
+            "longitud": float(fila.longitud),
+            "distancia_km": float(fila.distancia_km),
+            "categoria_id": fila.categoria_id,
+            "rating_promedio": float(fila.rating_promedio) if fila.rating_promedio is not None else None,
+        }
+    
+    @staticmethod
+    def agrupar_en_viewport(
+        db: Session,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float,
+        zoom: int,
+        categoria_id: Optional[int] = None
+    ) -> dict:
+        """
+        Empresas de un viewport de mapa, agrupadas según el zoom.
+        
+        Con zoom bajo devuelve clusters por celda de grilla (cantidad y
+        centroide); con zoom alto, o si hay pocas empresas, puntos
+        individuales. Ver IndiceGeografico.agrupar.
+        
+        Args:
+            db: Sesión de base de datos
+            min_lat, max_lat, min_lng, max_lng: Rectángulo visible
+            zoom: Nivel de zoom del mapa (0-22)
+            categoria_id: ID de categoría para filtrar (opcional)
+        """
+        parametros = dict(
+            zoom=zoom, categoria_id=categoria_id,
+            max_puntos=settings.MAPA_MAX_PUNTOS, zoom_puntos=settings.MAPA_ZOOM_PUNTOS,
+            max_marcadores=settings.MAPA_MAX_MARCADORES
+        )
+        
+        if settings.GEO_INDICE_EN_MEMORIA:
+            indice_geografico.asegurar_construido(db)
+            return indice_geografico.agrupar(min_lat, max_lat, min_lng, max_lng, **parametros)
+        
+        # Sin índice en memoria: se agrupan solo las empresas del rectángulo
+        filas = IndiceGeografico._query_empresas(db).filter(
+            and_(
+                Empresa.activa == True,
+                Empresa.latitud.isnot(None),
+                Empresa.longitud.isnot(None),
+                Empresa.latitud.between(min_lat, max_lat),
+                Empresa.longitud.between(min_lng, max_lng)
+            )
+        ).order_by(Empresa.empresa_id).all()
+        indice = IndiceGeografico()
+        indice.cargar(filas)
+        return indice.agrupar(min_lat, max_lat, min_lng, max_lng, **parametros)
     
     @staticmethod
     def get_empresas_in_bounds(
@@ -174,7 +428,7 @@ class GeolocationService:
         """
         return db.query(Empresa).filter(
             and_(
-                Empresa.activo == True,
+                Empresa.activa == True,
                 Empresa.latitud.isnot(None),
                 Empresa.longitud.isnot(None),
                 Empresa.latitud.between(min_lat, max_lat),
@@ -14,6 +14,7 @@ from app.config import settings
 from app.models.user import Usuario
 from app.models.rol import Rol, UsuarioRol
 from app.core.security import create_access_token
+from app.auth.permisos_token import agregar_claims_permisos
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
@@ -310,11 +311,11 @@ class GoogleOAuthService:
             
             # Generar JWT token
             access_token = create_access_token(
-            data={
+            data=agregar_claims_permisos(usuario.usuario_id, db, {
                 "sub": str(usuario.usuario_id),
                 "email": usuario.email,
                 "tipo_usuario": usuario.tipo_usuario.value
-            },
+            }),
             expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
 )
             
@@ -0,0 +1,564 @@
+# app/services/indice_geografico.py
+"""
+Índice geoespacial en memoria de empresas activas con coordenadas.
+
+Grilla regular de celdas de CELDA_GRADOS x CELDA_GRADOS. Los datos viven
+en arreglos NumPy paralelos (latitud, longitud, categoria_id, empresa_id,
+rating) y cada celda guarda las posiciones de sus empresas; una búsqueda
+por radio solo recorre las celdas que tocan el bounding box y calcula las
+distancias de todos los candidatos en una pasada (app/utils/geo_vectorial).
+
+Los criterios son los mismos que la consulta SQL que reemplaza
+(bounding box de GeolocationService.get_bounding_box, Haversine redondeado
+a 2 decimales y radio inclusivo), así que los resultados son idénticos.
+"""
+
+import logging
+import math
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.empresa import Empresa
+from app.services.indices_empresa import IndiceEmpresas, registro_indices
+from app.utils.geo_vectorial import (
+    EARTH_RADIUS_KM, agrupar_en_grilla, haversine_km, k_menores, puntaje_relevancia, tamano_celda_cluster
+)
+from app.utils.rating import rating_bayesiano
+
+logger = logging.getLogger(__name__)
+
+
+# ~11 km de lado: un radio de 10 km recorre del orden de 9 celdas
+CELDA_GRADOS = 0.1
+
+# Posición libre en los arreglos (empresa quitada)
+LIBRE = -1
+
+CAPACIDAD_INICIAL = 1024
+
+ORDENES = ("distancia", "relevancia")
+
+
+def celda_de(latitud: float, longitud: float) -> Tuple[int, int]:
+    return (math.floor(latitud / CELDA_GRADOS), math.floor(longitud / CELDA_GRADOS))
+
+
+def semiancho_longitud(latitud: float, latitud_fila: float, radio_km: float) -> Optional[float]:
+    """
+    Semiancho, en grados de longitud, del disco de `radio_km` centrado en
+    `latitud` a la altura de `latitud_fila`. None si esa latitud queda fuera
+    del disco; 180 si el paralelo entero queda dentro o no se puede acotar
+    (cerca de los polos).
+    """
+    delta = radio_km / EARTH_RADIUS_KM
+    phi_0 = math.radians(latitud)
+    phi = math.radians(latitud_fila)
+    denominador = math.cos(phi_0) * math.cos(phi)
+    if denominador <= 1e-9:
+        return 180.0
+    coseno = (math.cos(delta) - math.sin(phi_0) * math.sin(phi)) / denominador
+    if coseno > 1.0:
+        return None
+    if coseno <= -1.0:
+        return 180.0
+    return math.degrees(math.acos(coseno))
+
+
+def resultado_mapa(zoom: int, modo: str, total: int, clusters: Optional[List[dict]] = None,
+                   puntos: Optional[List[dict]] = None) -> dict:
+    """Formato de respuesta del viewport de mapa (ver ResultadoMapa)"""
+    return {
+        "zoom": zoom,
+        "modo": modo,
+        "total": total,
+        "clusters": clusters or [],
+        "puntos": puntos or [],
+    }
+
+
+class IndiceGeografico(IndiceEmpresas):
+    """
+    Grilla de empresas activas geolocalizadas.
+
+    Las bajas marcan la posición como LIBRE y la reutilizan en la próxima
+    alta; los arreglos crecen duplicando su capacidad y nunca se compactan.
+    """
+
+    nombre = "geografico"
+
+    def __init__(self):
+        super().__init__()
+        self._reiniciar()
+
+    @property
+    def total(self) -> int:
+        return len(self._posiciones)
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _query_empresas(db: Session):
+        return db.query(
+            Empresa.empresa_id,
+            Empresa.razon_social,
+            Empresa.descripcion,
+            Empresa.categoria_id,
+            Empresa.latitud,
+            Empresa.longitud,
+            Empresa.rating_promedio,
+            Empresa.total_calificaciones,
+            Empresa.activa
+        )
+
+    def construir(self, db: Session) -> None:
+        filas = self._query_empresas(db).filter(
+            Empresa.activa == True,
+            Empresa.latitud.isnot(None),
+            Empresa.longitud.isnot(None)
+        ).order_by(Empresa.empresa_id).all()
+        self.cargar(filas)
+
+    def cargar(self, empresas: Iterable) -> None:
+        """
+        Reemplaza el contenido del índice.
+
+        Args:
+            empresas: filas con empresa_id, razon_social, descripcion,
+                categoria_id, latitud, longitud, rating_promedio y
+                total_calificaciones
+        """
+        with self._lock:
+            self._reiniciar()
+            for empresa in empresas:
+                self._agregar(empresa)
+            self._construido = True
+
+    def _reiniciar(self, capacidad: int = CAPACIDAD_INICIAL) -> None:
+        self._latitudes = np.zeros(capacidad, dtype=np.float64)
+        self._longitudes = np.zeros(capacidad, dtype=np.float64)
+        self._categorias = np.zeros(capacidad, dtype=np.int64)
+        self._empresa_ids = np.full(capacidad, LIBRE, dtype=np.int64)
+        # Rating bayesiano, para el orden por relevancia
+        self._ratings = np.zeros(capacidad, dtype=np.float64)
+        self._usadas = 0
+        self._libres: List[int] = []
+        # empresa_id -> posición en los arreglos
+        self._posiciones: Dict[int, int] = {}
+        # celda -> posiciones
+        self._celdas: Dict[Tuple[int, int], List[int]] = {}
+        # empresa_id -> (razon_social, descripcion, rating_promedio)
+        self._datos: Dict[int, Tuple[str, Optional[str], Optional[float]]] = {}
+
+    def _crecer(self) -> None:
+        capacidad = len(self._empresa_ids) * 2
+        for nombre in ("_latitudes", "_longitudes", "_categorias", "_ratings"):
+            actual = getattr(self, nombre)
+            nuevo = np.zeros(capacidad, dtype=actual.dtype)
+            nuevo[:len(actual)] = actual
+            setattr(self, nombre, nuevo)
+        empresa_ids = np.full(capacidad, LIBRE, dtype=np.int64)
+        empresa_ids[:len(self._empresa_ids)] = self._empresa_ids
+        self._empresa_ids = empresa_ids
+
+    def actualizar(self, db: Session, empresa_ids: List[int]) -> None:
+        filas = {
+            fila.empresa_id: fila
+            for fila in self._query_empresas(db).filter(Empresa.empresa_id.in_(empresa_ids)).all()
+        }
+
+        with self._lock:
+            for empresa_id in empresa_ids:
+                self._quitar(empresa_id)
+                fila = filas.get(empresa_id)
+                if fila is not None and fila.activa and fila.latitud is not None and fila.longitud is not None:
+                    self._agregar(fila)
+
+    def _agregar(self, empresa) -> None:
+        latitud = float(empresa.latitud)
+        longitud = float(empresa.longitud)
+        rating = float(empresa.rating_promedio) if empresa.rating_promedio is not None else None
+
+        if self._libres:
+            posicion = self._libres.pop()
+        else:
+            if self._usadas == len(self._empresa_ids):
+                self._crecer()
+            posicion = self._usadas
+            self._usadas += 1
+
+        self._latitudes[posicion] = latitud
+        self._longitudes[posicion] = longitud
+        self._categorias[posicion] = empresa.categoria_id or 0
+        self._empresa_ids[posicion] = empresa.empresa_id
+        self._ratings[posicion] = rating_bayesiano(rating, empresa.total_calificaciones or 0)
+
+        self._posiciones[empresa.empresa_id] = posicion
+        self._celdas.setdefault(celda_de(latitud, longitud), []).append(posicion)
+        self._datos[empresa.empresa_id] = (empresa.razon_social, empresa.descripcion, rating)
+
+    def _quitar(self, empresa_id: int) -> None:
+        posicion = self._posiciones.pop(empresa_id, None)
+        if posicion is None:
+            return
+
+        celda = celda_de(self._latitudes[posicion], self._longitudes[posicion])
+        posiciones = self._celdas.get(celda)
+        if posiciones is not None:
+            posiciones.remove(posicion)
+            if not posiciones:
+                del self._celdas[celda]
+
+        self._empresa_ids[posicion] = LIBRE
+        self._libres.append(posicion)
+        self._datos.pop(empresa_id, None)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _celdas_en_rectangulo(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> List[Tuple[Tuple[int, int], List[int]]]:
+        """Celdas ocupadas que tocan el rectángulo, con sus posiciones"""
+        lat_0, lng_0 = celda_de(min_lat, min_lng)
+        lat_1, lng_1 = celda_de(max_lat, max_lng)
+
+        # Rectángulos enormes: más barato recorrer las celdas ocupadas
+        if (lat_1 - lat_0 + 1) * (lng_1 - lng_0 + 1) > len(self._celdas):
+            return [
+                (celda, posiciones) for celda, posiciones in self._celdas.items()
+                if lat_0 <= celda[0] <= lat_1 and lng_0 <= celda[1] <= lng_1
+            ]
+
+        celdas = self._celdas
+        ocupadas = []
+        for celda_lat in range(lat_0, lat_1 + 1):
+            for celda_lng in range(lng_0, lng_1 + 1):
+                posiciones = celdas.get((celda_lat, celda_lng))
+                if posiciones:
+                    ocupadas.append(((celda_lat, celda_lng), posiciones))
+        return ocupadas
+
+    def _candidatos(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> np.ndarray:
+        """Posiciones de las celdas que tocan el rectángulo"""
+        candidatos: List[int] = []
+        for _, posiciones in self._celdas_en_rectangulo(min_lat, max_lat, min_lng, max_lng):
+            candidatos.extend(posiciones)
+        return np.fromiter(candidatos, dtype=np.intp, count=len(candidatos))
+
+    def en_rectangulo(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float,
+        categoria_id: Optional[int] = None
+    ) -> np.ndarray:
+        """Posiciones de las empresas dentro del rectángulo (bordes inclusivos)"""
+        posiciones = self._candidatos(min_lat, max_lat, min_lng, max_lng)
+        latitudes = self._latitudes[posiciones]
+        longitudes = self._longitudes[posiciones]
+
+        dentro = (
+            (latitudes >= min_lat) & (latitudes <= max_lat)
+            & (longitudes >= min_lng) & (longitudes <= max_lng)
+        )
+        if categoria_id:
+            dentro &= self._categorias[posiciones] == categoria_id
+        return posiciones[dentro]
+
+    def buscar_radio(
+        self,
+        latitud: float,
+        longitud: float,
+        radio_km: float,
+        categoria_id: Optional[int] = None,
+        limit: int = 50,
+        ordenar_por: str = "distancia"
+    ) -> List[dict]:
+        """
+        Empresas a `radio_km` o menos. Mismo formato que
+        GeolocationService.find_nearby_empresas.
+
+        Args:
+            ordenar_por: "distancia" (la más cercana primero) o "relevancia"
+                (combina distancia y rating, ver puntaje_relevancia)
+        """
+        # Import diferido: geolocation_service usa este índice
+        from app.services.geolocation_service import GeolocationService
+
+        min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(latitud, longitud, radio_km)
+
+        with self._lock:
+            posiciones = self.en_rectangulo(min_lat, max_lat, min_lng, max_lng, categoria_id)
+            distancias = haversine_km(latitud, longitud, self._latitudes[posiciones], self._longitudes[posiciones])
+
+            dentro = distancias <= radio_km
+            posiciones, distancias = posiciones[dentro], distancias[dentro]
+
+            if ordenar_por == "relevancia":
+                clave = puntaje_relevancia(distancias, self._ratings[posiciones], radio_km)
+            else:
+                clave = distancias
+            mejores = k_menores(clave, limit, desempate=self._empresa_ids[posiciones])
+
+            return [self._resultado(posiciones[i], distancias[i]) for i in mejores]
+
+    def pagina_por_distancia(
+        self,
+        latitud: float,
+        longitud: float,
+        radio_km: float,
+        categoria_id: Optional[int] = None,
+        limit: int = 50,
+        despues_de: Optional[Tuple[float, int]] = None
+    ) -> List[dict]:
+        """
+        Página de buscar_radio (orden por distancia) que empieza después del
+        cursor (distancia_km, empresa_id) de la última empresa de la página
+        anterior.
+
+        Busca por anillos: desde la distancia del cursor hacia afuera,
+        duplicando el ancho del anillo hasta juntar `limit` empresas o
+        llegar a radio_km. Cada anillo recorre solo las celdas que lo tocan
+        y que ningún anillo anterior recorrió (ver _posiciones_en_anillo),
+        así que el costo de una página lejana crece con el perímetro del
+        anillo que necesita y no con el área del disco ya paginado.
+        """
+        from app.services.geolocation_service import GeolocationService
+
+        min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(latitud, longitud, radio_km)
+        distancia_cursor, id_cursor = despues_de if despues_de else (-1.0, 0)
+        interno = max(distancia_cursor, 0.0)
+        ancho = CELDA_GRADOS * 111.0
+        vistas: Set[Tuple[int, int]] = set()
+        posiciones = np.empty(0, dtype=np.intp)
+        distancias = np.empty(0, dtype=np.float64)
+
+        with self._lock:
+            while True:
+                externo = min(interno + ancho, radio_km)
+                nuevas = self._posiciones_en_anillo(latitud, longitud, interno, externo, vistas)
+                latitudes = self._latitudes[nuevas]
+                longitudes = self._longitudes[nuevas]
+                distancias_nuevas = haversine_km(latitud, longitud, latitudes, longitudes)
+                empresa_ids = self._empresa_ids[nuevas]
+
+                # Sin filtrar por `externo`: las de más afuera sirven para el próximo anillo
+                validas = (
+                    # Mismo criterio que buscar_radio: bounding box del radio completo
+                    (latitudes >= min_lat) & (latitudes <= max_lat)
+                    & (longitudes >= min_lng) & (longitudes <= max_lng)
+                    & ((distancias_nuevas > distancia_cursor)
+                       | ((distancias_nuevas == distancia_cursor) & (empresa_ids > id_cursor)))
+                )
+                if categoria_id:
+                    validas &= self._categorias[nuevas] == categoria_id
+                posiciones = np.concatenate((posiciones, nuevas[validas]))
+                distancias = np.concatenate((distancias, distancias_nuevas[validas]))
+
+                dentro = distancias <= externo
+                if np.count_nonzero(dentro) >= limit or externo >= radio_km:
+                    posiciones, distancias = posiciones[dentro], distancias[dentro]
+                    mejores = k_menores(distancias, limit, desempate=self._empresa_ids[posiciones])
+                    return [self._resultado(posiciones[i], distancias[i]) for i in mejores]
+
+                interno = externo
+                ancho *= 2
+
+    def _posiciones_en_anillo(
+        self,
+        latitud: float,
+        longitud: float,
+        interno: float,
+        externo: float,
+        vistas: Set[Tuple[int, int]]
+    ) -> np.ndarray:
+        """
+        Posiciones de las celdas que tocan el anillo [interno, externo] km y
+        no están en `vistas` (se agregan al devolverlas).
+
+        Por cada fila de celdas recorre las columnas que cubre el disco
+        externo salvo las que quedan enteras dentro del disco interno. Los
+        bordes llevan una columna y 0.01 km de margen (redondeo de las
+        distancias a 2 decimales): sobran algunas celdas, nunca faltan.
+        """
+        from app.services.geolocation_service import GeolocationService
+
+        interno -= 0.01
+        externo += 0.01
+        min_lat, max_lat, _, _ = GeolocationService.get_bounding_box(latitud, longitud, externo)
+        # Paralelo donde el disco externo es más ancho (en grados de longitud)
+        seno_maximo = math.sin(math.radians(latitud)) / math.cos(min(externo / EARTH_RADIUS_KM, math.pi / 2))
+
+        # (fila, primera columna, última columna, primera y última columna del hueco interno)
+        franjas: List[Tuple[int, int, int, int, int]] = []
+        for fila in range(celda_de(min_lat, 0)[0], celda_de(max_lat, 0)[0] + 1):
+            sur, norte = fila * CELDA_GRADOS, (fila + 1) * CELDA_GRADOS
+
+            alturas = [sur, norte]
+            if -1.0 <= seno_maximo <= 1.0:
+                alturas.append(min(max(math.degrees(math.asin(seno_maximo)), sur), norte))
+            anchos = [semiancho_longitud(latitud, altura, externo) for altura in alturas]
+            anchos = [a for a in anchos if a is not None]
+            if not anchos:
+                continue
+            semiancho = max(anchos)
+            if semiancho >= 180.0:
+                primera, ultima = celda_de(0, -180.0)[1], celda_de(0, 180.0)[1]
+            else:
+                primera = math.floor((longitud - semiancho) / CELDA_GRADOS) - 1
+                ultima = math.floor((longitud + semiancho) / CELDA_GRADOS) + 1
+
+            # El disco interno es más angosto en uno de los bordes de la franja
+            hueco_desde, hueco_hasta = 0, -1
+            if interno > 0:
+                internos = [semiancho_longitud(latitud, altura, interno) for altura in (sur, norte)]
+                if None not in internos and max(internos) < 180.0:
+                    semiancho_interno = min(internos)
+                    hueco_desde = math.ceil((longitud - semiancho_interno) / CELDA_GRADOS) + 1
+                    hueco_hasta = math.floor((longitud + semiancho_interno) / CELDA_GRADOS) - 2
+            franjas.append((fila, primera, ultima, hueco_desde, hueco_hasta))
+
+        celdas = self._celdas
+        candidatos: List[int] = []
+        recorridas = sum(
+            (ultima - primera + 1) - max(0, min(hasta, ultima) - max(desde, primera) + 1)
+            for _, primera, ultima, desde, hasta in franjas
+        )
+
+        # Anillos enormes: más barato recorrer las celdas ocupadas
+        if recorridas > len(celdas):
+            por_fila = {franja[0]: franja[1:] for franja in franjas}
+            for celda, posiciones in celdas.items():
+                franja = por_fila.get(celda[0])
+                if (franja is None or not franja[0] <= celda[1] <= franja[1]
+                        or franja[2] <= celda[1] <= franja[3] or celda in vistas):
+                    continue
+                vistas.add(celda)
+                candidatos.extend(posiciones)
+            return np.fromiter(candidatos, dtype=np.intp, count=len(candidatos))
+
+        for fila, primera, ultima, desde, hasta in franjas:
+            if desde > hasta:
+                columnas = range(primera, ultima + 1)
+            else:
+                columnas = chain(range(primera, min(desde, ultima + 1)), range(max(hasta + 1, primera), ultima + 1))
+            for columna in columnas:
+                posiciones = celdas.get((fila, columna))
+                if posiciones and (fila, columna) not in vistas:
+                    vistas.add((fila, columna))
+                    candidatos.extend(posiciones)
+        return np.fromiter(candidatos, dtype=np.intp, count=len(candidatos))
+
+    def mas_cercanas(
+        self,
+        latitud: float,
+        longitud: float,
+        k: int = 10,
+        categoria_id: Optional[int] = None,
+        radio_maximo_km: float = 20000.0
+    ) -> List[dict]:
+        """
+        Las k empresas más cercanas. Duplica el radio desde el tamaño de
+        una celda hasta encontrar k (todo lo no encontrado está fuera del radio).
+        """
+        radio_km = CELDA_GRADOS * 111.0
+        while True:
+            resultados = self.buscar_radio(latitud, longitud, radio_km, categoria_id, limit=k)
+            if len(resultados) >= k or radio_km >= radio_maximo_km:
+                return resultados
+            radio_km = min(radio_km * 2, radio_maximo_km)
+
+    def agrupar(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float,
+        zoom: int,
+        categoria_id: Optional[int] = None,
+        max_puntos: int = 200,
+        zoom_puntos: int = 15,
+        max_marcadores: int = 1000
+    ) -> dict:
+        """
+        Empresas de un viewport de mapa: puntos individuales si el zoom es
+        alto (>= zoom_puntos) o hay pocas (<= max_puntos); si no, clusters
+        por celda de grilla (tamano_celda_cluster) con cantidad y centroide.
+
+        Ninguna respuesta supera ~max_marcadores puntos o clusters: con zoom
+        alto y más empresas que eso (viewport enorme con un zoom que no le
+        corresponde) se agrupa igual, con celdas de al menos 1/sqrt(max_marcadores)
+        del lado mayor del viewport.
+        """
+        with self._lock:
+            posiciones = self.en_rectangulo(min_lat, max_lat, min_lng, max_lng, categoria_id)
+            posiciones = posiciones[np.argsort(self._empresa_ids[posiciones], kind="stable")]
+
+            if len(posiciones) <= max_puntos or (zoom >= zoom_puntos and len(posiciones) <= max_marcadores):
+                return resultado_mapa(zoom, "puntos", len(posiciones), puntos=[
+                    self._punto_mapa(posicion) for posicion in posiciones
+                ])
+
+            tamano_celda = max(
+                tamano_celda_cluster(zoom),
+                max(max_lat - min_lat, max_lng - min_lng) / math.sqrt(max_marcadores)
+            )
+            latitudes, longitudes, cantidades, primeras = agrupar_en_grilla(
+                self._latitudes[posiciones], self._longitudes[posiciones], tamano_celda
+            )
+            empresa_ids = self._empresa_ids[posiciones[primeras]]
+            return resultado_mapa(zoom, "clusters", len(posiciones), clusters=[
+                {
+                    "latitud": round(float(latitudes[i]), 6),
+                    "longitud": round(float(longitudes[i]), 6),
+                    "cantidad": int(cantidades[i]),
+                    "empresa_id": int(empresa_ids[i]) if cantidades[i] == 1 else None,
+                }
+                for i in range(len(cantidades))
+            ])
+
+    def _punto_mapa(self, posicion: int) -> dict:
+        empresa_id = int(self._empresa_ids[posicion])
+        razon_social, _, rating = self._datos[empresa_id]
+        return {
+            "empresa_id": empresa_id,
+            "nombre": razon_social,
+            "latitud": float(self._latitudes[posicion]),
+            "longitud": float(self._longitudes[posicion]),
+            "categoria_id": int(self._categorias[posicion]),
+            "rating_promedio": rating,
+        }
+
+    def _resultado(self, posicion: int, distancia_km: float) -> dict:
+        empresa_id = int(self._empresa_ids[posicion])
+        razon_social, descripcion, rating = self._datos[empresa_id]
+        return {
+            "empresa_id": empresa_id,
+            "nombre": razon_social,
+            "descripcion": descripcion,
+            "latitud": float(self._latitudes[posicion]),
+            "longitud": float(self._longitudes[posicion]),
+            "distancia_km": float(distancia_km),
+            "categoria_id": int(self._categorias[posicion]),
+            "rating_promedio": rating,
+        }
+
+
+indice_geografico = registro_indices.registrar(IndiceGeografico())
@@ -0,0 +1,221 @@
+# app/services/indices_empresa.py
+"""
+Registro de índices en memoria derivados de la tabla empresa.
+
+Cada worker mantiene sus propios índices (búsqueda de texto, autocompletado,
+geoespacial, ...). Se construyen en el arranque (o en el primer uso) y se
+mantienen al día por dos vías:
+
+1. notificar_cambio(): llamado por los endpoints de este worker después de
+   un commit que modifica una empresa o sus datos relacionados.
+2. sincronizar_cambios(): tarea periódica que toma las empresas con
+   fecha_actualizacion posterior a la última sincronización, para ver los
+   cambios hechos por otros workers.
+
+Los cambios en servicios y dirección actualizan empresa.fecha_actualizacion
+(EmpresaService.marcar_actualizada), así que también los detecta la vía 2.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.empresa import Empresa
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceEmpresas:
+    """
+    Clase base para índices en memoria sobre empresas.
+
+    Las subclases implementan construir() y actualizar(). La construcción
+    es perezosa y protegida por lock: asegurar_construido() la dispara
+    una sola vez aunque lleguen varios requests a la vez.
+    """
+
+    nombre = "indice"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._construido = False
+
+    @property
+    def construido(self) -> bool:
+        return self._construido
+
+    def asegurar_construido(self, db: Session) -> None:
+        """Construye el índice si todavía no se hizo"""
+        if self._construido:
+            return
+        with self._lock:
+            if not self._construido:
+                self.reconstruir(db)
+
+    def reconstruir(self, db: Session) -> None:
+        """Reconstruye el índice completo desde la base"""
+        inicio = datetime.now()
+        with self._lock:
+            self.construir(db)
+            self._construido = True
+        duracion_ms = (datetime.now() - inicio).total_seconds() * 1000
+        logger.info(f"Índice '{self.nombre}' construido en {duracion_ms:.0f}ms")
+
+    def construir(self, db: Session) -> None:
+        raise NotImplementedError
+
+    def actualizar(self, db: Session, empresa_ids: List[int]) -> None:
+        """Reindexa las empresas indicadas (las inexistentes o inactivas se quitan)"""
+        raise NotImplementedError
+
+    def refrescar(self, db: Session) -> None:
+        """
+        Hook opcional para datos de referencia que no cuelgan de una empresa
+        (ej: nombres de categorías). Se llama en cada sincronización.
+        """
+        pass
+
+
+class RegistroIndices:
+    """Índices registrados en este worker y su sincronización"""
+
+    # Margen para no perder cambios con la misma marca de tiempo (DATETIME
+    # tiene resolución de segundos y los relojes de los workers pueden diferir)
+    MARGEN_SINCRONIZACION = timedelta(seconds=2)
+
+    def __init__(self):
+        self._indices: List[IndiceEmpresas] = []
+        self._precargar: List[IndiceEmpresas] = []
+        self._ultima_marca: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def indices(self) -> List[IndiceEmpresas]:
+        return list(self._indices)
+
+    def registrar(self, indice: IndiceEmpresas, precargar: bool = True) -> IndiceEmpresas:
+        """
+        Registra un índice.
+
+        Args:
+            indice: Índice a registrar
+            precargar: Si True se construye en el arranque; si no, en el primer uso
+        """
+        self._indices.append(indice)
+        if precargar:
+            self._precargar.append(indice)
+        return indice
+
+    def precargar(self, db: Session) -> None:
+        """Construye los índices marcados para precarga (evento startup)"""
+        self._ultima_marca = self._marca_actual(db)
+        for indice in self._precargar:
+            try:
+                indice.asegurar_construido(db)
+            except Exception as e:
+                logger.error(f"Error construyendo índice '{indice.nombre}': {str(e)}")
+
+    def notificar_cambio(self, db: Session, empresa_ids: Union[int, Iterable[int]]) -> None:
+        """
+        Propaga un cambio local a los índices ya construidos.
+
+        Debe llamarse después del commit. Nunca lanza excepción: un índice
+        desactualizado se corrige en la próxima sincronización.
+        """
+        if isinstance(empresa_ids, int):
+            empresa_ids = [empresa_ids]
+        empresa_ids = list(empresa_ids)
+        if not empresa_ids:
+            return
+
+        for indice in self._indices:
+            if not indice.construido:
+                continue
+            try:
+                indice.actualizar(db, empresa_ids)
+            except Exception as e:
+                logger.error(f"Error actualizando índice '{indice.nombre}': {str(e)}")
+
+    def sincronizar_cambios(self, db: Session) -> int:
+        """
+        Aplica a los índices los cambios hechos desde la última sincronización
+        (incluidos los de otros workers).
+
+        Returns:
+            Cantidad de empresas reindexadas
+        """
+        with self._lock:
+            if self._ultima_marca is None:
+                self._ultima_marca = self._marca_actual(db)
+                return 0
+
+            desde = self._ultima_marca - self.MARGEN_SINCRONIZACION
+            cambios = db.query(Empresa.empresa_id, Empresa.fecha_actualizacion).filter(
+                Empresa.fecha_actualizacion >= desde
+            ).all()
+
+            if cambios:
+                self._ultima_marca = max(
+                    [self._ultima_marca] + [c.fecha_actualizacion for c in cambios if c.fecha_actualizacion]
+                )
+
+        self.notificar_cambio(db, [c.empresa_id for c in cambios])
+        self.notificar_referencias(db)
+        return len(cambios)
+
+    def notificar_referencias(self, db: Session) -> None:
+        """Propaga cambios en datos de referencia (categorías) a los índices construidos"""
+        for indice in self._indices:
+            if not indice.construido:
+                continue
+            try:
+                indice.refrescar(db)
+            except Exception as e:
+                logger.error(f"Error refrescando índice '{indice.nombre}': {str(e)}")
+
+    @staticmethod
+    def _marca_actual(db: Session) -> datetime:
+        marca = db.query(func.max(Empresa.fecha_actualizacion)).scalar()
+        return marca or datetime(1970, 1, 1)
+
+
+# Registro global del worker
+registro_indices = RegistroIndices()
+
+
+def precargar_indices() -> None:
+    """Construye los índices del worker con una sesión propia (bloqueante)"""
+    db = SessionLocal()
+    try:
+        registro_indices.precargar(db)
+    finally:
+        db.close()
+
+
+def _sincronizar_con_sesion_propia() -> int:
+    db = SessionLocal()
+    try:
+        return registro_indices.sincronizar_cambios(db)
+    finally:
+        db.close()
+
+
+async def sincronizar_periodicamente(intervalo_segundos: int) -> None:
+    """
+    Tarea de fondo: sincroniza los índices cada `intervalo_segundos`.
+    Se cancela en el evento shutdown.
+    """
+    while True:
+        await asyncio.sleep(intervalo_segundos)
+        try:
+            reindexadas = await asyncio.to_thread(_sincronizar_con_sesion_propia)
+            if reindexadas:
+                logger.debug(f"Índices sincronizados: {reindexadas} empresas")
+        except Exception as e:
+            logger.error(f"Error sincronizando índices: {str(e)}")
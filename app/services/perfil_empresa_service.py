@@ -0,0 +1,235 @@
+# app/services/perfil_empresa_service.py
+"""
+Perfil agregado de empresa: arma en una sola llamada los datos que la
+página de una empresa pedía en 5 requests (empresa, servicios, horarios,
+estadísticas de calificaciones y disponibilidad).
+
+Cantidad de queries fija, independiente del volumen de datos:
+    1. empresa + direccion + categoria (joined load)
+    2. servicios activos                (servicios o disponibilidad)
+    3. horarios activos                 (horarios o disponibilidad)
+    4. distribución de calificaciones   (calificaciones)
+    5. turnos ocupados en la ventana    (disponibilidad)
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from app.enums import EstadoTurno
+from app.models.calificacion import Calificacion
+from app.models.empresa import Empresa
+from app.models.horario_empresa import HorarioEmpresa
+from app.models.servicio import Servicio
+from app.models.turno import Turno
+from app.schemas.calificacion import EstadisticasCalificaciones
+from app.schemas.categoria import CategoriaSchema
+from app.schemas.empresa import EmpresaResponse, PerfilEmpresaResponse, SECCIONES_PERFIL
+from app.schemas.horario import HorarioResponse
+from app.schemas.servicio import ServicioResponse
+from app.schemas.turno import SlotDisponible
+from app.services.turno_service import DIAS_SEMANA, generar_slots_servicio
+
+logger = logging.getLogger(__name__)
+
+
+class PerfilEmpresaService:
+    """Service para el perfil agregado de una empresa"""
+
+    @staticmethod
+    def parsear_include(include: Optional[str]) -> Set[str]:
+        """
+        Convierte el parámetro include= en el conjunto de secciones pedidas.
+
+        Sin parámetro se incluyen todas. Lanza ValueError si alguna sección
+        no existe.
+        """
+        if include is None:
+            return set(SECCIONES_PERFIL)
+
+        secciones = {s.strip().lower() for s in include.split(",") if s.strip()}
+        invalidas = secciones - set(SECCIONES_PERFIL)
+        if invalidas:
+            raise ValueError(
+                f"Secciones inválidas: {', '.join(sorted(invalidas))}. "
+                f"Válidas: {', '.join(SECCIONES_PERFIL)}"
+            )
+        return secciones
+
+    @staticmethod
+    def obtener_perfil(
+        db: Session,
+        empresa_id: int,
+        secciones: Set[str],
+        max_slots: int = 10,
+        dias_disponibilidad: int = 7
+    ) -> Optional[PerfilEmpresaResponse]:
+        """
+        Obtiene el perfil agregado de una empresa.
+
+        Returns:
+            PerfilEmpresaResponse o None si la empresa no existe
+        """
+        # 1. Empresa con dirección y categoría
+        empresa = db.query(Empresa).options(
+            joinedload(Empresa.direccion),
+            joinedload(Empresa.categoria)
+        ).filter(Empresa.empresa_id == empresa_id).first()
+
+        if not empresa:
+            return None
+
+        perfil = PerfilEmpresaResponse(
+            empresa=EmpresaResponse.model_validate(empresa),
+            categoria=CategoriaSchema.model_validate(empresa.categoria) if empresa.categoria else None
+        )
+
+        con_disponibilidad = "disponibilidad" in secciones and empresa.activa
+
+        # 2. Servicios activos
+        servicios: List[Servicio] = []
+        if "servicios" in secciones or con_disponibilidad:
+            servicios = db.query(Servicio).filter(
+                Servicio.empresa_id == empresa_id,
+                Servicio.activo == True
+            ).order_by(Servicio.servicio_id).all()
+
+            if "servicios" in secciones:
+                perfil.servicios = [ServicioResponse.model_validate(s) for s in servicios]
+
+        # 3. Horarios semanales activos
+        horarios: List[HorarioEmpresa] = []
+        if "horarios" in secciones or con_disponibilidad:
+            horarios = db.query(HorarioEmpresa).filter(
+                HorarioEmpresa.empresa_id == empresa_id,
+                HorarioEmpresa.activo == True
+            ).all()
+
+            if "horarios" in secciones:
+                orden_dias = {dia: i for i, dia in enumerate(DIAS_SEMANA)}
+                horarios_ordenados = sorted(
+                    horarios,
+                    key=lambda h: (orden_dias.get(h.dia_semana, 7), h.hora_apertura)
+                )
+                perfil.horarios = [HorarioResponse.model_validate(h) for h in horarios_ordenados]
+
+        # 4. Resumen de calificaciones (rating ya desnormalizado en empresa)
+        if "calificaciones" in secciones:
+            perfil.calificaciones = PerfilEmpresaService._resumen_calificaciones(db, empresa)
+
+        # 5. Próximos slots disponibles
+        if "disponibilidad" in secciones:
+            perfil.proximos_turnos = []
+            if con_disponibilidad and servicios and horarios:
+                perfil.proximos_turnos = PerfilEmpresaService._proximos_slots(
+                    db, empresa_id, servicios, horarios, max_slots, dias_disponibilidad
+                )
+
+        return perfil
+
+    @staticmethod
+    def _resumen_calificaciones(db: Session, empresa: Empresa) -> EstadisticasCalificaciones:
+        """Rating promedio, total y distribución por estrellas (1 query)"""
+        distribucion = db.query(
+            Calificacion.puntuacion,
+            func.count(Calificacion.calificacion_id)
+        ).filter(
+            Calificacion.empresa_id == empresa.empresa_id
+        ).group_by(
+            Calificacion.puntuacion
+        ).all()
+
+        distribucion_dict = {str(i): 0 for i in range(1, 6)}
+        for puntuacion, cantidad in distribucion:
+            distribucion_dict[str(puntuacion)] = cantidad
+
+        return EstadisticasCalificaciones(
+            rating_promedio=float(empresa.rating_promedio) if empresa.rating_promedio else None,
+            total_calificaciones=empresa.total_calificaciones or 0,
+            distribucion=distribucion_dict
+        )
+
+    @staticmethod
+    def _proximos_slots(
+        db: Session,
+        empresa_id: int,
+        servicios: List[Servicio],
+        horarios: List[HorarioEmpresa],
+        max_slots: int,
+        dias: int,
+        ahora: Optional[datetime] = None
+    ) -> List[SlotDisponible]:
+        """
+        Calcula los próximos slots libres a partir de ahora.
+
+        Los turnos de toda la ventana se cargan en una sola query y los slots
+        se generan en memoria, día por día, cortando al llegar a max_slots.
+        """
+        ahora = ahora or datetime.now()
+        hoy = ahora.date()
+        fecha_limite = hoy + timedelta(days=dias - 1)
+
+        turnos = db.query(Turno).filter(
+            Turno.empresa_id == empresa_id,
+            Turno.fecha >= hoy,
+            Turno.fecha <= fecha_limite,
+            Turno.estado.in_([EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO])
+        ).all()
+
+        return calcular_proximos_slots(servicios, horarios, turnos, max_slots, dias, ahora)
+
+
+def calcular_proximos_slots(
+    servicios: Iterable[Servicio],
+    horarios: Iterable[HorarioEmpresa],
+    turnos_ocupados: Iterable[Turno],
+    max_slots: int,
+    dias: int,
+    ahora: datetime
+) -> List[SlotDisponible]:
+    """
+    Próximos max_slots slots libres dentro de los próximos `dias` días.
+
+    Función pura sobre datos precargados (servicios, horarios y turnos de
+    una empresa). Descarta los slots de hoy que ya empezaron.
+    """
+    servicios = list(servicios)
+
+    horarios_por_dia: Dict[str, List[HorarioEmpresa]] = {}
+    for horario in horarios:
+        horarios_por_dia.setdefault(horario.dia_semana, []).append(horario)
+
+    turnos_por_fecha: Dict[date, List[Turno]] = {}
+    for turno in turnos_ocupados:
+        turnos_por_fecha.setdefault(turno.fecha, []).append(turno)
+
+    resultado: List[SlotDisponible] = []
+    hoy = ahora.date()
+
+    for offset in range(dias):
+        fecha = hoy + timedelta(days=offset)
+        horarios_dia = horarios_por_dia.get(DIAS_SEMANA[fecha.weekday()], [])
+        if not horarios_dia:
+            continue
+
+        turnos_dia = turnos_por_fecha.get(fecha, [])
+        slots_dia: List[SlotDisponible] = []
+        for horario in horarios_dia:
+            for servicio in servicios:
+                slots_dia.extend(generar_slots_servicio(
+                    fecha, horario.hora_apertura, horario.hora_cierre, servicio, turnos_dia
+                ))
+
+        if fecha == hoy:
+            slots_dia = [s for s in slots_dia if s.hora_inicio > ahora.time()]
+
+        slots_dia.sort(key=lambda slot: (slot.hora_inicio, slot.servicio_id))
+        resultado.extend(slots_dia[:max_slots - len(resultado)])
+
+        if len(resultado) >= max_slots:
+            break
+
+    return resultado
@@ -0,0 +1,178 @@
+# app/services/referencias_cache.py
+"""
+Caché versionado de datos de referencia: categorías, roles y permisos.
+
+Son tablas chicas que casi nunca cambian pero se leen en casi todos los
+requests (listado de categorías, chequeos de rol). Cada worker guarda una
+foto inmutable (SnapshotReferencias) y la reemplaza entera cuando cambia
+la versión guardada en la tabla cache_version.
+
+- Lectura: obtener() devuelve la foto actual sin consultar la base. La
+  versión se verifica como mucho una vez cada REFERENCIAS_CHECK_INTERVAL_SECONDS.
+- Escritura: quien modifica categorías, roles o permisos llama a
+  invalidar(db) antes del commit; la versión sube en la misma transacción
+  y el worker local recarga en la próxima lectura. Los demás workers lo
+  ven en su próxima verificación. Roles y permisos no se editan desde la
+  API: la versión la suben triggers sobre rol, permiso y rol_permiso
+  (migración 5e2b9c7a41d3), así que un cambio por SQL o por migración se
+  ve sin reiniciar. En una base sin esos triggers, después de editarlos
+  hay que ejecutar
+  UPDATE cache_version SET version = version + 1 WHERE nombre = 'referencias'.
+"""
+
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.cache_version import CacheVersion
+from app.models.categoria import Categoria
+from app.models.rol import Permiso, Rol
+
+logger = logging.getLogger(__name__)
+
+
+CLAVE_VERSION = "referencias"
+
+
+class CategoriaRef(NamedTuple):
+    categoria_id: int
+    nombre: str
+    descripcion: Optional[str]
+    activa: bool
+
+
+class RolRef(NamedTuple):
+    rol_id: int
+    nombre: str
+    slug: str
+    tipo: str
+    nivel: int
+
+
+class PermisoRef(NamedTuple):
+    permiso_id: int
+    codigo: str
+    nombre: str
+    categoria: str
+
+
+class SnapshotReferencias(NamedTuple):
+    """Foto inmutable de los datos de referencia activos"""
+    version: Optional[int]
+    categorias: Tuple[CategoriaRef, ...]
+    roles_por_id: Mapping[int, RolRef]
+    roles_por_nombre: Mapping[str, RolRef]
+    permisos_por_codigo: Mapping[str, PermisoRef]
+
+    def rol(self, nombre: str) -> Optional[RolRef]:
+        return self.roles_por_nombre.get(nombre)
+
+
+class CacheReferencias:
+    """Foto de referencia por worker con recarga perezosa por versión"""
+
+    def __init__(self, intervalo_verificacion: float):
+        self.intervalo_verificacion = intervalo_verificacion
+        self._snapshot: Optional[SnapshotReferencias] = None
+        self._proxima_verificacion = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self, db: Session) -> SnapshotReferencias:
+        """
+        Foto vigente. Solo consulta la base si venció el intervalo de
+        verificación (1 query) o si cambió la versión (recarga completa).
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._proxima_verificacion:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() < self._proxima_verificacion:
+                return snapshot
+
+            version = self._leer_version(db)
+            if snapshot is None or version is None or version != snapshot.version:
+                snapshot = self._cargar(db, version)
+                self._snapshot = snapshot
+                logger.debug(f"Datos de referencia recargados (versión {version})")
+
+            self._proxima_verificacion = time.monotonic() + self.intervalo_verificacion
+            return snapshot
+
+    def invalidar(self, db: Session) -> None:
+        """
+        Incrementa la versión. Llamar antes del commit de la escritura para
+        que la nueva versión se confirme junto con los datos.
+        """
+        try:
+            actualizadas = db.execute(
+                update(CacheVersion)
+                .where(CacheVersion.nombre == CLAVE_VERSION)
+                .values(version=CacheVersion.version + 1)
+            ).rowcount
+            if not actualizadas:
+                db.add(CacheVersion(nombre=CLAVE_VERSION, version=1))
+        except Exception as e:
+            # Sin tabla de versión los workers recargan en cada verificación
+            logger.warning(f"No se pudo incrementar la versión de referencias: {str(e)}")
+        finally:
+            # Este worker vuelve a verificar en la próxima lectura
+            self._proxima_verificacion = 0.0
+
+    def limpiar(self) -> None:
+        """Descarta la foto actual (tests)"""
+        with self._lock:
+            self._snapshot = None
+            self._proxima_verificacion = 0.0
+
+    @staticmethod
+    def _leer_version(db: Session) -> Optional[int]:
+        try:
+            return db.query(CacheVersion.version).filter(
+                CacheVersion.nombre == CLAVE_VERSION
+            ).scalar() or 0
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"No se pudo leer la versión de referencias: {str(e)}")
+            return None
+
+    @staticmethod
+    def _cargar(db: Session, version: Optional[int]) -> SnapshotReferencias:
+        categorias = tuple(
+            CategoriaRef(c.categoria_id, c.nombre, c.descripcion, c.activa)
+            for c in db.query(
+                Categoria.categoria_id, Categoria.nombre, Categoria.descripcion, Categoria.activa
+            ).filter(Categoria.activa == True).order_by(Categoria.categoria_id)
+        )
+
+        roles = [
+            RolRef(r.rol_id, r.nombre, r.slug, r.tipo, r.nivel)
+            for r in db.query(Rol.rol_id, Rol.nombre, Rol.slug, Rol.tipo, Rol.nivel).filter(
+                Rol.activo == True
+            )
+        ]
+        permisos = [
+            PermisoRef(p.permiso_id, p.codigo, p.nombre, p.categoria)
+            for p in db.query(Permiso.permiso_id, Permiso.codigo, Permiso.nombre, Permiso.categoria).filter(
+                Permiso.activo == True
+            )
+        ]
+
+        return SnapshotReferencias(
+            version=version,
+            categorias=categorias,
+            roles_por_id=MappingProxyType({r.rol_id: r for r in roles}),
+            roles_por_nombre=MappingProxyType({r.nombre: r for r in roles}),
+            permisos_por_codigo=MappingProxyType({p.codigo: p for p in permisos}),
+        )
+
+
+# Caché global del worker
+cache_referencias = CacheReferencias(settings.REFERENCIAS_CHECK_INTERVAL_SECONDS)
@@ -24,6 +24,69 @@ from app.schemas.turno import (
 from app.enums import EstadoTurno, DiaSemana
 
 
+# Días de la semana indexados por date.weekday()
+DIAS_SEMANA = [
+    DiaSemana.LUNES, DiaSemana.MARTES, DiaSemana.MIERCOLES,
+    DiaSemana.JUEVES, DiaSemana.VIERNES, DiaSemana.SABADO, DiaSemana.DOMINGO
+]
+
+# Paso entre inicios de slot consecutivos
+INTERVALO_SLOTS_MINUTOS = 30
+
+
+def generar_slots_servicio(
+    fecha: date,
+    hora_inicio: time,
+    hora_fin: time,
+    servicio: Servicio,
+    turnos_ocupados: List[Turno]
+) -> List[SlotDisponible]:
+    """
+    Genera los slots libres de un servicio dentro de un rango horario.
+    
+    Función pura: trabaja sobre datos ya cargados y no consulta la base,
+    por lo que puede usarse con turnos precargados para varios días/empresas.
+    Solo los turnos del mismo servicio generan conflicto, y su duración es
+    la del propio servicio.
+    """
+    slots = []
+    
+    dt_inicio = datetime.combine(fecha, hora_inicio)
+    dt_fin = datetime.combine(fecha, hora_fin)
+    duracion = timedelta(minutes=servicio.duracion_minutos)
+    
+    # Intervalos ocupados por turnos del mismo servicio en esa fecha
+    ocupados = []
+    for turno in turnos_ocupados:
+        if turno.servicio_id == servicio.servicio_id and turno.fecha == fecha:
+            turno_inicio = datetime.combine(fecha, turno.hora)
+            ocupados.append((turno_inicio, turno_inicio + duracion))
+    
+    slot_actual = dt_inicio
+    while slot_actual + duracion <= dt_fin:
+        slot_fin = slot_actual + duracion
+        
+        conflicto = any(
+            slot_actual < ocupado_fin and ocupado_inicio < slot_fin
+            for ocupado_inicio, ocupado_fin in ocupados
+        )
+        
+        if not conflicto:
+            slots.append(SlotDisponible(
+                fecha=fecha,
+                hora_inicio=slot_actual.time(),
+                hora_fin=slot_fin.time(),
+                servicio_id=servicio.servicio_id,
+                servicio_nombre=servicio.nombre,
+                duracion_minutos=servicio.duracion_minutos,
+                precio=float(servicio.precio)
+            ))
+        
+        slot_actual += timedelta(minutes=INTERVALO_SLOTS_MINUTOS)
+    
+    return slots
+
+
 class TurnoService:
     """Service para manejo de turnos - lógica de negocio"""
     
@@ -362,11 +425,7 @@ class TurnoService:
     
     def _obtener_dia_semana(self, fecha: date) -> DiaSemana:
         """Convierte fecha a enum del día de semana"""
-        dias = [
-            DiaSemana.LUNES, DiaSemana.MARTES, DiaSemana.MIERCOLES,
-            DiaSemana.JUEVES, DiaSemana.VIERNES, DiaSemana.SABADO, DiaSemana.DOMINGO
-        ]
-        return dias[fecha.weekday()]
+        return DIAS_SEMANA[fecha.weekday()]
     
     def _generar_slots_para_servicio(
         self,
@@ -377,57 +436,7 @@ class TurnoService:
         fecha: date
     ) -> List[SlotDisponible]:
         """Genera slots disponibles para un servicio en un rango horario"""
-        slots = []
-        
-        # Convertir a datetime para facilitar cálculos
-        dt_inicio = datetime.combine(fecha, hora_inicio)
-        dt_fin = datetime.combine(fecha, hora_fin)
-        
-        slot_actual = dt_inicio
-        duracion = timedelta(minutes=servicio.duracion_minutos)
-        
-        while slot_actual + duracion <= dt_fin:
-            slot_fin = slot_actual + duracion
-            
-            # Verificar si hay conflicto con turnos existentes
-            conflicto = any(
-                turno.servicio_id == servicio.servicio_id and
-                self._hay_solapamiento(
-                    slot_actual.time(),
-                    slot_fin.time(),
-                    turno.hora,
-                    self._calcular_hora_fin(turno.hora, 
-                        self.db.query(Servicio).filter(Servicio.servicio_id == turno.servicio_id).first().duracion_minutos
-                    )
-                )
-                for turno in turnos_ocupados
-            )
-            
-            if not conflicto:
-                slots.append(SlotDisponible(
-                    fecha=fecha,
-                    hora_inicio=slot_actual.time(),
-                    hora_fin=slot_fin.time(),
-                    servicio_id=servicio.servicio_id,
-                    servicio_nombre=servicio.nombre,
-                    duracion_minutos=servicio.duracion_minutos,
-                    precio=float(servicio.precio)
-                ))
-            
-            # Avanzar al siguiente slot (cada 30 minutos por defecto)
-            slot_actual += timedelta(minutes=30)
-        
-        return slots
-    
-    def _hay_solapamiento(
-        self, 
-        inicio1: time, 
-        fin1: time, 
-        inicio2: time, 
-        fin2: time
-    ) -> bool:
-        """Verifica si dos rangos horarios se solapan"""
-        return inicio1 < fin2 and inicio2 < fin1
+        return generar_slots_servicio(fecha, hora_inicio, hora_fin, servicio, turnos_ocupados)
     
     def _validar_horario_disponible(
         self,
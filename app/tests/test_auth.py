@@ -0,0 +1,663 @@
+# tests/test_auth.py
+"""
+Tests de autenticación
+- Pool de hashing: no bloquea el event loop, rechaza al superar la cola
+- Perfiles de hashing: los hashes con otro costo se actualizan al verificar
+- Caché de principales: sin query por request, carga perezosa de la fila,
+  invalidación al commitear cambios del usuario o de sus roles
+- Verificación de tokens: los ya verificados no se decodifican de nuevo,
+  se respeta "exp" y un token modificado no usa el caché
+- Permisos en el token: bitsets por empresa, descartados al cambiar la época
+- Evaluador RBAC en memoria: paridad con la función usuario_tiene_permiso
+"""
+
+import asyncio
+import random
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from passlib.hash import argon2
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registra todos los modelos para las relaciones)
+from app.core.jwt_verificacion import (
+    BackendJose, TokenInvalidoError, VerificadorTokens, crear_backend_jwt
+)
+from app.core.password_hashing import PoolHashing, PoolHashingSaturadoError, crear_contexto_hashing
+from app.core.principal_cache import CachePrincipales, Principal
+from app.core.security import (
+    create_access_token, get_current_user, get_password_hash_async, verify_password_async
+)
+from app.auth import permisos_token
+from app.auth.evaluador_rbac import evaluador_rbac
+from app.auth.permisos_token import (
+    claims_permisos, codificar_bits, decodificar_bits, evaluar_claims, permiso_desde_token
+)
+from app.config import settings
+from app.database import Base
+from app.services.referencias_cache import cache_referencias
+from app.enums import TipoUsuario
+from app.models.cache_version import CacheVersion
+from app.models.categoria import Categoria
+from app.models.rol import Permiso, Rol, RolPermiso, UsuarioRol
+from app.models.user import Usuario
+
+
+@pytest.fixture
+def db():
+    """SQLite en memoria con usuarios, roles y permisos"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        Usuario.__table__, Rol.__table__, UsuarioRol.__table__,
+        Permiso.__table__, RolPermiso.__table__, CacheVersion.__table__, Categoria.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Usuario(usuario_id=1, email="ana@test.com", nombre="Ana", tipo_usuario=TipoUsuario.CLIENTE, activo=True),
+        Rol(rol_id=1, nombre="CLIENTE", slug="cliente", tipo="SISTEMA", nivel=1),
+        Rol(rol_id=2, nombre="ADMIN_EMPRESA", slug="admin-empresa", tipo="EMPRESA", nivel=50),
+        Permiso(permiso_id=3, codigo="turno:crear:propio", nombre="Crear turno", categoria="turno"),
+        Permiso(permiso_id=70, codigo="servicios:crear", nombre="Crear servicio", categoria="servicios"),
+        RolPermiso(rol_id=1, permiso_id=3),
+        RolPermiso(rol_id=2, permiso_id=70),
+        CacheVersion(nombre="referencias", version=1),
+    ])
+    session.commit()
+    cache_referencias.limpiar()
+    evaluador_rbac.limpiar()
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    session.info["queries"] = queries
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Caché de principales propio del test, el que usa get_current_user"""
+    import app.core.principal_cache as modulo
+
+    cache = CachePrincipales(ttl_seconds=60, max_entradas=100)
+    monkeypatch.setattr(modulo, "cache_principales", cache)
+    monkeypatch.setattr("app.core.security.cache_principales", cache)
+    return cache
+
+
+class TestPoolHashing:
+
+    def test_hash_no_bloquea_el_event_loop(self):
+        # Arrange
+        pool = PoolHashing(workers=1, max_en_cola=4)
+
+        async def escenario():
+            ticks = 0
+
+            async def reloj():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tarea = asyncio.create_task(reloj())
+            # Act: una operación lenta en el pool mientras el loop sigue atendiendo
+            await pool.ejecutar(time.sleep, 0.2)
+            tarea.cancel()
+            return ticks
+
+        # Assert
+        try:
+            assert asyncio.run(escenario()) >= 5
+        finally:
+            pool.cerrar()
+
+    def test_rechaza_cuando_la_cola_esta_llena(self):
+        # Arrange: un worker ocupado y una operación esperando
+        pool = PoolHashing(workers=1, max_en_cola=1)
+        liberar = threading.Event()
+
+        async def escenario():
+            ocupada = asyncio.create_task(pool.ejecutar(liberar.wait, 5))
+            while pool.estadisticas()["en_curso"] == 0:
+                await asyncio.sleep(0.005)
+            en_cola = asyncio.create_task(pool.ejecutar(lambda: "ok"))
+            await asyncio.sleep(0)
+            profundidad = pool.estadisticas()["en_cola"]
+
+            # Act
+            with pytest.raises(PoolHashingSaturadoError):
+                await pool.ejecutar(lambda: "rechazada")
+
+            liberar.set()
+            return profundidad, await ocupada, await en_cola
+
+        # Assert
+        try:
+            profundidad, ocupada, en_cola = asyncio.run(escenario())
+            assert profundidad == 1
+            assert ocupada is True
+            assert en_cola == "ok"
+            estadisticas = pool.estadisticas()
+            assert estadisticas["rechazadas"] == 1
+            assert estadisticas["completadas"] == 2
+            assert estadisticas["en_cola"] == 0
+        finally:
+            liberar.set()
+            pool.cerrar()
+
+    def test_hash_y_verificacion_async(self):
+        async def escenario():
+            hashed = await get_password_hash_async("secreto123")
+            return (
+                await verify_password_async("secreto123", hashed),
+                await verify_password_async("otra", hashed),
+            )
+
+        assert asyncio.run(escenario()) == (True, False)
+
+
+class TestPerfilesHashing:
+
+    def test_hash_con_costo_anterior_se_actualiza(self):
+        # Arrange: hash hecho con un costo menor al del perfil vigente
+        anterior = crear_contexto_hashing("bcrypt", bcrypt_rounds=4)
+        vigente = crear_contexto_hashing("bcrypt", bcrypt_rounds=5)
+        hashed = anterior.hash("secreto123")
+
+        # Act
+        valida, nuevo_hash = vigente.verify_and_update("secreto123", hashed)
+
+        # Assert
+        assert valida is True
+        assert nuevo_hash.startswith("$2b$05$")
+        assert vigente.verify("secreto123", nuevo_hash)
+        assert vigente.verify_and_update("secreto123", nuevo_hash) == (True, None)
+
+    def test_password_incorrecta_no_actualiza(self):
+        anterior = crear_contexto_hashing("bcrypt", bcrypt_rounds=4)
+        vigente = crear_contexto_hashing("bcrypt", bcrypt_rounds=5)
+
+        assert vigente.verify_and_update("otra", anterior.hash("secreto123")) == (False, None)
+
+    def test_perfil_desconocido(self):
+        with pytest.raises(ValueError):
+            crear_contexto_hashing("md5")
+
+    @pytest.mark.skipif(argon2.has_backend(), reason="argon2-cffi instalado")
+    def test_argon2id_sin_backend_falla_al_crear_el_contexto(self):
+        with pytest.raises(RuntimeError):
+            crear_contexto_hashing("argon2id")
+
+
+class RedisEnMemoria:
+    """Las operaciones de redis.Redis que usa el caché de principales, en un dict"""
+
+    def __init__(self):
+        self.valores = {}
+
+    def mget(self, *claves):
+        return [self.valores.get(clave) for clave in claves]
+
+    def set(self, clave, valor, ex=None):
+        self.valores[clave] = valor
+
+    def incr(self, clave):
+        self.valores[clave] = str(int(self.valores.get(clave, 0)) + 1)
+
+    def expire(self, clave, segundos):
+        pass
+
+    def delete(self, *claves):
+        for clave in claves:
+            self.valores.pop(clave, None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+
+class TestCachePrincipales:
+
+    def test_segundo_request_no_consulta_la_base(self, db, cache):
+        # Arrange
+        cache.obtener(db, 1)
+        db.expunge_all()
+        db.info["queries"].clear()
+
+        # Act
+        principal = cache.obtener(db, 1)
+
+        # Assert
+        assert isinstance(principal, Principal)
+        assert (principal.usuario_id, principal.email, principal.tipo_usuario, principal.activo) == (
+            1, "ana@test.com", TipoUsuario.CLIENTE, True
+        )
+        assert db.info["queries"] == []
+        assert cache.estadisticas()["local"] == 1
+
+    def test_atributos_no_cacheados_cargan_la_fila(self, db, cache):
+        cache.obtener(db, 1)
+        db.expunge_all()
+        principal = cache.obtener(db, 1)
+        db.info["queries"].clear()
+
+        assert principal.nombre == "Ana"
+        assert principal.usuario is db.get(Usuario, 1)
+        assert len(db.info["queries"]) == 1
+
+    def test_desactivar_usuario_invalida_al_commitear(self, db, cache):
+        # Arrange
+        principal = cache.obtener(db, 1)
+
+        # Act: el endpoint modifica current_user y commitea
+        principal.activo = False
+        db.commit()
+        db.expunge_all()
+
+        # Assert
+        assert cache.obtener(db, 1).activo is False
+        assert cache.estadisticas()["invalidaciones"] == 1
+
+    def test_cambio_de_roles_invalida_al_commitear(self, db, cache):
+        cache.obtener(db, 1)
+
+        db.add(UsuarioRol(usuario_id=1, rol_id=1, activo=True))
+        db.commit()
+
+        assert cache.estadisticas()["invalidaciones"] == 1
+        assert cache.estadisticas()["entradas_locales"] == 0
+
+    def test_lectura_anterior_a_la_invalidacion_no_queda_en_redis(self, db):
+        # Arrange: dos workers con el mismo Redis
+        redis = RedisEnMemoria()
+        worker_a, worker_b = (
+            CachePrincipales(ttl_seconds=60, max_entradas=100, redis_url="redis://compartido")
+            for _ in range(2)
+        )
+        for worker in (worker_a, worker_b):
+            worker._redis._cliente = redis
+        invalidado = []
+
+        def desactivar_durante_la_query(*args):
+            # El usuario se desactiva en otro request (otro thread de A) mientras
+            # A lee la fila vieja
+            if not invalidado:
+                invalidado.append(True)
+                worker_a.invalidar(1)
+
+        event.listen(db.get_bind(), "before_cursor_execute", desactivar_durante_la_query)
+
+        # Act: A guarda lo que leyó antes de la invalidación
+        worker_a.obtener(db, 1)
+        event.remove(db.get_bind(), "before_cursor_execute", desactivar_durante_la_query)
+        db.expunge_all()
+        worker_b.obtener(db, 1)
+
+        # Assert: ni Redis ni el nivel local de A sirven la entrada vieja
+        assert "principal:1" in redis.valores
+        assert worker_b.estadisticas()["redis"] == 0
+        assert worker_b.estadisticas()["base"] == 1
+        assert worker_a.estadisticas()["entradas_locales"] == 0
+
+        # La entrada que guarda B (versión vigente) sí se usa
+        worker_c = CachePrincipales(ttl_seconds=60, max_entradas=100, redis_url="redis://compartido")
+        worker_c._redis._cliente = redis
+        worker_c.obtener(db, 1)
+        assert worker_c.estadisticas()["redis"] == 1
+
+    def test_redis_caido_no_impide_autenticar(self, db):
+        cache = CachePrincipales(ttl_seconds=60, max_entradas=100, redis_url="redis://127.0.0.1:1/0")
+
+        principal = cache.obtener(db, 1)
+
+        assert principal.email == "ana@test.com"
+        assert cache.estadisticas()["base"] == 1
+
+    def test_get_current_user_rechaza_usuario_inactivo(self, db, cache):
+        # Arrange
+        token = create_access_token({"sub": "1", "email": "ana@test.com", "tipo_usuario": "CLIENTE"})
+        credenciales = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        assert get_current_user(credenciales, db).usuario_id == 1
+
+        # Act
+        db.get(Usuario, 1).activo = False
+        db.commit()
+
+        # Assert
+        with pytest.raises(HTTPException) as error:
+            get_current_user(credenciales, db)
+        assert error.value.status_code == 401
+
+
+class TestVerificacionTokens:
+
+    def _verificador(self, max_entradas=100):
+        return VerificadorTokens(BackendJose(), "clave-de-test", "HS256", max_entradas)
+
+    def _token(self, verificador, vence_en_segundos=600, **extra):
+        exp = int(time.time()) + vence_en_segundos
+        return verificador.codificar({"sub": "1", "email": "ana@test.com", "exp": exp, **extra})
+
+    def test_token_repetido_no_se_decodifica_de_nuevo(self):
+        # Arrange
+        verificador = self._verificador()
+        token = self._token(verificador, tipo_usuario="CLIENTE")
+
+        # Act
+        primero = verificador.verificar(token)
+        segundo = verificador.verificar(token)
+
+        # Assert
+        assert primero.usuario_id == 1 and primero.tipo_usuario == "CLIENTE"
+        assert segundo is primero
+        assert verificador.estadisticas()["decodificados"] == 1
+        assert verificador.estadisticas()["aciertos"] == 1
+
+    def test_token_cacheado_vencido_se_rechaza(self, monkeypatch):
+        # Arrange
+        verificador = self._verificador()
+        token = self._token(verificador, vence_en_segundos=60)
+        verificador.verificar(token)
+
+        # Act: el reloj pasa el "exp"
+        ahora = time.time()
+        monkeypatch.setattr(time, "time", lambda: ahora + 120)
+
+        # Assert
+        with pytest.raises(TokenInvalidoError):
+            verificador.verificar(token)
+        assert verificador.estadisticas()["entradas"] == 0
+
+    def test_token_modificado_no_usa_el_cache(self):
+        # Arrange
+        verificador = self._verificador()
+        token = self._token(verificador)
+        verificador.verificar(token)
+        encabezado, _, firma = token.split(".")
+        otro = self._token(verificador, email="otro@test.com").split(".")[1]
+
+        # Act / Assert: payload de otro token con la firma del primero
+        with pytest.raises(TokenInvalidoError):
+            verificador.verificar(f"{encabezado}.{otro}.{firma}")
+
+    def test_lru_acotado_y_sin_cache(self):
+        acotado = self._verificador(max_entradas=2)
+        for vence in (600, 601, 602):
+            acotado.verificar(self._token(acotado, vence_en_segundos=vence))
+        assert acotado.estadisticas()["entradas"] == 2
+
+        sin_cache = self._verificador(max_entradas=0)
+        token = self._token(sin_cache)
+        sin_cache.verificar(token)
+        sin_cache.verificar(token)
+        assert sin_cache.estadisticas()["decodificados"] == 2
+
+    def test_token_sin_usuario_se_rechaza(self):
+        verificador = self._verificador()
+        token = verificador.codificar({"email": "ana@test.com"})
+
+        with pytest.raises(TokenInvalidoError):
+            verificador.verificar(token)
+
+    def test_create_access_token_y_get_current_user(self, db, cache):
+        token = create_access_token({"sub": "1", "email": "ana@test.com"}, timedelta(minutes=5))
+        credenciales = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        assert get_current_user(credenciales, db).usuario_id == 1
+        assert get_current_user(credenciales, db).usuario_id == 1
+
+    def test_backend_desconocido(self):
+        with pytest.raises(ValueError):
+            crear_backend_jwt("md5")
+
+
+@pytest.fixture
+def epocas(monkeypatch):
+    """Épocas de permisos en un dict (en producción viven en Redis) y claims habilitados"""
+    valores = {}
+    monkeypatch.setattr(permisos_token.settings, "JWT_PERMISOS_EN_TOKEN", True)
+    monkeypatch.setattr(permisos_token.epocas_permisos, "actual", lambda usuario_id: valores.get(usuario_id, 0))
+    return valores
+
+
+class TestPermisosEnToken:
+
+    def test_bits_ida_y_vuelta(self):
+        bits = (1 << 3) | (1 << 70) | (1 << 255)
+
+        assert decodificar_bits(codificar_bits(bits)) == bits
+        assert decodificar_bits(codificar_bits(0)) == 0
+
+    def test_semantica_de_empresa_igual_a_la_funcion_sql(self):
+        claims = {"g": codificar_bits(1 << 3), "e": {"5": codificar_bits(1 << 70)}}
+
+        # Sin empresa: cualquier rol; con empresa: esa empresa + globales
+        assert evaluar_claims(claims, 70) is True
+        assert evaluar_claims(claims, 70, empresa_id=5) is True
+        assert evaluar_claims(claims, 70, empresa_id=6) is False
+        assert evaluar_claims(claims, 3, empresa_id=6) is True
+
+    def test_claims_desde_las_asignaciones(self, db, epocas):
+        # Arrange
+        db.add_all([
+            UsuarioRol(usuario_id=1, rol_id=1, empresa_id=None, activo=True),
+            UsuarioRol(usuario_id=1, rol_id=2, empresa_id=5, activo=True),
+            UsuarioRol(usuario_id=1, rol_id=2, empresa_id=9, activo=False),
+        ])
+        db.commit()
+
+        # Act
+        claims = claims_permisos(1, db)
+
+        # Assert
+        assert decodificar_bits(claims["g"]) == 1 << 3
+        assert {k: decodificar_bits(v) for k, v in claims["e"].items()} == {"5": 1 << 70}
+        assert (claims["ep"], claims["rv"]) == (0, 1)
+
+    def test_claims_con_la_semantica_de_la_funcion_sql(self, db, epocas):
+        # Arrange: rol_permiso inactivo (la función lo ignora) y permiso inactivo
+        db.add_all([
+            Permiso(permiso_id=80, codigo="servicios:editar", nombre="Editar servicio", categoria="servicios"),
+            Permiso(permiso_id=81, codigo="servicios:borrar", nombre="Borrar servicio", categoria="servicios",
+                    activo=False),
+            RolPermiso(rol_id=2, permiso_id=80, activo=False),
+            RolPermiso(rol_id=2, permiso_id=81),
+            UsuarioRol(usuario_id=1, rol_id=2, empresa_id=5, activo=True),
+        ])
+        db.commit()
+        cache_referencias.limpiar()
+
+        # Act
+        bits = decodificar_bits(claims_permisos(1, db)["e"]["5"])
+
+        # Assert: mismos permisos que responde usuario_tiene_permiso
+        for codigo, permiso_id in (("servicios:crear", 70), ("servicios:editar", 80), ("servicios:borrar", 81)):
+            esperado = bool(db.execute(FUNCION_USUARIO_TIENE_PERMISO, {
+                "usuario_id": 1, "permiso_codigo": codigo, "empresa_id": 5
+            }).scalar())
+            assert bool((bits >> permiso_id) & 1) == esperado
+        assert bits == (1 << 70) | (1 << 80)
+
+    def test_token_con_epoca_vieja_va_a_la_base(self, db, epocas):
+        # Arrange
+        db.add(UsuarioRol(usuario_id=1, rol_id=2, empresa_id=5, activo=True))
+        db.commit()
+        token = create_access_token({"sub": "1", "email": "ana@test.com", "perm": claims_permisos(1, db)})
+        principal = get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+        db.info["queries"].clear()
+
+        # Act / Assert: vigente, se decide sin consultar la base
+        assert permiso_desde_token(principal, "servicios:crear", db, empresa_id=5) is True
+        assert permiso_desde_token(principal, "servicios:crear", db, empresa_id=6) is False
+        assert permiso_desde_token(principal, "permiso:inexistente", db) is False
+        assert db.info["queries"] == []
+
+        # assign_role/remove_role incrementan la época: el claim deja de valer
+        epocas[1] = 1
+        assert permiso_desde_token(principal, "servicios:crear", db, empresa_id=5) is None
+
+    def test_sin_redis_no_se_emiten_claims(self, db, monkeypatch):
+        monkeypatch.setattr(permisos_token.settings, "JWT_PERMISOS_EN_TOKEN", True)
+
+        assert claims_permisos(1, db) is None
+
+
+# Cuerpo de la función usuario_tiene_permiso de MySQL (migración 101939ee5e20)
+FUNCION_USUARIO_TIENE_PERMISO = text("""
+    SELECT COUNT(*) > 0 AS tiene_permiso
+    FROM usuario_rol ur
+    INNER JOIN rol r ON ur.rol_id = r.rol_id
+    INNER JOIN rol_permiso rp ON r.rol_id = rp.rol_id
+    INNER JOIN permiso p ON rp.permiso_id = p.permiso_id
+    WHERE ur.usuario_id = :usuario_id
+      AND p.codigo = :permiso_codigo
+      AND ur.activo = 1
+      AND r.activo = 1
+      AND p.activo = 1
+      AND (:empresa_id IS NULL OR ur.empresa_id = :empresa_id OR ur.empresa_id IS NULL)
+""")
+
+
+class TestEvaluadorRBAC:
+
+    def test_paridad_con_la_funcion_sql(self, db):
+        # Arrange: roles, permisos y asignaciones al azar (con inactivos en cada nivel)
+        azar = random.Random(2024)
+        db.query(RolPermiso).delete()
+        db.query(Permiso).delete()
+        db.query(Rol).delete()
+        roles = [
+            Rol(rol_id=i, nombre=f"ROL_{i}", slug=f"rol-{i}", tipo="EMPRESA", nivel=i, activo=azar.random() > 0.2)
+            for i in range(1, 9)
+        ]
+        permisos = [
+            Permiso(permiso_id=i, codigo=f"recurso:accion:{i}", nombre=f"P{i}", categoria="x",
+                    activo=azar.random() > 0.2)
+            for i in range(1, 41)
+        ]
+        db.add_all(roles + permisos)
+        db.add_all(
+            RolPermiso(rol_id=rol.rol_id, permiso_id=permiso.permiso_id, activo=azar.random() > 0.2)
+            for rol in roles for permiso in permisos if azar.random() < 0.3
+        )
+        for usuario_id in range(2, 12):
+            db.add(Usuario(usuario_id=usuario_id, email=f"u{usuario_id}@test.com", nombre="U",
+                           tipo_usuario=TipoUsuario.CLIENTE))
+            for _ in range(azar.randint(0, 4)):
+                db.add(UsuarioRol(
+                    usuario_id=usuario_id,
+                    rol_id=azar.randint(1, 8),
+                    empresa_id=azar.choice([None, 1, 2, 3]),
+                    activo=azar.random() > 0.25,
+                ))
+        db.commit()
+        cache_referencias.limpiar()
+        evaluador_rbac.limpiar()
+
+        codigos = [p.codigo for p in permisos] + ["no:existe"]
+        diferencias = []
+
+        # Act / Assert
+        for usuario_id in range(1, 13):
+            for codigo in codigos:
+                for empresa_id in (None, 1, 2, 3, 4):
+                    esperado = bool(db.execute(FUNCION_USUARIO_TIENE_PERMISO, {
+                        "usuario_id": usuario_id, "permiso_codigo": codigo, "empresa_id": empresa_id
+                    }).scalar())
+                    obtenido = evaluador_rbac.tiene_permiso(db, usuario_id, codigo, empresa_id)
+                    if obtenido != esperado:
+                        diferencias.append((usuario_id, codigo, empresa_id, esperado))
+
+        assert diferencias == []
+
+    def test_chequeos_sin_queries_y_cambio_de_roles(self, db):
+        # Arrange
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear", 5) is False
+        db.info["queries"].clear()
+
+        # Act: mismo chequeo repetido, sin ir a la base
+        for _ in range(100):
+            evaluador_rbac.tiene_permiso(db, 1, "servicios:crear", 5)
+        assert db.info["queries"] == []
+
+        # Assert: el commit de un UsuarioRol descarta las asignaciones cacheadas
+        db.add(UsuarioRol(usuario_id=1, rol_id=2, empresa_id=5, activo=True))
+        db.commit()
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear", 5) is True
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear", 6) is False
+
+    def test_cambio_de_permisos_por_sql_recarga_los_bits(self, db, monkeypatch):
+        import importlib.util
+        from pathlib import Path
+
+        # Arrange: triggers de la migración sobre la base de prueba
+        ruta = next((Path(__file__).parents[2] / "alembic" / "versions").glob("5e2b9c7a41d3_*.py"))
+        spec = importlib.util.spec_from_file_location("migracion_triggers", ruta)
+        migracion = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migracion)
+        monkeypatch.setattr(migracion.op, "execute", lambda sql: db.execute(text(sql)), raising=False)
+        migracion.upgrade()
+        db.commit()
+        monkeypatch.setattr(cache_referencias, "intervalo_verificacion", 0)
+        db.add(UsuarioRol(usuario_id=1, rol_id=1, activo=True))
+        db.commit()
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear") is False
+
+        # Act: alta de un permiso al rol por SQL, sin pasar por la aplicación
+        db.execute(text("INSERT INTO rol_permiso (rol_id, permiso_id) VALUES (1, 70)"))
+        db.commit()
+
+        # Assert
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear") is True
+
+        db.execute(text("UPDATE permiso SET activo = 0 WHERE permiso_id = 70"))
+        db.commit()
+        assert evaluador_rbac.tiene_permiso(db, 1, "servicios:crear") is False
+
+    def test_en_memoria_por_defecto_solo_con_redis(self, monkeypatch):
+        monkeypatch.setattr(settings, "RBAC_EVALUADOR_EN_MEMORIA", None)
+        monkeypatch.setattr(settings, "PERMISOS_EPOCA_REDIS_URL", None)
+        assert settings.rbac_evaluador_en_memoria is False
+
+        monkeypatch.setattr(settings, "PERMISOS_EPOCA_REDIS_URL", "redis://localhost:6379/0")
+        assert settings.rbac_evaluador_en_memoria is True
+
+        # Explícito: sin Redis se acepta la ventana de RBAC_ASIGNACIONES_TTL_SECONDS
+        monkeypatch.setattr(settings, "RBAC_EVALUADOR_EN_MEMORIA", True)
+        monkeypatch.setattr(settings, "PERMISOS_EPOCA_REDIS_URL", None)
+        assert settings.rbac_evaluador_en_memoria is True
+
+    @pytest.mark.parametrize("en_memoria", [True, False])
+    def test_listado_de_permisos_igual_a_los_chequeos(self, db, monkeypatch, en_memoria):
+        from app.auth.permissions import PermissionService
+
+        # Arrange: un permiso por rol_permiso inactivo (cuenta, como en la función SQL)
+        monkeypatch.setattr(settings, "RBAC_EVALUADOR_EN_MEMORIA", en_memoria)
+        db.add_all([
+            Permiso(permiso_id=80, codigo="servicios:editar", nombre="Editar servicio", categoria="servicios"),
+            RolPermiso(rol_id=2, permiso_id=80, activo=False),
+            UsuarioRol(usuario_id=1, rol_id=1, empresa_id=None, activo=True),
+            UsuarioRol(usuario_id=1, rol_id=2, empresa_id=5, activo=True),
+        ])
+        db.commit()
+        cache_referencias.limpiar()
+
+        # Act
+        permisos = PermissionService(db).obtener_permisos_usuario(1)
+
+        # Assert
+        codigos = [p["permiso_codigo"] for p in permisos]
+        assert codigos == ["servicios:crear", "servicios:editar", "turno:crear:propio"]
+        assert all(evaluador_rbac.tiene_permiso(db, 1, codigo) for codigo in codigos)
+        assert permisos[1] == {
+            "permiso_codigo": "servicios:editar", "permiso_nombre": "Editar servicio",
+            "recurso": "servicios", "accion": "editar",
+        }
@@ -0,0 +1,200 @@
+# tests/test_busqueda.py
+"""
+Tests unitarios del índice de búsqueda en memoria (fallback sin MySQL)
+- Normalización y prefijos
+- Filtro por categoría y paginación
+- Top-k por umbral equivalente a la evaluación exhaustiva
+"""
+
+import random
+from collections import namedtuple
+
+import pytest
+
+from app.services.busqueda_service import IndiceBusquedaTexto
+
+
+Fila = namedtuple("Fila", "empresa_id razon_social descripcion categoria_id")
+
+
+@pytest.fixture
+def indice():
+    """Índice con un catálogo chico de empresas"""
+    indice = IndiceBusquedaTexto()
+    indice.cargar([
+        (Fila(1, "Peluquería Ñandú", "Cortes y color", 1), ["Corte de pelo", "Tintura"]),
+        (Fila(2, "Barbería Central", "Barba y corte clásico", 1), ["Afeitado"]),
+        (Fila(3, "Veterinaria Norte", "Atención de mascotas", 2), ["Vacunación", "Baño"]),
+        (Fila(4, "Spa Aurora", "Masajes y relax", 3), ["Masaje descontracturante"]),
+    ])
+    return indice
+
+
+class TestIndiceBusquedaTexto:
+    """Tests del índice invertido"""
+
+    def test_busqueda_ignora_acentos_y_mayusculas(self, indice):
+        # Act
+        resultados, total = indice.buscar("PELUQUERIA nandu")
+
+        # Assert
+        assert total == 1
+        assert resultados[0][0] == 1
+
+    def test_busqueda_por_prefijo_y_servicio(self, indice):
+        """'vacu' encuentra a la veterinaria por su servicio 'Vacunación'"""
+        resultados, total = indice.buscar("vacu")
+
+        assert total == 1
+        assert resultados[0][0] == 3
+
+    def test_ranking_prioriza_razon_social(self, indice):
+        """'corte' aparece en servicios/descripción de 1 y 2; ambos deben salir"""
+        resultados, total = indice.buscar("corte")
+
+        assert total == 2
+        assert {empresa_id for empresa_id, _ in resultados} == {1, 2}
+        assert resultados[0][1] >= resultados[1][1]
+
+    def test_filtro_por_categoria(self, indice):
+        resultados, total = indice.buscar("corte masaje", categoria_id=3)
+
+        assert total == 1
+        assert resultados[0][0] == 4
+
+    def test_paginacion(self, indice):
+        pagina_1, total = indice.buscar("corte", offset=0, limit=1)
+        pagina_2, _ = indice.buscar("corte", offset=1, limit=1)
+
+        assert total == 2
+        assert pagina_1[0][0] != pagina_2[0][0]
+
+    def test_actualizacion_incremental(self, indice):
+        """Quitar y volver a agregar una empresa se refleja en la búsqueda"""
+        with indice._lock:
+            indice._quitar(4)
+
+        assert indice.buscar("spa")[1] == 0
+
+        fila = Fila(4, "Spa Aurora", "Masajes", 3)
+        frecuencias = indice._frecuencias(fila, [])
+        indice._longitud_total += sum(frecuencias.values())
+        indice._agregar(fila, frecuencias, longitud_media=5.0)
+
+        assert indice.buscar("spa")[0][0][0] == 4
+
+    def test_consulta_sin_terminos_utiles(self, indice):
+        assert indice.buscar("de la y") == ([], 0)
+
+
+class TestTopKUmbral:
+    """El corte por umbral debe devolver lo mismo que puntuar todo"""
+
+    def test_umbral_equivalente_a_exhaustivo(self):
+        # Arrange
+        rnd = random.Random(1234)
+        palabras = ["corte", "color", "barba", "uñas", "masaje", "spa", "pelo", "facial", "spinning"]
+        documentos = [
+            (
+                Fila(i, " ".join(rnd.choices(palabras, k=3)), " ".join(rnd.choices(palabras, k=6)), rnd.randint(1, 3)),
+                rnd.sample(palabras, k=2)
+            )
+            for i in range(1, 3001)
+        ]
+
+        exhaustivo = IndiceBusquedaTexto()
+        exhaustivo.UMBRAL_EXHAUSTIVO = 10 ** 9
+        exhaustivo.cargar(documentos)
+
+        por_umbral = IndiceBusquedaTexto()
+        por_umbral.UMBRAL_EXHAUSTIVO = 0
+        por_umbral.cargar(documentos)
+
+        # Act / Assert
+        for consulta, categoria_id, offset in [
+            ("corte", None, 0), ("corte color", None, 20), ("sp", None, 0),
+            ("masaje facial", 2, 0), ("pelo barba uñas", 1, 40),
+        ]:
+            esperado = exhaustivo.buscar(consulta, categoria_id, offset, 20)
+            obtenido = por_umbral.buscar(consulta, categoria_id, offset, 20)
+            assert obtenido == esperado, consulta
+
+
+FilaAuto = namedtuple(
+    "FilaAuto",
+    "empresa_id razon_social rating_promedio total_calificaciones categoria_id activa ciudad"
+)
+FilaCategoria = namedtuple("FilaCategoria", "categoria_id nombre")
+
+
+class TestIndiceAutocompletado:
+    """Tests del autocompletado por prefijo"""
+
+    @pytest.fixture
+    def autocompletado(self):
+        from app.services.autocompletado_service import IndiceAutocompletado
+
+        indice = IndiceAutocompletado()
+        indice.cargar(
+            [
+                FilaAuto(1, "Peluquería Sol", 4.0, 2, 1, True, "Córdoba"),
+                FilaAuto(2, "Peluquería Norte", 4.8, 40, 1, True, "Córdoba"),
+                FilaAuto(3, "Solárium Playa", None, 0, 2, True, "Rosario"),
+            ],
+            [FilaCategoria(1, "Peluquería"), FilaCategoria(2, "Estética")],
+        )
+        return indice
+
+    def test_prefijo_ordena_por_rating_bayesiano(self, autocompletado):
+        sugerencias = autocompletado.sugerir("PELU")
+
+        assert [s["id"] for s in sugerencias["empresa"]] == [2, 1]
+        assert sugerencias["categoria"][0]["texto"] == "Peluquería"
+
+    def test_prefijo_desde_palabra_interna_y_ciudad(self, autocompletado):
+        sugerencias = autocompletado.sugerir("cord")
+
+        assert sugerencias["ciudad"][0]["texto"] == "Córdoba"
+        assert sugerencias["ciudad"][0]["cantidad"] == 2
+        assert {s["id"] for s in autocompletado.sugerir("sol")["empresa"]} == {1, 3}
+
+    def test_baja_quita_empresa_y_ciudad_sin_empresas(self, autocompletado):
+        autocompletado.sugerir("ros")
+
+        with autocompletado._lock:
+            autocompletado._quitar_empresa(3)
+            autocompletado._invalidar_cache()
+
+        sugerencias = autocompletado.sugerir("ros")
+        assert sugerencias["ciudad"] == []
+        assert autocompletado.sugerir("sol", tipos={"empresa"})["empresa"][0]["id"] == 1
+
+    def test_prefijo_corto_rankea_todo_el_rango(self, monkeypatch):
+        """Con el rango por encima de MAX_CLAVES_RECORRIDAS el mejor rating no se pierde aunque sea el último alfabéticamente"""
+        import app.services.autocompletado_service as modulo
+
+        # Arrange: 300 empresas con "a"; la mejor calificada es la última por orden alfabético
+        azar = random.Random(7)
+        empresas = [
+            FilaAuto(i, f"A{i:03d} {azar.choice(['Sol', 'Norte', 'Centro'])}", round(azar.uniform(1, 4.5), 2),
+                     azar.randint(0, 30), i % 3, True, azar.choice(["Azul", "Arrecifes", "Bahía Blanca"]))
+            for i in range(1, 300)
+        ] + [FilaAuto(300, "Azz Estética", 5.0, 200, 1, True, "Azul")]
+        indice = modulo.IndiceAutocompletado()
+        indice.cargar(empresas, [FilaCategoria(0, "Almacén"), FilaCategoria(1, "Arte"), FilaCategoria(2, "Spa")])
+        esperado = {prefijo: indice.sugerir(prefijo, limite=5) for prefijo in ("a", "a0", "a1", "s", "n", "az")}
+
+        # Act: mismas consultas resueltas recorriendo el ranking
+        monkeypatch.setattr(modulo, "MAX_CLAVES_RECORRIDAS", 10)
+        indice._invalidar_cache()
+        obtenido = {prefijo: indice.sugerir(prefijo, limite=5) for prefijo in esperado}
+
+        # Assert
+        assert obtenido["a"]["empresa"][0]["id"] == 300
+        assert obtenido == esperado
+
+        # Después de una baja la lista por ranking sigue consistente
+        with indice._lock:
+            indice._quitar_empresa(300)
+            indice._invalidar_cache()
+        assert 300 not in {s["id"] for s in indice.sugerir("a")["empresa"]}
@@ -0,0 +1,144 @@
+# tests/test_conditional.py
+"""
+Tests de GET condicional (app/utils/conditional.py)
+- If-None-Match: comparación débil, listas y "*"
+- ConditionalGet: 304 con el ETag vigente, 200 después de un cambio
+- Last-Modified: no se envía si el recurso cambió en el segundo actual
+- empresa.version: cambia en cada UPDATE aunque sea en el mismo segundo
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+import app.models  # noqa: F401  (registra todos los modelos para las relaciones)
+from app.database import Base
+from app.models.empresa import Empresa
+from app.services.empresa_service import EmpresaService
+from app.utils.conditional import (
+    ConditionalGet, calcular_etag, etag_coincide, formatear_http_date, serializar_json
+)
+
+
+def crear_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(nombre.replace("_", "-").encode(), valor.encode()) for nombre, valor in headers.items()],
+    })
+
+
+class TestEtagCoincide:
+
+    def test_fuerte_y_debil_coinciden_con_comparacion_debil(self):
+        etag = calcular_etag(b"{}")
+
+        assert etag_coincide(crear_request(if_none_match=etag), etag)
+        assert etag_coincide(crear_request(if_none_match=f"W/{etag}"), etag)
+        assert etag_coincide(crear_request(if_none_match=etag), f"W/{etag}")
+
+    def test_lista_comodin_y_distintos(self):
+        etag = calcular_etag(b"{}")
+
+        assert etag_coincide(crear_request(if_none_match=f'"otro", {etag}'), etag)
+        assert etag_coincide(crear_request(if_none_match="*"), etag)
+        assert not etag_coincide(crear_request(if_none_match='"otro"'), etag)
+        assert not etag_coincide(crear_request(), etag)
+
+
+class TestConditionalGet:
+
+    def test_304_con_el_etag_vigente(self):
+        # Arrange
+        etags = ConditionalGet("test")
+        respuesta = etags.responder(crear_request(), 1, 7, {"nombre": "Peluquería"})
+        etag = respuesta.headers["etag"]
+
+        # Act: la sonda devuelve la misma versión
+        no_modificado = etags.verificar(crear_request(if_none_match=etag), 1, 7)
+
+        # Assert
+        assert respuesta.status_code == 200
+        assert etag == calcular_etag(serializar_json({"nombre": "Peluquería"}))
+        assert no_modificado.status_code == 304
+        assert no_modificado.headers["etag"] == etag
+
+    def test_200_despues_de_un_cambio(self):
+        # Arrange
+        etags = ConditionalGet("test")
+        etag = etags.responder(crear_request(), 1, 7, {"nombre": "Peluquería"}).headers["etag"]
+        request = crear_request(if_none_match=etag)
+
+        # Act: nueva versión, sin atajo; el contenido cambió
+        atajo = etags.verificar(request, 1, 8)
+        respuesta = etags.responder(request, 1, 8, {"nombre": "Barbería"})
+
+        # Assert
+        assert atajo is None
+        assert respuesta.status_code == 200
+        assert respuesta.headers["etag"] != etag
+
+    def test_sin_version_compara_el_cuerpo(self):
+        etags = ConditionalGet("test")
+        etag = etags.responder(crear_request(), "lista", None, [1, 2]).headers["etag"]
+
+        assert etags.verificar(crear_request(if_none_match=etag), "lista", None) is None
+        assert etags.responder(crear_request(if_none_match=etag), "lista", None, [1, 2]).status_code == 304
+        assert etags.responder(crear_request(if_none_match=etag), "lista", None, [1, 2, 3]).status_code == 200
+
+    def test_last_modified_del_segundo_actual_no_se_envia(self):
+        etags = ConditionalGet("test")
+        ahora = datetime.utcnow()
+        antes = ahora - timedelta(minutes=5)
+
+        assert "last-modified" not in etags.responder(crear_request(), 1, 1, {}, ahora).headers
+        assert etags.responder(crear_request(), 2, 1, {}, antes).headers["last-modified"] == \
+            formatear_http_date(antes)
+
+    def test_if_modified_since(self):
+        etags = ConditionalGet("test")
+        antes = datetime.utcnow() - timedelta(minutes=5)
+        etags.responder(crear_request(), 1, 1, {}, antes)
+
+        vigente = crear_request(if_modified_since=formatear_http_date(antes))
+        viejo = crear_request(if_modified_since=formatear_http_date(antes - timedelta(minutes=1)))
+        assert etags.verificar(vigente, 1, 1, antes).status_code == 304
+        assert etags.verificar(viejo, 1, 1, antes) is None
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Empresa.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add(Empresa(empresa_id=1, usuario_id=1, categoria_id=1, razon_social="Peluquería"))
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestVersionEmpresa:
+
+    def test_cada_escritura_incrementa_la_version(self, db):
+        # Arrange
+        version_inicial = EmpresaService.get_empresa_version(db, 1).version
+
+        # Act: flush del ORM, query.update y bulk por PK, todo en el mismo segundo
+        db.get(Empresa, 1).razon_social = "Barbería"
+        db.commit()
+        EmpresaService.marcar_actualizada(db, 1)
+        db.commit()
+        db.execute(update(Empresa), [{"empresa_id": 1, "latitud": -34.6, "longitud": -58.4}])
+        db.commit()
+
+        # Assert
+        assert version_inicial == 1
+        assert EmpresaService.get_empresa_version(db, 1).version == 4
+
+    def test_empresa_inexistente(self, db):
+        assert EmpresaService.get_empresa_version(db, 99) is None
@@ -0,0 +1,684 @@
+# tests/test_geocoding.py
+"""
+Tests de geocodificación
+- Normalización de direcciones (clave del caché)
+- Caché en dos niveles: memoria, base y resultados negativos
+- Caché inverso por celdas de grilla
+- Clientes HTTP compartidos por host
+- Single-flight contra un Georef falso local
+- Geocodificación en lote (bulk, checkpoint)
+- Circuit breaker y respaldo local (gazetteer)
+- Gazetteer: KD-tree, archivo incluido y validación por ciudad
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.geocoding_cache as modulo_cache
+import app.services.geocoding_service_new as modulo_servicio
+from app.database import Base
+from app.models.geocoding_cache import GeocodingCache
+from app.services.geocoding_cache import CacheGeocodificacion
+from app.services.geocoding_service_new import GeocodingService
+from app.utils.texto import normalizar_direccion
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cachés (directa e inversa) con la tabla geocoding_cache en SQLite en memoria"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[GeocodingCache.__table__])
+    monkeypatch.setattr(modulo_cache, "SessionLocal", sessionmaker(bind=engine))
+
+    cache = CacheGeocodificacion(
+        tipo="direccion",
+        max_entradas=2,
+        ttl=timedelta(days=1),
+        ttl_negativo=timedelta(hours=1),
+        desde_json=modulo_cache._resultado_direccion_desde_json
+    )
+    inversa = CacheGeocodificacion(
+        tipo="inversa",
+        max_entradas=100,
+        ttl=timedelta(days=1),
+        ttl_negativo=timedelta(hours=1)
+    )
+    monkeypatch.setattr(modulo_servicio, "cache_direcciones", cache)
+    monkeypatch.setattr(modulo_servicio, "cache_inversa", inversa)
+    cache.inversa = inversa
+    return cache
+
+
+class TestNormalizarDireccion:
+
+    def test_abreviaturas_y_puntuacion(self):
+        assert normalizar_direccion("Av. Gral. Paz 1.200, C.A.B.A.") == \
+            normalizar_direccion("Avenida General Paz 1200, Ciudad Autónoma de Buenos Aires")
+
+    def test_mayusculas_acentos_y_espacios(self):
+        assert normalizar_direccion("  CÓRDOBA   ") == "cordoba"
+
+    def test_abreviaturas_ambiguas_solo_en_contexto(self):
+        assert normalizar_direccion("Bs. As.") == "buenos aires"
+        assert normalizar_direccion("Bs As") == "buenos aires"
+        assert normalizar_direccion("Cap. Fed.") == "ciudad autonoma de buenos aires"
+        # "as" y "cap" sueltas no se tocan
+        assert normalizar_direccion("As de Copas 120") == "as de copas 120"
+        assert normalizar_direccion("Cap Sarmiento") == "cap sarmiento"
+
+
+class TestCacheGeocodificacion:
+
+    def test_memoria_base_y_negativos(self, cache):
+        async def escenario():
+            resultado = {"coordinates": (-34.6, -58.4), "validation": None, "raw_result": {}}
+            await cache.guardar("corrientes 1234", resultado)
+            await cache.guardar("calle inexistente 1", None)
+
+            # Memoria
+            assert await cache.obtener("corrientes 1234") == (True, resultado)
+
+            # Base (otro worker / reinicio): coordinates vuelve como tupla
+            cache.limpiar_memoria()
+            encontrado, desde_base = await cache.obtener("corrientes 1234")
+            assert encontrado and desde_base["coordinates"] == (-34.6, -58.4)
+
+            # Negativo
+            assert await cache.obtener("calle inexistente 1") == (True, None)
+            assert await cache.obtener("otra calle") == (False, None)
+
+        asyncio.run(escenario())
+
+        estadisticas = cache.estadisticas()
+        assert estadisticas["hits_memoria"] == 1
+        assert estadisticas["hits_base"] == 2
+        assert estadisticas["hits_negativos"] == 1
+        assert estadisticas["misses"] == 1
+        assert estadisticas["hit_ratio"] == 0.75
+
+    def test_memoria_devuelve_copias(self, cache):
+        async def escenario():
+            resultado = {"coordinates": (-34.6, -58.4), "validation": {"confidence": "high"}, "raw_result": {}}
+            await cache.guardar("corrientes 1234", resultado)
+            # El caller que guardó sigue usando su dict
+            resultado["validation"]["confidence"] = "modificado"
+
+            _, primero = await cache.obtener("corrientes 1234")
+            primero["validation"]["confidence"] = "otro caller"
+            _, segundo = await cache.obtener("corrientes 1234")
+            return segundo
+
+        assert asyncio.run(escenario())["validation"] == {"confidence": "high"}
+
+    def test_lru_descarta_la_menos_usada(self, cache):
+        cache.persistir = False
+
+        async def escenario():
+            for clave in ("a", "b"):
+                await cache.guardar(clave, {"clave": clave})
+            await cache.obtener("a")
+            await cache.guardar("c", {"clave": "c"})
+            return [(await cache.obtener(clave))[0] for clave in ("a", "b", "c")]
+
+        assert asyncio.run(escenario()) == [True, False, True]
+
+    def test_geocode_address_consulta_georef_una_vez(self, cache, monkeypatch):
+        llamadas = []
+
+        async def remoto(self, calle, numero=None, ciudad=None, provincia=None, codigo_postal=None):
+            llamadas.append(calle)
+            return None if calle == "Inexistente" else {"coordinates": (-34.6, -58.4)}
+
+        monkeypatch.setattr(GeocodingService, "_geocode_address_remoto", remoto)
+        servicio = GeocodingService()
+
+        async def escenario():
+            await servicio.geocode_address("Av. Corrientes", "1234", "CABA")
+            await servicio.geocode_address("avenida corrientes", "1234", "C.A.B.A.")
+            await servicio.geocode_address("Inexistente", "1", "CABA")
+            return await servicio.geocode_address("Inexistente", "1", "CABA")
+
+        assert asyncio.run(escenario()) is None
+        assert llamadas == ["Av. Corrientes", "Inexistente"]
+
+
+class TestClientesHTTP:
+
+    def test_un_cliente_reutilizado_por_host(self):
+        from app.core.http_client import RegistroClientesHTTP
+
+        registro = RegistroClientesHTTP()
+
+        async def escenario():
+            georef = registro.cliente("https://apis.datos.gob.ar/georef/api/direcciones")
+            assert registro.cliente("https://apis.datos.gob.ar/georef/api/ubicacion") is georef
+            assert registro.cliente("https://otro.example.com/api") is not georef
+
+            await registro.cerrar()
+            return georef
+
+        assert asyncio.run(escenario()).is_closed
+
+    def test_cliente_de_otro_loop_se_cierra(self):
+        import threading
+
+        from app.core.http_client import RegistroClientesHTTP
+
+        registro = RegistroClientesHTTP()
+        url = "https://apis.datos.gob.ar/georef/api/direcciones"
+
+        async def obtener():
+            return registro.cliente(url)
+
+        # Arrange: un cliente de un asyncio.run ya terminado y otro de un loop
+        # que sigue corriendo en otro thread
+        de_loop_terminado = asyncio.run(obtener())
+        loop_thread = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop_thread.run_forever, daemon=True)
+        thread.start()
+        de_otro_thread = asyncio.run_coroutine_threadsafe(obtener(), loop_thread).result(timeout=5)
+
+        # Act: el loop principal lo reemplaza
+        async def escenario():
+            nuevo = registro.cliente(url)
+            await asyncio.sleep(0.1)
+            await registro.cerrar()
+            return nuevo
+
+        nuevo = asyncio.run(escenario())
+        loop_thread.call_soon_threadsafe(loop_thread.stop)
+        thread.join(timeout=5)
+        loop_thread.close()
+
+        # Assert
+        assert de_loop_terminado.is_closed
+        assert de_otro_thread.is_closed
+        assert nuevo is not de_otro_thread and nuevo.is_closed
+
+
+@pytest.fixture
+def georef_falso():
+    """Servidor HTTP local que imita Georef y cuenta las consultas recibidas"""
+    import json
+    import threading
+    import time
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    llamadas = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ruta = self.path.split("?")[0]
+            llamadas[ruta] += 1
+            time.sleep(0.2)  # Latencia: las consultas concurrentes se superponen
+
+            if ruta == "/direcciones" and "Rota" in self.path:
+                self.send_response(500)
+                self.end_headers()
+                return
+
+            if ruta == "/direcciones":
+                cuerpo = {"direcciones": [{"ubicacion": {"lat": -34.6037, "lon": -58.3816}}]}
+            else:
+                cuerpo = {"ubicacion": {"calle": "Corrientes", "altura": 1234, "localidad": "CABA",
+                                        "provincia": "Ciudad Autónoma de Buenos Aires"}}
+            datos = json.dumps(cuerpo).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_POST(self):
+            """Consulta bulk: un resultado por dirección, en el mismo orden"""
+            llamadas["POST " + self.path] += 1
+            consultas = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["direcciones"]
+            if any("Rota" in c["direccion"] for c in consultas):
+                self.send_response(500)
+                self.end_headers()
+                return
+
+            resultados = [
+                {"direcciones": [] if "Inexistente" in c["direccion"] else
+                 [{"ubicacion": {"lat": -34.6037, "lon": -58.3816}}]}
+                for c in consultas
+            ]
+            datos = json.dumps({"resultados": resultados}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.llamadas = llamadas
+    yield servidor
+    servidor.shutdown()
+
+
+class TestSingleFlight:
+    """Requests concurrentes idénticos comparten una sola consulta a Georef"""
+
+    def test_geocodificacion_concurrente(self, cache, georef_falso):
+        servicio = GeocodingService()
+        servicio.GEOREF_BASE_URL = georef_falso.url
+
+        async def escenario():
+            directas = await asyncio.gather(*[
+                servicio.geocode_address("Av. Corrientes", "1234") for _ in range(20)
+            ])
+            inversas = await asyncio.gather(*[
+                servicio.reverse_geocode(-34.6037, -58.3816) for _ in range(20)
+            ])
+            return directas, inversas
+
+        directas, inversas = asyncio.run(escenario())
+
+        assert all(r["coordinates"] == (-34.6037, -58.3816) for r in directas)
+        assert all(r["calle"] == "Corrientes" for r in inversas)
+        assert georef_falso.llamadas["/direcciones"] == 1
+        assert georef_falso.llamadas["/ubicacion"] == 1
+
+    def test_error_compartido_sin_reintentos(self, cache, georef_falso):
+        from app.services.geocoding_service_new import GeocodingServiceError
+
+        servicio = GeocodingService()
+        servicio.GEOREF_BASE_URL = georef_falso.url
+
+        async def escenario():
+            return await asyncio.gather(
+                *[servicio.geocode_address("Rota", "1") for _ in range(10)],
+                return_exceptions=True
+            )
+
+        resultados = asyncio.run(escenario())
+
+        assert all(isinstance(r, GeocodingServiceError) for r in resultados)
+        assert georef_falso.llamadas["/direcciones"] == 1
+        # Los errores no quedan en el caché
+        assert cache.estadisticas()["entradas_memoria"] == 0
+
+
+@pytest.fixture
+def empresas_db():
+    """Empresas con dirección en SQLite en memoria"""
+    from app.models.direccion import Direccion
+    from app.models.empresa import Empresa
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Direccion.__table__, Empresa.__table__])
+    fabrica = sessionmaker(bind=engine)
+
+    db = fabrica()
+    datos = [
+        # empresa_id, calle, ciudad, latitud, requires_verification, activa
+        (1, "Corrientes", "CABA", None, False, True),
+        (2, "Inexistente", "CABA", None, False, True),
+        (3, "Florida", "CABA", -34.6, False, True),        # Ya geocodificada: no se toca
+        (4, "Corrientes", "Tigre", None, False, True),     # Coordenadas de CABA: baja confianza
+        (5, "Corrientes", "CABA", None, False, False),     # Inactiva
+        (6, "Florida", "CABA", -34.6, True, True),         # Pendiente de verificación
+    ]
+    for empresa_id, calle, ciudad, latitud, verificar, activa in datos:
+        db.add(Direccion(direccion_id=empresa_id, calle=calle, numero="100", ciudad=ciudad,
+                         provincia="Buenos Aires"))
+        db.add(Empresa(empresa_id=empresa_id, usuario_id=empresa_id, categoria_id=1,
+                       razon_social=f"Empresa {empresa_id}", direccion_id=empresa_id,
+                       latitud=latitud, longitud=None if latitud is None else -58.4,
+                       requires_verification=verificar, activa=activa))
+    db.commit()
+    db.close()
+    return fabrica
+
+
+class TestGeocodificacionLote:
+
+    def _geocodificador(self, georef_falso, empresas_db, checkpoint):
+        from app.services.geocodificacion_lote import GeocodificadorLote
+
+        servicio = GeocodingService()
+        servicio.GEOREF_BASE_URL = georef_falso.url
+        return GeocodificadorLote(
+            tamano_lote=2, concurrencia=2, checkpoint=str(checkpoint),
+            servicio=servicio, session_factory=empresas_db
+        )
+
+    def test_backfill_y_reanudacion(self, georef_falso, empresas_db, tmp_path):
+        from app.models.empresa import Empresa
+
+        # Arrange
+        checkpoint = tmp_path / "checkpoint.json"
+        geocodificador = self._geocodificador(georef_falso, empresas_db, checkpoint)
+
+        # Act
+        progreso = asyncio.run(geocodificador.ejecutar())
+
+        # Assert
+        assert progreso["procesadas"] == 4
+        assert progreso["ultimo_empresa_id"] == 6
+        assert georef_falso.llamadas["POST /direcciones"] == 2
+
+        db = empresas_db()
+        empresas = {e.empresa_id: e for e in db.query(Empresa).all()}
+        assert float(empresas[1].latitud) == pytest.approx(-34.6037)
+        assert not empresas[1].requires_verification
+        assert empresas[2].latitud is None and empresas[2].geocoding_confidence == "not_found"
+        assert empresas[3].geocoding_confidence is None
+        assert empresas[4].requires_verification and empresas[4].geocoding_confidence == "low"
+        assert empresas[5].latitud is None
+        db.close()
+
+        # Una nueva corrida sigue desde el checkpoint: no queda nada
+        assert asyncio.run(self._geocodificador(georef_falso, empresas_db, checkpoint).ejecutar())["procesadas"] == 0
+
+    def test_lote_fallido_no_avanza_checkpoint(self, georef_falso, empresas_db, tmp_path):
+        from app.models.direccion import Direccion
+
+        db = empresas_db()
+        db.get(Direccion, 1).calle = "Rota"
+        db.commit()
+        db.close()
+
+        checkpoint = tmp_path / "checkpoint.json"
+        progreso = asyncio.run(self._geocodificador(georef_falso, empresas_db, checkpoint).ejecutar())
+
+        assert progreso["lotes_fallidos"] == 1
+        assert progreso["procesadas"] == 2
+        assert progreso["ultimo_empresa_id"] is None
+        assert not checkpoint.exists()
+
+
+class TestCacheInversa:
+
+    def test_puntos_cercanos_comparten_celda(self):
+        from app.services.geocoding_cache import celda_coordenadas
+
+        clave, lat_centro, lng_centro = celda_coordenadas(-34.60371, -58.38161, 50)
+
+        # A pocos metros: misma celda; el centro queda dentro de la celda
+        assert celda_coordenadas(-34.60372, -58.38163, 50)[0] == clave
+        assert celda_coordenadas(lat_centro, lng_centro, 50)[0] == clave
+        # A ~200 m: otra celda; con otra grilla: otra clave
+        assert celda_coordenadas(-34.6055, -58.38161, 50)[0] != clave
+        assert celda_coordenadas(-34.60371, -58.38161, 100)[0] != clave
+
+    def test_paneo_del_mapa_no_repite_consultas(self, cache, georef_falso):
+        servicio = GeocodingService()
+        servicio.GEOREF_BASE_URL = georef_falso.url
+
+        async def escenario():
+            for desplazamiento in range(5):
+                await servicio.reverse_geocode(-34.60371 + desplazamiento * 0.000002, -58.38161)
+            # Otro worker (memoria vacía): resuelve desde la base
+            cache.inversa.limpiar_memoria()
+            return await servicio.reverse_geocode(-34.60371, -58.38161)
+
+        assert asyncio.run(escenario())["calle"] == "Corrientes"
+        assert georef_falso.llamadas["/ubicacion"] == 1
+        assert cache.inversa.estadisticas()["hits_base"] == 1
+
+
+class TestCircuitoGeoref:
+
+    def test_estados_del_circuito(self, monkeypatch):
+        from app.utils import circuit_breaker
+        from app.utils.circuit_breaker import ABIERTO, CERRADO, CircuitBreaker
+
+        reloj = [1000.0]
+        monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: reloj[0])
+        circuito = CircuitBreaker("prueba", umbral_fallos=2, segundos_abierto=30)
+
+        circuito.registrar_fallo()
+        assert circuito.permitir()
+        circuito.registrar_fallo()
+        assert circuito.estado == ABIERTO and not circuito.permitir()
+
+        # Semi-abierto: una sola prueba; si falla, vuelve a abrirse
+        reloj[0] += 31
+        assert circuito.permitir() and not circuito.permitir()
+        circuito.registrar_fallo()
+        assert circuito.estado == ABIERTO and not circuito.permitir()
+
+        reloj[0] += 31
+        assert circuito.permitir()
+        circuito.registrar_exito()
+        assert circuito.estado == CERRADO and circuito.permitir()
+
+    def test_cuerpo_invalido_en_la_prueba_semi_abierta(self, monkeypatch):
+        import httpx
+
+        from app.services.geocoding_service_new import GeocodingServiceError
+        from app.utils import circuit_breaker
+        from app.utils.circuit_breaker import ABIERTO, CERRADO, CircuitBreaker
+
+        # Arrange: circuito abierto; la prueba recibe un 200 que no es JSON
+        reloj = [1000.0]
+        monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: reloj[0])
+        respuestas = [b"<html>mantenimiento</html>", b'{"direcciones": []}']
+
+        def responder(request):
+            return httpx.Response(200, content=respuestas.pop(0))
+
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(responder))
+        monkeypatch.setattr(modulo_servicio.clientes_http, "cliente", lambda url: cliente)
+        servicio = GeocodingService()
+        servicio.circuito = CircuitBreaker("georef", umbral_fallos=1, segundos_abierto=30)
+        servicio.circuito.registrar_fallo()
+        reloj[0] += 31
+
+        async def escenario():
+            with pytest.raises(GeocodingServiceError):
+                await servicio._make_request("https://georef.test/direcciones")
+            estado_tras_prueba = servicio.circuito.estado
+
+            # Act: vence el plazo otra vez y la siguiente prueba responde bien
+            reloj[0] += 31
+            datos = await servicio._make_request("https://georef.test/direcciones")
+            await cliente.aclose()
+            return estado_tras_prueba, datos
+
+        estado_tras_prueba, datos = asyncio.run(escenario())
+
+        # Assert
+        assert estado_tras_prueba == ABIERTO
+        assert datos == {"direcciones": []}
+        assert servicio.circuito.estado == CERRADO
+
+    def test_respaldo_local_con_circuito_abierto(self, cache, georef_falso):
+        from app.services.geocoding_service_new import GeocodingServiceError
+        from app.utils.circuit_breaker import CircuitBreaker
+
+        servicio = GeocodingService()
+        servicio.GEOREF_BASE_URL = georef_falso.url
+        servicio.circuito = CircuitBreaker("georef", umbral_fallos=2, segundos_abierto=60)
+
+        async def escenario():
+            for numero in ("1", "2"):
+                with pytest.raises(GeocodingServiceError):
+                    await servicio.geocode_address("Rota", numero, "Tigre")
+            directa = await servicio.geocode_address("Rota", "3", "Tigre")
+            inversa = await servicio.reverse_geocode(-34.4261, -58.5797)
+            return directa, inversa
+
+        directa, inversa = asyncio.run(escenario())
+
+        assert directa["coordinates"] == (-34.4261, -58.5797)
+        assert directa["validation"]["confidence"] == "low"
+        assert inversa["ciudad"] == "Tigre" and inversa["provincia"] == "Buenos Aires"
+        assert inversa["confianza"] == "low"
+        # Con el circuito abierto no se consulta Georef ni se cachea el respaldo
+        assert georef_falso.llamadas["/direcciones"] == 2
+        assert georef_falso.llamadas["/ubicacion"] == 0
+        assert cache.estadisticas()["entradas_memoria"] == 0
+
+    def test_gazetteer_archivo_de_localidades(self, tmp_path):
+        from app.services.gazetteer import Gazetteer
+
+        archivo = tmp_path / "localidades.csv"
+        archivo.write_text(
+            "nombre,provincia,latitud,longitud\n"
+            "San Martín,Mendoza,-33.0810,-68.4681\n"
+            "San Martín,Buenos Aires,-34.5750,-58.5370\n",
+            encoding="utf-8"
+        )
+        gazetteer = Gazetteer()
+        assert gazetteer.cargar_archivo(str(archivo)) == 2
+
+        assert gazetteer.buscar("SAN MARTIN", "Buenos Aires").latitud == -34.5750
+        assert gazetteer.buscar("san martín").provincia == "Mendoza"
+        localidad, distancia = gazetteer.mas_cercana(-33.09, -68.47)
+        assert localidad.provincia == "Mendoza" and distancia < 2
+
+
+class TestGazetteer:
+
+    def test_kdtree_igual_a_busqueda_lineal(self):
+        import numpy as np
+        from app.utils.kdtree import KDTree
+
+        # Arrange: puntos con repetidos (empates) y hojas chicas para forzar niveles
+        generador = np.random.default_rng(7)
+        puntos = generador.random((500, 3))
+        puntos[::10] = puntos[3]
+        arbol = KDTree(puntos, tamano_hoja=4)
+
+        for consulta in generador.random((200, 3)):
+            # Act
+            indice, distancia = arbol.mas_cercano(consulta)
+
+            # Assert: mismo índice que argmin (el primero ante empates)
+            distancias = np.sqrt(((puntos - consulta) ** 2).sum(axis=1))
+            assert indice == int(np.argmin(distancias))
+            assert distancia == pytest.approx(distancias.min())
+        assert arbol.mas_cercano(puntos[3])[0] == 0
+
+    def test_archivo_incluido_cubre_el_pais(self):
+        from app.services.gazetteer import obtener_gazetteer
+
+        gazetteer = obtener_gazetteer()
+
+        # Fuera del GBA, sin acentos y con provincia para desambiguar
+        assert gazetteer.buscar("cordoba", "Córdoba").latitud == pytest.approx(-31.42, abs=0.01)
+        assert gazetteer.buscar("Merlo", "San Luis").provincia == "San Luis"
+        assert gazetteer.buscar("Merlo").provincia == "Buenos Aires"
+        # Alias de CITY_CENTERS
+        assert gazetteer.buscar("Capital Federal").latitud == -34.6037
+
+        localidad, distancia = gazetteer.mas_cercana(-38.96, -68.06)
+        assert localidad.nombre == "Neuquén" and distancia < 2
+
+    def test_con_provincia_no_devuelve_homonimos_de_otra(self):
+        from app.services.gazetteer import obtener_gazetteer
+
+        gazetteer = obtener_gazetteer()
+
+        # Merlo existe en Buenos Aires y San Luis, no en Neuquén
+        assert gazetteer.buscar("Merlo", "Neuquén") is None
+        assert gazetteer.buscar("Merlo", "Provincia inventada") is None
+        assert gazetteer.buscar("Merlo", "Pcia. de San Luis").provincia == "San Luis"
+        assert gazetteer.buscar("Ushuaia", "Tierra del Fuego").latitud == pytest.approx(-54.80, abs=0.01)
+        # Los alias sin provincia valen con cualquier provincia
+        assert gazetteer.buscar("Capital Federal", "Ciudad Autónoma de Buenos Aires").latitud == -34.6037
+
+    def test_localidad_fuera_del_archivo(self, monkeypatch):
+        import app.services.gazetteer as modulo
+        from app.services.gazetteer import Gazetteer, Localidad
+        from app.services.geo_validation_service import GeoValidationService
+
+        # Arrange: gazetteer sin la localidad buscada
+        parcial = Gazetteer()
+        parcial.cargar([Localidad("Neuquén", "Neuquén", -38.9516, -68.0591)])
+        monkeypatch.setattr(modulo, "_gazetteer", parcial)
+        servicio = GeocodingService()
+
+        # Act
+        respaldo = servicio._geocode_address_local("Villa Traful", "Neuquén")
+        validacion = GeoValidationService().validate_coordinates_for_city(-40.65, -71.40, "Villa Traful", "Neuquén")
+
+        # Assert: sin respaldo ni validación, en lugar de la ubicación de otra localidad
+        assert respaldo is None
+        assert validacion["valid"] is None and validacion["requires_manual_review"]
+
+    def test_descarga_paginada_de_localidades(self, tmp_path):
+        import httpx
+        from app.services.gazetteer import Gazetteer, Localidad, descargar_localidades
+
+        # Arrange: API de datos.gob.ar falsa con 5 localidades
+        listado = [
+            {"nombre": f"Localidad {i}", "provincia": {"nombre": "Neuquén"},
+             "centroide": {"lat": -38.0 - i / 10, "lon": -68.0}}
+            for i in range(5)
+        ]
+        pedidos = []
+
+        def responder(request):
+            inicio, maximo = int(request.url.params["inicio"]), int(request.url.params["max"])
+            pedidos.append(inicio)
+            pagina = listado[inicio:inicio + maximo]
+            return httpx.Response(200, json={
+                "cantidad": len(pagina), "inicio": inicio, "total": len(listado), "localidades": pagina
+            })
+
+        # Act
+        with httpx.Client(transport=httpx.MockTransport(responder)) as cliente:
+            localidades = descargar_localidades("https://georef.test/localidades", por_pagina=2, cliente=cliente)
+        gazetteer = Gazetteer()
+        gazetteer.cargar(localidades)
+        gazetteer.guardar_archivo(str(tmp_path / "localidades.csv.gz"))
+        copia = Gazetteer()
+
+        # Assert
+        assert pedidos == [0, 2, 4]
+        assert copia.cargar_archivo(str(tmp_path / "localidades.csv.gz")) == 5
+        assert copia.buscar("localidad 4", "Neuquén") == Localidad("Localidad 4", "Neuquén", -38.4, -68.0)
+
+    def test_validacion_fuera_del_gba(self):
+        from app.services.geo_validation_service import GeoValidationService
+
+        servicio = GeoValidationService()
+
+        # Act: coordenadas correctas de Rosario, y de Rosario cargadas como Córdoba
+        correcta = servicio.validate_geocoding_result((-32.95, -60.65), {"ciudad": "Rosario", "provincia": "Santa Fe"})
+        incorrecta = servicio.validate_geocoding_result((-32.95, -60.65), {"ciudad": "Córdoba", "provincia": "Córdoba"})
+
+        # Assert
+        assert correcta["confidence"] == "high"
+        assert incorrecta["confidence"] == "low"
+        assert incorrecta["validation"]["closest_city"]["name"] == "Rosario"
+
+    def test_archivo_comprimido_ida_y_vuelta(self, tmp_path):
+        import gzip
+        import json
+        from app.services.gazetteer import Gazetteer, Localidad
+
+        # Arrange: JSON comprimido en el formato de datos.gob.ar
+        fuente = tmp_path / "localidades.json.gz"
+        with gzip.open(fuente, "wt", encoding="utf-8") as archivo:
+            json.dump({"localidades": [
+                {"nombre": "Ushuaia", "provincia": {"nombre": "Tierra del Fuego"},
+                 "centroide": {"lat": -54.8019, "lon": -68.3030}},
+                {"nombre": "Ushuaia", "provincia": {"nombre": "Tierra del Fuego"},
+                 "centroide": {"lat": -54.8, "lon": -68.3}},
+            ]}, archivo)
+        gazetteer = Gazetteer()
+
+        # Act
+        agregadas = gazetteer.cargar_archivo(str(fuente))
+        gazetteer.guardar_archivo(str(tmp_path / "salida.csv.gz"))
+        copia = Gazetteer()
+        copia.cargar_archivo(str(tmp_path / "salida.csv.gz"))
+
+        # Assert: la repetida se omite y el CSV comprimido conserva los datos
+        assert agregadas == 1
+        assert copia.buscar("USHUAIA") == Localidad("Ushuaia", "Tierra del Fuego", -54.8019, -68.303)
@@ -0,0 +1,476 @@
+# tests/test_indice_geografico.py
+"""
+Tests del índice geoespacial en memoria
+- Mismos resultados que la consulta SQL por bounding box + Haversine
+- Actualización incremental (coordenadas, baja)
+- k más cercanas
+- Clusters de mapa por viewport
+- Paginación por cursor de distancia
+- Empresas cercanas con disponibilidad (carga en lote)
+"""
+
+import random
+
+import pytest
+from sqlalchemy import and_, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registra todos los modelos para las relaciones)
+from app.database import Base
+from app.models.empresa import Empresa
+from app.services.geolocation_service import GeolocationService
+from app.services.indice_geografico import IndiceGeografico
+
+
+def buscar_con_sql(db, latitud, longitud, radio_km, categoria_id=None, limit=50):
+    """Implementación por consulta SQL (la que reemplaza el índice)"""
+    min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(latitud, longitud, radio_km)
+    query = db.query(Empresa).filter(
+        and_(
+            Empresa.activa == True,
+            Empresa.latitud.isnot(None),
+            Empresa.longitud.isnot(None),
+            Empresa.latitud.between(min_lat, max_lat),
+            Empresa.longitud.between(min_lng, max_lng)
+        )
+    )
+    if categoria_id:
+        query = query.filter(Empresa.categoria_id == categoria_id)
+
+    resultados = []
+    for empresa in query.order_by(Empresa.empresa_id).all():
+        distancia = GeolocationService.calculate_distance(
+            latitud, longitud, float(empresa.latitud), float(empresa.longitud)
+        )
+        if distancia <= radio_km:
+            resultados.append({
+                "empresa_id": empresa.empresa_id,
+                "nombre": empresa.razon_social,
+                "descripcion": empresa.descripcion,
+                "latitud": float(empresa.latitud),
+                "longitud": float(empresa.longitud),
+                "distancia_km": distancia,
+                "categoria_id": empresa.categoria_id,
+                "rating_promedio": float(empresa.rating_promedio) if empresa.rating_promedio is not None else None,
+            })
+    resultados.sort(key=lambda x: x["distancia_km"])
+    return resultados[:limit]
+
+
+@pytest.fixture
+def db():
+    """SQLite en memoria con empresas alrededor de Buenos Aires"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Empresa.__table__])
+    session = sessionmaker(bind=engine)()
+
+    rnd = random.Random(31)
+    for empresa_id in range(1, 1501):
+        sin_coordenadas = rnd.random() < 0.05
+        session.add(Empresa(
+            empresa_id=empresa_id,
+            usuario_id=empresa_id,
+            categoria_id=rnd.randint(1, 4),
+            razon_social=f"Empresa {empresa_id}",
+            descripcion=None,
+            latitud=None if sin_coordenadas else round(-34.6 + rnd.uniform(-0.6, 0.6), 6),
+            longitud=None if sin_coordenadas else round(-58.45 + rnd.uniform(-0.6, 0.6), 6),
+            activa=rnd.random() > 0.1,
+            rating_promedio=rnd.choice([None, round(rnd.uniform(1, 5), 2)]),
+            total_calificaciones=rnd.randint(0, 30),
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestIndiceGeografico:
+
+    def test_resultados_identicos_a_sql(self, db):
+        # Arrange
+        indice = IndiceGeografico()
+        indice.construir(db)
+        rnd = random.Random(5)
+
+        # Act / Assert
+        for _ in range(40):
+            latitud = -34.6 + rnd.uniform(-0.7, 0.7)
+            longitud = -58.45 + rnd.uniform(-0.7, 0.7)
+            radio_km = rnd.choice([0.5, 2, 5, 10, 25, 100])
+            categoria_id = rnd.choice([None, 1, 3])
+
+            esperado = buscar_con_sql(db, latitud, longitud, radio_km, categoria_id)
+            obtenido = indice.buscar_radio(latitud, longitud, radio_km, categoria_id)
+            assert obtenido == esperado
+
+    def test_actualizacion_incremental(self, db):
+        indice = IndiceGeografico()
+        indice.construir(db)
+
+        empresa = db.get(Empresa, 1)
+        empresa.activa = True
+        empresa.latitud, empresa.longitud = -31.4201, -64.1888  # Córdoba
+        db.get(Empresa, 2).activa = False
+        db.commit()
+        indice.actualizar(db, [1, 2])
+
+        cercanas = indice.buscar_radio(-31.4201, -64.1888, 1)
+        assert [e["empresa_id"] for e in cercanas] == [1]
+        assert 2 not in indice._posiciones
+        assert indice.buscar_radio(-34.6, -58.45, 100, limit=5000) == buscar_con_sql(db, -34.6, -58.45, 100, limit=5000)
+
+    def test_busqueda_en_base_igual_al_indice(self, db):
+        """Camino sin índice en memoria (SQLite: bounding box + Haversine)"""
+        indice = IndiceGeografico()
+        indice.construir(db)
+
+        for ordenar_por in ("distancia", "relevancia"):
+            for categoria_id in (None, 2):
+                esperado = indice.buscar_radio(-34.6, -58.45, 15, categoria_id, 30, ordenar_por)
+                obtenido = GeolocationService.find_nearby_empresas_db(
+                    db, -34.6, -58.45, 15, categoria_id, 30, ordenar_por
+                )
+                assert obtenido == esperado
+
+    def test_mas_cercanas(self, db):
+        indice = IndiceGeografico()
+        indice.construir(db)
+
+        cercanas = indice.mas_cercanas(-34.6, -58.45, k=7)
+        todas = buscar_con_sql(db, -34.6, -58.45, 200, limit=5000)
+
+        assert [e["empresa_id"] for e in cercanas] == [e["empresa_id"] for e in todas[:7]]
+
+
+class TestGeoVectorial:
+    """Distancias y top-k vectorizados"""
+
+    def test_haversine_igual_a_calculo_escalar(self):
+        import numpy as np
+        from app.utils.geo_vectorial import haversine_km
+
+        rnd = random.Random(3)
+        latitudes = np.array([rnd.uniform(-55, -21) for _ in range(500)])
+        longitudes = np.array([rnd.uniform(-73, -53) for _ in range(500)])
+
+        distancias = haversine_km(-34.6, -58.4, latitudes, longitudes)
+
+        escalares = [
+            GeolocationService.calculate_distance(-34.6, -58.4, lat, lng)
+            for lat, lng in zip(latitudes, longitudes)
+        ]
+        assert np.allclose(distancias, escalares, atol=0.01)
+
+    def test_k_menores_equivale_a_ordenar_todo_con_empates(self):
+        import numpy as np
+        from app.utils.geo_vectorial import k_menores
+
+        rnd = random.Random(8)
+        valores = np.array([rnd.randint(0, 20) for _ in range(300)], dtype=np.float64)
+        ids = np.arange(300)[::-1].copy()
+
+        for k in (1, 5, 37, 300, 400):
+            esperado = sorted(range(300), key=lambda i: (valores[i], ids[i]))[:k]
+            assert list(k_menores(valores, k, desempate=ids)) == esperado
+
+    def test_relevancia_favorece_mejor_rating_a_igual_distancia(self):
+        indice = IndiceGeografico()
+        Fila = __import__("collections").namedtuple(
+            "Fila", "empresa_id razon_social descripcion categoria_id latitud longitud "
+                    "rating_promedio total_calificaciones"
+        )
+        indice.cargar([
+            Fila(1, "Cerca sin rating", None, 1, -34.600, -58.450, None, 0),
+            Fila(2, "Algo más lejos muy buena", None, 1, -34.603, -58.450, 4.9, 120),
+            Fila(3, "Cerca mala", None, 1, -34.601, -58.450, 1.5, 40),
+        ])
+
+        por_distancia = indice.buscar_radio(-34.6, -58.45, 5)
+        por_relevancia = indice.buscar_radio(-34.6, -58.45, 5, ordenar_por="relevancia")
+
+        assert [e["empresa_id"] for e in por_distancia] == [1, 3, 2]
+        assert [e["empresa_id"] for e in por_relevancia] == [2, 1, 3]
+
+
+class TestMapaViewport:
+
+    def test_clusters_suman_las_empresas_del_viewport(self, db):
+        # Arrange
+        indice = IndiceGeografico()
+        indice.construir(db)
+        viewport = (-35.0, -34.2, -58.9, -58.0)
+        esperadas = {
+            e.empresa_id for e in db.query(Empresa).filter(
+                Empresa.activa == True, Empresa.latitud.between(-35.0, -34.2),
+                Empresa.longitud.between(-58.9, -58.0)
+            )
+        }
+
+        # Act
+        mapa = indice.agrupar(*viewport, zoom=9, max_puntos=50)
+
+        # Assert
+        assert mapa["modo"] == "clusters"
+        assert mapa["total"] == len(esperadas)
+        assert sum(c["cantidad"] for c in mapa["clusters"]) == len(esperadas)
+        assert len(mapa["clusters"]) < len(esperadas) / 10
+        for cluster in mapa["clusters"]:
+            assert -35.0 <= cluster["latitud"] <= -34.2 and -58.9 <= cluster["longitud"] <= -58.0
+
+    def test_puntos_con_zoom_alto(self, db):
+        indice = IndiceGeografico()
+        indice.construir(db)
+
+        mapa = indice.agrupar(-34.62, -34.58, -58.47, -58.43, zoom=16)
+
+        assert mapa["modo"] == "puntos"
+        assert [p["empresa_id"] for p in mapa["puntos"]] == sorted(
+            e.empresa_id for e in db.query(Empresa).filter(
+                Empresa.activa == True, Empresa.latitud.between(-34.62, -34.58),
+                Empresa.longitud.between(-58.47, -58.43)
+            )
+        )
+
+    def test_zoom_alto_con_viewport_enorme_agrupa(self, db):
+        # Arrange: todo el país con zoom de calle
+        indice = IndiceGeografico()
+        indice.construir(db)
+        total = db.query(Empresa).filter(Empresa.activa == True, Empresa.latitud.isnot(None)).count()
+
+        # Act
+        mapa = indice.agrupar(-56.0, -21.0, -74.0, -53.0, zoom=18, max_puntos=10, max_marcadores=100)
+
+        # Assert
+        assert total > 100
+        assert mapa["modo"] == "clusters"
+        assert mapa["total"] == total
+        assert sum(c["cantidad"] for c in mapa["clusters"]) == total
+        assert len(mapa["clusters"]) <= (10 + 1) ** 2
+
+    def test_camino_sin_indice_en_memoria(self, db, monkeypatch):
+        from app.config import settings
+
+        indice = IndiceGeografico()
+        indice.construir(db)
+        monkeypatch.setattr(settings, "GEO_INDICE_EN_MEMORIA", False)
+
+        obtenido = GeolocationService.agrupar_en_viewport(db, -35.0, -34.2, -58.9, -58.0, zoom=10)
+
+        assert obtenido == indice.agrupar(
+            -35.0, -34.2, -58.9, -58.0, zoom=10,
+            max_puntos=settings.MAPA_MAX_PUNTOS, zoom_puntos=settings.MAPA_ZOOM_PUNTOS,
+            max_marcadores=settings.MAPA_MAX_MARCADORES
+        )
+        assert len(GeolocationService.get_empresas_in_bounds(db, -35.0, -34.2, -58.9, -58.0)) == obtenido["total"]
+
+
+class TestPaginacionPorDistancia:
+
+    @pytest.mark.parametrize("en_memoria", [True, False])
+    def test_paginas_concatenadas_igual_a_busqueda_completa(self, db, monkeypatch, en_memoria):
+        from app.config import settings
+        from app.services import geolocation_service as modulo
+
+        # Arrange
+        indice = IndiceGeografico()
+        indice.construir(db)
+        monkeypatch.setattr(modulo, "indice_geografico", indice)
+        monkeypatch.setattr(settings, "GEO_INDICE_EN_MEMORIA", en_memoria)
+
+        for radio_km, categoria_id, limit in ((60, None, 37), (25, 2, 10), (3, None, 50)):
+            esperado = indice.buscar_radio(-34.6, -58.45, radio_km, categoria_id, limit=5000)
+
+            # Act
+            obtenido, cursor, paginas = [], None, 0
+            while True:
+                pagina, cursor = GeolocationService.find_nearby_empresas_pagina(
+                    db, -34.6, -58.45, radio_km, categoria_id, limit, cursor
+                )
+                obtenido.extend(pagina)
+                paginas += 1
+                if cursor is None:
+                    break
+
+            # Assert
+            assert obtenido == esperado
+            assert paginas == max(1, -(-len(esperado) // limit))
+
+    def test_pagina_lejana_recorre_solo_el_anillo(self):
+        from collections import namedtuple
+
+        # Arrange: grilla densa de 4 x 4 grados, varias empresas por celda
+        Fila = namedtuple("Fila", "empresa_id razon_social descripcion categoria_id latitud longitud "
+                                  "rating_promedio total_calificaciones")
+        filas = [
+            Fila(i * 80 + j + 1, f"Empresa {i * 80 + j + 1}", None, 1,
+                 -36.6 + i * 0.05 + 0.013, -60.45 + j * 0.05 + 0.021, None, 0)
+            for i in range(80) for j in range(80)
+        ]
+
+        class CeldasContadas(dict):
+            visitas = 0
+
+            def get(self, celda, default=None):
+                CeldasContadas.visitas += 1
+                return super().get(celda, default)
+
+            def items(self):
+                CeldasContadas.visitas += len(self)
+                return super().items()
+
+        indice = IndiceGeografico()
+        indice.cargar(filas)
+        indice._celdas = CeldasContadas(indice._celdas)
+        todas = indice.buscar_radio(-34.6, -58.45, 150, limit=100000)
+
+        visitas = {}
+        for distancia in (0.0, 50.0, 140.0):
+            cursor = (distancia, 0) if distancia else None
+            CeldasContadas.visitas = 0
+
+            # Act
+            pagina = indice.pagina_por_distancia(-34.6, -58.45, 150, limit=20, despues_de=cursor)
+
+            # Assert
+            assert pagina == [r for r in todas if cursor is None or (r["distancia_km"], r["empresa_id"]) > cursor][:20]
+            visitas[distancia] = CeldasContadas.visitas
+
+        # El bounding box del disco de 140 km tiene unas 800 celdas; el
+        # costo crece con el perímetro del anillo, no con el área del disco
+        min_lat, max_lat, min_lng, max_lng = GeolocationService.get_bounding_box(-34.6, -58.45, 140)
+        celdas_disco = ((max_lat - min_lat) / 0.1) * ((max_lng - min_lng) / 0.1)
+        assert visitas[140.0] < celdas_disco / 2
+        assert visitas[0.0] < visitas[50.0] < visitas[140.0] < visitas[50.0] * 140 / 50
+
+    def test_cursor_invalido(self, db):
+        with pytest.raises(ValueError):
+            GeolocationService.find_nearby_empresas_pagina(db, -34.6, -58.45, cursor="no-es-un-cursor")
+
+
+class TestDisponibilidadCercana:
+
+    @pytest.fixture
+    def agenda(self, db, monkeypatch):
+        """Horarios, servicios y turnos para las empresas cerca de (-34.6, -58.45)"""
+        from datetime import date, time
+        from app.enums import DiaSemana, EstadoTurno
+        from app.models.horario_empresa import HorarioEmpresa
+        from app.models.servicio import Servicio
+        from app.models.turno import Turno
+        from app.services import geolocation_service as modulo
+
+        Base.metadata.create_all(
+            db.get_bind(), tables=[HorarioEmpresa.__table__, Servicio.__table__, Turno.__table__]
+        )
+        indice = IndiceGeografico()
+        indice.construir(db)
+        monkeypatch.setattr(modulo, "indice_geografico", indice)
+
+        fecha = date(2030, 6, 11)  # martes
+        rnd = random.Random(5)
+        for empresa in indice.buscar_radio(-34.6, -58.45, 8, limit=5000):
+            empresa_id = empresa["empresa_id"]
+            if rnd.random() < 0.2:
+                continue  # sin horario ese día
+            apertura, cierre = rnd.choice([(time(9), time(18)), (time(14), time(20)), (time(8), time(13))])
+            db.add(HorarioEmpresa(empresa_id=empresa_id, dia_semana=DiaSemana.MARTES,
+                                  hora_apertura=apertura, hora_cierre=cierre, activo=True))
+            for nombre, duracion in (("Corte de pelo", 30), ("Color", 90)):
+                db.add(Servicio(servicio_id=empresa_id * 10 + duracion, empresa_id=empresa_id,
+                                nombre=nombre, duracion_minutos=duracion, precio=1000, activo=True))
+            # Turnos ocupados en la franja de la tarde
+            for hora in rnd.sample([time(16, 30), time(17), time(17, 30), time(18)], rnd.randint(0, 4)):
+                db.add(Turno(empresa_id=empresa_id, cliente_id=1, servicio_id=empresa_id * 10 + 30,
+                             fecha=fecha, hora=hora, estado=EstadoTurno.CONFIRMADO))
+        db.commit()
+        return fecha
+
+    def test_igual_a_disponibilidad_por_empresa(self, db, agenda):
+        from datetime import time
+        from app.services.disponibilidad_cercana_service import DisponibilidadCercanaService
+        from app.services.turno_service import TurnoService
+
+        # Arrange: camino anterior, una consulta de disponibilidad por empresa
+        desde, hasta = time(17), time(18)
+        turno_service = TurnoService(db)
+        esperado = []
+        for empresa in GeolocationService.find_nearby_empresas(db, -34.6, -58.45, 8, limit=5000):
+            dia = turno_service._obtener_disponibilidad_dia(empresa["empresa_id"], agenda)
+            slots = [
+                s for s in (dia.slots_disponibles if dia else [])
+                if desde <= s.hora_inicio < hasta and "corte" in s.servicio_nombre.lower()
+            ]
+            if slots:
+                esperado.append((empresa["empresa_id"], empresa["distancia_km"], slots[0].hora_inicio))
+
+        # Act
+        empresas, candidatas, truncadas = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, desde, hasta, servicio="corte", limit=1000
+        )
+
+        # Assert
+        assert candidatas > len(empresas) > 0
+        assert truncadas is False
+        assert [(e["empresa_id"], e["distancia_km"], e["primer_slot"]) for e in empresas] == esperado
+        assert all(desde <= s.hora_inicio < hasta for e in empresas for s in e["slots"])
+
+    def test_consultas_fijas_y_orden_por_horario(self, db, agenda):
+        from datetime import time
+        from sqlalchemy import event
+        from app.services.disponibilidad_cercana_service import DisponibilidadCercanaService
+
+        consultas = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+
+        empresas, _, _ = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), ordenar_por="horario", limit=1000
+        )
+
+        # Horarios, servicios y turnos de todas las candidatas en una query cada uno
+        assert len(consultas) == 3
+        claves = [(e["primer_slot"], e["distancia_km"]) for e in empresas]
+        assert claves == sorted(claves)
+
+    def test_comodines_like_en_el_servicio(self, db, agenda):
+        from datetime import time
+        from app.services.disponibilidad_cercana_service import DisponibilidadCercanaService
+
+        # Act: "_" y "%" son literales, no comodines
+        con_guion_bajo, _, _ = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), servicio="c_rte", limit=1000
+        )
+        con_porcentaje, _, _ = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), servicio="corte%pelo", limit=1000
+        )
+        literal, _, _ = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), servicio="corte de", limit=1000
+        )
+
+        # Assert
+        assert con_guion_bajo == [] and con_porcentaje == []
+        assert literal
+
+    def test_candidatas_truncadas(self, db, agenda, monkeypatch):
+        from datetime import time
+        from app.config import settings
+        from app.services.disponibilidad_cercana_service import DisponibilidadCercanaService
+
+        # Arrange
+        radio = GeolocationService.find_nearby_empresas(db, -34.6, -58.45, 8, limit=5000)
+        monkeypatch.setattr(settings, "DISPONIBILIDAD_CERCANA_MAX_CANDIDATAS", 10)
+
+        # Act
+        _, evaluadas, truncadas = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), limit=1000
+        )
+
+        # Assert
+        assert len(radio) > 10
+        assert (evaluadas, truncadas) == (10, True)
+
+        monkeypatch.setattr(settings, "DISPONIBILIDAD_CERCANA_MAX_CANDIDATAS", len(radio))
+        _, evaluadas, truncadas = DisponibilidadCercanaService.buscar(
+            db, -34.6, -58.45, 8, agenda, time(12), time(20), limit=1000
+        )
+        assert (evaluadas, truncadas) == (len(radio), False)
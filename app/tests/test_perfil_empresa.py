@@ -0,0 +1,228 @@
+# tests/test_perfil_empresa.py
+"""
+Tests del perfil agregado de empresa (GET /empresas/{id}/perfil)
+- Contenido del perfil, secciones opcionales y cantidad de queries
+- Próximos slots: turnos ocupados, slots de hoy ya empezados, corte en max_slots
+- generar_slots_servicio: mismos slots que el algoritmo anterior de TurnoService
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registra todos los modelos para las relaciones)
+from app.api.v1.empresas import get_perfil_empresa
+from app.database import Base
+from app.enums import DiaSemana, EstadoTurno
+from app.models.calificacion import Calificacion
+from app.models.categoria import Categoria
+from app.models.direccion import Direccion
+from app.models.empresa import Empresa
+from app.models.horario_empresa import HorarioEmpresa
+from app.models.servicio import Servicio
+from app.models.turno import Turno
+from app.services.perfil_empresa_service import calcular_proximos_slots
+from app.services.turno_service import DIAS_SEMANA, TurnoService, generar_slots_servicio
+
+
+@pytest.fixture
+def db():
+    """SQLite en memoria con una empresa completa"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        Categoria.__table__, Direccion.__table__, Empresa.__table__, Servicio.__table__,
+        HorarioEmpresa.__table__, Turno.__table__, Calificacion.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Categoria(categoria_id=1, nombre="Peluquería"),
+        Direccion(direccion_id=1, calle="Av. Corrientes", numero="1234", ciudad="CABA", provincia="Buenos Aires"),
+        Empresa(empresa_id=1, usuario_id=10, categoria_id=1, direccion_id=1, razon_social="Peluquería Ñandú"),
+        Servicio(servicio_id=1, empresa_id=1, nombre="Corte", duracion_minutos=30, precio=5000),
+        Servicio(servicio_id=2, empresa_id=1, nombre="Tintura", duracion_minutos=90, precio=12000),
+        Servicio(servicio_id=3, empresa_id=1, nombre="Permanente", duracion_minutos=60, precio=9000, activo=False),
+        # Se cargan desordenados: el perfil los ordena por día y hora
+        HorarioEmpresa(horario_id=1, empresa_id=1, dia_semana=DiaSemana.MARTES,
+                       hora_apertura=time(14), hora_cierre=time(18)),
+        HorarioEmpresa(horario_id=2, empresa_id=1, dia_semana=DiaSemana.LUNES,
+                       hora_apertura=time(9), hora_cierre=time(13)),
+        HorarioEmpresa(horario_id=3, empresa_id=1, dia_semana=DiaSemana.MARTES,
+                       hora_apertura=time(9), hora_cierre=time(12)),
+    ])
+    session.add_all(
+        Calificacion(calificacion_id=i, turno_id=i, cliente_id=20 + i, empresa_id=1, puntuacion=puntuacion)
+        for i, puntuacion in enumerate([5, 5, 4, 1], start=1)
+    )
+    session.commit()
+    empresa = session.get(Empresa, 1)
+    empresa.rating_promedio = 3.75
+    empresa.total_calificaciones = 4
+    session.commit()
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    session.info["queries"] = queries
+    yield session
+    session.close()
+
+
+class TestPerfilEmpresa:
+
+    def test_perfil_completo(self, db):
+        # Arrange
+        db.info["queries"].clear()
+
+        # Act
+        perfil = get_perfil_empresa(1, include=None, slots=5, dias=7, current_user=None, db=db)
+
+        # Assert
+        assert perfil.empresa.razon_social == "Peluquería Ñandú"
+        assert perfil.empresa.direccion.calle == "Av. Corrientes"
+        assert perfil.categoria.nombre == "Peluquería"
+        assert [s.nombre for s in perfil.servicios] == ["Corte", "Tintura"]
+        assert [(h.dia_semana, h.hora_apertura) for h in perfil.horarios] == [
+            ("lunes", time(9)), ("martes", time(9)), ("martes", time(14))
+        ]
+        assert perfil.calificaciones.rating_promedio == 3.75
+        assert perfil.calificaciones.total_calificaciones == 4
+        assert perfil.calificaciones.distribucion == {"1": 1, "2": 0, "3": 0, "4": 1, "5": 2}
+        assert 0 < len(perfil.proximos_turnos) <= 5
+        assert perfil.proximos_turnos == sorted(perfil.proximos_turnos, key=lambda s: (s.fecha, s.hora_inicio))
+        assert {s.servicio_id for s in perfil.proximos_turnos} <= {1, 2}
+        assert len(db.info["queries"]) <= 5
+
+    def test_solo_las_secciones_pedidas(self, db):
+        db.info["queries"].clear()
+
+        perfil = get_perfil_empresa(1, include="servicios", slots=10, dias=7, current_user=None, db=db)
+
+        assert perfil.servicios is not None
+        assert perfil.horarios is None
+        assert perfil.calificaciones is None
+        assert perfil.proximos_turnos is None
+        assert len(db.info["queries"]) == 2
+
+    def test_empresa_inactiva_sin_disponibilidad(self, db):
+        db.get(Empresa, 1).activa = False
+        db.commit()
+
+        perfil = get_perfil_empresa(1, include="disponibilidad", slots=10, dias=7, current_user=None, db=db)
+
+        assert perfil.proximos_turnos == []
+
+    def test_errores(self, db):
+        with pytest.raises(HTTPException) as no_existe:
+            get_perfil_empresa(99, include=None, slots=10, dias=7, current_user=None, db=db)
+        with pytest.raises(HTTPException) as invalida:
+            get_perfil_empresa(1, include="servicios,fotos", slots=10, dias=7, current_user=None, db=db)
+
+        assert no_existe.value.status_code == 404
+        assert invalida.value.status_code == 400
+
+
+def crear_servicio(servicio_id, duracion, nombre="Servicio", precio=1000):
+    return SimpleNamespace(servicio_id=servicio_id, nombre=nombre, duracion_minutos=duracion, precio=precio)
+
+
+def crear_turno(servicio_id, fecha, hora):
+    return SimpleNamespace(servicio_id=servicio_id, fecha=fecha, hora=hora, estado=EstadoTurno.CONFIRMADO)
+
+
+class TestProximosSlots:
+
+    # Lunes
+    AHORA = datetime(2026, 10, 19, 10, 15)
+
+    def test_descarta_ocupados_y_los_ya_empezados(self):
+        # Arrange: lunes 9 a 12, corte de 30 min, un turno a las 11
+        hoy = self.AHORA.date()
+        servicio = crear_servicio(1, 30)
+        horario = SimpleNamespace(dia_semana=DiaSemana.LUNES, hora_apertura=time(9), hora_cierre=time(12))
+
+        # Act
+        slots = calcular_proximos_slots([servicio], [horario], [crear_turno(1, hoy, time(11))], 10, 1, self.AHORA)
+
+        # Assert
+        assert [s.hora_inicio for s in slots] == [time(10, 30), time(11, 30)]
+
+    def test_corta_en_max_slots_y_sigue_en_los_dias_siguientes(self):
+        servicio = crear_servicio(1, 60)
+        horarios = [
+            SimpleNamespace(dia_semana=DiaSemana.LUNES, hora_apertura=time(9), hora_cierre=time(11)),
+            SimpleNamespace(dia_semana=DiaSemana.MIERCOLES, hora_apertura=time(9), hora_cierre=time(12)),
+        ]
+
+        slots = calcular_proximos_slots([servicio], horarios, [], 4, 7, self.AHORA)
+
+        # Lunes ya no quedan (10:30 no entra antes de las 11); martes cerrado
+        assert [(s.fecha, s.hora_inicio) for s in slots] == [
+            (date(2026, 10, 21), time(9)), (date(2026, 10, 21), time(9, 30)),
+            (date(2026, 10, 21), time(10)), (date(2026, 10, 21), time(10, 30)),
+        ]
+
+
+def slots_algoritmo_anterior(fecha, hora_inicio, hora_fin, servicio, turnos_ocupados, duraciones):
+    """Loop de TurnoService._generar_slots_para_servicio antes de extraerlo a generar_slots_servicio"""
+    turno_service = TurnoService(db=None)
+    slots = []
+    dt_inicio = datetime.combine(fecha, hora_inicio)
+    dt_fin = datetime.combine(fecha, hora_fin)
+    slot_actual = dt_inicio
+    duracion = timedelta(minutes=servicio.duracion_minutos)
+    while slot_actual + duracion <= dt_fin:
+        slot_fin = slot_actual + duracion
+        # Solapamiento de [slot_actual, slot_fin) con el turno (ex TurnoService._hay_solapamiento)
+        conflicto = any(
+            turno.servicio_id == servicio.servicio_id and
+            slot_actual.time() < turno_service._calcular_hora_fin(turno.hora, duraciones[turno.servicio_id]) and
+            turno.hora < slot_fin.time()
+            for turno in turnos_ocupados
+        )
+        if not conflicto:
+            slots.append((slot_actual.time(), slot_fin.time(), servicio.servicio_id))
+        slot_actual += timedelta(minutes=30)
+    return slots
+
+
+class TestGenerarSlotsServicio:
+
+    def test_mismos_slots_que_el_algoritmo_anterior(self):
+        # Arrange: rangos, duraciones y turnos al azar (los callers pasan turnos de la fecha)
+        azar = random.Random(2026)
+        fecha = date(2026, 10, 20)
+        duraciones = {1: 30, 2: 45, 3: 60, 4: 90, 5: 120}
+        servicios = [crear_servicio(servicio_id, duracion) for servicio_id, duracion in duraciones.items()]
+
+        for _ in range(300):
+            apertura = time(azar.randint(6, 12), azar.choice([0, 15, 30]))
+            cierre = time(azar.randint(13, 22), azar.choice([0, 30, 45]))
+            turnos = [
+                crear_turno(azar.choice(list(duraciones)), fecha, time(azar.randint(6, 21), azar.choice([0, 15, 30, 45])))
+                for _ in range(azar.randint(0, 8))
+            ]
+
+            for servicio in servicios:
+                # Act
+                nuevos = [
+                    (s.hora_inicio, s.hora_fin, s.servicio_id)
+                    for s in generar_slots_servicio(fecha, apertura, cierre, servicio, turnos)
+                ]
+
+                # Assert
+                assert nuevos == slots_algoritmo_anterior(fecha, apertura, cierre, servicio, turnos, duraciones)
+
+    def test_ignora_turnos_de_otra_fecha(self):
+        fecha = date(2026, 10, 20)
+        servicio = crear_servicio(1, 60)
+        otro_dia = [crear_turno(1, fecha + timedelta(days=1), time(9))]
+
+        slots = generar_slots_servicio(fecha, time(9), time(11), servicio, otro_dia)
+
+        assert [s.hora_inicio for s in slots] == [time(9), time(9, 30), time(10)]
+        assert DIAS_SEMANA[fecha.weekday()] == DiaSemana.MARTES
@@ -0,0 +1,95 @@
+# tests/test_referencias_cache.py
+"""
+Tests del caché versionado de datos de referencia
+- Foto con solo categorías/roles/permisos activos
+- Lecturas sin queries dentro del intervalo de verificación
+- Recarga al incrementar la versión
+"""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.cache_version import CacheVersion
+from app.models.categoria import Categoria
+from app.models.rol import Permiso, Rol, RolPermiso
+from app.services.referencias_cache import CacheReferencias
+
+
+@pytest.fixture
+def db():
+    """SQLite en memoria con las tablas de referencia"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        CacheVersion.__table__, Categoria.__table__,
+        Rol.__table__, Permiso.__table__, RolPermiso.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Categoria(categoria_id=1, nombre="Peluquería", activa=True),
+        Categoria(categoria_id=2, nombre="Spa", activa=False),
+        Rol(rol_id=1, nombre="CLIENTE", slug="cliente", tipo="SISTEMA", nivel=1),
+        Rol(rol_id=2, nombre="ADMIN_EMPRESA", slug="admin-empresa", tipo="EMPRESA", nivel=50),
+        Permiso(permiso_id=1, codigo="turno:crear:propio", nombre="Crear turno", categoria="turno"),
+        Permiso(permiso_id=2, codigo="empresa:actualizar:propia", nombre="Editar empresa", categoria="empresa"),
+        Permiso(permiso_id=3, codigo="viejo:permiso", nombre="Viejo", categoria="otro", activo=False),
+        RolPermiso(rol_id=1, permiso_id=1),
+        RolPermiso(rol_id=2, permiso_id=1),
+        RolPermiso(rol_id=2, permiso_id=2),
+        RolPermiso(rol_id=2, permiso_id=3),
+        CacheVersion(nombre="referencias", version=1),
+    ])
+    session.commit()
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    session.info["queries"] = queries
+    yield session
+    session.close()
+
+
+class TestCacheReferencias:
+
+    def test_snapshot_solo_activos(self, db):
+        snapshot = CacheReferencias(intervalo_verificacion=60).obtener(db)
+
+        assert snapshot.version == 1
+        assert [c.nombre for c in snapshot.categorias] == ["Peluquería"]
+        assert snapshot.rol("ADMIN_EMPRESA").nivel == 50
+        assert set(snapshot.permisos_por_codigo) == {"turno:crear:propio", "empresa:actualizar:propia"}
+
+    def test_lecturas_sin_queries_dentro_del_intervalo(self, db):
+        cache = CacheReferencias(intervalo_verificacion=60)
+        primera = cache.obtener(db)
+        db.info["queries"].clear()
+
+        for _ in range(10):
+            assert cache.obtener(db) is primera
+
+        assert db.info["queries"] == []
+
+    def test_invalidar_incrementa_version_y_recarga(self, db):
+        cache = CacheReferencias(intervalo_verificacion=60)
+        cache.obtener(db)
+
+        db.add(Categoria(categoria_id=3, nombre="Barbería", activa=True))
+        cache.invalidar(db)
+        db.commit()
+
+        snapshot = cache.obtener(db)
+        assert snapshot.version == 2
+        assert [c.nombre for c in snapshot.categorias] == ["Peluquería", "Barbería"]
+
+    def test_otro_worker_ve_el_cambio_al_verificar(self, db):
+        """Un caché con intervalo 0 verifica la versión en cada lectura"""
+        otro_worker = CacheReferencias(intervalo_verificacion=0)
+        antes = otro_worker.obtener(db)
+
+        assert otro_worker.obtener(db) is antes
+
+        CacheReferencias(intervalo_verificacion=60).invalidar(db)
+        db.commit()
+
+        assert otro_worker.obtener(db).version == antes.version + 1
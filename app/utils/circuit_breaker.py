@@ -0,0 +1,88 @@
+# app/utils/circuit_breaker.py
+"""
+Circuit breaker para proveedores externos (ej: Georef).
+
+Estados:
+- cerrado: las llamadas pasan; se cuentan los fallos consecutivos
+- abierto: tras umbral_fallos fallos seguidos, las llamadas se rechazan al
+  instante (sin esperar timeouts ni reintentos) durante segundos_abierto
+- semi_abierto: vencido ese plazo, se deja pasar una sola llamada de prueba;
+  si funciona el circuito se cierra, si falla vuelve a abrirse
+
+Uso:
+    if not circuito.permitir():
+        ...  # respaldo
+    try:
+        resultado = await llamar_proveedor()
+    except ErrorDeRed:
+        circuito.registrar_fallo()
+        raise
+    circuito.registrar_exito()
+"""
+
+import logging
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMI_ABIERTO = "semi_abierto"
+
+
+class CircuitBreaker:
+
+    def __init__(self, nombre: str, umbral_fallos: int = 5, segundos_abierto: float = 30.0):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+
+        self.estado = CERRADO
+        self._fallos_consecutivos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self.rechazadas = 0
+
+    def permitir(self) -> bool:
+        """True si la llamada puede ir al proveedor"""
+        if self.estado == CERRADO:
+            return True
+
+        if self.estado == ABIERTO and time.monotonic() - self._abierto_desde >= self.segundos_abierto:
+            self.estado = SEMI_ABIERTO
+            logger.info(f"Circuito '{self.nombre}' semi-abierto: probando el proveedor")
+
+        if self.estado == SEMI_ABIERTO and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True
+
+        self.rechazadas += 1
+        return False
+
+    def registrar_exito(self) -> None:
+        if self.estado != CERRADO:
+            logger.info(f"Circuito '{self.nombre}' cerrado: el proveedor respondió")
+        self.estado = CERRADO
+        self._fallos_consecutivos = 0
+        self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        self._fallos_consecutivos += 1
+        self._prueba_en_curso = False
+
+        if self.estado == SEMI_ABIERTO or self._fallos_consecutivos >= self.umbral_fallos:
+            if self.estado != ABIERTO:
+                logger.warning(
+                    f"Circuito '{self.nombre}' abierto por {self.segundos_abierto}s "
+                    f"({self._fallos_consecutivos} fallos consecutivos)"
+                )
+            self.estado = ABIERTO
+            self._abierto_desde = time.monotonic()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "fallos_consecutivos": self._fallos_consecutivos,
+            "rechazadas": self.rechazadas,
+        }
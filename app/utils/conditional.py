@@ -0,0 +1,244 @@
+# app/utils/conditional.py
+"""
+GET condicional (ETag / Last-Modified) para MiTurno API
+Permite responder 304 Not Modified sin cargar el recurso completo
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+from fastapi import Request, Response, status
+
+
+# Los recursos requieren autenticación: el cliente puede guardar la respuesta
+# pero debe revalidarla siempre contra el servidor
+CACHE_CONTROL_PRIVADO = "private, no-cache"
+
+
+# ============================================================================
+# HELPERS DE VALIDADORES HTTP
+# ============================================================================
+
+def serializar_json(contenido: Any) -> bytes:
+    """
+    Serializa el contenido a JSON compacto en UTF-8.
+
+    El ETag se calcula sobre estos mismos bytes, por eso la respuesta
+    se arma con ellos en lugar de delegar en JSONResponse.
+    """
+    return json.dumps(
+        contenido,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    ).encode("utf-8")
+
+
+def calcular_etag(cuerpo: bytes) -> str:
+    """Calcula un ETag fuerte a partir de los bytes de la representación"""
+    return '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+
+
+def formatear_http_date(fecha: datetime) -> str:
+    """Formatea un datetime como HTTP-date (las fechas naive se asumen UTC)"""
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return format_datetime(fecha.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_coincide(request: Request, etag: str) -> bool:
+    """
+    Evalúa If-None-Match contra el ETag actual.
+
+    Según RFC 9110 If-None-Match usa comparación débil: se ignora el prefijo W/.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    etag_actual = etag[2:] if etag.startswith("W/") else etag
+    for candidato in header.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag_actual:
+            return True
+    return False
+
+
+def no_modificado_desde(request: Request, last_modified: Optional[datetime]) -> bool:
+    """
+    Evalúa If-Modified-Since. Solo aplica si el cliente no envió If-None-Match.
+    """
+    if last_modified is None or "if-none-match" in request.headers:
+        return False
+
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+
+    try:
+        fecha_cliente = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+    if fecha_cliente.tzinfo is None:
+        fecha_cliente = fecha_cliente.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+    # HTTP-date tiene resolución de segundos
+    return last_modified.replace(microsecond=0) <= fecha_cliente
+
+
+def last_modified_confiable(last_modified: Optional[datetime]) -> bool:
+    """
+    Last-Modified tiene resolución de segundos: si el recurso cambió en el
+    segundo actual puede volver a cambiar en ese mismo segundo sin que la
+    fecha cambie, y un If-Modified-Since con esa fecha daría un 304 con datos
+    viejos. En ese caso no se envía y el cliente revalida con el ETag.
+    """
+    if last_modified is None:
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    segundo_actual = datetime.now(timezone.utc).replace(microsecond=0)
+    return last_modified < segundo_actual
+
+
+def _headers_validadores(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL_PRIVADO,
+    }
+    if last_modified_confiable(last_modified):
+        headers["Last-Modified"] = formatear_http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Respuesta HTTP 304 Not Modified con los validadores actuales"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=_headers_validadores(etag, last_modified)
+    )
+
+
+# ============================================================================
+# REGISTRO DE VERSIONES POR RECURSO
+# ============================================================================
+
+class ConditionalGet:
+    """
+    GET condicional basado en una sonda de versión barata.
+
+    Cada worker recuerda el ETag emitido para cada (clave, versión). Si el
+    cliente envía ese ETag y la sonda devuelve la misma versión, se responde
+    304 sin cargar ni serializar el recurso.
+
+    La versión debe cambiar cada vez que cambia la representación y leerse
+    de la base en cada request, así vale para todos los workers: un contador
+    (ej: empresa.version), no una fecha con resolución de segundos. Con
+    version=None no hay atajo: se carga el recurso y el ETag se compara
+    contra el cuerpo serializado.
+
+    Uso:
+        empresa_etags = ConditionalGet("empresa")
+
+        respuesta = empresa_etags.verificar(request, empresa_id, version, fecha_actualizacion)
+        if respuesta:
+            return respuesta
+        ...
+        return empresa_etags.responder(request, empresa_id, version, contenido, fecha_actualizacion)
+    """
+
+    def __init__(self, recurso: str, max_entradas: int = 10000):
+        self.recurso = recurso
+        self.max_entradas = max_entradas
+        self._etags: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def _recordar(self, clave: Hashable, version: Hashable, etag: str) -> None:
+        with self._lock:
+            self._etags[clave] = (version, etag)
+            self._etags.move_to_end(clave)
+            while len(self._etags) > self.max_entradas:
+                self._etags.popitem(last=False)
+
+    def _etag_conocido(self, clave: Hashable, version: Hashable) -> Optional[str]:
+        with self._lock:
+            entrada = self._etags.get(clave)
+        if entrada and entrada[0] == version:
+            return entrada[1]
+        return None
+
+    def verificar(
+        self,
+        request: Request,
+        clave: Hashable,
+        version: Optional[Hashable],
+        last_modified: Optional[datetime] = None
+    ) -> Optional[Response]:
+        """
+        Retorna un 304 si los validadores del cliente siguen vigentes, None si no.
+
+        Args:
+            request: Request actual
+            clave: Identificador del recurso (ej: empresa_id)
+            version: Resultado de la sonda de versión
+            last_modified: Fecha de última modificación (opcional)
+        """
+        if version is None:
+            return None
+
+        etag = self._etag_conocido(clave, version)
+        if etag is None:
+            return None
+
+        if etag_coincide(request, etag) or no_modificado_desde(request, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        return None
+
+    def responder(
+        self,
+        request: Request,
+        clave: Hashable,
+        version: Optional[Hashable],
+        contenido: Any,
+        last_modified: Optional[datetime] = None,
+        status_code: int = status.HTTP_200_OK
+    ) -> Response:
+        """
+        Serializa el contenido, registra su ETag y responde 200 o 304.
+
+        Args:
+            request: Request actual
+            clave: Identificador del recurso
+            version: Versión usada para la sonda (None si no hay sonda)
+            contenido: Datos JSON-serializables de la respuesta
+            last_modified: Fecha de última modificación (opcional)
+        """
+        cuerpo = serializar_json(contenido)
+        etag = calcular_etag(cuerpo)
+
+        if version is not None:
+            self._recordar(clave, version, etag)
+
+        if etag_coincide(request, etag):
+            return not_modified_response(etag, last_modified)
+
+        return Response(
+            content=cuerpo,
+            status_code=status_code,
+            media_type="application/json; charset=utf-8",
+            headers=_headers_validadores(etag, last_modified)
+        )
@@ -0,0 +1,133 @@
+# app/utils/geo_vectorial.py
+"""
+Distancias y ranking geográfico vectorizados con NumPy.
+
+Calcula Haversine para miles de candidatos en una sola pasada y elige
+los k mejores con argpartition (O(n)) en lugar de ordenar todo.
+La fórmula es la misma que GeolocationService.calculate_distance.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# Rating usado para empresas sin calificaciones (neutro en escala 1-5)
+RATING_NEUTRO = 3.5
+RATING_MAXIMO = 5.0
+
+# Peso del rating en el puntaje de relevancia (0 = solo distancia, 1 = solo rating)
+PESO_RATING = 0.3
+
+
+def haversine_km(
+    latitud: float,
+    longitud: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    decimales: Optional[int] = 2
+) -> np.ndarray:
+    """
+    Distancia en km desde un punto a cada uno de los candidatos.
+
+    Args:
+        latitud, longitud: Punto de origen
+        latitudes, longitudes: Arreglos de coordenadas de los candidatos
+        decimales: Redondeo (2 como calculate_distance); None para no redondear
+    """
+    lat1 = np.radians(latitud)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlng = np.radians(longitudes) - np.radians(longitud)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    distancias = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    if decimales is not None:
+        distancias = np.round(distancias, decimales)
+    return distancias
+
+
+def k_menores(valores: np.ndarray, k: int, desempate: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Índices de los k valores más chicos, ordenados ascendentemente.
+
+    Usa argpartition para separar el top-k y solo ordena ese tramo. Los
+    empates en el borde se resuelven por `desempate` (ej: empresa_id), así
+    el resultado es el mismo que ordenar todo por (valor, desempate).
+    """
+    n = len(valores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < n:
+        # Todos los que empatan con el k-ésimo entran al tramo a ordenar
+        umbral = valores[np.argpartition(valores, k - 1)[k - 1]]
+        seleccion = np.flatnonzero(valores <= umbral)
+    else:
+        seleccion = np.arange(n)
+
+    if desempate is None:
+        orden = np.argsort(valores[seleccion], kind="stable")
+    else:
+        orden = np.lexsort((desempate[seleccion], valores[seleccion]))
+    return seleccion[orden[:k]]
+
+
+def puntaje_relevancia(
+    distancias_km: np.ndarray,
+    ratings: np.ndarray,
+    radio_km: float,
+    peso_rating: float = PESO_RATING
+) -> np.ndarray:
+    """
+    Puntaje ordenable (menor es mejor) que combina cercanía y rating.
+
+    La distancia se normaliza por el radio y el rating por RATING_MAXIMO;
+    los ratings NaN (sin calificaciones) cuentan como RATING_NEUTRO.
+    """
+    ratings = np.where(np.isnan(ratings), RATING_NEUTRO, ratings)
+    distancia_normalizada = distancias_km / max(radio_km, 1e-9)
+    rating_faltante = 1 - ratings / RATING_MAXIMO
+    return (1 - peso_rating) * distancia_normalizada + peso_rating * rating_faltante
+
+
+def tamano_celda_cluster(zoom: int, celdas_por_tile: int = 4) -> float:
+    """
+    Lado en grados de la celda de agrupamiento para un nivel de zoom de
+    mapa web (tiles de 256 px): un tile cubre 360 / 2^zoom grados de
+    longitud; con 4 celdas por tile cada cluster representa ~64 px.
+    """
+    return 360.0 / (2 ** zoom) / celdas_por_tile
+
+
+def agrupar_en_grilla(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    tamano_celda: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Agrupa puntos por celda de una grilla regular.
+
+    Returns:
+        (latitudes_centroide, longitudes_centroide, cantidades, primer_indice)
+        por celda ocupada; primer_indice es un punto de ejemplo de la celda
+        (útil para devolver la empresa cuando la celda tiene una sola)
+    """
+    if len(latitudes) == 0:
+        vacio = np.empty(0, dtype=np.float64)
+        return vacio, vacio, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+
+    filas = np.floor(latitudes / tamano_celda).astype(np.int64)
+    columnas = np.floor(longitudes / tamano_celda).astype(np.int64)
+    ancho = int(columnas.max() - columnas.min()) + 1
+    claves = (filas - filas.min()) * ancho + (columnas - columnas.min())
+
+    _, primer_indice, inversa, cantidades = np.unique(
+        claves, return_index=True, return_inverse=True, return_counts=True
+    )
+    latitudes_centroide = np.bincount(inversa, weights=latitudes) / cantidades
+    longitudes_centroide = np.bincount(inversa, weights=longitudes) / cantidades
+    return latitudes_centroide, longitudes_centroide, cantidades, primer_indice
@@ -0,0 +1,104 @@
+# app/utils/kdtree.py
+"""
+KD-tree estático sobre arreglos NumPy (sin scipy).
+
+El árbol es implícito: se guarda una permutación de los puntos tal que cada
+nodo es un rango [inicio, fin) con el punto de corte en la mitad, más el eje
+de corte de cada nodo. No hay objetos por nodo; la memoria es la de los
+puntos reordenados + un int32 y un int8 por punto.
+
+- Construcción: O(n log n) con argpartition por nivel
+- mas_cercano: O(log n) en promedio; las hojas (hasta TAMANO_HOJA puntos)
+  se resuelven vectorizadas
+
+Los empates se resuelven a favor del menor índice original, igual que un
+argmin sobre los puntos en el orden de carga.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+TAMANO_HOJA = 32
+
+
+class KDTree:
+
+    def __init__(self, puntos: np.ndarray, tamano_hoja: int = TAMANO_HOJA):
+        puntos = np.asarray(puntos, dtype=np.float64)
+        if puntos.ndim != 2:
+            raise ValueError("puntos debe ser un arreglo (n, dimensiones)")
+
+        self._tamano_hoja = max(1, tamano_hoja)
+        n = len(puntos)
+        # posición en el árbol -> índice original
+        self._orden = np.arange(n, dtype=np.int32)
+        self._ejes = np.zeros(n, dtype=np.int8)
+
+        pendientes = [(0, n)]
+        while pendientes:
+            inicio, fin = pendientes.pop()
+            if fin - inicio <= self._tamano_hoja:
+                continue
+            segmento = puntos[self._orden[inicio:fin]]
+            # Se corta por el eje de mayor extensión
+            eje = int(np.argmax(np.ptp(segmento, axis=0)))
+            medio = (inicio + fin) // 2
+            particion = np.argpartition(segmento[:, eje], medio - inicio)
+            self._orden[inicio:fin] = self._orden[inicio:fin][particion]
+            self._ejes[medio] = eje
+            pendientes.append((inicio, medio))
+            pendientes.append((medio + 1, fin))
+
+        self._puntos = puntos[self._orden]
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+    def mas_cercano(self, punto) -> Tuple[int, float]:
+        """(índice original, distancia euclídea) del punto más cercano; (-1, inf) si está vacío"""
+        consulta = np.asarray(punto, dtype=np.float64)
+        # Los nodos internos se evalúan con floats de Python: en arreglos
+        # tan chicos el overhead de NumPy domina
+        coordenadas = consulta.tolist()
+        mejor_d2 = np.inf
+        mejor_indice = -1
+
+        # (inicio, fin, cota inferior de la distancia² a cualquier punto del rango)
+        pendientes = [(0, len(self._orden), 0.0)]
+        while pendientes:
+            inicio, fin, cota = pendientes.pop()
+            if cota > mejor_d2:
+                continue
+
+            if fin - inicio <= self._tamano_hoja:
+                d2 = ((self._puntos[inicio:fin] - consulta) ** 2).sum(axis=1)
+                if len(d2) == 0:
+                    continue
+                minimo = d2.min()
+                if minimo <= mejor_d2:
+                    indice = int(self._orden[inicio:fin][d2 == minimo].min())
+                    if minimo < mejor_d2 or indice < mejor_indice:
+                        mejor_d2, mejor_indice = minimo, indice
+                continue
+
+            medio = (inicio + fin) // 2
+            corte = self._puntos[medio].tolist()
+            diferencia = coordenadas[self._ejes[medio]] - corte[self._ejes[medio]]
+
+            d2 = sum((a - b) * (a - b) for a, b in zip(corte, coordenadas))
+            indice = int(self._orden[medio])
+            if d2 < mejor_d2 or (d2 == mejor_d2 and indice < mejor_indice):
+                mejor_d2, mejor_indice = d2, indice
+
+            # Se apila primero el lado lejano: el cercano se explora antes
+            # y suele acotar lo suficiente para descartar al otro
+            cota_lejano = max(cota, diferencia * diferencia)
+            if diferencia < 0:
+                pendientes.append((medio + 1, fin, cota_lejano))
+                pendientes.append((inicio, medio, cota))
+            else:
+                pendientes.append((inicio, medio, cota_lejano))
+                pendientes.append((medio + 1, fin, cota))
+
+        return mejor_indice, float(np.sqrt(mejor_d2))
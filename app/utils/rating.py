@@ -0,0 +1,19 @@
+# app/utils/rating.py
+"""
+Rating bayesiano de empresas
+Promedio de calificaciones ajustado por la cantidad: una empresa con una sola
+calificación de 5 no queda por encima de una con cientos de 4.8
+"""
+
+from typing import Optional
+
+
+# Promedio previo y su peso en "calificaciones virtuales"
+RATING_PREVIO = 3.5
+PESO_RATING_PREVIO = 5
+
+
+def rating_bayesiano(rating_promedio: Optional[float], total: int) -> float:
+    total = total or 0
+    suma = float(rating_promedio or 0) * total
+    return (RATING_PREVIO * PESO_RATING_PREVIO + suma) / (PESO_RATING_PREVIO + total)
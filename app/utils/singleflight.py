@@ -0,0 +1,48 @@
+# app/utils/singleflight.py
+"""
+Single-flight: coalescencia de llamadas async concurrentes e idénticas.
+
+Si llegan varias llamadas con la misma clave mientras la primera está en
+curso, todas esperan esa misma ejecución y reciben su resultado (o su
+excepción). Se evita que una dirección popular dispare N requests iguales
+a un servicio externo, y que un error en ese servicio se convierta en N
+reintentos simultáneos.
+
+La ejecución corre en su propia tarea: si el request que la inició se
+cancela (cliente desconectado), los demás siguen esperando el resultado.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes por clave"""
+
+    def __init__(self):
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+        self.ejecuciones = 0
+        self.compartidas = 0
+
+    async def ejecutar(self, clave: Hashable, funcion: Callable[[], Awaitable[Any]]) -> Any:
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(funcion())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t, clave=clave: self._terminar(clave, t))
+            self.ejecuciones += 1
+        else:
+            self.compartidas += 1
+
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave: Hashable, tarea: asyncio.Task) -> None:
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        # Marca la excepción como leída aunque todos los que esperaban se
+        # hayan cancelado (evita "Task exception was never retrieved")
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def en_vuelo(self) -> int:
+        return len(self._en_vuelo)
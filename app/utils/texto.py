@@ -0,0 +1,88 @@
+# app/utils/texto.py
+"""
+Normalización de texto para búsquedas en memoria
+Minúsculas, sin acentos y tokenizado simple para español
+"""
+
+import re
+import unicodedata
+from typing import List
+
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+# Palabras vacías frecuentes en nombres y descripciones de comercios
+STOPWORDS = frozenset({
+    "de", "del", "la", "las", "el", "los", "y", "e", "o", "u", "en", "con",
+    "por", "para", "a", "al", "un", "una", "unos", "unas", "que", "se", "su",
+    "sus", "lo", "es", "the", "and", "of",
+})
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Pasa a minúsculas y elimina acentos/diacríticos.
+
+    Ejemplo: "Peluquería Ñandú" -> "peluqueria nandu"
+    """
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str, min_longitud: int = 2, quitar_stopwords: bool = True) -> List[str]:
+    """
+    Divide un texto normalizado en tokens alfanuméricos.
+
+    Args:
+        texto: Texto original (se normaliza internamente)
+        min_longitud: Longitud mínima de token
+        quitar_stopwords: Si True, descarta palabras vacías
+    """
+    tokens = _NO_ALFANUMERICO.split(normalizar_texto(texto))
+    return [
+        t for t in tokens
+        if len(t) >= min_longitud and not (quitar_stopwords and t in STOPWORDS)
+    ]
+
+
+# Abreviaturas frecuentes en direcciones argentinas. Solo las que no son
+# también una palabra común: "as" o "cap" sueltas se dejan como están y se
+# expanden únicamente en contexto ("bs as", "cap fed")
+ABREVIATURAS_DIRECCION = {
+    "av": "avenida", "avda": "avenida", "avd": "avenida", "aven": "avenida",
+    "bv": "boulevard", "bvd": "boulevard", "bvard": "boulevard", "blvd": "boulevard", "boul": "boulevard",
+    "pje": "pasaje", "psje": "pasaje", "cno": "camino", "diag": "diagonal",
+    "gral": "general", "grl": "general", "pte": "presidente", "pres": "presidente",
+    "cnel": "coronel", "tte": "teniente", "sgto": "sargento", "cmte": "comandante",
+    "dr": "doctor", "dra": "doctora", "ing": "ingeniero", "prof": "profesor",
+    "sta": "santa", "sto": "santo", "sn": "san", "ntra": "nuestra", "sra": "senora",
+    "pcia": "provincia", "prov": "provincia", "bsas": "buenos aires", "bs as": "buenos aires",
+    "caba": "ciudad autonoma de buenos aires", "cap fed": "ciudad autonoma de buenos aires",
+}
+
+
+def normalizar_direccion(texto: str) -> str:
+    """
+    Forma canónica de una dirección para usar como clave de caché.
+    Minúsculas, sin acentos ni puntuación y con abreviaturas expandidas.
+
+    Ejemplo: "Av. Gral. Paz 1.200, C.A.B.A." -> "avenida general paz 1200 ciudad autonoma de buenos aires"
+    """
+    # Puntos entre letras/dígitos ("C.A.B.A.", "1.200") se eliminan antes de tokenizar
+    sin_puntos = re.sub(r"(?<=\w)\.(?=\w)", "", normalizar_texto(texto))
+    palabras = tokenizar(sin_puntos, min_longitud=1, quitar_stopwords=False)
+
+    expandidas = []
+    i = 0
+    while i < len(palabras):
+        # Abreviaturas de dos palabras ("cap fed")
+        par = " ".join(palabras[i:i + 2])
+        if par in ABREVIATURAS_DIRECCION:
+            expandidas.append(ABREVIATURAS_DIRECCION[par])
+            i += 2
+            continue
+        expandidas.append(ABREVIATURAS_DIRECCION.get(palabras[i], palabras[i]))
+        i += 1
+    return " ".join(expandidas)
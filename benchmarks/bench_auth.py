@@ -0,0 +1,199 @@
+# benchmarks/bench_auth.py
+"""
+Benchmark del costo de autenticación por request
+
+Mide lo que agrega la autenticación a un request protegido con un chequeo
+de permiso (verificar el bearer token, obtener el usuario y require_permission),
+con el mismo token repetido como lo manda un cliente real:
+
+- antes: decodificación completa del JWT en cada request (python-jose), los
+  logs DEBUG/INFO que hacía verify_token / get_current_user (a un handler
+  con el formato de app/core/logger.py que escribe en /dev/null), la fila
+  completa del usuario y la función usuario_tiene_permiso en SQL
+- despues: verify_token con el caché de tokens verificados, caché de
+  principales y evaluador RBAC en memoria
+
+También reporta solo la verificación del token, con cada backend JWT
+disponible, sin caché y con caché. Las queries corren contra SQLite en
+memoria: en MySQL la diferencia del "antes" es mayor (ida y vuelta por red).
+
+Uso:
+    python benchmarks/bench_auth.py
+    python benchmarks/bench_auth.py --requests 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import app.models  # noqa: E402,F401
+from app.auth.evaluador_rbac import evaluador_rbac  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.core.jwt_verificacion import BACKENDS_JWT, VerificadorTokens, crear_backend_jwt  # noqa: E402
+from app.core.principal_cache import CachePrincipales  # noqa: E402
+from app.core.security import create_access_token, verify_token  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.enums import TipoUsuario  # noqa: E402
+from app.models.cache_version import CacheVersion  # noqa: E402
+from app.models.categoria import Categoria  # noqa: E402
+from app.models.rol import Permiso, Rol, RolPermiso, UsuarioRol  # noqa: E402
+from app.models.user import Usuario  # noqa: E402
+from app.schemas.auth import TokenData  # noqa: E402
+
+
+PERMISO = "servicios:crear"
+EMPRESA_ID = 5
+
+# Cuerpo de la función usuario_tiene_permiso de MySQL
+FUNCION_USUARIO_TIENE_PERMISO = text("""
+    SELECT COUNT(*) > 0 AS tiene_permiso
+    FROM usuario_rol ur
+    INNER JOIN rol r ON ur.rol_id = r.rol_id
+    INNER JOIN rol_permiso rp ON r.rol_id = rp.rol_id
+    INNER JOIN permiso p ON rp.permiso_id = p.permiso_id
+    WHERE ur.usuario_id = :usuario_id
+      AND p.codigo = :permiso_codigo
+      AND ur.activo = 1
+      AND r.activo = 1
+      AND p.activo = 1
+      AND (:empresa_id IS NULL OR ur.empresa_id = :empresa_id OR ur.empresa_id IS NULL)
+""")
+
+
+def crear_base() -> Session:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        Usuario.__table__, Rol.__table__, UsuarioRol.__table__,
+        Permiso.__table__, RolPermiso.__table__, CacheVersion.__table__, Categoria.__table__,
+    ])
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Usuario(usuario_id=1, email="ana@test.com", nombre="Ana", tipo_usuario=TipoUsuario.EMPRESA, activo=True),
+        Rol(rol_id=2, nombre="ADMIN_EMPRESA", slug="admin-empresa", tipo="EMPRESA", nivel=50),
+        Permiso(permiso_id=70, codigo=PERMISO, nombre="Crear servicio", categoria="servicios"),
+        RolPermiso(rol_id=2, permiso_id=70),
+        UsuarioRol(usuario_id=1, rol_id=2, empresa_id=EMPRESA_ID),
+        CacheVersion(nombre="referencias", version=1),
+    ])
+    db.commit()
+    return db
+
+
+def crear_logger_anterior() -> logging.Logger:
+    """Logger con el nivel y el formato de miturno.auth, escribiendo en /dev/null"""
+    logger = logging.getLogger("bench.auth")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter(
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+    logger.addHandler(handler)
+    return logger
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir(funcion: Callable[[], object], requests: int) -> Dict[str, float]:
+    for _ in range(min(requests, 200)):
+        funcion()
+    latencias: List[float] = []
+    for _ in range(requests):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1_000_000)
+    return {
+        "media_us": sum(latencias) / len(latencias),
+        "p50_us": percentil(latencias, 50),
+        "p95_us": percentil(latencias, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests medidos por escenario")
+    args = parser.parse_args()
+
+    db = crear_base()
+    token = create_access_token({"sub": "1", "email": "ana@test.com", "tipo_usuario": "EMPRESA"},
+                                timedelta(minutes=30))
+    logger = crear_logger_anterior()
+    decodificador = VerificadorTokens(crear_backend_jwt("jose"), settings.secret_key, settings.algorithm, 0)
+
+    def request_antes():
+        logger.debug("Iniciando get_current_user")
+        logger.debug("Iniciando verificación de token")
+        logger.debug(f"Decodificando token con SECRET_KEY: {settings.secret_key[:10]}... "
+                     f"y algoritmo: {settings.algorithm}")
+        payload = decodificador.backend.decodificar(token, settings.secret_key, settings.algorithm)
+        logger.debug("Token decodificado exitosamente")
+        usuario_id = int(payload.get("sub"))
+        email = payload.get("email")
+        logger.debug(f"Datos extraídos - usuario_id: {usuario_id}, email: {email}")
+        token_data = TokenData(usuario_id=usuario_id, email=email, tipo_usuario=payload.get("tipo_usuario"),
+                               permisos=payload.get("perm"))
+        logger.info(f"Token verificado exitosamente para usuario: {email}")
+        logger.debug(f"Token verificado, buscando usuario ID: {token_data.usuario_id}")
+        usuario = db.query(Usuario).filter(Usuario.usuario_id == token_data.usuario_id).first()
+        logger.info(f"Usuario autenticado exitosamente: {usuario.email}")
+        permitido = bool(db.execute(FUNCION_USUARIO_TIENE_PERMISO, {
+            "usuario_id": usuario.usuario_id, "permiso_codigo": PERMISO, "empresa_id": EMPRESA_ID
+        }).scalar())
+        assert permitido
+        # Cada request usa una sesión nueva: la fila no queda en el identity map
+        db.expunge_all()
+
+    principales = CachePrincipales(ttl_seconds=60, max_entradas=1000)
+
+    def request_despues():
+        token_data = verify_token(token)
+        principal = principales.obtener(db, token_data.usuario_id, token_data)
+        assert evaluador_rbac.tiene_permiso(db, principal.usuario_id, PERMISO, EMPRESA_ID)
+        db.expunge_all()
+
+    print(f"Requests por escenario: {args.requests}")
+    print(f"{'escenario':<32}{'media µs':>12}{'p50 µs':>10}{'p95 µs':>10}")
+
+    resultados = {}
+    for nombre, funcion in (("request completo: antes", request_antes),
+                            ("request completo: despues", request_despues)):
+        resultados[nombre] = medir(funcion, args.requests)
+        r = resultados[nombre]
+        print(f"{nombre:<32}{r['media_us']:>12.1f}{r['p50_us']:>10.1f}{r['p95_us']:>10.1f}")
+
+    for backend in BACKENDS_JWT:
+        try:
+            instancia = crear_backend_jwt(backend)
+        except RuntimeError as e:
+            print(f"{'token ' + backend:<32}omitido ({str(e)})")
+            continue
+        for max_entradas, etiqueta in ((0, "sin caché"), (1000, "con caché")):
+            verificador = VerificadorTokens(instancia, settings.secret_key, settings.algorithm, max_entradas)
+            nombre = f"token {backend}, {etiqueta}"
+            r = medir(lambda: verificador.verificar(token), args.requests)
+            print(f"{nombre:<32}{r['media_us']:>12.1f}{r['p50_us']:>10.1f}{r['p95_us']:>10.1f}")
+
+    antes = resultados["request completo: antes"]["media_us"]
+    despues = resultados["request completo: despues"]["media_us"]
+    print(f"\nAutenticación por request: {antes:.1f} µs -> {despues:.1f} µs ({antes / despues:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
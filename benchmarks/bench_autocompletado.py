@@ -0,0 +1,124 @@
+# benchmarks/bench_autocompletado.py
+"""
+Benchmark del índice de autocompletado
+
+Construye el índice con N empresas sintéticas y reporta:
+- memoria ocupada por worker (tracemalloc)
+- latencia de sugerencias por prefijo, sin caché y con caché
+
+Uso:
+    python benchmarks/bench_autocompletado.py
+    python benchmarks/bench_autocompletado.py --empresas 100000 --consultas 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.autocompletado_service import IndiceAutocompletado  # noqa: E402
+
+
+RUBROS = [
+    "Peluquería", "Barbería", "Estética", "Manicuría", "Spa", "Masajes",
+    "Odontología", "Kinesiología", "Nutrición", "Psicología", "Veterinaria",
+    "Taller", "Lavadero", "Tatuajes", "Gimnasio", "Yoga", "Pilates",
+]
+NOMBRES = [
+    "Sol", "Luna", "Norte", "Sur", "Central", "Palermo", "Belgrano", "Rosario",
+    "Andes", "Patagonia", "Río", "Plaza", "Jardín", "Estrella", "Aurora",
+    "Delta", "Pampa", "Litoral", "San Martín", "Don Pedro", "La Esquina",
+]
+CIUDADES = [
+    "Buenos Aires", "Córdoba", "Rosario", "Mendoza", "La Plata", "San Miguel de Tucumán",
+    "Mar del Plata", "Salta", "Santa Fe", "San Juan", "Resistencia", "Neuquén",
+    "Posadas", "Bahía Blanca", "Paraná", "Corrientes", "San Luis", "Río Cuarto",
+]
+
+FilaEmpresa = namedtuple(
+    "FilaEmpresa",
+    "empresa_id razon_social rating_promedio total_calificaciones categoria_id activa ciudad"
+)
+FilaCategoria = namedtuple("FilaCategoria", "categoria_id nombre")
+
+
+def generar_datos(cantidad: int, semilla: int = 42):
+    rnd = random.Random(semilla)
+    empresas = []
+    for empresa_id in range(1, cantidad + 1):
+        rubro = rnd.randrange(len(RUBROS))
+        total = rnd.choice([0, 0, 1, 3, 10, 50, 200])
+        empresas.append(FilaEmpresa(
+            empresa_id=empresa_id,
+            razon_social=f"{RUBROS[rubro]} {rnd.choice(NOMBRES)} {rnd.randint(1, 9999)}",
+            rating_promedio=round(rnd.uniform(1, 5), 2) if total else None,
+            total_calificaciones=total,
+            categoria_id=rubro + 1,
+            activa=True,
+            ciudad=rnd.choice(CIUDADES) + ("" if rnd.random() < 0.9 else f" {rnd.randint(1, 500)}"),
+        ))
+    categorias = [FilaCategoria(i + 1, nombre) for i, nombre in enumerate(RUBROS)]
+    return empresas, categorias
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(indice, consultas):
+    latencias = []
+    for consulta in consultas:
+        t0 = time.perf_counter()
+        indice.sugerir(consulta, limite=5)
+        latencias.append((time.perf_counter() - t0) * 1000)
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--empresas", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=5000)
+    args = parser.parse_args()
+
+    empresas, categorias = generar_datos(args.empresas)
+
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    inicio = time.perf_counter()
+    indice = IndiceAutocompletado()
+    indice.cargar(empresas, categorias)
+    construccion = time.perf_counter() - inicio
+    despues = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    memoria = sum(stat.size_diff for stat in despues.compare_to(antes, "filename"))
+    print(f"Índice: {args.empresas} empresas, {len(indice._claves)} claves, construido en {construccion:.2f}s")
+    print(f"Memoria por worker: {memoria / 1024 / 1024:.1f} MiB "
+          f"({memoria / max(args.empresas, 1):.0f} bytes por empresa)")
+
+    rnd = random.Random(7)
+    vocabulario = [p.lower() for p in RUBROS + NOMBRES + CIUDADES]
+    consultas = [rnd.choice(vocabulario)[:rnd.randint(1, 6)] for _ in range(args.consultas)]
+
+    # Sin caché: peor caso, cada consulta recorre el rango del prefijo
+    indice.MAX_CACHE = 0
+    sin_cache = medir(indice, consultas)
+    indice.MAX_CACHE = IndiceAutocompletado.MAX_CACHE
+    indice._invalidar_cache()
+    con_cache = medir(indice, consultas)
+
+    for nombre, latencias in (("sin caché", sin_cache), ("con caché", con_cache)):
+        print(f"Consultas {nombre}: p50 {percentil(latencias, 50):.3f} ms | "
+              f"p99 {percentil(latencias, 99):.3f} ms | max {max(latencias):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
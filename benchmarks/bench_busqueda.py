@@ -0,0 +1,117 @@
+# benchmarks/bench_busqueda.py
+"""
+Benchmark del índice de búsqueda en memoria (fallback sin MySQL)
+
+Construye un índice sintético de N empresas y mide la latencia de consultas
+típicas (p50 / p95 / p99). Objetivo: p99 < 50ms con 100.000 empresas.
+
+Uso:
+    python benchmarks/bench_busqueda.py
+    python benchmarks/bench_busqueda.py --empresas 100000 --consultas 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.busqueda_service import IndiceBusquedaTexto  # noqa: E402
+
+
+RUBROS = [
+    "peluquería", "barbería", "estética", "manicuría", "spa", "masajes",
+    "odontología", "kinesiología", "nutrición", "psicología", "veterinaria",
+    "taller mecánico", "lavadero", "tatuajes", "gimnasio", "yoga", "pilates",
+]
+NOMBRES = [
+    "Sol", "Luna", "Norte", "Sur", "Central", "Palermo", "Belgrano", "Rosario",
+    "Córdoba", "Mendoza", "Andes", "Patagonia", "Río", "Plaza", "Jardín",
+    "Estrella", "Aurora", "Delta", "Pampa", "Litoral",
+]
+SERVICIOS = [
+    "corte", "color", "tintura", "brushing", "barba", "uñas", "limpieza facial",
+    "depilación", "masaje descontracturante", "consulta", "control", "baño",
+    "vacunación", "cambio de aceite", "alineación", "clase grupal", "sesión",
+]
+PALABRAS = (
+    "atención profesional turnos online calidad precios accesibles equipo "
+    "especializado años experiencia ambiente cómodo productos importados "
+    "cuidado personal salud bienestar zona céntrica estacionamiento"
+).split()
+
+FilaEmpresa = namedtuple("FilaEmpresa", "empresa_id razon_social descripcion categoria_id")
+
+
+def construir_indice(cantidad: int, semilla: int = 42) -> IndiceBusquedaTexto:
+    rnd = random.Random(semilla)
+    documentos = []
+
+    for empresa_id in range(1, cantidad + 1):
+        rubro = rnd.choice(RUBROS)
+        fila = FilaEmpresa(
+            empresa_id=empresa_id,
+            razon_social=f"{rubro.title()} {rnd.choice(NOMBRES)} {rnd.randint(1, 999)}",
+            descripcion=" ".join(rnd.choices(PALABRAS, k=rnd.randint(8, 25))),
+            categoria_id=RUBROS.index(rubro) + 1,
+        )
+        documentos.append((fila, rnd.sample(SERVICIOS, k=rnd.randint(1, 5))))
+
+    indice = IndiceBusquedaTexto()
+    indice.cargar(documentos)
+    return indice
+
+
+def generar_consultas(cantidad: int, semilla: int = 7):
+    rnd = random.Random(semilla)
+    consultas = []
+    for _ in range(cantidad):
+        tipo = rnd.random()
+        if tipo < 0.4:
+            consultas.append((rnd.choice(RUBROS)[:rnd.randint(3, 8)], None))
+        elif tipo < 0.7:
+            consultas.append((f"{rnd.choice(SERVICIOS)} {rnd.choice(NOMBRES)}", None))
+        elif tipo < 0.9:
+            consultas.append((rnd.choice(SERVICIOS), rnd.randint(1, len(RUBROS))))
+        else:
+            consultas.append((" ".join(rnd.choices(PALABRAS, k=3)), None))
+    return consultas
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--empresas", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    indice = construir_indice(args.empresas)
+    construccion = time.perf_counter() - inicio
+    print(f"Índice: {args.empresas} empresas, {len(indice._postings)} términos, "
+          f"construido en {construccion:.1f}s")
+
+    latencias = []
+    for consulta, categoria_id in generar_consultas(args.consultas):
+        t0 = time.perf_counter()
+        indice.buscar(consulta, categoria_id=categoria_id, offset=0, limit=20)
+        latencias.append((time.perf_counter() - t0) * 1000)
+
+    print(f"Consultas: {len(latencias)}")
+    for p in (50, 95, 99):
+        print(f"  p{p}: {percentil(latencias, p):.2f} ms")
+    print(f"  max: {max(latencias):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
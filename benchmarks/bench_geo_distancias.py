@@ -0,0 +1,85 @@
+# benchmarks/bench_geo_distancias.py
+"""
+Microbenchmark de distancias y ranking geográfico
+
+Compara, para N candidatos (default 10.000), el cálculo escalar
+(GeolocationService.calculate_distance en un loop + sort) contra la
+versión vectorizada (haversine_km + k_menores de app/utils/geo_vectorial).
+
+Uso:
+    python benchmarks/bench_geo_distancias.py
+    python benchmarks/bench_geo_distancias.py --candidatos 10000 --k 50 --repeticiones 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import numpy as np  # noqa: E402
+
+from app.services.geolocation_service import GeolocationService  # noqa: E402
+from app.utils.geo_vectorial import haversine_km, k_menores  # noqa: E402
+
+
+def escalar(latitud, longitud, latitudes, longitudes, ids, radio_km, k):
+    encontrados = []
+    for lat, lng, empresa_id in zip(latitudes, longitudes, ids):
+        distancia = GeolocationService.calculate_distance(latitud, longitud, lat, lng)
+        if distancia <= radio_km:
+            encontrados.append((distancia, empresa_id))
+    encontrados.sort()
+    return [empresa_id for _, empresa_id in encontrados[:k]]
+
+
+def vectorial(latitud, longitud, latitudes, longitudes, ids, radio_km, k):
+    distancias = haversine_km(latitud, longitud, latitudes, longitudes)
+    dentro = np.flatnonzero(distancias <= radio_km)
+    mejores = k_menores(distancias[dentro], k, desempate=ids[dentro])
+    return ids[dentro[mejores]].tolist()
+
+
+def medir(funcion, argumentos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion(*argumentos)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return resultado, tiempos[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidatos", type=int, default=10_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--radio", type=float, default=50.0)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    latitudes = np.array([-34.6 + rnd.uniform(-0.5, 0.5) for _ in range(args.candidatos)])
+    longitudes = np.array([-58.45 + rnd.uniform(-0.5, 0.5) for _ in range(args.candidatos)])
+    ids = np.arange(1, args.candidatos + 1, dtype=np.int64)
+
+    lista_lat, lista_lng, lista_ids = latitudes.tolist(), longitudes.tolist(), ids.tolist()
+    esperado, t_escalar = medir(
+        escalar, (-34.6, -58.45, lista_lat, lista_lng, lista_ids, args.radio, args.k), args.repeticiones
+    )
+    obtenido, t_vectorial = medir(
+        vectorial, (-34.6, -58.45, latitudes, longitudes, ids, args.radio, args.k), args.repeticiones
+    )
+
+    print(f"{args.candidatos} candidatos, top {args.k}, radio {args.radio}km (mediana de {args.repeticiones})")
+    print(f"Escalar:    {t_escalar:8.3f} ms")
+    print(f"Vectorial:  {t_vectorial:8.3f} ms  ({t_escalar / t_vectorial:.1f}x)")
+    print(f"Mismo resultado: {'sí' if esperado == obtenido else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
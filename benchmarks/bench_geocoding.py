@@ -0,0 +1,406 @@
+# benchmarks/bench_geocoding.py
+"""
+Benchmark de la capa de geocodificación (sin red)
+
+Reproduce un corpus de direcciones con coordenadas conocidas
+(benchmarks/datos/geocoding_corpus.json) contra proveedores intercambiables
+y reporta, por proveedor:
+- latencia p50 / p95 / p99 y throughput
+- consultas que llegaron al proveedor remoto y conexiones abiertas
+- hit ratio del caché y consultas coalescidas (single-flight)
+- precisión contra las coordenadas conocidas (error en metros): para los
+  proveedores remotos, solo sobre las direcciones con respuesta grabada
+
+El proveedor remoto es un Georef falso local que sirve las respuestas
+grabadas en el corpus, con latencia, costo de conexión (handshake) y tasa
+de errores configurables. Sirve para evaluar cambios de caché, coalescencia
+o pooling antes de desplegarlos.
+
+Proveedores:
+    servicio   GeocodingService completo: caché + single-flight + cliente compartido
+    sin-cache  Consulta remota de GeocodingService (cliente compartido, sin caché ni coalescencia)
+    directo    Un httpx.AsyncClient por request, como los scripts anteriores (línea base)
+    local      Gazetteer local (respaldo sin red; precisión a nivel localidad)
+
+Las entradas del corpus sin "respuesta" grabada se sirven con sus
+coordenadas conocidas (el error sería siempre 0 m), así que no entran en la
+precisión de los proveedores remotos; sin ninguna grabada no se reporta.
+Para medirla, grabar respuestas de Georef real con --grabar (requiere red).
+
+Uso:
+    python benchmarks/bench_geocoding.py
+    python benchmarks/bench_geocoding.py --proveedores servicio,directo --solicitudes 5000 --concurrencia 100
+    python benchmarks/bench_geocoding.py --latencia-ms 150 --costo-conexion-ms 60 --tasa-errores 0.02
+    python benchmarks/bench_geocoding.py --grabar
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+import app.services.geocoding_service_new as modulo_servicio  # noqa: E402
+from app.core.http_client import clientes_http  # noqa: E402
+from app.services.geocoding_cache import CacheGeocodificacion, _resultado_direccion_desde_json  # noqa: E402
+from app.services.geocoding_service_new import GeocodingService, GeocodingServiceError  # noqa: E402
+from app.utils.geo_vectorial import haversine_km  # noqa: E402
+from app.utils.texto import normalizar_direccion  # noqa: E402
+
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "geocoding_corpus.json")
+
+Coordenadas = Optional[Tuple[float, float]]
+
+
+# ----------------------------------------------------------------------
+# Corpus
+# ----------------------------------------------------------------------
+
+def cargar_corpus(ruta: str) -> List[Dict[str, Any]]:
+    with open(ruta, encoding="utf-8") as archivo:
+        corpus = json.load(archivo)["direcciones"]
+    servicio = GeocodingService()
+    for entrada in corpus:
+        entrada["direccion"] = servicio._build_address_string(
+            entrada["calle"], entrada["numero"], entrada["ciudad"], entrada["provincia"]
+        )
+        entrada["clave"] = normalizar_direccion(entrada["direccion"])
+    return corpus
+
+
+def generar_carga(corpus: List[Dict[str, Any]], cantidad: int, semilla: int = 11) -> List[Dict[str, Any]]:
+    """Solicitudes con popularidad tipo Zipf: pocas direcciones concentran la mayoría"""
+    rnd = random.Random(semilla)
+    orden = corpus[:]
+    rnd.shuffle(orden)
+    pesos = [1 / (rango ** 1.1) for rango in range(1, len(orden) + 1)]
+    return rnd.choices(orden, weights=pesos, k=cantidad)
+
+
+def grabar_respuestas(ruta: str, corpus: List[Dict[str, Any]]) -> None:
+    """Consulta Georef real por cada dirección y guarda la respuesta en el corpus"""
+    async def grabar():
+        async with httpx.AsyncClient(timeout=15) as cliente:
+            for entrada in corpus:
+                response = await cliente.get(f"{GeocodingService.GEOREF_BASE_URL}/direcciones", params={
+                    "direccion": entrada["direccion"], "provincia": entrada["provincia"],
+                    "formato": "json", "campos": "completo",
+                })
+                response.raise_for_status()
+                entrada["respuesta"] = response.json()
+                print(f"  {entrada['referencia']}: {entrada['respuesta'].get('cantidad', 0)} resultados")
+                await asyncio.sleep(0.2)
+
+    asyncio.run(grabar())
+    campos = ("referencia", "calle", "numero", "ciudad", "provincia", "latitud", "longitud", "respuesta")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({"direcciones": [{c: e[c] for c in campos} for e in corpus]}, archivo, ensure_ascii=False, indent=1)
+
+
+# ----------------------------------------------------------------------
+# Georef falso con respuestas grabadas
+# ----------------------------------------------------------------------
+
+def respuesta_georef(entrada: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Respuesta grabada; si no hay, una con las coordenadas conocidas"""
+    if entrada and entrada.get("respuesta"):
+        return entrada["respuesta"]
+    if not entrada or entrada["latitud"] is None:
+        return {"cantidad": 0, "direcciones": []}
+    return {"cantidad": 1, "direcciones": [{
+        "nomenclatura": entrada["direccion"],
+        "ubicacion": {"lat": entrada["latitud"], "lon": entrada["longitud"]},
+    }]}
+
+
+def iniciar_georef_falso(corpus, latencia_ms: float, costo_conexion_ms: float, tasa_errores: float):
+    por_clave = {e["clave"]: e for e in corpus}
+    contadores = Counter()
+    rnd = random.Random(3)
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1: las conexiones quedan abiertas entre requests (keep-alive)
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            contadores["conexiones"] += 1
+            time.sleep(costo_conexion_ms / 1000)  # Handshake TCP+TLS simulado
+
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            contadores["consultas"] += 1
+            time.sleep(latencia_ms / 1000 * rnd.uniform(0.5, 1.5))
+
+            if rnd.random() < tasa_errores:
+                contadores["errores"] += 1
+                self._responder(500, {"error": "simulado"})
+                return
+
+            direccion = parse_qs(partes.query).get("direccion", [""])[0]
+            self._responder(200, respuesta_georef(por_clave.get(normalizar_direccion(direccion))))
+
+        def _responder(self, estado: int, cuerpo: Dict[str, Any]):
+            datos = json.dumps(cuerpo).encode()
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    class Servidor(ThreadingHTTPServer):
+        # Cola de accept amplia: con la de 5 por defecto las ráfagas de
+        # conexiones nuevas esperan reintentos de SYN (~1s) y distorsionan la latencia
+        request_queue_size = 256
+        daemon_threads = True
+
+    servidor = Servidor(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.contadores = contadores
+    return servidor
+
+
+# ----------------------------------------------------------------------
+# Proveedores
+# ----------------------------------------------------------------------
+
+class ProveedorServicio:
+    """GeocodingService completo, con cachés nuevos en memoria (sin base)"""
+
+    remoto = True
+
+    def __init__(self, url: str):
+        self.cache = CacheGeocodificacion(
+            tipo="direccion", max_entradas=10_000, ttl=timedelta(days=1),
+            ttl_negativo=timedelta(hours=1), persistir=False, desde_json=_resultado_direccion_desde_json
+        )
+        modulo_servicio.cache_direcciones = self.cache
+        self.servicio = GeocodingService()
+        self.servicio.GEOREF_BASE_URL = url
+
+    async def geocodificar(self, entrada) -> Coordenadas:
+        resultado = await self.servicio.geocode_address(
+            entrada["calle"], entrada["numero"], entrada["ciudad"], entrada["provincia"]
+        )
+        return resultado["coordinates"] if resultado else None
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "hit_ratio": self.cache.estadisticas()["hit_ratio"],
+            "coalescidas": self.servicio._vuelos.compartidas,
+            "circuito": self.servicio.circuito.estado,
+        }
+
+
+class ProveedorSinCache(ProveedorServicio):
+    """Solo la consulta remota de GeocodingService (cliente compartido)"""
+
+    async def geocodificar(self, entrada) -> Coordenadas:
+        resultado = await self.servicio._geocode_address_remoto(
+            entrada["calle"], entrada["numero"], entrada["ciudad"], entrada["provincia"]
+        )
+        return resultado["coordinates"] if resultado else None
+
+    def metricas(self) -> Dict[str, Any]:
+        return {"circuito": self.servicio.circuito.estado}
+
+
+class ProveedorDirecto:
+    """Un cliente httpx por request, sin caché (comportamiento de los scripts anteriores)"""
+
+    remoto = True
+
+    def __init__(self, url: str):
+        self.url = f"{url}/direcciones"
+
+    async def geocodificar(self, entrada) -> Coordenadas:
+        async with httpx.AsyncClient(timeout=10) as cliente:
+            response = await cliente.get(self.url, params={
+                "direccion": entrada["direccion"], "provincia": entrada["provincia"],
+                "formato": "json", "campos": "completo",
+            })
+            response.raise_for_status()
+            direcciones = response.json().get("direcciones")
+        if not direcciones:
+            return None
+        ubicacion = direcciones[0].get("ubicacion") or {}
+        if ubicacion.get("lat") is None:
+            return None
+        return float(ubicacion["lat"]), float(ubicacion["lon"])
+
+    def metricas(self) -> Dict[str, Any]:
+        return {}
+
+
+class ProveedorLocal:
+    """Gazetteer local: centro de la localidad"""
+
+    remoto = False
+
+    def __init__(self, url: str):
+        self.servicio = GeocodingService()
+
+    async def geocodificar(self, entrada) -> Coordenadas:
+        resultado = self.servicio._geocode_address_local(entrada["ciudad"], entrada["provincia"])
+        return resultado["coordinates"] if resultado else None
+
+    def metricas(self) -> Dict[str, Any]:
+        return {}
+
+
+PROVEEDORES = {
+    "servicio": ProveedorServicio,
+    "sin-cache": ProveedorSinCache,
+    "directo": ProveedorDirecto,
+    "local": ProveedorLocal,
+}
+
+
+# ----------------------------------------------------------------------
+# Corrida y métricas
+# ----------------------------------------------------------------------
+
+async def reproducir(proveedor, carga, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias: List[float] = []
+    resultados: Dict[str, Coordenadas] = {}
+    errores = 0
+
+    async def solicitud(entrada):
+        nonlocal errores
+        async with semaforo:
+            t0 = time.perf_counter()
+            try:
+                resultados[entrada["clave"]] = await proveedor.geocodificar(entrada)
+            except (GeocodingServiceError, httpx.HTTPError):
+                errores += 1
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*[solicitud(e) for e in carga])
+    finally:
+        await clientes_http.cerrar()
+    return latencias, resultados, errores, time.perf_counter() - inicio
+
+
+def precision(corpus, resultados: Dict[str, Coordenadas], solo_grabadas: bool) -> Dict[str, Any]:
+    """
+    Error contra las coordenadas conocidas de las direcciones respondidas.
+    Con solo_grabadas (proveedores remotos) se ignoran las direcciones que el
+    Georef falso respondió con las mismas coordenadas conocidas.
+    """
+    if solo_grabadas:
+        corpus = [e for e in corpus if e.get("respuesta")]
+        if not corpus:
+            return {"precision": "no disponible (sin respuestas grabadas de Georef, ver --grabar)"}
+
+    errores_m = []
+    aciertos_vacios = fallos = 0
+    for entrada in corpus:
+        if entrada["clave"] not in resultados:
+            continue
+        obtenido = resultados[entrada["clave"]]
+        if entrada["latitud"] is None:
+            aciertos_vacios += obtenido is None
+            continue
+        if obtenido is None:
+            fallos += 1
+            continue
+        distancia = haversine_km(entrada["latitud"], entrada["longitud"],
+                                 np.array([obtenido[0]]), np.array([obtenido[1]]), decimales=None)
+        errores_m.append(float(distancia[0]) * 1000)
+
+    return {
+        "evaluadas": len(errores_m) + fallos,
+        "sin_resultado": fallos,
+        "vacias_correctas": aciertos_vacios,
+        "hasta_100m": sum(e <= 100 for e in errores_m),
+        "hasta_1km": sum(e <= 1000 for e in errores_m),
+        "error_mediano_m": round(statistics.median(errores_m), 1) if errores_m else None,
+    }
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--proveedores", default=",".join(PROVEEDORES), help="Lista separada por comas")
+    parser.add_argument("--solicitudes", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=80, help="Latencia media del Georef falso")
+    parser.add_argument("--costo-conexion-ms", type=float, default=40, help="Costo de abrir cada conexión")
+    parser.add_argument("--tasa-errores", type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument("--grabar", action="store_true", help="Grabar respuestas de Georef real en el corpus")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    corpus = cargar_corpus(args.corpus)
+
+    if args.grabar:
+        grabar_respuestas(args.corpus, corpus)
+        return
+
+    grabadas = sum(1 for e in corpus if e.get("respuesta"))
+    print(f"Corpus: {len(corpus)} direcciones ({grabadas} con respuesta grabada)")
+    if grabadas < len(corpus):
+        print("  Sin respuesta grabada se sirven las coordenadas conocidas: "
+              "esas direcciones no cuentan en la precisión de los proveedores remotos")
+    carga = generar_carga(corpus, args.solicitudes)
+    print(f"Carga: {len(carga)} solicitudes, {len({e['clave'] for e in carga})} direcciones distintas, "
+          f"concurrencia {args.concurrencia}")
+
+    # El gazetteer se carga en el primer uso: fuera de la medición
+    modulo_servicio.obtener_gazetteer()
+
+    for nombre in args.proveedores.split(","):
+        servidor = iniciar_georef_falso(corpus, args.latencia_ms, args.costo_conexion_ms, args.tasa_errores)
+        try:
+            proveedor = PROVEEDORES[nombre](servidor.url)
+            latencias, resultados, errores, segundos = asyncio.run(
+                reproducir(proveedor, carga, args.concurrencia)
+            )
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+        print(f"\n[{nombre}]")
+        print(f"  total: {segundos:.2f}s ({len(carga) / segundos:.0f} solicitudes/s), errores: {errores}")
+        print("  latencia: " + ", ".join(
+            f"p{p} {percentil(latencias, p):.1f} ms" for p in (50, 95, 99)
+        ) + f", max {max(latencias):.1f} ms")
+        print(f"  proveedor remoto: {servidor.contadores['consultas']} consultas, "
+              f"{servidor.contadores['conexiones']} conexiones")
+        for clave, valor in {**proveedor.metricas(), **precision(corpus, resultados, proveedor.remoto)}.items():
+            print(f"  {clave}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
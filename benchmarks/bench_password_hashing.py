@@ -0,0 +1,135 @@
+# benchmarks/bench_password_hashing.py
+"""
+Benchmark de los perfiles de hashing de contraseñas
+
+Para cada perfil mide la verificación de una contraseña correcta (lo que
+cuesta un login) y reporta:
+- latencia p50 / p95 de una verificación en un solo thread
+- logins/s por núcleo (1 / tiempo de CPU por verificación)
+- throughput con el pool de hashing de la API (--workers threads en paralelo)
+
+Sirve para elegir PASSWORD_HASH_PERFIL y sus parámetros por despliegue: la
+idea es el costo más alto que todavía deja los logins/s que necesita el pico
+con los núcleos disponibles.
+
+Perfiles (lista separada por comas):
+    bcrypt-<rounds>                                   ej: bcrypt-12
+    argon2id-<memoria_kib>-<iteraciones>-<paralelismo>  ej: argon2id-19456-2-1
+
+Los perfiles argon2id se omiten si no está instalado argon2-cffi.
+
+Uso:
+    python benchmarks/bench_password_hashing.py
+    python benchmarks/bench_password_hashing.py --perfiles bcrypt-10,bcrypt-12 --verificaciones 50
+    python benchmarks/bench_password_hashing.py --workers 8 --logins 400
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from passlib.context import CryptContext  # noqa: E402
+from passlib.hash import argon2  # noqa: E402
+
+from app.core.password_hashing import PoolHashing, crear_contexto_hashing  # noqa: E402
+
+
+PERFILES = "bcrypt-10,bcrypt-11,bcrypt-12,bcrypt-13,argon2id-19456-2-1,argon2id-47104-1-1,argon2id-65536-3-4"
+
+PASSWORD = "Benchmark-Password-123"
+
+
+def crear_contexto(perfil: str) -> CryptContext:
+    nombre, *parametros = perfil.split("-")
+    valores = [int(p) for p in parametros]
+    if nombre == "bcrypt":
+        return crear_contexto_hashing("bcrypt", bcrypt_rounds=valores[0])
+    if nombre == "argon2id":
+        memoria, iteraciones, paralelismo = valores
+        return crear_contexto_hashing(
+            "argon2id",
+            argon2_memoria_kib=memoria,
+            argon2_iteraciones=iteraciones,
+            argon2_paralelismo=paralelismo,
+        )
+    raise ValueError(f"Perfil desconocido: {perfil}")
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir_secuencial(contexto: CryptContext, hashed: str, verificaciones: int) -> Dict[str, float]:
+    latencias: List[float] = []
+    cpu_inicio = time.process_time()
+    for _ in range(verificaciones):
+        inicio = time.perf_counter()
+        assert contexto.verify(PASSWORD, hashed)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    cpu_ms = (time.process_time() - cpu_inicio) * 1000 / verificaciones
+
+    return {
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "cpu_ms": cpu_ms,
+        "logins_por_nucleo": 1000 / cpu_ms if cpu_ms else float("inf"),
+    }
+
+
+async def medir_pool(contexto: CryptContext, hashed: str, logins: int, workers: int) -> float:
+    """Logins/s con el pool de la API atendiendo `logins` verificaciones concurrentes"""
+    pool = PoolHashing(workers=workers, max_en_cola=logins)
+    try:
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*[
+            pool.ejecutar(contexto.verify, PASSWORD, hashed) for _ in range(logins)
+        ])
+        segundos = time.perf_counter() - inicio
+    finally:
+        pool.cerrar()
+    assert all(resultados)
+    return logins / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfiles", default=PERFILES, help="Lista separada por comas")
+    parser.add_argument("--verificaciones", type=int, default=20, help="Verificaciones secuenciales por perfil")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Threads del pool de hashing")
+    parser.add_argument("--logins", type=int, default=0,
+                        help="Logins concurrentes contra el pool (por defecto 4 por worker)")
+    args = parser.parse_args()
+    logins = args.logins or args.workers * 4
+
+    print(f"Núcleos: {os.cpu_count()}, workers del pool: {args.workers}, logins concurrentes: {logins}")
+    print(f"{'perfil':<24}{'p50 ms':>10}{'p95 ms':>10}{'CPU ms':>10}{'logins/s/núcleo':>18}{'logins/s pool':>16}")
+
+    for perfil in args.perfiles.split(","):
+        if perfil.startswith("argon2id") and not argon2.has_backend():
+            print(f"{perfil:<24}omitido (requiere argon2-cffi)")
+            continue
+
+        contexto = crear_contexto(perfil)
+        hashed = contexto.hash(PASSWORD)
+        # Primera verificación fuera de la medición (carga del backend)
+        contexto.verify(PASSWORD, hashed)
+
+        secuencial = medir_secuencial(contexto, hashed, args.verificaciones)
+        throughput = asyncio.run(medir_pool(contexto, hashed, logins, args.workers))
+        print(
+            f"{perfil:<24}{secuencial['p50_ms']:>10.1f}{secuencial['p95_ms']:>10.1f}"
+            f"{secuencial['cpu_ms']:>10.1f}{secuencial['logins_por_nucleo']:>18.1f}{throughput:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()